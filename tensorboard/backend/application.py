@@ -38,6 +38,10 @@ from six.moves.urllib import parse as urlparse  # pylint: disable=wrong-import-o
 from werkzeug import wrappers
 
 from tensorboard.backend import http_util
+from tensorboard.backend import metrics
+from tensorboard.backend import profiling
+from tensorboard.backend import response_cache
+from tensorboard.backend import thumbnails
 from tensorboard.backend.event_processing import db_import_multiplexer
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
@@ -68,6 +72,9 @@ DEFAULT_TENSOR_SIZE_GUIDANCE = {
 DATA_PREFIX = '/data'
 PLUGIN_PREFIX = '/plugin'
 PLUGINS_LISTING_ROUTE = '/plugins_listing'
+METRICS_ROUTE = '/metrics'
+PROFILES_ROUTE = '/debug/profiles'
+PROFILE_ROUTE = '/debug/profile'
 
 # Slashes in a plugin name could throw the router for a loop. An empty
 # name would be confusing, too. To be safe, let's restrict the valid
@@ -76,6 +83,27 @@ _VALID_PLUGIN_RE = re.compile(r'^[A-Za-z0-9_.-]+$')
 
 logger = tb_logging.get_logger()
 
+_REQUESTS = metrics.REGISTRY.Counter(
+    'tensorboard_http_requests_total',
+    'Number of HTTP requests, by route and status code.',
+    labels=('route', 'code'))
+_REQUEST_SECONDS = metrics.REGISTRY.Histogram(
+    'tensorboard_http_request_duration_seconds',
+    'Time until the response to HTTP requests was ready to be sent, by '
+    'route and status code.',
+    labels=('route', 'code'))
+_RELOAD_SECONDS = metrics.REGISTRY.Histogram(
+    'tensorboard_reload_duration_seconds',
+    'How long each reload of all runs took, including looking for new runs.',
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0,
+             1800.0))
+_LAST_RELOAD = metrics.REGISTRY.Gauge(
+    'tensorboard_last_reload_timestamp_seconds',
+    'When the latest reload of all runs finished, in seconds since the '
+    'epoch.')
+# The route label of requests for unknown paths.
+_UNKNOWN_ROUTE = 'unknown'
+
 
 def tensor_size_guidance_from_flags(flags):
   """Apply user per-summary size guidance overrides."""
@@ -109,7 +137,13 @@ def standard_tensorboard_wsgi(flags, plugin_loaders, assets_zip_provider):
       size_guidance=DEFAULT_SIZE_GUIDANCE,
       tensor_size_guidance=tensor_size_guidance_from_flags(flags),
       purge_orphaned_data=flags.purge_orphaned_data,
-      max_reload_threads=flags.max_reload_threads)
+      max_reload_threads=flags.max_reload_threads,
+      max_reload_processes=flags.max_reload_processes,
+      ingest_cache_dir=flags.ingest_cache_dir,
+      logdir_full_rescan_interval_secs=flags.logdir_full_rescan_interval,
+      watch_for_changes=flags.watch_for_changes,
+      max_memory_bytes=int(flags.max_memory_mb * 2**20),
+      memory_eviction_policy=flags.memory_eviction_policy)
   loading_multiplexer = multiplexer
   reload_interval = flags.reload_interval
   # For db import op mode, prefer reloading in a child process. See
@@ -138,6 +172,11 @@ def standard_tensorboard_wsgi(flags, plugin_loaders, assets_zip_provider):
     # DB read-only mode, never load event logs.
     reload_interval = -1
   plugin_name_to_instance = {}
+  cache = None
+  if flags.response_cache_mb > 0:
+    cache = response_cache.ResponseCache(int(flags.response_cache_mb * 2**20))
+  thumbnail_cache = thumbnails.ThumbnailCache(
+      int(flags.thumbnail_cache_mb * 2**20), flags.thumbnail_threads)
   context = base_plugin.TBContext(
       db_module=db_module,
       db_connection_provider=db_connection_provider,
@@ -147,7 +186,18 @@ def standard_tensorboard_wsgi(flags, plugin_loaders, assets_zip_provider):
       multiplexer=multiplexer,
       assets_zip_provider=assets_zip_provider,
       plugin_name_to_instance=plugin_name_to_instance,
+      response_cache=cache,
+      thumbnail_cache=thumbnail_cache,
       window_title=flags.window_title)
+  _ExportReservoirMetrics(multiplexer)
+  profiler = profiling.Profiler(
+      request_threshold_secs=flags.profile_requests_slower_than_ms / 1000.0,
+      reload_threshold_secs=flags.profile_reloads_slower_than_secs,
+      mode=flags.profiler,
+      max_profiles=flags.max_profiles)
+  http_util.ConfigureCompression(
+      min_bytes=flags.compression_min_bytes,
+      levels=http_util.ParseCompressionLevels(flags.compression_levels))
   plugins = []
   for loader in plugin_loaders:
     plugin = loader.load(context)
@@ -157,11 +207,11 @@ def standard_tensorboard_wsgi(flags, plugin_loaders, assets_zip_provider):
     plugin_name_to_instance[plugin.plugin_name] = plugin
   return TensorBoardWSGIApp(flags.logdir, plugins, loading_multiplexer,
                             reload_interval, flags.path_prefix,
-                            reload_task)
+                            reload_task, profiler)
 
 
 def TensorBoardWSGIApp(logdir, plugins, multiplexer, reload_interval,
-                       path_prefix='', reload_task='auto'):
+                       path_prefix='', reload_task='auto', profiler=None):
   """Constructs the TensorBoard application.
 
   Args:
@@ -174,6 +224,7 @@ def TensorBoardWSGIApp(logdir, plugins, multiplexer, reload_interval,
       Zero means reload just once at startup; negative means never load.
     path_prefix: A prefix of the path when app isn't served from root.
     reload_task: Indicates the type of background task to reload with.
+    profiler: An optional `profiling.Profiler` of requests and reloads.
 
   Returns:
     A WSGI application that implements the TensorBoard backend.
@@ -189,19 +240,21 @@ def TensorBoardWSGIApp(logdir, plugins, multiplexer, reload_interval,
     # We either reload the multiplexer once when TensorBoard starts up, or we
     # continuously reload the multiplexer.
     start_reloading_multiplexer(multiplexer, path_to_run, reload_interval,
-                                reload_task)
-  return TensorBoardWSGI(plugins, path_prefix)
+                                reload_task, profiler)
+  return TensorBoardWSGI(plugins, path_prefix, profiler)
 
 
 class TensorBoardWSGI(object):
   """The TensorBoard WSGI app that delegates to a set of TBPlugin."""
 
-  def __init__(self, plugins, path_prefix=''):
+  def __init__(self, plugins, path_prefix='', profiler=None):
     """Constructs TensorBoardWSGI instance.
 
     Args:
       plugins: A list of base_plugin.TBPlugin subclass instances.
-      flags: An argparse.Namespace containing TensorBoard CLI flags.
+      path_prefix: A prefix of the path when app isn't served from root.
+      profiler: An optional `profiling.Profiler` of requests, whose profiles
+        are then served at `/debug/profiles`.
 
     Returns:
       A WSGI application for the set of all TBPlugin instances.
@@ -217,6 +270,7 @@ class TensorBoardWSGI(object):
     :type plugins: list[base_plugin.TBPlugin]
     """
     self._plugins = plugins
+    self._profiler = profiler or profiling.Profiler()
     if path_prefix.endswith('/'):
       self._path_prefix = path_prefix[:-1]
     else:
@@ -228,7 +282,13 @@ class TensorBoardWSGI(object):
         # active.
         self._path_prefix + DATA_PREFIX + PLUGINS_LISTING_ROUTE:
             self._serve_plugins_listing,
+        self._path_prefix + METRICS_ROUTE: self._serve_metrics,
     }
+    if self._profiler.enabled:
+      self.data_applications[self._path_prefix + PROFILES_ROUTE] = (
+          self._serve_profiles)
+      self.data_applications[self._path_prefix + PROFILE_ROUTE] = (
+          self._serve_profile)
 
     # Serve the routes from the registered plugins using their name as the route
     # prefix. For example if plugin z has two routes /a and /b, they will be
@@ -284,6 +344,39 @@ class TensorBoardWSGI(object):
           plugin.plugin_name, elapsed)
     return http_util.Respond(request, response, 'application/json')
 
+  @wrappers.Request.application
+  def _serve_metrics(self, request):
+    """Serves `metrics.REGISTRY` in the Prometheus text format."""
+    return http_util.Respond(
+        request, metrics.REGISTRY.Render(), metrics.CONTENT_TYPE)
+
+  @wrappers.Request.application
+  def _serve_profiles(self, request):
+    """Serves a list of the kept profiles, latest first."""
+    return http_util.Respond(
+        request, [p.Summary() for p in self._profiler.Profiles()],
+        'application/json')
+
+  @wrappers.Request.application
+  def _serve_profile(self, request):
+    """Serves the data of the profile given by the `id` query parameter."""
+    try:
+      profile_id = int(request.args.get('id'))
+    except (TypeError, ValueError):
+      return http_util.Respond(
+          request, 'query parameter "id" must be an integer', 'text/plain',
+          code=400)
+    profile = self._profiler.Get(profile_id)
+    if profile is None:
+      return http_util.Respond(
+          request, 'no profile with id %d' % profile_id, 'text/plain',
+          code=404)
+    if profile.mode == profiling.CPROFILE:
+      content_type = 'application/octet-stream'
+    else:
+      content_type = 'text/plain'
+    return http_util.Respond(request, profile.data, content_type)
+
   def __call__(self, environ, start_response):  # pylint: disable=invalid-name
     """Central entry point for the TensorBoard application.
 
@@ -304,14 +397,49 @@ class TensorBoardWSGI(object):
     parsed_url = urlparse.urlparse(request.path)
     clean_path = _clean_path(parsed_url.path, self._path_prefix)
 
-    # pylint: disable=too-many-function-args
-    if clean_path in self.data_applications:
-      return self.data_applications[clean_path](environ, start_response)
-    else:
-      logger.warn('path %s not found, sending 404', clean_path)
-      return http_util.Respond(request, 'Not found', 'text/plain', code=404)(
-          environ, start_response)
-    # pylint: enable=too-many-function-args
+    start = time.time()
+    statuses = []
+    def _start_response(status, headers, exc_info=None):
+      statuses.append(status.split(' ', 1)[0])
+      return start_response(status, headers, exc_info)
+
+    route = (clean_path if clean_path in self.data_applications
+             else _UNKNOWN_ROUTE)
+    try:
+      # pylint: disable=too-many-function-args
+      with self._profiler.Profile(profiling.REQUEST, route):
+        if clean_path in self.data_applications:
+          return self.data_applications[clean_path](environ, _start_response)
+        else:
+          logger.warn('path %s not found, sending 404', clean_path)
+          return http_util.Respond(
+              request, 'Not found', 'text/plain', code=404)(
+                  environ, _start_response)
+      # pylint: enable=too-many-function-args
+    finally:
+      # Unhandled exceptions turn into internal server errors.
+      labels = (route, statuses[-1] if statuses else '500')
+      _REQUESTS.Inc(labels=labels)
+      _REQUEST_SECONDS.Observe(time.time() - start, labels=labels)
+
+
+def _ExportReservoirMetrics(multiplexer):
+  """Exports how much data the reservoirs of a multiplexer hold."""
+  def stats():
+    return {(plugin_name,): value for (plugin_name, value)
+            in six.iteritems(multiplexer.ReservoirStats())}
+  metrics.REGISTRY.GaugeFunction(
+      'tensorboard_reservoir_items',
+      'Number of samples kept in memory, by plugin.',
+      ('plugin',),
+      lambda: {key: num_items for (key, (num_items, _)) in six.iteritems(
+          stats())})
+  metrics.REGISTRY.GaugeFunction(
+      'tensorboard_reservoir_bytes',
+      'Approximate bytes of samples kept in memory, by plugin.',
+      ('plugin',),
+      lambda: {key: num_bytes for (key, (_, num_bytes)) in six.iteritems(
+          stats())})
 
 
 def parse_event_files_spec(logdir):
@@ -358,12 +486,14 @@ def parse_event_files_spec(logdir):
 
 
 def start_reloading_multiplexer(multiplexer, path_to_run, load_interval,
-                                reload_task):
+                                reload_task, profiler=None):
   """Starts automatically reloading the given multiplexer.
 
   If `load_interval` is positive, the thread will reload the multiplexer
   by calling `ReloadMultiplexer` every `load_interval` seconds, starting
-  immediately. Otherwise, reloads the multiplexer once and never again.
+  immediately. Otherwise, reloads the multiplexer once and never again. If
+  the multiplexer watches its runs for changes, runs that change are also
+  reloaded in between, as soon as they do.
 
   Args:
     multiplexer: The `EventMultiplexer` to add runs to and reload.
@@ -373,27 +503,49 @@ def start_reloading_multiplexer(multiplexer, path_to_run, load_interval,
       seconds to wait after one load before starting the next load. Otherwise,
       reloads the multiplexer once and never again (no continuous reloading).
     reload_task: Indicates the type of background task to reload with.
+    profiler: An optional `profiling.Profiler` of reloads. Profiles of
+      reloads in a child process are lost.
 
   Raises:
     ValueError: If `load_interval` is negative.
   """
   if load_interval < 0:
     raise ValueError('load_interval is negative: %d' % load_interval)
+  profiler = profiler or profiling.Profiler()
+  if reload_task == 'process' and profiler.Enabled(profiling.RELOAD):
+    logger.warn('Reloads in a child process are not profiled')
+    profiler = profiling.Profiler()
 
   def _reload():
+    changed_only = False
     while True:
       start = time.time()
       logger.info('TensorBoard reload process beginning')
-      for path, name in six.iteritems(path_to_run):
-        multiplexer.AddRunsFromDirectory(path, name)
-      logger.info('TensorBoard reload process: Reload the whole Multiplexer')
-      multiplexer.Reload()
+      with profiler.Profile(profiling.RELOAD, 'reload'):
+        if changed_only:
+          logger.info('TensorBoard reload process: Reload the changed runs')
+          multiplexer.Reload(changed_only=True)
+        else:
+          for path, name in six.iteritems(path_to_run):
+            multiplexer.AddRunsFromDirectory(path, name)
+          logger.info(
+              'TensorBoard reload process: Reload the whole Multiplexer')
+          multiplexer.Reload()
       duration = time.time() - start
       logger.info('TensorBoard done reloading. Load took %0.3f secs', duration)
+      _RELOAD_SECONDS.Observe(duration)
+      _LAST_RELOAD.Set(time.time())
       if load_interval == 0:
         # Only load the multiplexer once. Do not continuously reload.
         break
-      time.sleep(load_interval)
+      if not changed_only:
+        next_full_reload = time.time() + load_interval
+      # Returns early if the multiplexer watches its runs and one changes.
+      # Until the next full reload is due, only changed runs are reloaded:
+      # looking for new runs and polling unwatched runs wait for it.
+      changed_only = (
+          multiplexer.WaitForChanges(max(next_full_reload - time.time(), 0))
+          and time.time() < next_full_reload)
 
   if reload_task == 'process':
     logger.info('Launching reload in a child process')
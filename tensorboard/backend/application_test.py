@@ -27,6 +27,7 @@ import posixpath
 import shutil
 import socket
 import tempfile
+import time
 
 import six
 
@@ -41,6 +42,7 @@ from werkzeug import wrappers
 
 from tensorboard import test as tb_test
 from tensorboard.backend import application
+from tensorboard.backend import profiling
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
 from tensorboard.plugins import base_plugin
 
@@ -53,7 +55,22 @@ class FakeFlags(object):
       reload_interval=60,
       samples_per_plugin='',
       max_reload_threads=1,
+      max_reload_processes=0,
+      ingest_cache_dir='',
+      logdir_full_rescan_interval=600.0,
+      watch_for_changes=False,
+      response_cache_mb=64.0,
+      thumbnail_cache_mb=64.0,
+      thumbnail_threads=4,
+      compression_min_bytes=512,
+      compression_levels='',
+      max_memory_mb=0.0,
+      memory_eviction_policy='largest',
       reload_task='auto',
+      profile_requests_slower_than_ms=0.0,
+      profile_reloads_slower_than_secs=0.0,
+      profiler='sample',
+      max_profiles=20,
       db='',
       db_import=False,
       db_import_use_op=False,
@@ -64,7 +81,22 @@ class FakeFlags(object):
     self.reload_interval = reload_interval
     self.samples_per_plugin = samples_per_plugin
     self.max_reload_threads = max_reload_threads
+    self.max_reload_processes = max_reload_processes
+    self.ingest_cache_dir = ingest_cache_dir
+    self.logdir_full_rescan_interval = logdir_full_rescan_interval
+    self.watch_for_changes = watch_for_changes
+    self.response_cache_mb = response_cache_mb
+    self.thumbnail_cache_mb = thumbnail_cache_mb
+    self.thumbnail_threads = thumbnail_threads
+    self.compression_min_bytes = compression_min_bytes
+    self.compression_levels = compression_levels
+    self.max_memory_mb = max_memory_mb
+    self.memory_eviction_policy = memory_eviction_policy
     self.reload_task = reload_task
+    self.profile_requests_slower_than_ms = profile_requests_slower_than_ms
+    self.profile_reloads_slower_than_secs = profile_reloads_slower_than_secs
+    self.profiler = profiler
+    self.max_profiles = max_profiles
     self.db = db
     self.db_import = db_import
     self.db_import_use_op = db_import_use_op
@@ -149,6 +181,64 @@ class ApplicationTest(tb_test.TestCase):
     # Plugin foo is active. Plugin bar is not.
     self.assertEqual(parsed_object, {'foo': True, 'bar': False})
 
+  def testMetrics(self):
+    """Test that /metrics counts the requests served so far."""
+    requests = application._REQUESTS
+    before = requests.Value(labels=('/data/plugins_listing', '200'))
+    unknown_before = requests.Value(labels=('unknown', '404'))
+    self._get_json('/data/plugins_listing')
+    self.server.get('/asdf')
+    response = self.server.get('/metrics')
+    self.assertEqual(200, response.status_code)
+    self.assertEqual('text/plain; version=0.0.4; charset=utf-8',
+                     response.headers.get('Content-Type'))
+    body = response.get_data().decode('utf-8')
+    self.assertIn(
+        'tensorboard_http_requests_total{route="/data/plugins_listing",'
+        'code="200"} %d' % (before + 1), body)
+    self.assertIn(
+        'tensorboard_http_requests_total{route="unknown",code="404"} %d'
+        % (unknown_before + 1), body)
+    self.assertIn('# TYPE tensorboard_http_request_duration_seconds '
+                  'histogram', body)
+
+
+class ApplicationProfilingTest(tb_test.TestCase):
+  def setUp(self):
+    @wrappers.Request.application
+    def slow_route(request):
+      time.sleep(0.05)
+      return wrappers.Response(b'slow')
+    plugins = [
+        FakePlugin(
+            None, plugin_name='foo', is_active_value=True,
+            routes_mapping={'/slow': slow_route}),
+    ]
+    self.profiler = profiling.Profiler(request_threshold_secs=0.02)
+    app = application.TensorBoardWSGI(plugins, profiler=self.profiler)
+    self.server = werkzeug_test.Client(app, wrappers.BaseResponse)
+
+  def testProfilesSlowRequests(self):
+    self.server.get('/data/plugins_listing')
+    self.assertEqual(200, self.server.get('/data/plugin/foo/slow').status_code)
+    response = self.server.get('/debug/profiles')
+    self.assertEqual(200, response.status_code)
+    (summary,) = json.loads(response.get_data().decode('utf-8'))
+    self.assertEqual('request', summary['kind'])
+    self.assertEqual('/data/plugin/foo/slow', summary['name'])
+    response = self.server.get('/debug/profile?id=%d' % summary['id'])
+    self.assertEqual(200, response.status_code)
+    self.assertEqual(
+        self.profiler.Get(summary['id']).data, response.get_data())
+    self.assertEqual(
+        404, self.server.get('/debug/profile?id=12345').status_code)
+    self.assertEqual(400, self.server.get('/debug/profile').status_code)
+
+  def testNoDebugRoutesWhenDisabled(self):
+    app = application.TensorBoardWSGI([])
+    server = werkzeug_test.Client(app, wrappers.BaseResponse)
+    self.assertEqual(404, server.get('/debug/profiles').status_code)
+
 
 class ApplicationBaseUrlTest(tb_test.TestCase):
   path_prefix = '/test'
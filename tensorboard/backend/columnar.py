@@ -0,0 +1,142 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""A compact binary format for responses of numeric series.
+
+Routes that serve long numeric series, like those of scalars and histograms,
+can send them as named columns of little-endian typed arrays rather than as
+JSON, which is several times smaller and costs one `tobytes()` per column to
+encode and one typed array view per column to decode, such as in JavaScript
+with `new Float64Array(buffer, offset, length)`.
+
+A payload is laid out as follows:
+
+  * the 4 bytes `MAGIC`;
+  * the length of the header, as a little-endian uint32;
+  * the header, a UTF-8 JSON object with a `columns` list that describes each
+    column with its `name`, its NumPy `dtype` string such as "<f8", its
+    `shape`, and the `offset` of its data from the start of the data section;
+  * zero padding up to a multiple of 8 bytes from the start of the payload,
+    which is where the data section starts;
+  * the data of each column in C order, each padded to a multiple of 8 bytes
+    so that every column is aligned for any typed array.
+
+Clients ask for the format with a `format=columnar` query parameter, or by
+listing `MIME_TYPE` in their Accept header.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import json
+import struct
+
+import numpy as np
+
+MIME_TYPE = 'application/x-tensorboard-columnar'
+FORMAT = 'columnar'
+MAGIC = b'TBC1'
+
+_HEADER_LENGTH = struct.Struct('<I')
+_ALIGNMENT = 8
+
+
+def Requested(request):
+  """Returns whether a request asks for a columnar response.
+
+  Args:
+    request: A werkzeug Request.
+
+  Returns:
+    True if the request's `format` argument is `FORMAT`, or if it has no
+    `format` argument and explicitly accepts `MIME_TYPE`.
+  """
+  output_format = request.args.get('format')
+  if output_format is not None:
+    return output_format == FORMAT
+  return any(mimetype == MIME_TYPE and quality > 0
+             for (mimetype, quality) in request.accept_mimetypes)
+
+
+def Encode(columns):
+  """Encodes named columns as a columnar payload.
+
+  Args:
+    columns: A list of `(name, array)` pairs, where each array is a NumPy
+      array of a numeric or boolean dtype.
+
+  Returns:
+    The payload as bytes.
+  """
+  header = []
+  chunks = []
+  offset = 0
+  for (name, array) in columns:
+    array = np.asarray(array)
+    dtype = array.dtype.newbyteorder('<')
+    if dtype.kind not in 'biuf':
+      raise ValueError('Column %r has non-numeric dtype %s' % (name, dtype))
+    data = np.ascontiguousarray(array, dtype=dtype).tobytes()
+    header.append({
+        'name': name,
+        'dtype': dtype.str,
+        'shape': list(array.shape),
+        'offset': offset,
+    })
+    chunks.append(data)
+    chunks.append(_Padding(len(data)))
+    offset += len(data) + len(chunks[-1])
+  header = json.dumps({'columns': header}, sort_keys=True).encode('utf-8')
+  prefix = MAGIC + _HEADER_LENGTH.pack(len(header)) + header
+  return b''.join([prefix, _Padding(len(prefix))] + chunks)
+
+
+def Decode(payload):
+  """Decodes a columnar payload.
+
+  Args:
+    payload: Bytes as returned by `Encode`.
+
+  Returns:
+    An `OrderedDict` mapping the name of each column to a read-only NumPy
+    array.
+
+  Raises:
+    ValueError: If the payload is malformed.
+  """
+  if payload[:len(MAGIC)] != MAGIC:
+    raise ValueError('Not a columnar payload')
+  start = len(MAGIC) + _HEADER_LENGTH.size
+  (header_length,) = _HEADER_LENGTH.unpack(payload[len(MAGIC):start])
+  header = json.loads(payload[start:start + header_length].decode('utf-8'))
+  data_start = start + header_length
+  data_start += len(_Padding(data_start))
+  columns = collections.OrderedDict()
+  for column in header['columns']:
+    dtype = np.dtype(str(column['dtype']))
+    shape = tuple(column['shape'])
+    count = int(np.prod(shape))
+    offset = data_start + column['offset']
+    if offset + count * dtype.itemsize > len(payload):
+      raise ValueError('Column %r is truncated' % column['name'])
+    columns[column['name']] = np.frombuffer(
+        payload, dtype=dtype, count=count, offset=offset).reshape(shape)
+  return columns
+
+
+def _Padding(length):
+  """Returns the zero bytes that align `length` to `_ALIGNMENT`."""
+  return b'\0' * (-length % _ALIGNMENT)
@@ -0,0 +1,110 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for tensorboard.backend.columnar."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import struct
+
+import numpy as np
+import six
+from werkzeug import test as werkzeug_test
+from werkzeug import wrappers
+
+from tensorboard import test as tb_test
+from tensorboard.backend import columnar
+
+
+def _Request(query_string='', accept=None):
+  headers = {'Accept': accept} if accept is not None else {}
+  return wrappers.Request(werkzeug_test.EnvironBuilder(
+      query_string=query_string, headers=headers).get_environ())
+
+
+class EncodeTest(tb_test.TestCase):
+
+  def testRoundTrip(self):
+    columns = [
+        ('wall_time', np.array([1.5, 2.5, 3.25])),
+        ('step', np.array([1, 2, 3], dtype=np.int64)),
+        ('value', np.array([0.5, -1, np.inf], dtype=np.float32)),
+        ('buckets', np.arange(12, dtype=np.float64).reshape(4, 3)),
+        ('empty', np.zeros((0, 3))),
+    ]
+    decoded = columnar.Decode(columnar.Encode(columns))
+    self.assertEqual([name for (name, _) in columns], list(decoded))
+    for (name, array) in columns:
+      self.assertEqual(array.dtype, decoded[name].dtype)
+      np.testing.assert_array_equal(array, decoded[name])
+
+  def testLayout(self):
+    payload = columnar.Encode([
+        ('step', np.array([7], dtype=np.int32)),
+        ('value', np.array([1.0, 2.0])),
+    ])
+    self.assertEqual(columnar.MAGIC, payload[:4])
+    (header_length,) = struct.unpack('<I', payload[4:8])
+    header = json.loads(payload[8:8 + header_length].decode('utf-8'))
+    self.assertEqual([
+        {'name': 'step', 'dtype': '<i4', 'shape': [1], 'offset': 0},
+        {'name': 'value', 'dtype': '<f8', 'shape': [2], 'offset': 8},
+    ], header['columns'])
+    data_start = 8 + header_length
+    data_start += -data_start % 8
+    self.assertEqual(data_start + 24, len(payload))
+    self.assertEqual(struct.pack('<i', 7), payload[data_start:data_start + 4])
+    self.assertEqual(struct.pack('<2d', 1.0, 2.0), payload[-16:])
+
+  def testConvertsToLittleEndian(self):
+    array = np.array([1, 2], dtype='>i8')
+    decoded = columnar.Decode(columnar.Encode([('step', array)]))
+    self.assertEqual('<i8', decoded['step'].dtype.str)
+    np.testing.assert_array_equal([1, 2], decoded['step'])
+
+  def testRejectsNonNumericColumns(self):
+    with six.assertRaisesRegex(self, ValueError, 'non-numeric'):
+      columnar.Encode([('tag', np.array(['a', 'b']))])
+
+  def testRejectsMalformedPayloads(self):
+    with six.assertRaisesRegex(self, ValueError, 'Not a columnar payload'):
+      columnar.Decode(b'[1, 2, 3]')
+    payload = columnar.Encode([('value', np.arange(4.0))])
+    with six.assertRaisesRegex(self, ValueError, 'truncated'):
+      columnar.Decode(payload[:-8])
+
+
+class RequestedTest(tb_test.TestCase):
+
+  def testFormatArgument(self):
+    self.assertTrue(columnar.Requested(_Request('format=columnar')))
+    self.assertFalse(columnar.Requested(_Request('format=json')))
+    self.assertFalse(columnar.Requested(
+        _Request('format=csv', accept=columnar.MIME_TYPE)))
+
+  def testAcceptHeader(self):
+    self.assertTrue(columnar.Requested(_Request(accept=columnar.MIME_TYPE)))
+    self.assertTrue(columnar.Requested(_Request(
+        accept='application/json;q=0.5, %s' % columnar.MIME_TYPE)))
+    self.assertFalse(columnar.Requested(_Request(
+        accept='%s;q=0' % columnar.MIME_TYPE)))
+    self.assertFalse(columnar.Requested(_Request(accept='*/*')))
+    self.assertFalse(columnar.Requested(_Request()))
+
+
+if __name__ == '__main__':
+  tb_test.main()
@@ -0,0 +1,260 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Event-driven change notification for local run directories.
+
+Polling a run costs a directory listing and several stats on every reload,
+even if nothing was written. On Linux, an `InotifyChangeNotifier` instead
+asks the kernel to report writes to the watched paths, so that idle runs
+need not be touched at all and new data can be picked up as soon as it is
+written. inotify is used through `ctypes`, so there are no extra
+dependencies; where it is unavailable, `IsSupported` returns False and
+callers should keep polling.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+
+from tensorboard.compat import tf
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+# Constants from <sys/inotify.h>.
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO |
+               _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+
+# struct inotify_event { int wd; uint32_t mask, cookie, len; char name[]; }
+_EVENT_HEADER = struct.Struct('iIII')
+
+_READ_SIZE = 64 * 1024
+
+_libc = None
+_libc_lock = threading.Lock()
+
+
+def _GetLibc():
+  """Returns libc with the inotify functions, or None if unavailable."""
+  global _libc
+  with _libc_lock:
+    if _libc is None:
+      _libc = False
+      if sys.platform.startswith('linux'):
+        try:
+          libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                             use_errno=True)
+          libc.inotify_init1.argtypes = [ctypes.c_int]
+          libc.inotify_add_watch.argtypes = [
+              ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+          libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+          _libc = libc
+        except (OSError, AttributeError) as e:
+          logger.info('inotify is not available: %s', e)
+    return _libc or None
+
+
+def IsSupported():
+  """Returns whether `InotifyChangeNotifier` can be used on this system."""
+  return _GetLibc() is not None
+
+
+class InotifyChangeNotifier(object):
+  """Tracks which watched paths have changed, using Linux inotify.
+
+  Each watched path is identified by a key chosen by the caller, such as a
+  run name. A background thread collects kernel events; `PopChanges`
+  returns the keys whose paths changed since it was last called, and
+  `WaitForChanges` blocks until there are any.
+
+  Only the path itself is watched: for a directory, that covers files being
+  created, written, renamed or deleted directly inside it, but not changes
+  in its subdirectories.
+  """
+
+  def __init__(self):
+    """Starts listening for events.
+
+    Raises:
+      OSError: If inotify is not available.
+    """
+    libc = _GetLibc()
+    if libc is None:
+      raise OSError(errno.ENOSYS, 'inotify is not available')
+    self._libc = libc
+    self._fd = libc.inotify_init1(getattr(os, 'O_CLOEXEC', 0))
+    if self._fd < 0:
+      error = ctypes.get_errno()
+      raise OSError(error, os.strerror(error))
+    self._condition = threading.Condition()
+    self._wd_to_keys = {}
+    self._key_to_wd = {}
+    self._changed = set()
+    self._closed = False
+    (self._wake_read_fd, self._wake_write_fd) = os.pipe()
+    self._thread = threading.Thread(
+        target=self._ReadEvents, name='InotifyChangeNotifier')
+    self._thread.daemon = True
+    self._thread.start()
+
+  def Watch(self, key, path):
+    """Starts reporting changes to `path` under `key`.
+
+    Args:
+      key: A hashable key to report changes under.
+      path: The local file or directory to watch.
+
+    Returns:
+      Whether the path is being watched. If not, for instance because the
+      path does not exist or the system limit on watches was reached, the
+      caller should poll it instead.
+    """
+    wd = self._libc.inotify_add_watch(
+        self._fd, tf.compat.as_bytes(path), _WATCH_MASK)
+    if wd < 0:
+      error = ctypes.get_errno()
+      logger.warn('Unable to watch %s for changes: %s', path,
+                  os.strerror(error))
+      return False
+    self.Unwatch(key)
+    with self._condition:
+      self._key_to_wd[key] = wd
+      self._wd_to_keys.setdefault(wd, set()).add(key)
+    return True
+
+  def Unwatch(self, key):
+    """Stops reporting changes under `key`."""
+    with self._condition:
+      wd = self._RemoveKey(key)
+      if wd is not None and wd not in self._wd_to_keys:
+        self._libc.inotify_rm_watch(self._fd, wd)
+      self._changed.discard(key)
+
+  def IsWatched(self, key):
+    """Returns whether changes are still being reported under `key`.
+
+    A watch ends when its path is deleted or moved away.
+    """
+    with self._condition:
+      return key in self._key_to_wd
+
+  def _RemoveKey(self, key):
+    """Forgets a key; returns its watch descriptor. Requires the lock."""
+    wd = self._key_to_wd.pop(key, None)
+    if wd is not None:
+      keys = self._wd_to_keys[wd]
+      keys.discard(key)
+      if not keys:
+        del self._wd_to_keys[wd]
+    return wd
+
+  def PopChanges(self):
+    """Returns the set of keys that changed since the last call."""
+    with self._condition:
+      changed = self._changed
+      self._changed = set()
+    return changed
+
+  def WaitForChanges(self, timeout):
+    """Waits until some watched path changes.
+
+    Args:
+      timeout: The maximum number of seconds to wait.
+
+    Returns:
+      Whether any changes are pending.
+    """
+    with self._condition:
+      if not self._changed and not self._closed:
+        self._condition.wait(timeout)
+      return bool(self._changed)
+
+  def Close(self):
+    """Stops listening for events and releases the inotify instance."""
+    with self._condition:
+      if self._closed:
+        return
+      self._closed = True
+      self._condition.notify_all()
+    os.write(self._wake_write_fd, b'x')
+    self._thread.join()
+    os.close(self._wake_read_fd)
+    os.close(self._wake_write_fd)
+    os.close(self._fd)
+
+  def _ReadEvents(self):
+    while True:
+      try:
+        (readable, _, _) = select.select(
+            [self._fd, self._wake_read_fd], [], [])
+      except (OSError, select.error) as e:
+        if e.args[0] == errno.EINTR:
+          continue
+        raise
+      if self._wake_read_fd in readable:
+        return
+      try:
+        data = os.read(self._fd, _READ_SIZE)
+      except OSError as e:
+        if e.errno == errno.EINTR:
+          continue
+        raise
+      self._HandleEvents(data)
+
+  def _HandleEvents(self, data):
+    changed = set()
+    overflowed = False
+    offset = 0
+    with self._condition:
+      while offset + _EVENT_HEADER.size <= len(data):
+        (wd, mask, _, name_length) = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size + name_length
+        if mask & _IN_Q_OVERFLOW:
+          overflowed = True
+          continue
+        keys = self._wd_to_keys.get(wd, ())
+        changed.update(keys)
+        if mask & _IN_IGNORED:
+          # The path is gone and the kernel dropped the watch. Keep reporting
+          # the keys as changed so that the caller notices the deletion.
+          for key in list(keys):
+            self._RemoveKey(key)
+      if overflowed:
+        logger.warn('inotify event queue overflowed; treating all watched '
+                    'paths as changed')
+        changed.update(self._key_to_wd)
+      if changed:
+        self._changed.update(changed)
+        self._condition.notify_all()
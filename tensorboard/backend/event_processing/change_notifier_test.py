@@ -0,0 +1,149 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import change_notifier
+from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+
+
+# Long enough for the kernel to deliver events even on a loaded machine.
+_TIMEOUT_SECS = 10
+
+
+def _Touch(path):
+  with open(path, 'ab') as f:
+    f.write(b'x')
+
+
+@unittest.skipUnless(change_notifier.IsSupported(), 'requires inotify')
+class InotifyChangeNotifierTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(InotifyChangeNotifierTest, self).setUp()
+    self.temp_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    self.notifier = change_notifier.InotifyChangeNotifier()
+    self.addCleanup(self.notifier.Close)
+
+  def _MakeDir(self, name):
+    path = os.path.join(self.temp_dir, name)
+    os.mkdir(path)
+    return path
+
+  def _WaitForChanges(self, expected):
+    changed = set()
+    while not expected <= changed:
+      self.assertTrue(self.notifier.WaitForChanges(_TIMEOUT_SECS))
+      changed.update(self.notifier.PopChanges())
+    return changed
+
+  def testReportsChangedDirectories(self):
+    run1 = self._MakeDir('run1')
+    run2 = self._MakeDir('run2')
+    self.assertTrue(self.notifier.Watch('run1', run1))
+    self.assertTrue(self.notifier.Watch('run2', run2))
+    self.assertEqual(set(), self.notifier.PopChanges())
+    _Touch(os.path.join(run1, 'events.out.tfevents.1'))
+    self.assertEqual(set(['run1']), self._WaitForChanges(set(['run1'])))
+    self.assertFalse(self.notifier.WaitForChanges(0))
+
+  def testIgnoresSubdirectories(self):
+    run1 = self._MakeDir('run1')
+    nested = self._MakeDir(os.path.join('run1', 'nested'))
+    self.notifier.Watch('run1', run1)
+    _Touch(os.path.join(nested, 'events.out.tfevents.1'))
+    self.assertFalse(self.notifier.WaitForChanges(0.5))
+
+  def testUnwatch(self):
+    run1 = self._MakeDir('run1')
+    self.notifier.Watch('run1', run1)
+    self.notifier.Unwatch('run1')
+    self.assertFalse(self.notifier.IsWatched('run1'))
+    _Touch(os.path.join(run1, 'events.out.tfevents.1'))
+    self.assertFalse(self.notifier.WaitForChanges(0.5))
+
+  def testReportsDeletion(self):
+    run1 = self._MakeDir('run1')
+    self.notifier.Watch('run1', run1)
+    shutil.rmtree(run1)
+    self._WaitForChanges(set(['run1']))
+    # The kernel drops the watch along with the directory.
+    while self.notifier.IsWatched('run1'):
+      self.notifier.WaitForChanges(_TIMEOUT_SECS)
+      self.notifier.PopChanges()
+
+  def testWatchMissingPath(self):
+    self.assertFalse(self.notifier.Watch(
+        'run1', os.path.join(self.temp_dir, 'nonexistent')))
+    self.assertFalse(self.notifier.IsWatched('run1'))
+
+
+class _CountingAccumulator(event_accumulator.EventAccumulator):
+
+  reload_counts = {}
+
+  def Reload(self):
+    counts = _CountingAccumulator.reload_counts
+    counts[self.path] = counts.get(self.path, 0) + 1
+    return super(_CountingAccumulator, self).Reload()
+
+
+@unittest.skipUnless(change_notifier.IsSupported(), 'requires inotify')
+class EventMultiplexerWatchingForChangesTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(EventMultiplexerWatchingForChangesTest, self).setUp()
+    self.stubs = tf.compat.v1.test.StubOutForTesting()
+    self.addCleanup(self.stubs.CleanUp)
+    self.stubs.Set(event_accumulator, 'EventAccumulator', _CountingAccumulator)
+    _CountingAccumulator.reload_counts = {}
+
+  def testOnlyReloadsChangedRuns(self):
+    logdir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    run1 = os.path.join(logdir, 'run1')
+    run2 = os.path.join(logdir, 'run2')
+    for run in (run1, run2):
+      os.mkdir(run)
+      _Touch(os.path.join(run, 'events.out.tfevents.1'))
+    x = event_multiplexer.EventMultiplexer(watch_for_changes=True)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    self.assertEqual({run1: 1, run2: 1}, _CountingAccumulator.reload_counts)
+
+    x.Reload()
+    self.assertEqual({run1: 1, run2: 1}, _CountingAccumulator.reload_counts)
+
+    _Touch(os.path.join(run2, 'events.out.tfevents.1'))
+    self.assertTrue(x.WaitForChanges(_TIMEOUT_SECS))
+    x.Reload()
+    self.assertEqual({run1: 1, run2: 2}, _CountingAccumulator.reload_counts)
+
+    shutil.rmtree(run1)
+    self.assertTrue(x.WaitForChanges(_TIMEOUT_SECS))
+    x.Reload()
+    self.assertNotIn('run1', x.Runs())
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -177,6 +177,11 @@ class DbImportMultiplexer(object):
       del self._run_loaders[loader.subdir]
     logger.info('Finished with DbImportMultiplexer.Reload()')
 
+  def WaitForChanges(self, timeout):
+    """Waits for `timeout` seconds; changes are not watched for."""
+    time.sleep(timeout)
+    return False
+
   def _get_exp_and_run_names(self, path, subdir, experiment_name_override=None):
     if experiment_name_override is not None:
       return (experiment_name_override, os.path.relpath(subdir, path))
@@ -20,6 +20,8 @@ from __future__ import print_function
 
 import bisect
 
+import six
+
 from tensorboard.backend.event_processing import io_wrapper
 from tensorboard.compat import tf
 from tensorboard.util import tb_logging
@@ -162,6 +164,59 @@ class DirectoryWatcher(object):
     """
     return self._ooo_writes_detected
 
+  def Checkpoint(self):
+    """Returns the position of this watcher, for `RestoreCheckpoint`.
+
+    This is only meaningful between calls to `Load`, and only if the loader
+    has an `offset` and its factory takes a `start_offset`, like
+    `event_file_loader.EventFileLoader`.
+
+    Returns:
+      A dict of plain Python values, or None if nothing has been loaded yet.
+    """
+    if self._path is None:
+      return None
+    stats = {}
+    for path in list(self._finalized_sizes) + [self._path]:
+      stats[path] = _StatOrNone(path)
+    return {
+        'path': self._path,
+        'offset': self._loader.offset,
+        'finalized_sizes': dict(self._finalized_sizes),
+        'ooo_writes_detected': self._ooo_writes_detected,
+        'stats': stats,
+    }
+
+  def RestoreCheckpoint(self, checkpoint):
+    """Resumes loading from a position returned by `Checkpoint`.
+
+    The checkpoint is rejected if any file it covers has since been
+    modified, other than by appending to the file being read.
+
+    Args:
+      checkpoint: A value returned by `Checkpoint`.
+
+    Returns:
+      Whether the checkpoint was restored. If not, this watcher is unchanged.
+    """
+    if self._path is not None:
+      raise ValueError('Cannot restore a watcher that has started loading')
+    path = checkpoint['path']
+    for (stat_path, stat) in six.iteritems(checkpoint['stats']):
+      current = _StatOrNone(stat_path)
+      if current is None or stat is None:
+        return False
+      if stat_path == path:
+        if current[0] < max(stat[0], checkpoint['offset']):
+          return False
+      elif current != stat:
+        return False
+    self._finalized_sizes = dict(checkpoint['finalized_sizes'])
+    self._ooo_writes_detected = checkpoint['ooo_writes_detected']
+    self._path = path
+    self._loader = self._loader_factory(path, start_offset=checkpoint['offset'])
+    return True
+
   def _InitializeLoader(self):
     path = self._GetNextPath()
     if path:
@@ -245,6 +300,15 @@ class DirectoryWatcher(object):
       return False
 
 
+def _StatOrNone(path):
+  """Returns the length and mtime of a file, or None if it is unavailable."""
+  try:
+    stat = tf.io.gfile.stat(path)
+  except tf.errors.OpError:
+    return None
+  return (stat.length, stat.mtime_nsec)
+
+
 class DirectoryDeletedError(Exception):
   """Thrown by Load() when the directory is *permanently* gone.
 
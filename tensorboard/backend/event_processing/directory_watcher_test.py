@@ -31,9 +31,13 @@ from tensorboard.backend.event_processing import io_wrapper
 class _ByteLoader(object):
   """A loader that loads individual bytes from a file."""
 
-  def __init__(self, path):
+  def __init__(self, path, start_offset=0):
     self._f = open(path)
-    self.bytes_read = 0
+    self.bytes_read = start_offset
+
+  @property
+  def offset(self):
+    return self.bytes_read
 
   def Load(self):
     while True:
@@ -208,6 +212,40 @@ class DirectoryWatcherTest(tf.test.TestCase):
     with self.assertRaises((IOError, OSError)):
       self._LoadAllEvents()
 
+  def testCheckpointBeforeLoading(self):
+    self.assertIsNone(self._watcher.Checkpoint())
+
+  def testRestoreCheckpointResumes(self):
+    self._WriteToFile('a', 'ab')
+    self._WriteToFile('b', 'c')
+    self._LoadAllEvents()
+    checkpoint = self._watcher.Checkpoint()
+    self._WriteToFile('b', 'de')
+    self._WriteToFile('c', 'f')
+    watcher = directory_watcher.DirectoryWatcher(self._directory, _ByteLoader)
+    self.assertTrue(watcher.RestoreCheckpoint(checkpoint))
+    self.assertEqual(list(watcher.Load()), ['d', 'e', 'f'])
+
+  def testRestoreCheckpointRejectsModifiedFinalizedFile(self):
+    self._WriteToFile('a', 'ab')
+    self._WriteToFile('b', 'c')
+    self._LoadAllEvents()
+    checkpoint = self._watcher.Checkpoint()
+    self._WriteToFile('a', 'x')
+    watcher = directory_watcher.DirectoryWatcher(self._directory, _ByteLoader)
+    self.assertFalse(watcher.RestoreCheckpoint(checkpoint))
+    self.assertEqual(list(watcher.Load()), ['a', 'b', 'x', 'c'])
+
+  def testRestoreCheckpointRejectsTruncatedFile(self):
+    self._WriteToFile('a', 'abc')
+    self._LoadAllEvents()
+    checkpoint = self._watcher.Checkpoint()
+    with open(os.path.join(self._directory, 'a'), 'w') as f:
+      f.write('x')
+    watcher = directory_watcher.DirectoryWatcher(self._directory, _ByteLoader)
+    self.assertFalse(watcher.RestoreCheckpoint(checkpoint))
+    self.assertEqual(list(watcher.Load()), ['x'])
+
 
 if __name__ == '__main__':
   tf.test.main()
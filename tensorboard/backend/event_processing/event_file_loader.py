@@ -29,20 +29,36 @@ from tensorboard.util import tb_logging
 
 logger = tb_logging.get_logger()
 
+# Each record is framed by a length, a checksum of the length and a
+# checksum of the data: 8 + 4 + 4 bytes.
+_RECORD_OVERHEAD_BYTES = 16
+
 
 class RawEventFileLoader(object):
   """An iterator that yields Event protos as serialized bytestrings."""
 
-  def __init__(self, file_path):
+  def __init__(self, file_path, start_offset=0):
+    """Opens a record reader.
+
+    Args:
+      file_path: The path of the record file to read.
+      start_offset: The byte offset to start reading at. This must be the
+        start of a record, such as a value previously returned by `offset`.
+
+    Raises:
+      ValueError: If `file_path` is None.
+    """
     if file_path is None:
       raise ValueError('A file path is required')
     file_path = platform_util.readahead_file_path(file_path)
     logger.debug('Opening a record reader pointing at %s', file_path)
     with tf.compat.v1.errors.raise_exception_on_not_ok_status() as status:
       self._reader = _pywrap_tensorflow.PyRecordReader_New(
-          tf.compat.as_bytes(file_path), 0, tf.compat.as_bytes(''), status)
+          tf.compat.as_bytes(file_path), start_offset, tf.compat.as_bytes(''),
+          status)
     # Store it for logging purposes.
     self._file_path = file_path
+    self._offset = start_offset
     if not self._reader:
       raise IOError('Failed to open a record reader pointing to %s' % file_path)
 
@@ -75,9 +91,16 @@ class RawEventFileLoader(object):
         # PyRecordReader holds the offset prior to the failed read, so retrying
         # will succeed.
         break
-      yield self._reader.record()
+      record = self._reader.record()
+      self._offset += len(record) + _RECORD_OVERHEAD_BYTES
+      yield record
     logger.debug('No more events in %s', self._file_path)
 
+  @property
+  def offset(self):
+    """The byte offset just past the last record that has been yielded."""
+    return self._offset
+
 
 class EventFileLoader(RawEventFileLoader):
   """An iterator that yields parsed Event protos."""
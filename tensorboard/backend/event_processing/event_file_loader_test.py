@@ -88,6 +88,19 @@ class EventFileLoaderTest(tf.test.TestCase):
     loader = self._LoaderForTestFile(filename)
     self.assertEqual(len(list(loader.Load())), 2)
 
+  def testOffsetResumesAfterLastRecord(self):
+    filename = tempfile.NamedTemporaryFile(dir=self.get_temp_dir()).name
+    self._WriteToFile(filename, EventFileLoaderTest.RECORD)
+    self._WriteToFile(filename, b'123')
+    loader = self._LoaderForTestFile(filename)
+    self.assertEqual(loader.offset, 0)
+    self.assertEqual(len(list(loader.Load())), 1)
+    self.assertEqual(loader.offset, len(EventFileLoaderTest.RECORD))
+    resumed = event_file_loader.EventFileLoader(
+        os.path.join(self.get_temp_dir(), filename),
+        start_offset=loader.offset)
+    self.assertEqual(len(list(resumed.Load())), 0)
+
 
 class RawEventFileLoaderTest(EventFileLoaderTest):
 
@@ -0,0 +1,287 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Partial decoding of serialized `Event` protos.
+
+Parsing a summary event in full costs time in proportion to its size, and
+then its values still have to be migrated, even though reservoir sampling
+throws most of the values of a long run away. `ScanSummaryEvent` instead
+walks the protobuf wire format of an event just far enough to find its step,
+its wall time, and the tag and position of each of its summary values, so
+that only the values that are kept need to be parsed. `ScanTensorHeader`
+likewise reads the shape of a value's tensor without copying its data, also
+for legacy images and audio, whose tensor is that of their migrated form.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import struct
+
+import six
+
+
+SummaryEventHeader = collections.namedtuple(
+    'SummaryEventHeader', ['wall_time', 'step', 'values'])
+
+# `data_field` is the field number of the value's data, or None if it has no
+# data; `start` and `end` delimit the serialized `Summary.Value` in the record.
+ValueHeader = collections.namedtuple(
+    'ValueHeader', ['tag', 'data_field', 'has_metadata', 'start', 'end'])
+
+# The dimensions of a tensor, its number of string values, and the first few
+# of them.
+TensorHeader = collections.namedtuple(
+    'TensorHeader', ['dims', 'num_strings', 'strings'])
+
+# Field numbers from `event.proto`, `summary.proto`, `tensor.proto` and
+# `tensor_shape.proto`.
+_EVENT_WALL_TIME = 1
+_EVENT_STEP = 2
+_EVENT_SUMMARY = 5
+_SUMMARY_VALUE = 1
+_VALUE_TAG = 1
+_VALUE_NODE_NAME = 7
+_VALUE_METADATA = 9
+_TENSOR_SHAPE = 2
+_TENSOR_STRING_VAL = 8
+_SHAPE_DIM = 2
+_DIM_SIZE = 1
+_IMAGE_HEIGHT = 1
+_IMAGE_WIDTH = 2
+_IMAGE_ENCODED = 4
+_AUDIO_ENCODED = 4
+
+# The fields of the `value` oneof of `Summary.Value` that
+# `data_compat.migrate_value` understands.
+SIMPLE_VALUE = 2
+IMAGE = 4
+HISTO = 5
+AUDIO = 6
+TENSOR = 8
+_DATA_FIELDS = frozenset([SIMPLE_VALUE, IMAGE, HISTO, AUDIO, TENSOR])
+
+# Wire types.
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+_FIXED32 = 5
+
+_DOUBLE = struct.Struct('<d')
+
+
+def ScanSummaryEvent(record):
+  """Reads the header of a serialized event, if it is a plain summary event.
+
+  Args:
+    record: A serialized `Event` proto, as bytes.
+
+  Returns:
+    A `SummaryEventHeader` whose `values` are `ValueHeader`s, or None if the
+    event has any field other than a wall time, a step and a summary, if any
+    field of its summary values is unexpected, or if it is malformed. The
+    caller should then parse the event in full.
+  """
+  try:
+    return _ScanEvent(record)
+  except (ValueError, IndexError, struct.error):
+    return None
+
+
+def ScanTensorHeader(record, start, end, max_strings=2):
+  """Reads the shape and leading string values of a summary value's tensor.
+
+  Args:
+    record: A serialized `Event` proto, as bytes.
+    start: The start of a serialized `Summary.Value` in `record`, as given
+      by its `ValueHeader`.
+    end: The end of that value.
+    max_strings: How many of the tensor's string values to return.
+
+  Returns:
+    A `TensorHeader`, or None if the value has no `tensor` field, or if it is
+    malformed. Legacy image and audio values are given the header of the
+    tensor that `data_compat.migrate_value` turns them into; values of other
+    legacy types have none.
+  """
+  try:
+    tensor = None
+    for (field, wire_type, value) in _Fields(record, start, end):
+      if wire_type != _LENGTH_DELIMITED:
+        continue
+      if field == TENSOR:
+        tensor = value
+        break
+      elif field == IMAGE:
+        return _ImageTensorHeader(record, value, max_strings)
+      elif field == AUDIO:
+        return _AudioTensorHeader(record, value, max_strings)
+    if tensor is None:
+      return None
+    dims = []
+    num_strings = 0
+    strings = []
+    for (field, wire_type, value) in _Fields(record, *tensor):
+      if wire_type != _LENGTH_DELIMITED:
+        continue
+      if field == _TENSOR_SHAPE:
+        for (dim_field, dim_wire_type, dim) in _Fields(record, *value):
+          if dim_field == _SHAPE_DIM and dim_wire_type == _LENGTH_DELIMITED:
+            dims.append(_DimSize(record, *dim))
+      elif field == _TENSOR_STRING_VAL:
+        if num_strings < max_strings:
+          strings.append(record[value[0]:value[1]])
+        num_strings += 1
+    return TensorHeader(dims=dims, num_strings=num_strings, strings=strings)
+  except (ValueError, IndexError, struct.error):
+    return None
+
+
+def _ImageTensorHeader(record, image, max_strings):
+  """Returns the header of the `[width, height, image]` tensor of an image."""
+  width = 0
+  height = 0
+  encoded = (0, 0)
+  for (field, wire_type, value) in _Fields(record, *image):
+    if field == _IMAGE_WIDTH and wire_type == _VARINT:
+      width = _Int64(value)
+    elif field == _IMAGE_HEIGHT and wire_type == _VARINT:
+      height = _Int64(value)
+    elif field == _IMAGE_ENCODED and wire_type == _LENGTH_DELIMITED:
+      encoded = value
+  strings = [str(width).encode('ascii'), str(height).encode('ascii')]
+  if max_strings > 2:
+    strings.append(record[encoded[0]:encoded[1]])
+  return TensorHeader(dims=[3], num_strings=3, strings=strings[:max_strings])
+
+
+def _AudioTensorHeader(record, audio, max_strings):
+  """Returns the header of the `[[audio, label]]` tensor of an audio clip."""
+  encoded = (0, 0)
+  for (field, wire_type, value) in _Fields(record, *audio):
+    if field == _AUDIO_ENCODED and wire_type == _LENGTH_DELIMITED:
+      encoded = value
+  strings = []
+  if max_strings > 0:
+    strings.append(record[encoded[0]:encoded[1]])
+  if max_strings > 1:
+    strings.append(b'')
+  return TensorHeader(dims=[1, 2], num_strings=2, strings=strings)
+
+
+def _DimSize(record, start, end):
+  size = 0
+  for (field, wire_type, value) in _Fields(record, start, end):
+    if field == _DIM_SIZE and wire_type == _VARINT:
+      size = _Int64(value)
+  return size
+
+
+def _Int64(value):
+  """Interprets a varint as an int64, which is encoded in two's complement."""
+  return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _ScanEvent(record):
+  wall_time = 0.0
+  step = 0
+  summary = None
+  for (field, wire_type, value) in _Fields(record, 0, len(record)):
+    if field == _EVENT_WALL_TIME and wire_type == _FIXED64:
+      (wall_time,) = _DOUBLE.unpack_from(record, value)
+    elif field == _EVENT_STEP and wire_type == _VARINT:
+      step = _Int64(value)
+    elif (field == _EVENT_SUMMARY and wire_type == _LENGTH_DELIMITED and
+          summary is None):
+      summary = value
+    else:
+      return None
+  if summary is None:
+    return None
+  values = []
+  for (field, wire_type, value) in _Fields(record, *summary):
+    if field != _SUMMARY_VALUE or wire_type != _LENGTH_DELIMITED:
+      return None
+    header = _ScanValue(record, *value)
+    if header is None:
+      return None
+    values.append(header)
+  return SummaryEventHeader(wall_time=wall_time, step=step, values=values)
+
+
+def _ScanValue(record, start, end):
+  tag = None
+  data_field = None
+  has_metadata = False
+  for (field, wire_type, value) in _Fields(record, start, end):
+    if field == _VALUE_TAG and wire_type == _LENGTH_DELIMITED and tag is None:
+      tag = record[value[0]:value[1]].decode('utf-8')
+    elif field == _VALUE_METADATA:
+      has_metadata = True
+    elif field in _DATA_FIELDS and data_field is None:
+      data_field = field
+    elif field != _VALUE_NODE_NAME:
+      return None
+  return ValueHeader(tag=tag or u'', data_field=data_field,
+                     has_metadata=has_metadata, start=start, end=end)
+
+
+def _Fields(data, pos, end):
+  """Yields the fields of the message serialized in `data[pos:end]`.
+
+  Yields:
+    `(field_number, wire_type, value)` triples, where `value` is the value of
+    a varint, the position of a fixed-size value, or the `(start, end)`
+    positions of a length-delimited value.
+
+  Raises:
+    ValueError: If the message is malformed or uses groups.
+  """
+  while pos < end:
+    (key, pos) = _ReadVarint(data, pos)
+    (field, wire_type) = (key >> 3, key & 7)
+    if wire_type == _VARINT:
+      (value, pos) = _ReadVarint(data, pos)
+    elif wire_type == _FIXED64:
+      value = pos
+      pos += 8
+    elif wire_type == _LENGTH_DELIMITED:
+      (length, pos) = _ReadVarint(data, pos)
+      value = (pos, pos + length)
+      pos += length
+    elif wire_type == _FIXED32:
+      value = pos
+      pos += 4
+    else:
+      raise ValueError('Unsupported wire type: %d' % wire_type)
+    if pos > end:
+      raise ValueError('Truncated field %d' % field)
+    yield (field, wire_type, value)
+
+
+def _ReadVarint(data, pos):
+  """Returns the varint at `data[pos]` and the position after it."""
+  result = 0
+  shift = 0
+  while True:
+    byte = six.indexbytes(data, pos)
+    pos += 1
+    result |= (byte & 0x7f) << shift
+    if not byte & 0x80:
+      return (result, pos)
+    shift += 7
+    if shift >= 64:
+      raise ValueError('Varint too long')
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from tensorboard import data_compat
+from tensorboard.backend.event_processing import event_scanner
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.util import tensor_util
+
+
+class ScanSummaryEventTest(tf.test.TestCase):
+
+  def testScansValues(self):
+    metadata = summary_pb2.SummaryMetadata(
+        plugin_data=summary_pb2.SummaryMetadata.PluginData(plugin_name='foo'))
+    values = [
+        summary_pb2.Summary.Value(
+            tag=u'tensor/é', metadata=metadata,
+            tensor=tensor_util.make_tensor_proto(1.5)),
+        summary_pb2.Summary.Value(tag='simple', simple_value=2.0),
+        summary_pb2.Summary.Value(
+            tag='image', image=summary_pb2.Summary.Image(height=1)),
+        summary_pb2.Summary.Value(tag='metadata_only', metadata=metadata),
+    ]
+    record = event_pb2.Event(
+        wall_time=123.25, step=-7,
+        summary=summary_pb2.Summary(value=values)).SerializeToString()
+    header = event_scanner.ScanSummaryEvent(record)
+    self.assertEqual(123.25, header.wall_time)
+    self.assertEqual(-7, header.step)
+    self.assertEqual(
+        [(u'tensor/é', event_scanner.TENSOR, True),
+         (u'simple', event_scanner.SIMPLE_VALUE, False),
+         (u'image', event_scanner.IMAGE, False),
+         (u'metadata_only', None, True)],
+        [(v.tag, v.data_field, v.has_metadata) for v in header.values])
+    for (value, value_header) in zip(values, header.values):
+      self.assertProtoEquals(
+          value,
+          summary_pb2.Summary.Value.FromString(
+              record[value_header.start:value_header.end]))
+
+  def testDefaults(self):
+    record = event_pb2.Event(summary=summary_pb2.Summary()).SerializeToString()
+    self.assertEqual(
+        event_scanner.SummaryEventHeader(wall_time=0.0, step=0, values=[]),
+        event_scanner.ScanSummaryEvent(record))
+
+  def testLargeStep(self):
+    record = event_pb2.Event(
+        step=2**40, summary=summary_pb2.Summary()).SerializeToString()
+    self.assertEqual(2**40, event_scanner.ScanSummaryEvent(record).step)
+
+  def testRejectsOtherEvents(self):
+    for event in (
+        event_pb2.Event(wall_time=1.0, step=2),
+        event_pb2.Event(file_version='brain.Event:2'),
+        event_pb2.Event(graph_def=b'graph'),
+        event_pb2.Event(
+            summary=summary_pb2.Summary(),
+            session_log=event_pb2.SessionLog(
+                status=event_pb2.SessionLog.START)),
+        event_pb2.Event(summary=summary_pb2.Summary(value=[
+            summary_pb2.Summary.Value(
+                tag='old', obsolete_old_style_histogram=b'x')])),
+    ):
+      self.assertIsNone(
+          event_scanner.ScanSummaryEvent(event.SerializeToString()), event)
+
+  def testRejectsMalformedRecords(self):
+    record = event_pb2.Event(
+        step=3,
+        summary=summary_pb2.Summary(value=[
+            summary_pb2.Summary.Value(tag='a', simple_value=1.0)]),
+    ).SerializeToString()
+    for i in range(1, len(record)):
+      self.assertIsNone(event_scanner.ScanSummaryEvent(record[:i]))
+    self.assertIsNone(event_scanner.ScanSummaryEvent(b'\xff' * 12))
+
+
+class ScanTensorHeaderTest(tf.test.TestCase):
+
+  def _Scan(self, value, **kwargs):
+    record = event_pb2.Event(
+        step=1, summary=summary_pb2.Summary(value=[value])).SerializeToString()
+    (value_header,) = event_scanner.ScanSummaryEvent(record).values
+    return event_scanner.ScanTensorHeader(
+        record, value_header.start, value_header.end, **kwargs)
+
+  def testScansStrings(self):
+    tensor = tensor_util.make_tensor_proto([b'640', b'480', b'a', b'b', b'c'])
+    value = summary_pb2.Summary.Value(tag='images', tensor=tensor)
+    self.assertEqual(
+        event_scanner.TensorHeader(
+            dims=[5], num_strings=5, strings=[b'640', b'480']),
+        self._Scan(value))
+    self.assertEqual([b'640', b'480', b'a'],
+                     self._Scan(value, max_strings=3).strings)
+
+  def testScansShape(self):
+    tensor = tensor_util.make_tensor_proto(
+        [[b'a', b'b']] * 3, shape=[3, 2])
+    self.assertEqual(
+        [3, 2],
+        self._Scan(summary_pb2.Summary.Value(tag='audio', tensor=tensor)).dims)
+    scalar = tensor_util.make_tensor_proto(1.5)
+    self.assertEqual(
+        event_scanner.TensorHeader(dims=[], num_strings=0, strings=[]),
+        self._Scan(summary_pb2.Summary.Value(tag='scalar', tensor=scalar)))
+
+  def _MigratedHeader(self, value, max_strings=2):
+    tensor = data_compat.migrate_value(value).tensor
+    return event_scanner.TensorHeader(
+        dims=[dim.size for dim in tensor.tensor_shape.dim],
+        num_strings=len(tensor.string_val),
+        strings=tensor.string_val[:max_strings])
+
+  def testScansLegacyImagesAndAudioAsMigrated(self):
+    values = [
+        summary_pb2.Summary.Value(tag='image', image=summary_pb2.Summary.Image(
+            height=480, width=640, colorspace=3, encoded_image_string=b'png')),
+        summary_pb2.Summary.Value(
+            tag='image', image=summary_pb2.Summary.Image(height=1)),
+        summary_pb2.Summary.Value(tag='audio', audio=summary_pb2.Summary.Audio(
+            sample_rate=44100, num_channels=2, length_frames=10,
+            encoded_audio_string=b'wav', content_type='audio/wav')),
+        summary_pb2.Summary.Value(
+            tag='audio', audio=summary_pb2.Summary.Audio()),
+    ]
+    for value in values:
+      for max_strings in (0, 1, 2, 3):
+        self.assertEqual(self._MigratedHeader(value, max_strings),
+                         self._Scan(value, max_strings=max_strings))
+
+  def testRejectsOtherLegacyValues(self):
+    self.assertIsNone(self._Scan(
+        summary_pb2.Summary.Value(tag='simple', simple_value=1.0)))
+    self.assertIsNone(self._Scan(summary_pb2.Summary.Value(
+        tag='histo', histo=summary_pb2.HistogramProto(num=1))))
+
+  def testRejectsMalformedValues(self):
+    record = summary_pb2.Summary.Value(
+        tag='a', tensor=tensor_util.make_tensor_proto([b'1', b'2'])
+    ).SerializeToString()
+    self.assertIsNotNone(event_scanner.ScanTensorHeader(record, 0, len(record)))
+    for i in range(3, len(record)):
+      self.assertIsNone(event_scanner.ScanTensorHeader(record, 0, i))
+
+
+if __name__ == '__main__':
+  tf.test.main()
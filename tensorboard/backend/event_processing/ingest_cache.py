@@ -0,0 +1,155 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Persists `EventAccumulator` checkpoints across TensorBoard restarts.
+
+Without a cache, every restart re-reads every event file from the beginning.
+An `IngestCache` stores the result of `EventAccumulator.Checkpoint` for each
+run in a local directory, so that a new accumulator for the same path can
+restore it and continue reading from where the old one stopped.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from six.moves import cPickle as pickle
+
+from tensorboard.compat import tf
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+# Highest protocol that both Python 2 and 3 can read.
+_PICKLE_PROTOCOL = 2
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class IngestCache(object):
+  """A directory of accumulator checkpoints, one file per run path."""
+
+  def __init__(self, cache_dir, save_interval_secs=300):
+    """Creates the cache directory if it does not exist.
+
+    Args:
+      cache_dir: A local directory to store checkpoints in.
+      save_interval_secs: The minimum time between saving two checkpoints
+        for the same run in `MaybeSave`.
+    """
+    self._cache_dir = cache_dir
+    self._save_interval_secs = save_interval_secs
+    self._last_save_times = {}
+    self._lock = threading.Lock()
+    if not os.path.isdir(cache_dir):
+      os.makedirs(cache_dir)
+
+  def _CachePath(self, run_path):
+    digest = hashlib.sha1(tf.compat.as_bytes(run_path)).hexdigest()
+    return os.path.join(self._cache_dir, digest + '.ckpt')
+
+  def Restore(self, accumulator):
+    """Restores the cached checkpoint for an accumulator, if it is valid.
+
+    Args:
+      accumulator: An `EventAccumulator` that has not been loaded yet.
+
+    Returns:
+      Whether a checkpoint was restored.
+    """
+    cache_path = self._CachePath(accumulator.path)
+    try:
+      with open(cache_path, 'rb') as f:
+        checkpoint = pickle.load(f)
+    except (IOError, OSError):
+      return False
+    except Exception as e:  # pylint: disable=broad-except
+      # Unpickling a corrupt file can raise nearly anything.
+      logger.warn('Ignoring unreadable ingest cache entry %s: %s',
+                  cache_path, e)
+      return False
+    if not accumulator.RestoreCheckpoint(checkpoint):
+      logger.info('Ingest cache entry for %s is stale', accumulator.path)
+      return False
+    logger.info('Restored %s from the ingest cache', accumulator.path)
+    with self._lock:
+      self._last_save_times[accumulator.path] = time.time()
+    return True
+
+  def MaybeSave(self, accumulator):
+    """Saves a checkpoint unless one was saved for this run recently.
+
+    This must not be called concurrently with `accumulator.Reload`.
+
+    Args:
+      accumulator: An `EventAccumulator`.
+
+    Returns:
+      Whether a checkpoint was saved.
+    """
+    now = time.time()
+    with self._lock:
+      last_save_time = self._last_save_times.get(accumulator.path)
+      if (last_save_time is not None and
+          now - last_save_time < self._save_interval_secs):
+        return False
+      self._last_save_times[accumulator.path] = now
+    return self.Save(accumulator)
+
+  def Save(self, accumulator):
+    """Saves a checkpoint of an accumulator, replacing any previous one.
+
+    This must not be called concurrently with `accumulator.Reload`.
+
+    Args:
+      accumulator: An `EventAccumulator`.
+
+    Returns:
+      Whether a checkpoint was saved.
+    """
+    checkpoint = accumulator.Checkpoint()
+    if checkpoint is None:
+      return False
+    cache_path = self._CachePath(accumulator.path)
+    # Write to a temporary file first so that a crash never leaves a
+    # truncated checkpoint behind.
+    (fd, temp_path) = tempfile.mkstemp(dir=self._cache_dir, suffix='.tmp')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        pickle.dump(checkpoint, f, _PICKLE_PROTOCOL)
+      _replace(temp_path, cache_path)
+    except (IOError, OSError) as e:
+      logger.error('Unable to write ingest cache entry for %s: %s',
+                   accumulator.path, e)
+      if os.path.exists(temp_path):
+        os.remove(temp_path)
+      return False
+    logger.debug('Saved ingest cache entry for %s', accumulator.path)
+    return True
+
+  def Forget(self, run_path):
+    """Removes the checkpoint for a run, such as one that was deleted."""
+    with self._lock:
+      self._last_save_times.pop(run_path, None)
+    try:
+      os.remove(self._CachePath(run_path))
+    except OSError:
+      pass
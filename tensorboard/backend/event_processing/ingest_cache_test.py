@@ -0,0 +1,235 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import tempfile
+import threading
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import ingest_cache
+from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.plugins.image import metadata as image_metadata
+from tensorboard.plugins.scalar import metadata as scalar_metadata
+from tensorboard.summary.writer import record_writer
+from tensorboard.util import tensor_util
+
+
+_SIZE_GUIDANCE = {event_accumulator.TENSORS: 10}
+
+
+def _WriteScalars(logdir, tag, steps, filename='events.out.tfevents.1'):
+  """Appends scalar events to an events file in `logdir`."""
+  if not os.path.isdir(logdir):
+    os.makedirs(logdir)
+  metadata = scalar_metadata.create_summary_metadata(
+      display_name=tag, description='')
+  with open(os.path.join(logdir, filename), 'ab') as f:
+    writer = record_writer.RecordWriter(f)
+    for step in steps:
+      value = summary_pb2.Summary.Value(
+          tag=tag,
+          metadata=metadata,
+          tensor=tensor_util.make_tensor_proto(float(step)))
+      event = event_pb2.Event(
+          wall_time=step * 10.0,
+          step=step,
+          summary=summary_pb2.Summary(value=[value]))
+      writer.write(event.SerializeToString())
+
+
+def _WriteImages(logdir, tag, samples_by_step):
+  """Appends image events to an events file in `logdir`."""
+  if not os.path.isdir(logdir):
+    os.makedirs(logdir)
+  metadata = image_metadata.create_summary_metadata(
+      display_name=tag, description='')
+  with open(os.path.join(logdir, 'events.out.tfevents.1'), 'ab') as f:
+    writer = record_writer.RecordWriter(f)
+    for (step, samples) in enumerate(samples_by_step):
+      value = summary_pb2.Summary.Value(
+          tag=tag,
+          metadata=metadata,
+          tensor=tensor_util.make_tensor_proto(
+              [b'4', b'3'] + [b'image'] * samples))
+      event = event_pb2.Event(
+          wall_time=step * 10.0,
+          step=step,
+          summary=summary_pb2.Summary(value=[value]))
+      writer.write(event.SerializeToString())
+
+
+class IngestCacheTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(IngestCacheTest, self).setUp()
+    temp_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    self.run_dir = os.path.join(temp_dir, 'logs', 'run1')
+    self.cache_dir = os.path.join(temp_dir, 'cache')
+    self.cache = ingest_cache.IngestCache(self.cache_dir)
+
+  def _NewAccumulator(self, size_guidance=None):
+    return event_accumulator.EventAccumulator(
+        self.run_dir, size_guidance=size_guidance or _SIZE_GUIDANCE)
+
+  def _Steps(self, accumulator):
+    return [(e.step, tensor_util.make_ndarray(e.tensor_proto).item())
+            for e in accumulator.Tensors('loss')]
+
+  def testRestoreResumesReading(self):
+    _WriteScalars(self.run_dir, 'loss', range(50))
+    accumulator = self._NewAccumulator()
+    accumulator.Reload()
+    self.assertTrue(self.cache.Save(accumulator))
+
+    _WriteScalars(self.run_dir, 'loss', range(50, 80))
+    restored = self._NewAccumulator()
+    self.assertTrue(self.cache.Restore(restored))
+    self.assertEqual(self._Steps(accumulator), self._Steps(restored))
+    self.assertEqual(
+        accumulator.PluginTagToContent(scalar_metadata.PLUGIN_NAME),
+        restored.PluginTagToContent(scalar_metadata.PLUGIN_NAME))
+    restored.Reload()
+
+    expected = self._NewAccumulator()
+    expected.Reload()
+    self.assertEqual(self._Steps(expected), self._Steps(restored))
+    self.assertEqual(expected.FirstEventTimestamp(),
+                     restored.FirstEventTimestamp())
+
+  def testRestoreKeepsSampleStatsOfEvictedEvents(self):
+    _WriteImages(self.run_dir, 'images', [5] + [1] * 29)
+    accumulator = self._NewAccumulator()
+    accumulator.Reload()
+    self.assertTrue(self.cache.Save(accumulator))
+    restored = self._NewAccumulator()
+    self.assertTrue(self.cache.Restore(restored))
+    self.assertEqual(5, restored.SampleStats('images').max_samples)
+    self.assertEqual(accumulator.SampleStats('images'),
+                     restored.SampleStats('images'))
+
+  def testRestoreWithoutEntry(self):
+    _WriteScalars(self.run_dir, 'loss', range(5))
+    self.assertFalse(self.cache.Restore(self._NewAccumulator()))
+
+  def testRejectsOtherSizeGuidance(self):
+    _WriteScalars(self.run_dir, 'loss', range(5))
+    accumulator = self._NewAccumulator()
+    accumulator.Reload()
+    self.cache.Save(accumulator)
+    other = self._NewAccumulator({event_accumulator.TENSORS: 20})
+    self.assertFalse(self.cache.Restore(other))
+
+  def testRejectsRewrittenFiles(self):
+    _WriteScalars(self.run_dir, 'loss', range(5))
+    _WriteScalars(self.run_dir, 'loss', range(5, 10),
+                  filename='events.out.tfevents.2')
+    accumulator = self._NewAccumulator()
+    accumulator.Reload()
+    self.cache.Save(accumulator)
+    with open(os.path.join(self.run_dir, 'events.out.tfevents.1'), 'ab') as f:
+      f.write(b'garbage')
+    self.assertFalse(self.cache.Restore(self._NewAccumulator()))
+
+  def testIgnoresCorruptEntry(self):
+    _WriteScalars(self.run_dir, 'loss', range(5))
+    accumulator = self._NewAccumulator()
+    accumulator.Reload()
+    self.cache.Save(accumulator)
+    for filename in os.listdir(self.cache_dir):
+      with open(os.path.join(self.cache_dir, filename), 'wb') as f:
+        f.write(b'not a pickle')
+    self.assertFalse(self.cache.Restore(self._NewAccumulator()))
+
+  def testMaybeSaveRespectsInterval(self):
+    _WriteScalars(self.run_dir, 'loss', range(5))
+    accumulator = self._NewAccumulator()
+    accumulator.Reload()
+    self.assertTrue(self.cache.MaybeSave(accumulator))
+    self.assertFalse(self.cache.MaybeSave(accumulator))
+    eager_cache = ingest_cache.IngestCache(self.cache_dir, save_interval_secs=0)
+    self.assertTrue(eager_cache.MaybeSave(accumulator))
+
+  def testForget(self):
+    _WriteScalars(self.run_dir, 'loss', range(5))
+    accumulator = self._NewAccumulator()
+    accumulator.Reload()
+    self.cache.Save(accumulator)
+    self.cache.Forget(self.run_dir)
+    self.assertFalse(self.cache.Restore(self._NewAccumulator()))
+
+
+class EventMultiplexerWithIngestCacheTest(tf.test.TestCase):
+
+  def testRestoresRunsAfterRestart(self):
+    temp_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    logdir = os.path.join(temp_dir, 'logs')
+    cache_dir = os.path.join(temp_dir, 'cache')
+    _WriteScalars(os.path.join(logdir, 'run1'), 'loss', range(3))
+    x = event_multiplexer.EventMultiplexer(ingest_cache_dir=cache_dir)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+
+    _WriteScalars(os.path.join(logdir, 'run1'), 'loss', range(3, 5),
+                  filename='events.out.tfevents.2')
+    y = event_multiplexer.EventMultiplexer(ingest_cache_dir=cache_dir)
+    y.AddRunsFromDirectory(logdir)
+    # Data is available before the first reload.
+    self.assertEqual(3, len(y.Tensors('run1', 'loss')))
+    y.Reload()
+    self.assertEqual([0, 1, 2, 3, 4],
+                     [e.step for e in y.Tensors('run1', 'loss')])
+
+  def testRestoresWithoutHoldingMultiplexerMutex(self):
+    temp_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    logdir = os.path.join(temp_dir, 'logs')
+    cache_dir = os.path.join(temp_dir, 'cache')
+    _WriteScalars(os.path.join(logdir, 'run1'), 'loss', range(3))
+    x = event_multiplexer.EventMultiplexer(ingest_cache_dir=cache_dir)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+
+    y = event_multiplexer.EventMultiplexer(ingest_cache_dir=cache_dir)
+    acquired = []
+    def try_acquire():
+      if y._accumulators_mutex.acquire(False):
+        y._accumulators_mutex.release()
+        acquired.append(True)
+      else:
+        acquired.append(False)
+    original_restore = ingest_cache.IngestCache.Restore
+    def Restore(cache, accumulator):
+      thread = threading.Thread(target=try_acquire)
+      thread.start()
+      thread.join()
+      return original_restore(cache, accumulator)
+    with tf.compat.v1.test.mock.patch.object(
+        ingest_cache.IngestCache, 'Restore', Restore):
+      y.AddRunsFromDirectory(logdir)
+    self.assertEqual([True], acquired)
+    # The restored tags are indexed once the run is added.
+    self.assertEqual(['loss'],
+                     list(y.PluginRunToTagToContent(
+                         scalar_metadata.PLUGIN_NAME)['run1']))
+
+
+if __name__ == '__main__':
+  tf.test.main()
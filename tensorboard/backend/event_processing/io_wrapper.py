@@ -20,6 +20,7 @@ from __future__ import print_function
 import collections
 import os
 import re
+import time
 
 import six
 
@@ -31,6 +32,10 @@ logger = tb_logging.get_logger()
 
 _ESCAPE_GLOB_CHARACTERS_REGEX = re.compile('([*?[])')
 
+# Directory mtimes within this many seconds of the time a directory was listed
+# are not trusted, since many file systems only store whole seconds.
+_MTIME_SLACK_SECS = 2
+
 
 def IsCloudPath(path):
   return (
@@ -201,3 +206,111 @@ def GetLogdirSubdirectories(path):
       for (subdir, files) in traversal_method(path)
       if any(IsTensorFlowEventsFile(f) for f in files)
   )
+
+
+_DirectoryListing = collections.namedtuple(
+    '_DirectoryListing', ['mtime_nsec', 'listed_time', 'subdirs', 'has_events'])
+
+
+class LogdirSubdirectoryIndex(object):
+  """Incrementally finds the subdirectories of a logdir with events files.
+
+  A directory's mtime changes whenever an entry is added to or removed from
+  it, so this index remembers each directory's mtime and contents and only
+  lists directories whose mtime has changed since they were last listed. It
+  still stats every known directory, which is much cheaper than listing it.
+
+  As a safety net against file systems with unreliable mtimes, the whole
+  tree is listed again every `full_rescan_interval_secs`. Cloud paths do not
+  report directory mtimes, so they are always listed in full.
+  """
+
+  def __init__(self, path, full_rescan_interval_secs=600):
+    """Creates an index for a logdir; nothing is listed until it is used.
+
+    Args:
+      path: The path to a directory under which to find subdirectories.
+      full_rescan_interval_secs: The maximum time between listing every
+        directory from scratch. If not positive, every call lists the whole
+        tree, like `GetLogdirSubdirectories`.
+    """
+    self._path = path
+    self._full_rescan_interval_secs = full_rescan_interval_secs
+    self._listings = {}
+    self._last_full_rescan_time = None
+
+  def GetLogdirSubdirectories(self):
+    """Obtains all subdirectories with events files.
+
+    Like the function `GetLogdirSubdirectories`, but reuses the listings of
+    directories that have not changed since the last call.
+
+    Returns:
+      A tuple of absolute paths of all subdirectories each with at least 1
+      events file directly within the subdirectory.
+
+    Raises:
+      ValueError: If the path exists and is not a directory.
+    """
+    if IsCloudPath(self._path) or self._full_rescan_interval_secs <= 0:
+      return tuple(GetLogdirSubdirectories(self._path))
+
+    if not tf.io.gfile.exists(self._path):
+      self._listings = {}
+      return ()
+    if not tf.io.gfile.isdir(self._path):
+      raise ValueError('GetLogdirSubdirectories: path exists and is not a '
+                       'directory, %s' % self._path)
+
+    now = time.time()
+    if (self._last_full_rescan_time is None or
+        now - self._last_full_rescan_time >= self._full_rescan_interval_secs):
+      logger.info('LogdirSubdirectoryIndex: Listing all of %s', self._path)
+      self._listings = {}
+      self._last_full_rescan_time = now
+
+    listings = {}
+    num_listed = 0
+    pending = [self._path]
+    while pending:
+      directory = pending.pop()
+      listing = self._listings.get(directory)
+      try:
+        mtime_nsec = tf.io.gfile.stat(directory).mtime_nsec
+        if not _IsListingCurrent(listing, mtime_nsec):
+          listing = _ListDirectory(directory, mtime_nsec, now)
+          num_listed += 1
+      except tf.errors.OpError as e:
+        # The directory was probably deleted since its parent was listed.
+        logger.debug('Unable to list %s: %s', directory, e)
+        continue
+      listings[directory] = listing
+      pending.extend(listing.subdirs)
+    # Forget directories that are gone, by only keeping the ones we visited.
+    self._listings = listings
+    logger.info('LogdirSubdirectoryIndex: Listed %d of %d directories',
+                num_listed, len(listings))
+    return tuple(directory
+                 for (directory, listing) in six.iteritems(listings)
+                 if listing.has_events)
+
+
+def _IsListingCurrent(listing, mtime_nsec):
+  """Returns whether a directory with the given mtime needs no new listing."""
+  if listing is None or mtime_nsec is None:
+    return False
+  if listing.mtime_nsec != mtime_nsec:
+    return False
+  # The directory could have changed again within the same mtime tick.
+  return mtime_nsec < (listing.listed_time - _MTIME_SLACK_SECS) * 1e9
+
+
+def _ListDirectory(directory, mtime_nsec, listed_time):
+  subdirs = []
+  has_events = False
+  for path in ListDirectoryAbsolute(directory):
+    if tf.io.gfile.isdir(path):
+      subdirs.append(path)
+    elif IsTensorFlowEventsFile(path):
+      has_events = True
+  return _DirectoryListing(mtime_nsec, listed_time, subdirs, has_events)
@@ -249,6 +249,89 @@ class IoWrapperTest(tf.test.TestCase):
          for subdir in expected],
         io_wrapper.GetLogdirSubdirectories(temp_dir))
 
+  def testLogdirSubdirectoryIndexMatchesFullListing(self):
+    temp_dir = tempfile.mkdtemp(prefix=self.get_temp_dir())
+    self._CreateDeepDirectoryStructure(temp_dir)
+    index = io_wrapper.LogdirSubdirectoryIndex(temp_dir)
+    for _ in range(2):
+      self.assertItemsEqual(
+          io_wrapper.GetLogdirSubdirectories(temp_dir),
+          index.GetLogdirSubdirectories())
+
+  def testLogdirSubdirectoryIndexOnlyListsChangedDirectories(self):
+    temp_dir = tempfile.mkdtemp(prefix=self.get_temp_dir())
+    self._CreateDeepDirectoryStructure(temp_dir)
+    self._AgeDirectories(temp_dir)
+    listed = self._RecordListedDirectories()
+    index = io_wrapper.LogdirSubdirectoryIndex(temp_dir)
+    index.GetLogdirSubdirectories()
+    self.assertEqual(11, len(listed))
+
+    del listed[:]
+    index.GetLogdirSubdirectories()
+    self.assertEqual([], listed)
+
+    os.makedirs(os.path.join(temp_dir, 'waldo', 'plugh'))
+    open(os.path.join(temp_dir, 'waldo', 'plugh', 'j.tfevents.1'), 'w').close()
+    subdirs = index.GetLogdirSubdirectories()
+    self.assertItemsEqual(
+        [os.path.join(temp_dir, 'waldo'),
+         os.path.join(temp_dir, 'waldo', 'plugh')],
+        listed)
+    self.assertIn(os.path.join(temp_dir, 'waldo', 'plugh'), subdirs)
+
+  def testLogdirSubdirectoryIndexForgetsDeletedDirectories(self):
+    temp_dir = tempfile.mkdtemp(prefix=self.get_temp_dir())
+    self._CreateDeepDirectoryStructure(temp_dir)
+    index = io_wrapper.LogdirSubdirectoryIndex(temp_dir)
+    index.GetLogdirSubdirectories()
+    tf.io.gfile.rmtree(os.path.join(temp_dir, 'quuz'))
+    self.assertItemsEqual(
+        [temp_dir,
+         os.path.join(temp_dir, 'bar'),
+         os.path.join(temp_dir, 'bar', 'baz'),
+         os.path.join(temp_dir, 'waldo', 'fred')],
+        index.GetLogdirSubdirectories())
+
+  def testLogdirSubdirectoryIndexRescansPeriodically(self):
+    temp_dir = tempfile.mkdtemp(prefix=self.get_temp_dir())
+    self._CreateDeepDirectoryStructure(temp_dir)
+    self._AgeDirectories(temp_dir)
+    listed = self._RecordListedDirectories()
+    now = [1e9]
+    self.stubs.Set(io_wrapper.time, 'time', lambda: now[0])
+    index = io_wrapper.LogdirSubdirectoryIndex(
+        temp_dir, full_rescan_interval_secs=60)
+    index.GetLogdirSubdirectories()
+    now[0] += 59
+    del listed[:]
+    index.GetLogdirSubdirectories()
+    self.assertEqual([], listed)
+    now[0] += 1
+    index.GetLogdirSubdirectories()
+    self.assertEqual(11, len(listed))
+
+  def testLogdirSubdirectoryIndexForMissingDirectory(self):
+    index = io_wrapper.LogdirSubdirectoryIndex(
+        os.path.join(self.get_temp_dir(), 'nonexistent'))
+    self.assertEqual((), index.GetLogdirSubdirectories())
+
+  def _AgeDirectories(self, top_directory):
+    """Moves the mtimes of all directories back so that they are trusted."""
+    mtime = 1e9 - 3600
+    for (dir_path, _, _) in os.walk(top_directory):
+      os.utime(dir_path, (mtime, mtime))
+
+  def _RecordListedDirectories(self):
+    """Makes io_wrapper record each directory that it lists."""
+    listed = []
+    list_directory_absolute = io_wrapper.ListDirectoryAbsolute
+    def ListDirectoryAbsolute(directory):
+      listed.append(directory)
+      return list_directory_absolute(directory)
+    self.stubs.Set(io_wrapper, 'ListDirectoryAbsolute', ListDirectoryAbsolute)
+    return listed
+
   def _CreateDeepDirectoryStructure(self, top_directory):
     """Creates a reasonable deep structure of subdirectories with files.
 
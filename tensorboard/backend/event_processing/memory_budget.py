@@ -0,0 +1,144 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""A ceiling on the memory retained by the reservoirs of a process.
+
+Size guidance bounds reservoirs by their number of items, which says little
+about their memory use: ten high-resolution images can take more memory than
+millions of scalars. A `MemoryBudget` keeps track of the reservoirs of all
+runs, and when the bytes they retain exceed a ceiling, shrinks some of them
+with `reservoir.Reservoir.Shrink` until they fit again.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+import weakref
+
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+# Eviction policies: which reservoir to shrink first.
+# The reservoir that retains the most bytes.
+LARGEST = 'largest'
+# The reservoir that was read least recently, then the largest one.
+COLDEST = 'coldest'
+
+POLICIES = (LARGEST, COLDEST)
+
+# Fraction of the ceiling that may be added between two checks.
+_CHECK_FRACTION = 16
+
+
+class MemoryBudget(object):
+  """Shrinks registered reservoirs when they retain too many bytes.
+
+  Reservoirs are registered as they are created. Loaders report how many
+  bytes they may have added to them with `Charge`, which is cheap; once a
+  sixteenth of the ceiling has been charged, the exact sizes of the
+  reservoirs are added up, and reservoirs are shrunk according to the policy
+  until they fit. Reservoirs that are no longer referenced elsewhere are
+  forgotten.
+  """
+
+  def __init__(self, max_bytes, policy=LARGEST):
+    """Creates a budget.
+
+    Args:
+      max_bytes: The maximum number of bytes that the registered reservoirs
+        may retain, as reported by their `NumBytes`.
+      policy: One of `POLICIES`.
+
+    Raises:
+      ValueError: If `max_bytes` is not positive or `policy` is unknown.
+    """
+    if max_bytes <= 0:
+      raise ValueError('max_bytes must be positive, was %r' % (max_bytes,))
+    if policy not in POLICIES:
+      raise ValueError('Unknown eviction policy: %r' % (policy,))
+    self._max_bytes = max_bytes
+    self._policy = policy
+    self._check_interval_bytes = max(max_bytes // _CHECK_FRACTION, 1)
+    self._reservoirs = weakref.WeakSet()
+    self._unchecked_bytes = 0
+    self._warned = False
+    self._lock = threading.Lock()
+
+  @property
+  def max_bytes(self):
+    return self._max_bytes
+
+  def Register(self, reservoir):
+    """Starts accounting for a `reservoir.Reservoir`."""
+    with self._lock:
+      self._reservoirs.add(reservoir)
+
+  def NumBytes(self):
+    """Returns the number of bytes retained by the registered reservoirs."""
+    with self._lock:
+      reservoirs = list(self._reservoirs)
+    return sum(r.NumBytes() for r in reservoirs)
+
+  def Charge(self, num_bytes):
+    """Notes that up to `num_bytes` may have been added to the reservoirs.
+
+    Enforces the ceiling if enough bytes were charged since it last was.
+    """
+    with self._lock:
+      self._unchecked_bytes += num_bytes
+      if self._unchecked_bytes < self._check_interval_bytes:
+        return
+    self.Enforce()
+
+  def Enforce(self):
+    """Shrinks reservoirs until they fit within the ceiling, if possible.
+
+    Returns:
+      The number of bytes freed.
+    """
+    with self._lock:
+      self._unchecked_bytes = 0
+      reservoirs = list(self._reservoirs)
+      sizes = dict((r, r.NumBytes()) for r in reservoirs)
+      total = sum(sizes.values())
+      freed = 0
+      candidates = [r for r in reservoirs if sizes[r]]
+      while total > self._max_bytes and candidates:
+        victim = self._PickVictim(candidates, sizes)
+        num_freed = victim.Shrink()
+        if num_freed <= 0:
+          candidates.remove(victim)
+          continue
+        sizes[victim] -= num_freed
+        total -= num_freed
+        freed += num_freed
+      if total > self._max_bytes and not self._warned:
+        logger.warn(
+            'Loaded data takes %d bytes even though every tag keeps only '
+            'its latest sample, which is more than --max_memory_mb allows.',
+            total)
+        self._warned = True
+      if freed:
+        logger.info('Freed %d bytes of loaded data to stay within %d bytes',
+                    freed, self._max_bytes)
+      return freed
+
+  def _PickVictim(self, candidates, sizes):
+    if self._policy == COLDEST:
+      return min(candidates, key=lambda r: (r.last_read, -sizes[r]))
+    return max(candidates, key=lambda r: sizes[r])
@@ -0,0 +1,109 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import gc
+
+from tensorboard import test as tb_test
+from tensorboard.backend.event_processing import memory_budget
+from tensorboard.backend.event_processing import reservoir
+
+
+def _Filled(num_items, item_size, size=0):
+  r = reservoir.Reservoir(size, item_bytes=len)
+  for i in range(num_items):
+    r.AddItem('key', b'%d' % (i % 10) * item_size)
+  return r
+
+
+class MemoryBudgetTest(tb_test.TestCase):
+
+  def testValidatesArguments(self):
+    with self.assertRaises(ValueError):
+      memory_budget.MemoryBudget(0)
+    with self.assertRaises(ValueError):
+      memory_budget.MemoryBudget(100, policy='random')
+
+  def testDoesNothingWithinCeiling(self):
+    budget = memory_budget.MemoryBudget(1000)
+    r = _Filled(10, 100)
+    budget.Register(r)
+    self.assertEqual(1000, budget.NumBytes())
+    self.assertEqual(0, budget.Enforce())
+    self.assertEqual(10, len(r.Items('key')))
+
+  def testShrinksLargestFirst(self):
+    budget = memory_budget.MemoryBudget(1500)
+    small = _Filled(10, 10)
+    large = _Filled(20, 100)
+    budget.Register(small)
+    budget.Register(large)
+    self.assertEqual(1000, budget.Enforce())
+    self.assertEqual(10, len(small.Items('key')))
+    self.assertEqual(10, len(large.Items('key')))
+    self.assertEqual(10, large.size)
+    self.assertLessEqual(budget.NumBytes(), 1500)
+
+  def testShrinksColdestFirst(self):
+    budget = memory_budget.MemoryBudget(3500, policy=memory_budget.COLDEST)
+    cold = _Filled(20, 100)
+    hot = _Filled(20, 100)
+    budget.Register(cold)
+    budget.Register(hot)
+    hot.Items('key')
+    budget.Enforce()
+    self.assertEqual(10, len(cold.Items('key')))
+    self.assertEqual(20, len(hot.Items('key')))
+
+  def testShrinkingKeepsLastItemAndIsDeterministic(self):
+    def run():
+      budget = memory_budget.MemoryBudget(50)
+      r = _Filled(100, 1)
+      budget.Register(r)
+      budget.Enforce()
+      return r.Items('key')
+    items = run()
+    self.assertEqual(50, len(items))
+    self.assertEqual(b'9', items[-1])
+    self.assertEqual(items, run())
+
+  def testChargeEnforcesPeriodically(self):
+    budget = memory_budget.MemoryBudget(160)
+    r = _Filled(20, 10)
+    budget.Register(r)
+    budget.Charge(9)
+    self.assertEqual(20, len(r.Items('key')))
+    budget.Charge(1)
+    self.assertEqual(10, len(r.Items('key')))
+
+  def testGivesUpWhenEveryReservoirHasOneItem(self):
+    budget = memory_budget.MemoryBudget(10)
+    r = _Filled(4, 100)
+    budget.Register(r)
+    budget.Enforce()
+    self.assertEqual(1, len(r.Items('key')))
+    self.assertEqual(100, budget.NumBytes())
+
+  def testForgetsUnreferencedReservoirs(self):
+    budget = memory_budget.MemoryBudget(10)
+    budget.Register(_Filled(4, 100))
+    gc.collect()  # Reservoirs refer to themselves through their buckets.
+    self.assertEqual(0, budget.NumBytes())
+
+
+if __name__ == '__main__':
+  tb_test.main()
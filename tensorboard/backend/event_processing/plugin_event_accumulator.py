@@ -18,13 +18,18 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import itertools
 import threading
+import time
 
+from google.protobuf import message
+import numpy as np
 import six
 
 from tensorboard import data_compat
 from tensorboard.backend.event_processing import directory_watcher
 from tensorboard.backend.event_processing import event_file_loader
+from tensorboard.backend.event_processing import event_scanner
 from tensorboard.backend.event_processing import io_wrapper
 from tensorboard.backend.event_processing import plugin_asset_util
 from tensorboard.backend.event_processing import reservoir
@@ -33,7 +38,12 @@ from tensorboard.compat.proto import config_pb2
 from tensorboard.compat.proto import event_pb2
 from tensorboard.compat.proto import graph_pb2
 from tensorboard.compat.proto import meta_graph_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.plugins.audio import metadata as audio_metadata
+from tensorboard.plugins.image import metadata as image_metadata
+from tensorboard.plugins.scalar import metadata as scalar_metadata
 from tensorboard.util import tb_logging
+from tensorboard.util import tensor_util
 
 
 logger = tb_logging.get_logger()
@@ -42,6 +52,16 @@ namedtuple = collections.namedtuple
 
 TensorEvent = namedtuple('TensorEvent', ['wall_time', 'step', 'tensor_proto'])
 
+ScalarSeries = reservoir.ScalarSeries
+
+# A summary of the events of a tag whose tensors each hold a batch of samples,
+# such as images or audio clips: the number of events in its reservoir, the
+# greatest number of samples of any event loaded, and the step of the latest
+# event and, for images, its width and height (or None).
+SampleStats = namedtuple(
+    'SampleStats',
+    ['num_events', 'max_samples', 'last_step', 'width', 'height'])
+
 ## Different types of summary events handled by the event_accumulator
 SUMMARY_TYPES = {
     'tensor': '_ProcessTensor',
@@ -64,6 +84,14 @@ STORE_EVERYTHING_SIZE_GUIDANCE = {
 
 _TENSOR_RESERVOIR_KEY = "."  # arbitrary
 
+# Bump this whenever the contents of `EventAccumulator.Checkpoint` change.
+_CHECKPOINT_VERSION = 4
+
+# Source of the values returned by `EventAccumulator.Generation`. It is shared
+# by all accumulators, so that a run that is replaced by a new accumulator
+# does not repeat the generations of the old one.
+_generations = itertools.count(1)
+
 
 class EventAccumulator(object):
   """An `EventAccumulator` takes an event generator, and accumulates the values.
@@ -96,16 +124,22 @@ class EventAccumulator(object):
         tf events file. The accumulator will load events from this path.
     tensors_by_tag: A dictionary mapping each tag name to a
       reservoir.Reservoir of tensor summaries. Each such reservoir will
-      only use a single key, given by `_TENSOR_RESERVOIR_KEY`.
+      only use a single key, given by `_TENSOR_RESERVOIR_KEY`. Tags of the
+      scalars plugin use a reservoir.ScalarReservoir instead, which holds
+      their values in columns.
 
   @@Tensors
+  @@ScalarSeries
+  @@SampleStats
   """
 
   def __init__(self,
                path,
                size_guidance=None,
                tensor_size_guidance=None,
-               purge_orphaned_data=True):
+               purge_orphaned_data=True,
+               memory_budget=None,
+               tag_listener=None):
     """Construct the `EventAccumulator`.
 
     Args:
@@ -125,6 +159,12 @@ class EventAccumulator(object):
         `size_guidance[event_accumulator.TENSORS]`. Defaults to `{}`.
       purge_orphaned_data: Whether to discard any events that were "orphaned" by
         a TensorFlow restart.
+      memory_budget: An optional `memory_budget.MemoryBudget`, which may
+        shrink the tensor reservoirs below the size guidance when the data of
+        all runs takes more memory than it allows.
+      tag_listener: An optional function that is called with a tag and its
+        `SummaryMetadata` whenever a tag with metadata is first seen,
+        including when it is restored from a checkpoint.
     """
     size_guidance = dict(size_guidance or DEFAULT_SIZE_GUIDANCE)
     sizes = {}
@@ -145,6 +185,16 @@ class EventAccumulator(object):
     self.summary_metadata = {}
     self.tensors_by_tag = {}
     self._tensors_by_tag_lock = threading.Lock()
+    self._tag_generations = {}
+    # The size of each tag's reservoir as of its latest generation, to notice
+    # when the memory budget shrinks it.
+    self._generation_sizes = {}
+    # Maps tags of plugins in `_SAMPLE_SHAPE_FNS` to the
+    # `(max_samples, last_step, width, height)` of their events, which are
+    # kept up to date as events are added, so that listing those tags never
+    # has to read the events.
+    self._sample_stats = {}
+    self._memory_budget = memory_budget
 
     # Keep a mapping from plugin name to a dict mapping from tag to plugin data
     # content obtained from the SummaryMetadata (metadata field of Value) for
@@ -154,6 +204,7 @@ class EventAccumulator(object):
     # content for each tag.
     self._plugin_to_tag_to_content = collections.defaultdict(dict)
     self._plugin_tag_locks = collections.defaultdict(threading.Lock)
+    self._tag_listener = tag_listener
 
     self.path = path
     self._generator = _GeneratorFromPath(path)
@@ -165,6 +216,13 @@ class EventAccumulator(object):
     self.most_recent_wall_time = -1
     self.file_version = None
 
+    # Totals since construction, for monitoring.
+    self.records_read = 0
+    self.bytes_read = 0
+    self.parse_errors = 0
+    # How long the latest call to `Reload` took, in seconds.
+    self.reload_secs = None
+
   def Reload(self):
     """Loads all events added since the last call to `Reload`.
 
@@ -174,10 +232,123 @@ class EventAccumulator(object):
       The `EventAccumulator`.
     """
     with self._generator_mutex:
-      for event in self._generator.Load():
-        self._ProcessEvent(event)
+      start = time.time()
+      for record in self._generator.Load():
+        self.records_read += 1
+        if isinstance(record, bytes):
+          self.bytes_read += len(record)
+        self._ProcessRecord(record)
+      self.reload_secs = time.time() - start
     return self
 
+  def SetTagListener(self, tag_listener):
+    """Replaces the `tag_listener` and calls it with the tags seen so far.
+
+    Args:
+      tag_listener: As for the constructor.
+    """
+    self._tag_listener = tag_listener
+    for (tag, summary_metadata) in six.iteritems(dict(self.summary_metadata)):
+      tag_listener(tag, summary_metadata)
+
+  def Checkpoint(self):
+    """Returns a picklable snapshot of the loaded data and reading position.
+
+    Passing the snapshot to `RestoreCheckpoint` on a new accumulator for the
+    same path resumes loading where this one left off, without re-reading
+    the event files.
+
+    Returns:
+      The snapshot, or None if nothing has been loaded yet or if `path` is a
+      single events file rather than a directory.
+    """
+    if not isinstance(self._generator, directory_watcher.DirectoryWatcher):
+      return None
+    with self._generator_mutex:
+      generator_checkpoint = self._generator.Checkpoint()
+      if generator_checkpoint is None:
+        return None
+      with self._tensors_by_tag_lock:
+        tensors_by_tag = dict(self.tensors_by_tag)
+      plugin_to_tag_to_content = {}
+      for plugin_name in list(self._plugin_to_tag_to_content):
+        with self._plugin_tag_locks[plugin_name]:
+          plugin_to_tag_to_content[plugin_name] = dict(
+              self._plugin_to_tag_to_content[plugin_name])
+      return {
+          'version': _CHECKPOINT_VERSION,
+          'path': self.path,
+          'guidance': self._CheckpointGuidance(),
+          'generator': generator_checkpoint,
+          'first_event_timestamp': self._first_event_timestamp,
+          'file_version': self.file_version,
+          'most_recent_step': self.most_recent_step,
+          'most_recent_wall_time': self.most_recent_wall_time,
+          'graph': self._graph,
+          'graph_from_metagraph': self._graph_from_metagraph,
+          'meta_graph': self._meta_graph,
+          'tagged_metadata': dict(self._tagged_metadata),
+          'summary_metadata': dict(self.summary_metadata),
+          'plugin_to_tag_to_content': plugin_to_tag_to_content,
+          'tensors_by_tag': tensors_by_tag,
+          'sample_stats': dict(self._sample_stats),
+      }
+
+  def RestoreCheckpoint(self, checkpoint):
+    """Restores a snapshot returned by `Checkpoint`.
+
+    The snapshot is rejected if it was taken for another path, with other
+    size guidance, or if the event files it covers have since changed other
+    than by being appended to.
+
+    Args:
+      checkpoint: A value returned by `Checkpoint`.
+
+    Returns:
+      Whether the snapshot was restored. If not, this accumulator is unchanged.
+    """
+    if (checkpoint.get('version') != _CHECKPOINT_VERSION or
+        checkpoint['path'] != self.path or
+        checkpoint['guidance'] != self._CheckpointGuidance() or
+        not isinstance(self._generator, directory_watcher.DirectoryWatcher)):
+      return False
+    with self._generator_mutex:
+      if not self._generator.RestoreCheckpoint(checkpoint['generator']):
+        return False
+      self._first_event_timestamp = checkpoint['first_event_timestamp']
+      self.file_version = checkpoint['file_version']
+      self.most_recent_step = checkpoint['most_recent_step']
+      self.most_recent_wall_time = checkpoint['most_recent_wall_time']
+      self._graph = checkpoint['graph']
+      self._graph_from_metagraph = checkpoint['graph_from_metagraph']
+      self._meta_graph = checkpoint['meta_graph']
+      self._tagged_metadata = checkpoint['tagged_metadata']
+      self.summary_metadata = checkpoint['summary_metadata']
+      for (plugin_name, tag_to_content) in six.iteritems(
+          checkpoint['plugin_to_tag_to_content']):
+        with self._plugin_tag_locks[plugin_name]:
+          self._plugin_to_tag_to_content[plugin_name] = tag_to_content
+      if self._tag_listener is not None:
+        for (tag, summary_metadata) in six.iteritems(self.summary_metadata):
+          self._tag_listener(tag, summary_metadata)
+      with self._tensors_by_tag_lock:
+        self.tensors_by_tag = checkpoint['tensors_by_tag']
+      self._sample_stats = checkpoint['sample_stats']
+      for (tag, tag_reservoir) in six.iteritems(self.tensors_by_tag):
+        self._BumpGeneration(tag)
+        if self._memory_budget is not None:
+          self._memory_budget.Register(tag_reservoir)
+          self._memory_budget.Charge(tag_reservoir.NumBytes())
+    return True
+
+  def _CheckpointGuidance(self):
+    """Returns the settings that a checkpoint is only valid for."""
+    return {
+        'size_guidance': self._size_guidance,
+        'tensor_size_guidance': self._tensor_size_guidance,
+        'purge_orphaned_data': self.purge_orphaned_data,
+    }
+
   def PluginAssets(self, plugin_name):
     """Return a list of all plugin assets for the given plugin.
 
@@ -224,8 +395,8 @@ class EventAccumulator(object):
       return self._first_event_timestamp
     with self._generator_mutex:
       try:
-        event = next(self._generator.Load())
-        self._ProcessEvent(event)
+        record = next(self._generator.Load())
+        self._ProcessRecord(record)
         return self._first_event_timestamp
 
       except StopIteration:
@@ -265,6 +436,92 @@ class EventAccumulator(object):
     """
     return self.summary_metadata[tag]
 
+  def _ProcessRecord(self, record):
+    """Called whenever a serialized event is loaded.
+
+    Summary values of tags that have been seen before are not parsed right
+    away: their reservoir is handed the position of the value in the record,
+    and only parses and migrates it if it keeps it.
+
+    Args:
+      record: A serialized `Event` proto. For the sake of generators that
+        yield parsed events, an `Event` proto is accepted too.
+    """
+    if self._memory_budget is not None:
+      self._memory_budget.Charge(
+          len(record) if isinstance(record, bytes) else record.ByteSize())
+    if not isinstance(record, bytes):
+      self._ProcessEvent(record)
+      return
+    header = None
+    if self._first_event_timestamp is not None:
+      header = event_scanner.ScanSummaryEvent(record)
+    if header is None or self._MayPurge(header.step):
+      try:
+        event = event_pb2.Event.FromString(record)
+      except message.DecodeError as e:
+        self.parse_errors += 1
+        logger.warn('Skipping malformed event in %s: %s', self.path, e)
+        return
+      self._ProcessEvent(event)
+      return
+    if self.purge_orphaned_data:
+      # As in `_MaybePurgeOrphanedData`.
+      self.most_recent_step = header.step
+      self.most_recent_wall_time = header.wall_time
+    for value in header.values:
+      if self._CanDeferValue(value):
+        raw_value = _RawValue(wall_time=header.wall_time, step=header.step,
+                              record=record, start=value.start, end=value.end)
+        self._AddTensorItem(value.tag, raw_value, self._DecodeDeferredValue)
+      else:
+        self._ProcessValue(
+            summary_pb2.Summary.Value.FromString(
+                record[value.start:value.end]),
+            header.wall_time, header.step)
+
+  def _DecodeDeferredValue(self, raw_value):
+    """Decodes a `_RawValue` that a reservoir keeps, or returns None.
+
+    This runs when the reservoir is read, long after the record was scanned,
+    so a value that turns out to be malformed is dropped rather than failing
+    the read.
+    """
+    try:
+      return _DecodeRawValue(raw_value)
+    except (message.DecodeError, TypeError, ValueError) as e:
+      self.parse_errors += 1
+      logger.warn('Skipping malformed summary value in %s at step %d: %s',
+                  self.path, raw_value.step, e)
+      return None
+
+  def _MayPurge(self, step):
+    """Whether a summary event at `step` may cause orphaned data to be purged.
+
+    Summary events can only do so when purging by out-of-order steps.
+    """
+    return (self.purge_orphaned_data and
+            not (self.file_version and self.file_version >= 2) and
+            step < self.most_recent_step)
+
+  def _CanDeferValue(self, value):
+    """Whether a value's parsing can be left to its tag's reservoir.
+
+    That is the case if the reservoir already exists, and the value holds
+    data but no summary metadata that would still need to be recorded.
+
+    Args:
+      value: An `event_scanner.ValueHeader`.
+    """
+    if not value.tag or value.tag not in self.tensors_by_tag:
+      return False
+    if value.data_field is None:
+      return False
+    # Values of legacy types are given metadata when they are migrated.
+    gets_metadata = (value.has_metadata or
+                     value.data_field != event_scanner.TENSOR)
+    return not gets_metadata or value.tag in self.summary_metadata
+
   def _ProcessEvent(self, event):
     """Called whenever an event is loaded."""
     if self._first_event_timestamp is None:
@@ -323,37 +580,47 @@ class EventAccumulator(object):
       self._tagged_metadata[tag] = event.tagged_run_metadata.run_metadata
     elif event.HasField('summary'):
       for value in event.summary.value:
-        value = data_compat.migrate_value(value)
-
-        if value.HasField('metadata'):
-          tag = value.tag
-          # We only store the first instance of the metadata. This check
-          # is important: the `FileWriter` does strip metadata from all
-          # values except the first one per each tag, but a new
-          # `FileWriter` is created every time a training job stops and
-          # restarts. Hence, we must also ignore non-initial metadata in
-          # this logic.
-          if tag not in self.summary_metadata:
-            self.summary_metadata[tag] = value.metadata
-            plugin_data = value.metadata.plugin_data
-            if plugin_data.plugin_name:
-              with self._plugin_tag_locks[plugin_data.plugin_name]:
-                self._plugin_to_tag_to_content[plugin_data.plugin_name][tag] = (
-                    plugin_data.content)
-            else:
-              logger.warn(
-                  ('This summary with tag %r is oddly not associated with a '
-                   'plugin.'), tag)
-
-        for summary_type, summary_func in SUMMARY_TYPES.items():
-          if value.HasField(summary_type):
-            datum = getattr(value, summary_type)
-            tag = value.tag
-            if summary_type == 'tensor' and not tag:
-              # This tensor summary was created using the old method that used
-              # plugin assets. We must still continue to support it.
-              tag = value.node_name
-            getattr(self, summary_func)(tag, event.wall_time, event.step, datum)
+        self._ProcessValue(value, event.wall_time, event.step)
+
+  def _ProcessValue(self, value, wall_time, step):
+    """Processes a `Summary.Value` of an event."""
+    value = data_compat.migrate_value(value)
+
+    if value.HasField('metadata'):
+      tag = value.tag
+      # We only store the first instance of the metadata. This check
+      # is important: the `FileWriter` does strip metadata from all
+      # values except the first one per each tag, but a new
+      # `FileWriter` is created every time a training job stops and
+      # restarts. Hence, we must also ignore non-initial metadata in
+      # this logic.
+      if tag not in self.summary_metadata:
+        self._AddSummaryMetadata(tag, value.metadata)
+        if not value.metadata.plugin_data.plugin_name:
+          logger.warn(
+              ('This summary with tag %r is oddly not associated with a '
+               'plugin.'), tag)
+
+    for summary_type, summary_func in SUMMARY_TYPES.items():
+      if value.HasField(summary_type):
+        datum = getattr(value, summary_type)
+        tag = value.tag
+        if summary_type == 'tensor' and not tag:
+          # This tensor summary was created using the old method that used
+          # plugin assets. We must still continue to support it.
+          tag = value.node_name
+        getattr(self, summary_func)(tag, wall_time, step, datum)
+
+  def _AddSummaryMetadata(self, tag, summary_metadata):
+    """Records the metadata of a tag that was not seen before."""
+    self.summary_metadata[tag] = summary_metadata
+    plugin_data = summary_metadata.plugin_data
+    if plugin_data.plugin_name:
+      with self._plugin_tag_locks[plugin_data.plugin_name]:
+        self._plugin_to_tag_to_content[plugin_data.plugin_name][tag] = (
+            plugin_data.content)
+    if self._tag_listener is not None:
+      self._tag_listener(tag, summary_metadata)
 
   def Tags(self):
     """Return all tags found in the value stream.
@@ -434,7 +701,152 @@ class EventAccumulator(object):
     Returns:
       An array of `TensorEvent`s.
     """
-    return self.tensors_by_tag[tag].Items(_TENSOR_RESERVOIR_KEY)
+    tag_reservoir = self.tensors_by_tag[tag]
+    items = tag_reservoir.Items(_TENSOR_RESERVOIR_KEY)
+    if isinstance(tag_reservoir, reservoir.ScalarReservoir):
+      return [
+          TensorEvent(wall_time=item.wall_time,
+                      step=item.step,
+                      tensor_proto=tensor_util.make_tensor_proto(item.value))
+          for item in items
+      ]
+    return items
+
+  def Generation(self, tag):
+    """Returns a number that changes whenever the data of a tag changes.
+
+    Callers can use it to tell whether anything derived from `Tensors(tag)`
+    is still current. Generations are unique across all accumulators.
+
+    Args:
+      tag: A string tag.
+
+    Returns:
+      A positive integer, or 0 if the tag has no data.
+    """
+    tag_reservoir = self.tensors_by_tag.get(tag)
+    if (tag_reservoir is not None and
+        tag_reservoir.size != self._generation_sizes.get(tag)):
+      # The memory budget shrank the reservoir, which only ever lowers its size.
+      self._BumpGeneration(tag)
+    return self._tag_generations.get(tag, 0)
+
+  def _BumpGeneration(self, tag):
+    tag_reservoir = self.tensors_by_tag.get(tag)
+    if tag_reservoir is not None:
+      self._generation_sizes[tag] = tag_reservoir.size
+    self._tag_generations[tag] = next(_generations)
+
+  def ReservoirStats(self):
+    """Returns the number of items and bytes of tensor data per plugin.
+
+    Returns:
+      A dict mapping plugin names to `(num_items, num_bytes)` pairs. Tags
+      without a plugin are counted under the empty string.
+    """
+    with self._tensors_by_tag_lock:
+      tensors_by_tag = dict(self.tensors_by_tag)
+    result = {}
+    for (tag, tag_reservoir) in six.iteritems(tensors_by_tag):
+      summary_metadata = self.summary_metadata.get(tag)
+      plugin_name = (summary_metadata.plugin_data.plugin_name
+                     if summary_metadata is not None else '')
+      (num_items, num_bytes) = result.get(plugin_name, (0, 0))
+      result[plugin_name] = (num_items + tag_reservoir.NumItems(),
+                             num_bytes + tag_reservoir.NumBytes())
+    return result
+
+  def RetainedBytes(self):
+    """Returns the approximate number of bytes of tensor data per tag.
+
+    Returns:
+      A dict mapping each tag to the number of bytes that its reservoir
+      retains. Only tags loaded with a memory budget are accounted for; the
+      others have 0 bytes.
+    """
+    with self._tensors_by_tag_lock:
+      tensors_by_tag = dict(self.tensors_by_tag)
+    return {tag: tag_reservoir.NumBytes()
+            for (tag, tag_reservoir) in six.iteritems(tensors_by_tag)}
+
+  def ScalarSeries(self, tag):
+    """Given a summary tag of scalar tensors, return all associated values.
+
+    This is much cheaper than `Tensors` for tags of the scalars plugin, whose
+    values are already stored in columns.
+
+    Args:
+      tag: A string tag associated with the events.
+
+    Raises:
+      KeyError: If the tag is not found.
+
+    Returns:
+      A `ScalarSeries` of numpy arrays of wall times, steps and values.
+    """
+    tag_reservoir = self.tensors_by_tag[tag]
+    if isinstance(tag_reservoir, reservoir.ScalarReservoir):
+      return tag_reservoir.Series(_TENSOR_RESERVOIR_KEY)
+    events = [_ToScalarEvent(tensor_event) for tensor_event
+              in tag_reservoir.Items(_TENSOR_RESERVOIR_KEY)]
+    return ScalarSeries(
+        wall_times=np.array([e.wall_time for e in events], dtype=np.float64),
+        steps=np.array([e.step for e in events], dtype=np.int64),
+        values=np.array([e.value for e in events]))
+
+  def SampleStats(self, tag):
+    """Given a tag of images or audio, summarizes its events.
+
+    This does not read the events, whose tensors hold the encoded samples,
+    but the statistics that are kept as the events are loaded. Only the
+    maximum number of samples is of all events loaded rather than only of
+    those that the reservoir retains, except that purging orphaned data
+    recomputes it from the events that are left. It is the same whether the
+    events were loaded in this process or in a worker process, or restored
+    from a checkpoint.
+
+    Args:
+      tag: A string tag of the images or the audio plugin.
+
+    Raises:
+      KeyError: If the tag is not found.
+
+    Returns:
+      A `SampleStats`.
+    """
+    tag_reservoir = self.tensors_by_tag[tag]
+    (max_samples, last_step, width, height) = self._sample_stats.get(
+        tag, (0, None, None, None))
+    return SampleStats(num_events=tag_reservoir.NumItems(),
+                       max_samples=max_samples,
+                       last_step=last_step,
+                       width=width,
+                       height=height)
+
+  def _SampleShapeFn(self, tag):
+    """Returns the function of `_SAMPLE_SHAPE_FNS` for a tag, if any."""
+    summary_metadata = self.summary_metadata.get(tag)
+    if summary_metadata is None:
+      return None
+    return _SAMPLE_SHAPE_FNS.get(summary_metadata.plugin_data.plugin_name)
+
+  def _SampleHeader(self, tensor_event):
+    """Returns the `event_scanner.TensorHeader` of a retained event."""
+    return _TensorHeader(tensor_event)
+
+  def _ResetSampleStats(self, tag):
+    """Recomputes the `SampleStats` of a tag from the events it retains."""
+    shape_fn = self._SampleShapeFn(tag)
+    if shape_fn is None:
+      return
+    stats = None
+    for tensor_event in self.tensors_by_tag[tag].Items(_TENSOR_RESERVOIR_KEY):
+      stats = _NextSampleStats(
+          stats, tensor_event.step, shape_fn(self._SampleHeader(tensor_event)))
+    if stats is None:
+      self._sample_stats.pop(tag, None)
+    else:
+      self._sample_stats[tag] = stats
 
   def _MaybePurgeOrphanedData(self, event):
     """Maybe purge orphaned data due to a TensorFlow crash.
@@ -500,11 +912,41 @@ class EventAccumulator(object):
 
   def _ProcessTensor(self, tag, wall_time, step, tensor):
     tv = TensorEvent(wall_time=wall_time, step=step, tensor_proto=tensor)
+    self._AddTensorItem(tag, tv)
+
+  def _AddTensorItem(self, tag, item, f=None):
+    """Adds an item to the reservoir of a tag, creating it if needed.
+
+    Args:
+      tag: The tag of the item.
+      item: A `TensorEvent`, or an item that `f` turns into one.
+      f: An optional function that turns `item` into a `TensorEvent`. The
+        reservoir only applies it if it keeps the item.
+    """
     with self._tensors_by_tag_lock:
       if tag not in self.tensors_by_tag:
         reservoir_size = self._GetTensorReservoirSize(tag)
-        self.tensors_by_tag[tag] = reservoir.Reservoir(reservoir_size)
-    self.tensors_by_tag[tag].AddItem(_TENSOR_RESERVOIR_KEY, tv)
+        self.tensors_by_tag[tag] = self._NewTensorReservoir(
+            tag, reservoir_size)
+    _AddTensorEvent(self.tensors_by_tag[tag], item, f)
+    self._BumpGeneration(tag)
+    shape_fn = self._SampleShapeFn(tag)
+    if shape_fn is not None:
+      header = _TensorHeader(item)
+      if header is not None:
+        self._sample_stats[tag] = _NextSampleStats(
+            self._sample_stats.get(tag), item.step, shape_fn(header))
+
+  def _NewTensorReservoir(self, tag, size):
+    summary_metadata = self.summary_metadata.get(tag)
+    if (summary_metadata is not None and
+        summary_metadata.plugin_data.plugin_name == scalar_metadata.PLUGIN_NAME):
+      tag_reservoir = reservoir.ScalarReservoir(size)
+    else:
+      tag_reservoir = reservoir.Reservoir(size, item_bytes=_TensorItemBytes)
+    if self._memory_budget is not None:
+      self._memory_budget.Register(tag_reservoir)
+    return tag_reservoir
 
   def _GetTensorReservoirSize(self, tag):
     default = self._size_guidance[TENSORS]
@@ -539,17 +981,19 @@ class EventAccumulator(object):
     ## Keep data in reservoirs that has a step less than event.step
     _NotExpired = lambda x: x.step < event.step
 
-    num_expired = 0
     if by_tags:
-      for value in event.summary.value:
-        if value.tag in self.tensors_by_tag:
-          tag_reservoir = self.tensors_by_tag[value.tag]
-          num_expired += tag_reservoir.FilterItems(
-              _NotExpired, _TENSOR_RESERVOIR_KEY)
+      tags = [value.tag for value in event.summary.value
+              if value.tag in self.tensors_by_tag]
     else:
-      for tag_reservoir in six.itervalues(self.tensors_by_tag):
-        num_expired += tag_reservoir.FilterItems(
-            _NotExpired, _TENSOR_RESERVOIR_KEY)
+      tags = list(self.tensors_by_tag)
+    num_expired = 0
+    for tag in tags:
+      num_expired_for_tag = self.tensors_by_tag[tag].FilterItems(
+          _NotExpired, _TENSOR_RESERVOIR_KEY)
+      if num_expired_for_tag:
+        self._BumpGeneration(tag)
+        self._ResetSampleStats(tag)
+        num_expired += num_expired_for_tag
     if num_expired > 0:
       purge_msg = _GetPurgeMessage(self.most_recent_step,
                                    self.most_recent_wall_time, event.step,
@@ -557,6 +1001,115 @@ class EventAccumulator(object):
       logger.warn(purge_msg)
 
 
+def _AddTensorEvent(tag_reservoir, item, f=None):
+  """Adds a `TensorEvent` to a reservoir from `_NewTensorReservoir`.
+
+  Args:
+    tag_reservoir: The reservoir.
+    item: A `TensorEvent`, or an item that `f` turns into one.
+    f: An optional function that turns `item` into a `TensorEvent`, which is
+      only applied if the reservoir keeps the item, or into None to drop it.
+  """
+  if isinstance(tag_reservoir, reservoir.ScalarReservoir):
+    if f is None:
+      transform = _ToScalarEvent
+    else:
+      def transform(x):
+        tensor_event = f(x)
+        return None if tensor_event is None else _ToScalarEvent(tensor_event)
+    tag_reservoir.AddItem(_TENSOR_RESERVOIR_KEY, item, transform)
+  elif f is None:
+    tag_reservoir.AddItem(_TENSOR_RESERVOIR_KEY, item)
+  else:
+    tag_reservoir.AddItem(_TENSOR_RESERVOIR_KEY, item, f)
+
+
+# A summary value that has not been parsed yet: `record[start:end]` is a
+# serialized `Summary.Value` of an event at the given wall time and step.
+_RawValue = collections.namedtuple(
+    '_RawValue', ['wall_time', 'step', 'record', 'start', 'end'])
+
+
+def _TensorItemBytes(item):
+  """Returns the bytes retained by a `TensorEvent` or a `_RawValue`."""
+  if isinstance(item, _RawValue):
+    # The rest of the record is shared with the other values of the event.
+    return item.end - item.start
+  return item.tensor_proto.ByteSize()
+
+
+def _DecodeRawValue(raw_value):
+  """Parses and migrates a `_RawValue` into a `TensorEvent`."""
+  value = data_compat.migrate_value(summary_pb2.Summary.Value.FromString(
+      raw_value.record[raw_value.start:raw_value.end]))
+  return TensorEvent(wall_time=raw_value.wall_time, step=raw_value.step,
+                     tensor_proto=value.tensor)
+
+
+def _TensorHeader(item):
+  """Returns the `event_scanner.TensorHeader` of a `TensorEvent` or `_RawValue`.
+
+  The value of a `_RawValue` is scanned rather than parsed, so that the
+  reservoir still only parses the values that it keeps. Returns None if it
+  cannot be scanned, in which case it is malformed and will be dropped when
+  decoded.
+  """
+  if isinstance(item, _RawValue):
+    return event_scanner.ScanTensorHeader(item.record, item.start, item.end)
+  tensor_proto = item.tensor_proto
+  return event_scanner.TensorHeader(
+      dims=[dim.size for dim in tensor_proto.tensor_shape.dim],
+      num_strings=len(tensor_proto.string_val),
+      strings=tensor_proto.string_val[:2])
+
+
+def _ImageShape(header):
+  """Returns the samples, width and height of the tensor of an image summary.
+
+  The tensor holds the width and height followed by the encoded images.
+  """
+  samples = max(header.num_strings - 2, 0)
+  try:
+    (width, height) = [int(s) for s in header.strings[:2]]
+  except ValueError:
+    (width, height) = (None, None)
+  return (samples, width, height)
+
+
+def _AudioShape(header):
+  """Returns the samples of the `[k, 2]` tensor of an audio summary."""
+  samples = header.dims[0] if header.dims else 0
+  return (samples, None, None)
+
+
+# Functions that turn the `event_scanner.TensorHeader` of an event of a tag of
+# the plugin into its number of samples, its width and its height.
+_SAMPLE_SHAPE_FNS = {
+    audio_metadata.PLUGIN_NAME: _AudioShape,
+    image_metadata.PLUGIN_NAME: _ImageShape,
+}
+
+
+def _NextSampleStats(stats, step, shape):
+  """Adds the shape of an event at a step to stats kept in `_sample_stats`."""
+  (samples, width, height) = shape
+  if stats is not None:
+    samples = max(samples, stats[0])
+  return (samples, step, width, height)
+
+
+def _ToScalarEvent(tensor_event):
+  """Converts a `TensorEvent` of a scalar to a `reservoir.ScalarEvent`."""
+  array = tensor_util.make_ndarray(tensor_event.tensor_proto)
+  if array.size == 1:
+    value = array.reshape(())[()]
+  else:
+    # Not a scalar, so this is malformed; keep the step but not the value.
+    value = np.float64('nan')
+  return reservoir.ScalarEvent(
+      wall_time=tensor_event.wall_time, step=tensor_event.step, value=value)
+
+
 def _GetPurgeMessage(most_recent_step, most_recent_wall_time, event_step,
                      event_wall_time, num_expired):
   """Return the string message associated with TensorBoard purges."""
@@ -572,12 +1125,13 @@ def _GeneratorFromPath(path):
   """Create an event generator for file or directory at given path string."""
   if not path:
     raise ValueError('path must be a valid string')
+  # Events are parsed by `_ProcessRecord`, only as far as needed.
   if io_wrapper.IsTensorFlowEventsFile(path):
-    return event_file_loader.EventFileLoader(path)
+    return event_file_loader.RawEventFileLoader(path)
   else:
     return directory_watcher.DirectoryWatcher(
         path,
-        event_file_loader.EventFileLoader,
+        event_file_loader.RawEventFileLoader,
         io_wrapper.IsTensorFlowEventsFile)
 
 
@@ -24,14 +24,19 @@ import six
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import tensorflow as tf
 
+from tensorboard import data_compat
+from tensorboard.backend.event_processing import memory_budget
 from tensorboard.backend.event_processing import plugin_event_accumulator as ea
 from tensorboard.compat.proto import config_pb2
 from tensorboard.compat.proto import event_pb2
 from tensorboard.compat.proto import graph_pb2
 from tensorboard.compat.proto import meta_graph_pb2
 from tensorboard.compat.proto import summary_pb2
+from tensorboard.compat.proto import tensor_pb2
 from tensorboard.plugins.audio import summary as audio_summary
+from tensorboard.plugins.image import metadata as image_metadata
 from tensorboard.plugins.image import summary as image_summary
+from tensorboard.plugins.scalar import metadata as scalar_metadata
 from tensorboard.plugins.scalar import summary as scalar_summary
 from tensorboard.util import tb_logging
 from tensorboard.util import tensor_util
@@ -49,14 +54,17 @@ class _EventGenerator(object):
   Has additional convenience methods for adding test events.
   """
 
-  def __init__(self, testcase, zero_out_timestamps=False):
+  def __init__(self, testcase, zero_out_timestamps=False, serialize=False):
     self._testcase = testcase
     self.items = []
     self.zero_out_timestamps = zero_out_timestamps
+    # Whether to yield serialized events, like an events file loader.
+    self.serialize = serialize
 
   def Load(self):
     while self.items:
-      yield self.items.pop(0)
+      event = self.items.pop(0)
+      yield event.SerializeToString() if self.serialize else event
 
   def AddScalarTensor(self, tag, wall_time=0, step=0, value=0):
     """Add a rank-0 tensor event.
@@ -380,6 +388,290 @@ class MockingEventAccumulatorTest(EventAccumulatorTest):
         ea.META_GRAPH: False,
     })
 
+  def _AddScalarPluginEvent(self, gen, tag, step, value):
+    gen.AddEvent(event_pb2.Event(
+        wall_time=step * 2.0,
+        step=step,
+        summary=summary_pb2.Summary(value=[summary_pb2.Summary.Value(
+            tag=tag,
+            metadata=scalar_metadata.create_summary_metadata(
+                display_name=tag, description=''),
+            tensor=tensor_util.make_tensor_proto(value))])))
+
+  def testScalarPluginTagsAreStoredInColumns(self):
+    gen = _EventGenerator(self)
+    acc = ea.EventAccumulator(gen, size_guidance={ea.TENSORS: 5})
+    for step in xrange(20):
+      self._AddScalarPluginEvent(gen, 'loss', step, np.float32(step / 4.0))
+      gen.AddScalarTensor('other', wall_time=step * 2.0, step=step, value=step)
+    acc.Reload()
+
+    series = acc.ScalarSeries('loss')
+    tensor_events = acc.Tensors('loss')
+    self.assertEqual(5, len(series.steps))
+    self.assertEqual(19, series.steps[-1])
+    self.assertAllEqual([e.step for e in tensor_events], series.steps)
+    self.assertAllEqual([e.wall_time for e in tensor_events], series.wall_times)
+    self.assertAllEqual(
+        [tensor_util.make_ndarray(e.tensor_proto) for e in tensor_events],
+        series.values)
+    # The original dtype and shape survive.
+    self.assertProtoEquals(
+        tensor_util.make_tensor_proto(np.float32(19 / 4.0)),
+        tensor_events[-1].tensor_proto)
+    # Sampling is the same as for any other tag.
+    self.assertAllEqual([e.step for e in acc.Tensors('other')], series.steps)
+    self.assertAllEqual(
+        [e.step for e in acc.Tensors('other')],
+        acc.ScalarSeries('other').steps)
+
+  def testScalarPluginTagsArePurged(self):
+    gen = _EventGenerator(self)
+    acc = ea.EventAccumulator(gen)
+    gen.AddEvent(
+        event_pb2.Event(wall_time=0, step=0, file_version='brain.Event:2'))
+    for step in (100, 200, 300):
+      self._AddScalarPluginEvent(gen, 'loss', step, 1.0)
+    slog = event_pb2.SessionLog(status=event_pb2.SessionLog.START)
+    gen.AddEvent(event_pb2.Event(wall_time=2, step=201, session_log=slog))
+    self._AddScalarPluginEvent(gen, 'loss', 201, 2.0)
+    acc.Reload()
+    series = acc.ScalarSeries('loss')
+    self.assertAllEqual([100, 200, 201], series.steps)
+    self.assertAllEqual([1.0, 1.0, 2.0], series.values)
+
+  def _AddMixedEvents(self, gen, file_version):
+    gen.AddEvent(event_pb2.Event(
+        wall_time=0, step=0, file_version=file_version))
+    for step in xrange(30):
+      self._AddScalarPluginEvent(gen, 'loss', step, step / 2.0)
+      gen.AddScalarTensor('tensor', wall_time=step, step=step, value=step)
+      gen.AddEvent(event_pb2.Event(
+          wall_time=step, step=step,
+          summary=summary_pb2.Summary(value=[
+              summary_pb2.Summary.Value(tag='legacy', simple_value=step),
+              summary_pb2.Summary.Value(
+                  tag='histogram',
+                  histo=summary_pb2.HistogramProto(
+                      min=0, max=step, num=1, sum=step, sum_squares=step,
+                      bucket_limit=[step], bucket=[1])),
+          ])))
+    # A restart that orphans some steps.
+    gen.AddEvent(event_pb2.Event(
+        wall_time=40, step=20,
+        session_log=event_pb2.SessionLog(status=event_pb2.SessionLog.START)))
+    for step in xrange(20, 25):
+      self._AddScalarPluginEvent(gen, 'loss', step, -1.0)
+      gen.AddScalarTensor('tensor', wall_time=step, step=step, value=-step)
+
+  def testSerializedEventsAreProcessedLikeParsedEvents(self):
+    for file_version in ('brain.Event:1', 'brain.Event:2'):
+      accumulators = []
+      for serialize in (False, True):
+        gen = _EventGenerator(self, serialize=serialize)
+        acc = ea.EventAccumulator(gen, size_guidance={ea.TENSORS: 7})
+        self._AddMixedEvents(gen, file_version)
+        acc.Reload()
+        accumulators.append(acc)
+      (parsed, serialized) = accumulators
+      self.assertEqual(parsed.Tags(), serialized.Tags())
+      self.assertEqual(parsed.summary_metadata, serialized.summary_metadata)
+      self.assertEqual(
+          parsed.PluginTagToContent(scalar_metadata.PLUGIN_NAME),
+          serialized.PluginTagToContent(scalar_metadata.PLUGIN_NAME))
+      self.assertEqual(parsed.most_recent_step, serialized.most_recent_step)
+      for tag in parsed.Tags()[ea.TENSORS]:
+        self.assertEqual(parsed.Tensors(tag), serialized.Tensors(tag))
+
+  def testSerializedValuesAreOnlyDecodedIfKept(self):
+    migrated = []
+    def migrate_value(value):
+      migrated.append(value.tag)
+      return self._real_migrate_value(value)
+    self._real_migrate_value = data_compat.migrate_value
+    self.stubs.Set(data_compat, 'migrate_value', migrate_value)
+    gen = _EventGenerator(self, serialize=True)
+    acc = ea.EventAccumulator(gen, size_guidance={ea.TENSORS: 10})
+    for step in xrange(1000):
+      gen.AddEvent(event_pb2.Event(
+          wall_time=step, step=step,
+          summary=summary_pb2.Summary(value=[
+              summary_pb2.Summary.Value(tag='legacy', simple_value=step)])))
+    acc.Reload()
+    self.assertLess(len(migrated), 100)
+    tensor_events = acc.Tensors('legacy')
+    self.assertEqual(10, len(tensor_events))
+    self.assertEqual(999, tensor_events[-1].step)
+    self.assertEqual(
+        999.0, tensor_util.make_ndarray(tensor_events[-1].tensor_proto))
+
+  def _AddImageEvent(self, gen, tag, step, samples, width=4, height=3):
+    strings = [str(width).encode(), str(height).encode()] + [b'x'] * samples
+    value = summary_pb2.Summary.Value(
+        tag=tag, tensor=tensor_util.make_tensor_proto(strings))
+    if step == 0:
+      value.metadata.CopyFrom(image_metadata.create_summary_metadata(
+          display_name=tag, description=''))
+    gen.AddEvent(event_pb2.Event(
+        wall_time=step, step=step, summary=summary_pb2.Summary(value=[value])))
+
+  def testSampleStatsAreKeptWithoutDecodingValues(self):
+    migrated = []
+    def migrate_value(value):
+      migrated.append(value.tag)
+      return self._real_migrate_value(value)
+    self._real_migrate_value = data_compat.migrate_value
+    self.stubs.Set(data_compat, 'migrate_value', migrate_value)
+    gen = _EventGenerator(self, serialize=True)
+    acc = ea.EventAccumulator(gen, size_guidance={ea.TENSORS: 10})
+    for step in xrange(100):
+      self._AddImageEvent(gen, 'images', step, 5 if step == 40 else 2)
+    self._AddImageEvent(gen, 'images', 100, 1, width=8, height=6)
+    acc.Reload()
+    self.assertLess(len(migrated), 30)
+    self.assertEqual(
+        ea.SampleStats(num_events=10, max_samples=5, last_step=100, width=8,
+                       height=6),
+        acc.SampleStats('images'))
+    with self.assertRaises(KeyError):
+      acc.SampleStats('missing')
+
+  def testSampleStatsOfLegacyImagesAreKeptWithoutDecodingValues(self):
+    migrated = []
+    def migrate_value(value):
+      migrated.append(value.tag)
+      return self._real_migrate_value(value)
+    self._real_migrate_value = data_compat.migrate_value
+    self.stubs.Set(data_compat, 'migrate_value', migrate_value)
+    gen = _EventGenerator(self, serialize=True)
+    acc = ea.EventAccumulator(gen, size_guidance={ea.TENSORS: 10})
+    for step in xrange(1000):
+      image = summary_pb2.Summary.Image(
+          height=3, width=4, colorspace=3, encoded_image_string=b'x')
+      if step == 999:
+        (image.width, image.height) = (8, 6)
+      gen.AddEvent(event_pb2.Event(
+          wall_time=step, step=step,
+          summary=summary_pb2.Summary(value=[
+              summary_pb2.Summary.Value(tag='images', image=image)])))
+    acc.Reload()
+    self.assertLess(len(migrated), 100)
+    self.assertEqual(
+        ea.SampleStats(num_events=10, max_samples=1, last_step=999, width=8,
+                       height=6),
+        acc.SampleStats('images'))
+    tensor_events = acc.Tensors('images')
+    self.assertEqual(999, tensor_events[-1].step)
+    self.assertEqual([b'8', b'6', b'x'],
+                     tensor_events[-1].tensor_proto.string_val)
+
+  def testSampleStatsArePurged(self):
+    gen = _EventGenerator(self)
+    acc = ea.EventAccumulator(gen)
+    for step in xrange(10):
+      self._AddImageEvent(gen, 'images', step, 5 if step == 8 else 2)
+    acc.Reload()
+    self.assertEqual(5, acc.SampleStats('images').max_samples)
+    # An out-of-order step discards the later steps.
+    self._AddImageEvent(gen, 'images', 5, 3)
+    acc.Reload()
+    self.assertEqual(
+        ea.SampleStats(num_events=6, max_samples=3, last_step=5, width=4,
+                       height=3),
+        acc.SampleStats('images'))
+
+  def testGenerationChangesWithData(self):
+    gen = _EventGenerator(self)
+    acc = ea.EventAccumulator(gen)
+    self.assertEqual(0, acc.Generation('loss'))
+    self._AddScalarPluginEvent(gen, 'loss', 1, 1.0)
+    gen.AddScalarTensor('other', wall_time=2.0, step=1, value=1.0)
+    acc.Reload()
+    generation = acc.Generation('loss')
+    other_generation = acc.Generation('other')
+    self.assertNotEqual(0, generation)
+    acc.Reload()
+    self.assertEqual(generation, acc.Generation('loss'))
+    self._AddScalarPluginEvent(gen, 'loss', 2, 2.0)
+    acc.Reload()
+    self.assertNotEqual(generation, acc.Generation('loss'))
+    self.assertEqual(other_generation, acc.Generation('other'))
+
+  def testMemoryBudgetShrinksReservoirs(self):
+    budget = memory_budget.MemoryBudget(10000)
+    gen = _EventGenerator(self, serialize=True)
+    acc = ea.EventAccumulator(
+        gen, size_guidance={ea.TENSORS: 100}, memory_budget=budget)
+    for step in xrange(100):
+      gen.AddScalarTensor('small', wall_time=step, step=step, value=step)
+      gen.AddEvent(event_pb2.Event(
+          wall_time=step, step=step,
+          summary=summary_pb2.Summary(value=[summary_pb2.Summary.Value(
+              tag='large',
+              tensor=tensor_util.make_tensor_proto(b'x' * 500))])))
+    acc.Reload()
+    retained = acc.RetainedBytes()
+    self.assertLessEqual(sum(retained.values()), 10000)
+    self.assertEqual(budget.NumBytes(), sum(retained.values()))
+    self.assertEqual(100, len(acc.Tensors('small')))
+    large = acc.Tensors('large')
+    self.assertLess(len(large), 20)
+    self.assertEqual(99, large[-1].step)
+
+  def testGenerationChangesWhenShrunk(self):
+    budget = memory_budget.MemoryBudget(10**6)
+    gen = _EventGenerator(self)
+    acc = ea.EventAccumulator(gen, memory_budget=budget)
+    for step in xrange(10):
+      gen.AddScalarTensor('tensor', wall_time=step, step=step, value=step)
+    acc.Reload()
+    generation = acc.Generation('tensor')
+    self.assertEqual(generation, acc.Generation('tensor'))
+    acc.tensors_by_tag['tensor'].Shrink()
+    self.assertNotEqual(generation, acc.Generation('tensor'))
+
+  def testLoadStatistics(self):
+    gen = _EventGenerator(self, serialize=True)
+    acc = ea.EventAccumulator(gen)
+    gen.AddScalarTensor('tensor', wall_time=1, step=1, value=1)
+    records = list(gen.Load()) + [b'\x0a\x05ab']  # Truncated.
+    gen.Load = lambda: iter(records)
+    gen.AddScalarTensor('tensor', wall_time=2, step=2, value=2)
+    records.append(gen.items.pop().SerializeToString())
+    acc.Reload()
+    self.assertEqual(3, acc.records_read)
+    self.assertEqual(sum(len(record) for record in records), acc.bytes_read)
+    self.assertEqual(1, acc.parse_errors)
+    self.assertIsNotNone(acc.reload_secs)
+    self.assertEqual([1, 2], [e.step for e in acc.Tensors('tensor')])
+    self.assertEqual({'': (2, acc.RetainedBytes()['tensor'])},
+                     acc.ReservoirStats())
+
+  def testMalformedDeferredValuesAreSkipped(self):
+    gen = _EventGenerator(self, serialize=True)
+    acc = ea.EventAccumulator(gen)
+    gen.AddScalarTensor('tensor', wall_time=1, step=1, value=1)
+    gen.AddScalarTensor('tensor', wall_time=2, step=2, value=2)
+    records = list(gen.Load())
+    # A value that scans fine, but whose tensor claims a string of 8 bytes
+    # when only 6 follow.
+    event = event_pb2.Event(
+        wall_time=3, step=3,
+        summary=summary_pb2.Summary(value=[summary_pb2.Summary.Value(
+            tag='tensor',
+            tensor=tensor_pb2.TensorProto(string_val=[b'abcdef']))]))
+    records.append(event.SerializeToString().replace(
+        b'\x42\x06abcdef', b'\x42\x08abcdef'))
+    gen.Load = lambda: iter(records)
+    acc.Reload()
+    self.assertEqual(0, acc.parse_errors)
+    # The malformed value is only decoded when it is read.
+    self.assertEqual([1, 2], [e.step for e in acc.Tensors('tensor')])
+    self.assertEqual(1, acc.parse_errors)
+    self.assertEqual(
+        sum(e.tensor_proto.ByteSize() for e in acc.Tensors('tensor')),
+        acc.RetainedBytes()['tensor'])
+
   def testNewStyleAudioSummary(self):
     """Verify processing of tensorboard.plugins.audio.summary."""
     event_sink = _EventGenerator(self, zero_out_timestamps=True)
@@ -413,6 +705,10 @@ class MockingEventAccumulatorTest(EventAccumulatorTest):
         ea.GRAPH: True,
         ea.META_GRAPH: False,
     })
+    self.assertEqual(
+        ea.SampleStats(num_events=10, max_samples=3, last_step=9, width=None,
+                       height=None),
+        accumulator.SampleStats(u'3/three/audio_summary'))
 
   def testNewStyleImageSummary(self):
     """Verify processing of tensorboard.plugins.image.summary."""
@@ -451,6 +747,10 @@ class MockingEventAccumulatorTest(EventAccumulatorTest):
         ea.GRAPH: True,
         ea.META_GRAPH: False,
     })
+    self.assertEqual(
+        ea.SampleStats(num_events=10, max_samples=3, last_step=9, width=4,
+                       height=4),
+        accumulator.SampleStats(u'3/images/image_summary'))
 
   def testTFSummaryTensor(self):
     """Verify processing of tf.summary.tensor."""
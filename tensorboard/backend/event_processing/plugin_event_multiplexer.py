@@ -20,18 +20,46 @@ from __future__ import print_function
 
 import os
 import threading
+import time
 
 import six
 from six.moves import queue, xrange  # pylint: disable=redefined-builtin
 
+from tensorboard.backend import metrics
+from tensorboard.backend.event_processing import change_notifier
 from tensorboard.backend.event_processing import directory_watcher
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import ingest_cache
 from tensorboard.backend.event_processing import io_wrapper
+from tensorboard.backend.event_processing import memory_budget
+from tensorboard.backend.event_processing import reload_process_pool
+from tensorboard.backend.event_processing import run_tag_index
 from tensorboard.util import tb_logging
 
 
 logger = tb_logging.get_logger()
 
+# How long to wait after a run changes before reloading it.
+_CHANGE_DEBOUNCE_SECS = 0.25
+
+_RECORDS_READ = metrics.REGISTRY.Counter(
+    'tensorboard_event_records_read_total',
+    'Number of event records read from event files.')
+_BYTES_READ = metrics.REGISTRY.Counter(
+    'tensorboard_event_bytes_read_total',
+    'Number of bytes of event records read from event files.')
+_PARSE_ERRORS = metrics.REGISTRY.Counter(
+    'tensorboard_event_parse_errors_total',
+    'Number of event records that could not be parsed and were skipped.')
+_EVENTS_PER_SECOND = metrics.REGISTRY.Gauge(
+    'tensorboard_reload_events_per_second',
+    'Event records read per second during the latest reload of all runs.')
+_RUN_RELOAD_SECONDS = metrics.REGISTRY.Gauge(
+    'tensorboard_run_reload_duration_seconds',
+    'How long the latest reload of each run took.',
+    labels=('run',))
+
+
 class EventMultiplexer(object):
   """An `EventMultiplexer` manages access to multiple `EventAccumulator`s.
 
@@ -75,7 +103,13 @@ class EventMultiplexer(object):
                size_guidance=None,
                tensor_size_guidance=None,
                purge_orphaned_data=True,
-               max_reload_threads=None):
+               max_reload_threads=None,
+               max_reload_processes=None,
+               ingest_cache_dir=None,
+               logdir_full_rescan_interval_secs=None,
+               watch_for_changes=False,
+               max_memory_bytes=None,
+               memory_eviction_policy=memory_budget.LARGEST):
     """Constructor for the `EventMultiplexer`.
 
     Args:
@@ -93,10 +127,31 @@ class EventMultiplexer(object):
       max_reload_threads: The max number of threads that TensorBoard can use
         to reload runs. Each thread reloads one run at a time. If not provided,
         reloads runs serially (one after another).
+      max_reload_processes: If greater than 1, the number of worker processes
+        used to read and parse event files, bypassing the GIL. This takes
+        precedence over `max_reload_threads`. The processes are started on
+        the first call to `Reload`.
+      ingest_cache_dir: If provided, a local directory in which to persist
+        the loaded data of each run, so that it is restored instead of
+        re-read after a restart. Not supported with `max_reload_processes`.
+      logdir_full_rescan_interval_secs: If positive, `AddRunsFromDirectory`
+        only lists directories whose mtime has changed since its last call
+        for the same path, and lists everything again at this interval. If
+        not provided, every call lists the whole directory tree.
+      watch_for_changes: If true and supported by the system, `Reload` only
+        reloads runs whose local directories have changed since the previous
+        call, as reported by inotify. Runs on cloud file systems, or whose
+        paths cannot be watched, are reloaded every time.
+      max_memory_bytes: If positive, the approximate number of bytes of
+        tensor data that all runs together may keep in memory. Reservoirs are
+        shrunk below their size guidance to stay within it.
+      memory_eviction_policy: Which reservoirs to shrink first when over
+        `max_memory_bytes`; one of `memory_budget.POLICIES`.
     """
     logger.info('Event Multiplexer initializing.')
     self._accumulators_mutex = threading.Lock()
     self._accumulators = {}
+    self._index = run_tag_index.RunTagIndex()
     self._paths = {}
     self._reload_called = False
     self._size_guidance = (size_guidance or
@@ -104,6 +159,29 @@ class EventMultiplexer(object):
     self._tensor_size_guidance = tensor_size_guidance
     self.purge_orphaned_data = purge_orphaned_data
     self._max_reload_threads = max_reload_threads or 1
+    self._max_reload_processes = max_reload_processes or 1
+    self._reload_process_pool = None
+    self._ingest_cache = None
+    self._logdir_full_rescan_interval_secs = logdir_full_rescan_interval_secs
+    self._logdir_indexes = {}
+    self._change_notifier = None
+    self._runs_to_reload = set()
+    self._memory_budget = None
+    if max_memory_bytes:
+      self._memory_budget = memory_budget.MemoryBudget(
+          max_memory_bytes, memory_eviction_policy)
+    if watch_for_changes:
+      if change_notifier.IsSupported():
+        self._change_notifier = change_notifier.InotifyChangeNotifier()
+      else:
+        logger.warn('Watching for changes is not supported on this system; '
+                    'polling every run on each reload instead.')
+    if ingest_cache_dir:
+      if self._max_reload_processes > 1:
+        logger.warn('The ingest cache is not supported when reloading in '
+                    'multiple processes; not using %s', ingest_cache_dir)
+      else:
+        self._ingest_cache = ingest_cache.IngestCache(ingest_cache_dir)
     if run_path_map is not None:
       logger.info('Event Multplexer doing initialization load for %s',
                       run_path_map)
@@ -131,25 +209,50 @@ class EventMultiplexer(object):
       The `EventMultiplexer`.
     """
     name = name or path
-    accumulator = None
     with self._accumulators_mutex:
-      if name not in self._accumulators or self._paths[name] != path:
-        if name in self._paths and self._paths[name] != path:
-          # TODO(@dandelionmane) - Make it impossible to overwrite an old path
-          # with a new path (just give the new path a distinct name)
-          logger.warn('Conflict for name %s: old path %s, new path %s',
-                             name, self._paths[name], path)
-        logger.info('Constructing EventAccumulator for %s', path)
-        accumulator = event_accumulator.EventAccumulator(
-            path,
-            size_guidance=self._size_guidance,
-            tensor_size_guidance=self._tensor_size_guidance,
-            purge_orphaned_data=self.purge_orphaned_data)
-        self._accumulators[name] = accumulator
-        self._paths[name] = path
-    if accumulator:
-      if self._reload_called:
+      if name in self._accumulators and self._paths[name] == path:
+        return self
+    logger.info('Constructing EventAccumulator for %s', path)
+    accumulator = event_accumulator.EventAccumulator(
+        path,
+        size_guidance=self._size_guidance,
+        tensor_size_guidance=self._tensor_size_guidance,
+        purge_orphaned_data=self.purge_orphaned_data,
+        memory_budget=self._memory_budget)
+    if self._ingest_cache:
+      # Unpickling a whole run takes a while, so it must not hold up the
+      # requests that need the mutex.
+      self._ingest_cache.Restore(accumulator)
+    with self._accumulators_mutex:
+      if name in self._accumulators and self._paths[name] == path:
+        # Another thread added the same run in the meantime.
+        return self
+      if name in self._paths:
+        # TODO(@dandelionmane) - Make it impossible to overwrite an old path
+        # with a new path (just give the new path a distinct name)
+        logger.warn('Conflict for name %s: old path %s, new path %s',
+                           name, self._paths[name], path)
+      # Only index the run's tags once it is sure to be added, since adding
+      # it to the index replaces any previous run of the same name.
+      accumulator.SetTagListener(self._index.AddRun(name))
+      if self._change_notifier:
+        # Watch before loading anything, so that no write goes unnoticed.
+        if not io_wrapper.IsCloudPath(path):
+          self._change_notifier.Watch(name, path)
+        self._runs_to_reload.add(name)
+      self._accumulators[name] = accumulator
+      self._paths[name] = path
+    if self._reload_called:
+      stats_before = _LoadStats(accumulator)
+      pool = self._GetReloadProcessPool()
+      if pool:
+        names_to_delete = pool.Reload([(name, accumulator)], complete=False)
+        self._DeleteAccumulators(names_to_delete)
+      else:
         accumulator.Reload()
+        if self._ingest_cache:
+          self._ingest_cache.MaybeSave(accumulator)
+      self._RecordMetrics([(name, accumulator)], [stats_before])
     return self
 
   def AddRunsFromDirectory(self, path, name=None):
@@ -180,7 +283,14 @@ class EventMultiplexer(object):
       The `EventMultiplexer`.
     """
     logger.info('Starting AddRunsFromDirectory: %s', path)
-    for subdir in io_wrapper.GetLogdirSubdirectories(path):
+    if self._logdir_full_rescan_interval_secs:
+      if path not in self._logdir_indexes:
+        self._logdir_indexes[path] = io_wrapper.LogdirSubdirectoryIndex(
+            path, self._logdir_full_rescan_interval_secs)
+      subdirs = self._logdir_indexes[path].GetLogdirSubdirectories()
+    else:
+      subdirs = io_wrapper.GetLogdirSubdirectories(path)
+    for subdir in subdirs:
       logger.info('Adding run from directory %s', subdir)
       rpath = os.path.relpath(subdir, path)
       subname = os.path.join(name, rpath) if name else rpath
@@ -188,14 +298,47 @@ class EventMultiplexer(object):
     logger.info('Done with AddRunsFromDirectory: %s', path)
     return self
 
-  def Reload(self):
-    """Call `Reload` on every `EventAccumulator`."""
+  def Reload(self, changed_only=False):
+    """Call `Reload` on every `EventAccumulator`.
+
+    Args:
+      changed_only: If true and changes are watched for, only reloads the runs
+        that were added or have changed since the previous reload, without
+        polling the runs that are not watched. Otherwise, every run that may
+        have changed is reloaded.
+    """
     logger.info('Beginning EventMultiplexer.Reload()')
     self._reload_called = True
     # Build a list so we're safe even if the list of accumulators is modified
     # even while we're reloading.
     with self._accumulators_mutex:
       items = list(self._accumulators.items())
+      runs_to_reload = self._runs_to_reload
+      self._runs_to_reload = set()
+
+    if self._change_notifier:
+      runs_to_reload.update(self._change_notifier.PopChanges())
+      num_runs = len(items)
+      # Runs that are not watched, such as those on cloud file systems, are
+      # polled unless only changed runs are to be reloaded.
+      items = [(name, accumulator) for (name, accumulator) in items
+               if name in runs_to_reload or
+               not (changed_only or self._change_notifier.IsWatched(name))]
+      logger.info('Reloading %d of %d runs', len(items), num_runs)
+
+    start = time.time()
+    stats_before = [_LoadStats(accumulator) for (_, accumulator) in items]
+    pool = self._GetReloadProcessPool()
+    if pool:
+      logger.info('Reloading runs in %d processes', self._max_reload_processes)
+      names_to_delete = pool.Reload(
+          items, complete=self._change_notifier is None)
+      self._DeleteAccumulators(names_to_delete)
+      self._EnforceMemoryBudget()
+      self._RecordMetrics(items, stats_before, time.time() - start)
+      logger.info('Finished with EventMultiplexer.Reload()')
+      return self
+
     items_queue = queue.Queue()
     for item in items:
       items_queue.put(item)
@@ -216,6 +359,8 @@ class EventMultiplexer(object):
 
         try:
           accumulator.Reload()
+          if self._ingest_cache:
+            self._ingest_cache.MaybeSave(accumulator)
         except (OSError, IOError) as e:
           logger.error('Unable to reload accumulator %r: %s', name, e)
         except directory_watcher.DirectoryDeletedError:
@@ -239,13 +384,91 @@ class EventMultiplexer(object):
           'thread.')
       Worker()
 
-    with self._accumulators_mutex:
-      for name in names_to_delete:
-        logger.warn('Deleting accumulator %r', name)
-        del self._accumulators[name]
+    self._DeleteAccumulators(names_to_delete)
+    self._EnforceMemoryBudget()
+    self._RecordMetrics(items, stats_before, time.time() - start)
     logger.info('Finished with EventMultiplexer.Reload()')
     return self
 
+  def _RecordMetrics(self, items, stats_before, duration=None):
+    """Exports what the reload of some runs read to `metrics.REGISTRY`.
+
+    Args:
+      items: The `(name, accumulator)` pairs that were reloaded.
+      stats_before: The `_LoadStats` of each accumulator before the reload.
+      duration: How long the reload took, if it was a reload of all runs.
+    """
+    records = 0
+    for ((name, accumulator), before) in zip(items, stats_before):
+      # Totals start over if a reload process restarts.
+      (records_read, bytes_read, parse_errors) = [
+          after - previous if after >= previous else after
+          for (after, previous) in zip(_LoadStats(accumulator), before)]
+      records += records_read
+      _RECORDS_READ.Inc(records_read)
+      _BYTES_READ.Inc(bytes_read)
+      _PARSE_ERRORS.Inc(parse_errors)
+      reload_secs = getattr(accumulator, 'reload_secs', None)
+      if reload_secs is not None and name in self._accumulators:
+        _RUN_RELOAD_SECONDS.Set(reload_secs, labels=(name,))
+    if duration:
+      _EVENTS_PER_SECOND.Set(records / duration)
+
+  def _EnforceMemoryBudget(self):
+    """Makes the loaded data fit the budget exactly, not just eventually."""
+    if self._memory_budget is not None:
+      self._memory_budget.Enforce()
+
+  def _DeleteAccumulators(self, names):
+    with self._accumulators_mutex:
+      for name in names:
+        logger.warn('Deleting accumulator %r', name)
+        accumulator = self._accumulators.pop(name, None)
+        self._index.RemoveRun(name)
+        _RUN_RELOAD_SECONDS.Remove(labels=(name,))
+        if accumulator and self._ingest_cache:
+          self._ingest_cache.Forget(accumulator.path)
+        if self._change_notifier:
+          self._change_notifier.Unwatch(name)
+
+  def WaitForChanges(self, timeout):
+    """Waits until a run may need reloading, or for `timeout` seconds.
+
+    Without `watch_for_changes`, this always waits for the full timeout.
+
+    Args:
+      timeout: The maximum number of seconds to wait.
+
+    Returns:
+      Whether a watched run has changed.
+    """
+    if self._change_notifier:
+      if not self._change_notifier.WaitForChanges(timeout):
+        return False
+      # Writers tend to touch several files at once; let them finish.
+      time.sleep(min(timeout, _CHANGE_DEBOUNCE_SECS))
+      return True
+    time.sleep(timeout)
+    return False
+
+  def _GetReloadProcessPool(self):
+    """Returns the `ReloadProcessPool` to reload with, or None."""
+    if self._max_reload_processes <= 1:
+      return None
+    if self._reload_process_pool is None:
+      if not reload_process_pool.CanStartProcesses():
+        logger.warn(
+            'Cannot start reload processes from a daemonic process; '
+            'reloading with threads instead.')
+        self._max_reload_processes = 1
+        return None
+      self._reload_process_pool = reload_process_pool.ReloadProcessPool(
+          self._max_reload_processes,
+          size_guidance=self._size_guidance,
+          tensor_size_guidance=self._tensor_size_guidance,
+          purge_orphaned_data=self.purge_orphaned_data)
+    return self._reload_process_pool
+
   def PluginAssets(self, plugin_name):
     """Get index of runs and assets for a given plugin.
 
@@ -399,6 +622,86 @@ class EventMultiplexer(object):
     accumulator = self.GetAccumulator(run)
     return accumulator.Tensors(tag)
 
+  def Generation(self, run, tag):
+    """Returns a number that changes whenever the data of a tag changes.
+
+    See `EventAccumulator.Generation`.
+
+    Args:
+      run: A string name of a run.
+      tag: A string name of a tag.
+
+    Raises:
+      KeyError: If the run is not found.
+
+    Returns:
+      A positive integer, or 0 if the tag has no data for the run.
+    """
+    accumulator = self.GetAccumulator(run)
+    return accumulator.Generation(tag)
+
+  def ReservoirStats(self):
+    """Returns the number of items and bytes of tensor data per plugin.
+
+    Returns:
+      A dict mapping plugin names to `(num_items, num_bytes)` pairs, summed
+      over all runs; see `EventAccumulator.ReservoirStats`.
+    """
+    with self._accumulators_mutex:
+      accumulators = list(self._accumulators.values())
+    result = {}
+    for accumulator in accumulators:
+      for (plugin_name, (num_items, num_bytes)) in six.iteritems(
+          accumulator.ReservoirStats()):
+        (total_items, total_bytes) = result.get(plugin_name, (0, 0))
+        result[plugin_name] = (total_items + num_items, total_bytes + num_bytes)
+    return result
+
+  def RetainedBytes(self):
+    """Returns the approximate number of bytes of tensor data per run and tag.
+
+    Returns:
+      A dict `{run: {tag: num_bytes}}`; see `EventAccumulator.RetainedBytes`.
+    """
+    with self._accumulators_mutex:
+      items = list(six.iteritems(self._accumulators))
+    return {run: accumulator.RetainedBytes() for (run, accumulator) in items}
+
+  def ScalarSeries(self, run, tag):
+    """Retrieve the scalar values associated with a run and tag, in columns.
+
+    Args:
+      run: A string name of the run for which values are retrieved.
+      tag: A string name of the tag for which values are retrieved.
+
+    Raises:
+      KeyError: If the run is not found, or the tag is not available for
+        the given run.
+
+    Returns:
+      An `event_accumulator.ScalarSeries` of numpy arrays of wall times,
+      steps and values.
+    """
+    accumulator = self.GetAccumulator(run)
+    return accumulator.ScalarSeries(tag)
+
+  def SampleStats(self, run, tag):
+    """Summarizes the events of a tag of images or audio without reading them.
+
+    Args:
+      run: A string name of the run.
+      tag: A string name of a tag of the images or the audio plugin.
+
+    Raises:
+      KeyError: If the run is not found, or the tag is not available for
+        the given run.
+
+    Returns:
+      An `event_accumulator.SampleStats`.
+    """
+    accumulator = self.GetAccumulator(run)
+    return accumulator.SampleStats(tag)
+
   def PluginRunToTagToContent(self, plugin_name):
     """Returns a 2-layer dictionary of the form {run: {tag: content}}.
 
@@ -409,18 +712,10 @@ class EventMultiplexer(object):
       plugin_name: The name of the plugin for which to fetch content.
 
     Returns:
-      A dictionary of the form {run: {tag: content}}.
+      A dictionary of the form {run: {tag: content}}, which is shared with
+      other callers and must not be modified.
     """
-    mapping = {}
-    for run in self.Runs():
-      try:
-        tag_to_content = self.GetAccumulator(run).PluginTagToContent(
-            plugin_name)
-      except KeyError:
-        # This run lacks content for the plugin. Try the next run.
-        continue
-      mapping[run] = tag_to_content
-    return mapping
+    return self._index.Snapshot().PluginRunToTagToContent(plugin_name)
 
   def SummaryMetadata(self, run, tag):
     """Return the summary metadata for the given tag on the given run.
@@ -438,8 +733,16 @@ class EventMultiplexer(object):
     Returns:
       A `SummaryMetadata` protobuf.
     """
-    accumulator = self.GetAccumulator(run)
-    return accumulator.SummaryMetadata(tag)
+    return self._index.Snapshot().SummaryMetadata(run, tag)
+
+  def IndexSnapshot(self):
+    """Returns a `run_tag_index.IndexSnapshot` of the runs and their tags.
+
+    Taking a snapshot is cheap, and gives a consistent view across several
+    lookups. Its `version` only changes when runs or tags are added or
+    removed, so that plugins can reuse anything derived from it until then.
+    """
+    return self._index.Snapshot()
 
   def Runs(self):
     """Return all the run names in the `EventMultiplexer`.
@@ -473,3 +776,10 @@ class EventMultiplexer(object):
     """
     with self._accumulators_mutex:
       return self._accumulators[run]
+
+
+def _LoadStats(accumulator):
+  """Returns the totals an accumulator keeps of what it read."""
+  return (getattr(accumulator, 'records_read', 0),
+          getattr(accumulator, 'bytes_read', 0),
+          getattr(accumulator, 'parse_errors', 0))
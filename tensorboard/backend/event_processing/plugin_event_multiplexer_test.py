@@ -25,6 +25,9 @@ import tensorflow as tf
 
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.util import tensor_util
+from tensorboard.util import test_util
 
 
 def _AddEvents(path):
@@ -44,20 +47,30 @@ def _CreateCleanDirectory(path):
 
 class _FakeAccumulator(object):
 
-  def __init__(self, path):
+  def __init__(self, path, tag_listener=None):
     """Constructs a fake accumulator with some fake events.
 
     Args:
       path: The path for the run that this accumulator is for.
+      tag_listener: As for `EventAccumulator`.
     """
     self._path = path
     self.reload_called = False
     self._plugin_to_tag_to_content = {
         'baz_plugin': {
-            'foo': 'foo_content',
-            'bar': 'bar_content',
+            'foo': b'foo_content',
+            'bar': b'bar_content',
         }
     }
+    if tag_listener is not None:
+      self.SetTagListener(tag_listener)
+
+  def SetTagListener(self, tag_listener):
+    for plugin_name in self._plugin_to_tag_to_content:
+      for (tag, content) in self.PluginTagToContent(plugin_name).items():
+        tag_listener(tag, summary_pb2.SummaryMetadata(
+            plugin_data=summary_pb2.SummaryMetadata.PluginData(
+                plugin_name=plugin_name, content=content)))
 
   def Tags(self):
     return {}
@@ -89,9 +102,34 @@ class _FakeAccumulator(object):
 def _GetFakeAccumulator(path,
                         size_guidance=None,
                         tensor_size_guidance=None,
-                        purge_orphaned_data=None):
+                        purge_orphaned_data=None,
+                        memory_budget=None,
+                        tag_listener=None):
   del size_guidance, tensor_size_guidance, purge_orphaned_data  # Unused.
-  return _FakeAccumulator(path)
+  del memory_budget  # Unused.
+  return _FakeAccumulator(path, tag_listener)
+
+
+class _FakeChangeNotifier(object):
+  """Reports the runs in `changed` as changed; watches all but `unwatched`."""
+
+  def __init__(self, unwatched=()):
+    self.changed = set()
+    self._unwatched = set(unwatched)
+
+  def Watch(self, key, path):
+    del path  # Unused.
+    return key not in self._unwatched
+
+  def Unwatch(self, key):
+    self._unwatched.add(key)
+
+  def IsWatched(self, key):
+    return key not in self._unwatched
+
+  def PopChanges(self):
+    (changed, self.changed) = (self.changed, set())
+    return changed
 
 
 class EventMultiplexerTest(tf.test.TestCase):
@@ -126,20 +164,62 @@ class EventMultiplexerTest(tf.test.TestCase):
     self.assertTrue(x.GetAccumulator('run1').reload_called)
     self.assertTrue(x.GetAccumulator('run2').reload_called)
 
+  def testReloadChangedOnly(self):
+    x = event_multiplexer.EventMultiplexer()
+    notifier = _FakeChangeNotifier(unwatched=['unwatched'])
+    x._change_notifier = notifier
+    x.AddRun('path1', 'watched')
+    x.AddRun('path2', 'unwatched')
+    def reloaded():
+      names = [name for name in ('watched', 'unwatched')
+               if x.GetAccumulator(name).reload_called]
+      for name in ('watched', 'unwatched'):
+        x.GetAccumulator(name).reload_called = False
+      return names
+
+    x.Reload(changed_only=True)
+    # Runs that were just added count as changed.
+    self.assertEqual(['watched', 'unwatched'], reloaded())
+    x.Reload(changed_only=True)
+    self.assertEqual([], reloaded())
+    notifier.changed.add('watched')
+    x.Reload(changed_only=True)
+    self.assertEqual(['watched'], reloaded())
+    x.Reload()
+    self.assertEqual(['unwatched'], reloaded())
+
   def testPluginRunToTagToContent(self):
     """Tests the method that produces the run to tag to content mapping."""
     x = event_multiplexer.EventMultiplexer({'run1': 'path1', 'run2': 'path2'})
     self.assertDictEqual({
         'run1': {
-            'path1_foo': 'foo_content',
-            'path1_bar': 'bar_content',
+            'path1_foo': b'foo_content',
+            'path1_bar': b'bar_content',
         },
         'run2': {
-            'path2_foo': 'foo_content',
-            'path2_bar': 'bar_content',
+            'path2_foo': b'foo_content',
+            'path2_bar': b'bar_content',
         }
     }, x.PluginRunToTagToContent('baz_plugin'))
 
+  def testIndexSnapshot(self):
+    x = event_multiplexer.EventMultiplexer({'run1': 'path1'})
+    snapshot = x.IndexSnapshot()
+    self.assertIs(snapshot, x.IndexSnapshot())
+    self.assertEqual(['run1'], snapshot.Runs())
+    self.assertEqual(
+        'baz_plugin',
+        x.SummaryMetadata('run1', 'path1_foo').plugin_data.plugin_name)
+    x.AddRun('path2', 'run2')
+    new_snapshot = x.IndexSnapshot()
+    self.assertGreater(new_snapshot.version, snapshot.version)
+    self.assertItemsEqual(['run1', 'run2'], new_snapshot.Runs())
+    self.assertEqual(['run1'], snapshot.Runs())
+    x._DeleteAccumulators(['run1'])  # pylint: disable=protected-access
+    self.assertEqual(['run2'], list(x.PluginRunToTagToContent('baz_plugin')))
+    with self.assertRaises(KeyError):
+      x.SummaryMetadata('run1', 'path1_foo')
+
   def testExceptions(self):
     """KeyError should be raised when accessing non-existing keys."""
     x = event_multiplexer.EventMultiplexer({'run1': 'path1', 'run2': 'path2'})
@@ -202,6 +282,24 @@ class EventMultiplexerTest(tf.test.TestCase):
     self.assertEqual(
         x.GetAccumulator('path2/path2')._path, path2_2, 'loader2 path correct')
 
+  def testAddRunsFromDirectoryIncrementally(self):
+    x = event_multiplexer.EventMultiplexer(
+        logdir_full_rescan_interval_secs=600)
+    realdir = os.path.join(self.get_temp_dir(), 'incremental_directory')
+    _CreateCleanDirectory(realdir)
+    x.AddRunsFromDirectory(realdir)
+    self.assertEqual(x.Runs(), {})
+
+    path1 = os.path.join(realdir, 'path1')
+    _AddEvents(path1)
+    x.AddRunsFromDirectory(realdir)
+    self.assertItemsEqual(x.Runs(), ['path1'])
+
+    path1_1 = os.path.join(path1, 'path1')
+    _AddEvents(path1_1)
+    x.AddRunsFromDirectory(realdir)
+    self.assertItemsEqual(x.Runs(), ['path1', 'path1/path1'])
+
   def testAddRunsFromDirectoryThatContainsEvents(self):
     x = event_multiplexer.EventMultiplexer()
     tmpdir = self.get_temp_dir()
@@ -377,6 +475,50 @@ class EventMultiplexerWithRealAccumulatorTest(tf.test.TestCase):
     x.Reload()
     self.assertNotIn('run2', x.Runs().keys())
 
+  def testMaxMemoryBytes(self):
+    logdir = self.get_temp_dir()
+    for (run, value_size) in (('small', 10), ('large', 1000)):
+      writer = test_util.FileWriter(os.path.join(logdir, run))
+      for step in range(100):
+        writer.add_summary(summary_pb2.Summary(value=[
+            summary_pb2.Summary.Value(
+                tag='tensor',
+                tensor=tensor_util.make_tensor_proto(b'x' * value_size))
+        ]), step)
+      writer.close()
+    x = event_multiplexer.EventMultiplexer(max_memory_bytes=20000)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    retained = x.RetainedBytes()
+    self.assertLessEqual(
+        sum(sum(tags.values()) for tags in retained.values()), 20000)
+    self.assertEqual(100, len(x.Tensors('small', 'tensor')))
+    large = x.Tensors('large', 'tensor')
+    self.assertLess(len(large), 20)
+    self.assertEqual(99, large[-1].step)
+
+  def testLoadMetrics(self):
+    logdir = self.get_temp_dir()
+    writer = test_util.FileWriter(os.path.join(logdir, 'run'))
+    for step in range(10):
+      writer.add_summary(summary_pb2.Summary(value=[
+          summary_pb2.Summary.Value(
+              tag='tensor', tensor=tensor_util.make_tensor_proto(1.0))
+      ]), step)
+    writer.close()
+    records_before = event_multiplexer._RECORDS_READ.Value()
+    x = event_multiplexer.EventMultiplexer()
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    # The file version event, and one event per step.
+    self.assertEqual(11, event_multiplexer._RECORDS_READ.Value() -
+                     records_before)
+    self.assertIsNotNone(
+        event_multiplexer._RUN_RELOAD_SECONDS.Value(labels=('run',)))
+    (num_items, num_bytes) = x.ReservoirStats()['']
+    self.assertEqual(10, num_items)
+    self.assertGreater(num_bytes, 0)
+
   def add3RunsToMultiplexer(self, logdir, multiplexer):
     """Creates and adds 3 runs to the multiplexer."""
     run1_dir = os.path.join(logdir, 'run1')
@@ -0,0 +1,539 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Reloads `EventAccumulator`s using a pool of worker processes.
+
+Parsing event protos and migrating their values is CPU-bound, so reloading
+runs on several threads is serialized by the GIL. A `ReloadProcessPool`
+instead assigns every run to one of several long-lived worker processes.
+
+Each worker keeps its own accumulator for each of its runs. That accumulator
+reads and parses events, migrates values and runs the usual reservoir
+sampling and purging logic, but only retains the step and wall time of
+tensors that it has already handed off. After each reload, the worker sends
+the parent a compact delta per run: new summary metadata, graphs and run
+metadata, and for each changed tag the new layout of its reservoir, where
+items already known to the parent are referenced by index and only newly
+admitted tensors are sent as serialized protos. Scalars are sent as whole
+columns instead, which are cheaper to send than to index. Values that the
+reservoir rejects never leave the worker. The parent merely swaps in new
+reservoirs, filled with the given items without sampling them again. The
+sample stats of images and audio are sent as the worker keeps them, since they
+also cover events that the reservoirs no longer hold.
+
+The parent does not keep items of its own to resolve the indices of later
+layouts: it finds them in its reservoirs by identity. When the memory budget
+shrinks one of those, the worker is told which items are left before its
+next reload, so that it keeps the same ones and samples at the new size.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import threading
+import traceback
+
+import six
+
+from tensorboard.backend.event_processing import directory_watcher
+from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import reservoir
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.compat.proto import tensor_pb2
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+# Status codes for the per-run results sent back by workers.
+_OK = 'ok'
+_ERROR = 'error'
+_DELETED = 'deleted'
+
+
+def CanStartProcesses():
+  """Returns whether this process may start worker processes.
+
+  Daemonic processes, such as the reloader started for
+  `--reload_task=process`, are not allowed to have children.
+  """
+  return not multiprocessing.current_process().daemon
+
+
+class ReloadProcessPool(object):
+  """Reloads accumulators in worker processes and applies the results.
+
+  Runs are assigned to workers round-robin the first time they are seen and
+  stay with the same worker afterwards, since the worker holds the read
+  position within the run's event files.
+  """
+
+  def __init__(self,
+               num_processes,
+               size_guidance=None,
+               tensor_size_guidance=None,
+               purge_orphaned_data=True):
+    """Starts the worker processes.
+
+    Args:
+      num_processes: The number of worker processes to start.
+      size_guidance: As for `event_accumulator.EventAccumulator`.
+      tensor_size_guidance: As for `event_accumulator.EventAccumulator`.
+      purge_orphaned_data: As for `event_accumulator.EventAccumulator`.
+
+    Raises:
+      ValueError: If `num_processes` is not positive.
+    """
+    if num_processes < 1:
+      raise ValueError('num_processes must be positive, was %s' %
+                       num_processes)
+    self._accumulator_kwargs = {
+        'size_guidance': size_guidance,
+        'tensor_size_guidance': tensor_size_guidance,
+        'purge_orphaned_data': purge_orphaned_data,
+    }
+    self._lock = threading.Lock()
+    self._workers = [None] * num_processes
+    self._worker_for_run = {}
+    # Per run name, maps each tag to the size that the worker samples it at,
+    # or 0 for its size guidance, and for tags other than scalars, to the
+    # index in the latest layout of each item applied, by `id`.
+    self._applied = {}
+    for index in six.moves.xrange(num_processes):
+      self._StartWorker(index)
+
+  def _StartWorker(self, index):
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=_WorkerMain,
+        args=(child_conn, self._accumulator_kwargs),
+        name='Reload worker %d' % index)
+    process.daemon = True
+    process.start()
+    child_conn.close()
+    self._workers[index] = (process, parent_conn)
+
+  def Reload(self, items, complete=True):
+    """Reloads the given runs in the worker processes.
+
+    Args:
+      items: A list of `(name, accumulator)` pairs. The data each worker loads
+        for `name` from `accumulator.path` is applied to `accumulator`.
+      complete: Whether `items` lists every run. If so, workers discard their
+        state for runs that are not listed.
+
+    Returns:
+      A set of the names of runs whose directories have been deleted.
+    """
+    with self._lock:
+      return self._Reload(items, complete)
+
+  def _Reload(self, items, complete):
+    requests = [[] for _ in self._workers]
+    accumulators = {}
+    for (name, accumulator) in items:
+      if name not in self._worker_for_run:
+        self._worker_for_run[name] = (
+            len(self._worker_for_run) % len(self._workers))
+      requests[self._worker_for_run[name]].append(
+          (name, accumulator.path, self._ShrunkTags(name, accumulator)))
+      accumulators[name] = accumulator
+    if complete:
+      for name in set(self._worker_for_run) - set(accumulators):
+        del self._worker_for_run[name]
+        self._applied.pop(name, None)
+
+    pending = []
+    for (index, request) in enumerate(requests):
+      if not request and not complete:
+        continue
+      (process, conn) = self._workers[index]
+      try:
+        conn.send((request, complete))
+        pending.append(index)
+      except (IOError, OSError) as e:
+        self._RestartWorker(index, e)
+
+    names_to_delete = set()
+    for index in pending:
+      (process, conn) = self._workers[index]
+      try:
+        results = conn.recv()
+      except (EOFError, IOError, OSError) as e:
+        self._RestartWorker(index, e)
+        continue
+      for (name, status, payload) in results:
+        if status == _OK:
+          self._ApplyDelta(name, accumulators[name], payload)
+        elif status == _DELETED:
+          names_to_delete.add(name)
+          del self._worker_for_run[name]
+          self._applied.pop(name, None)
+        else:
+          logger.error('Unable to reload accumulator %r: %s', name, payload)
+    return names_to_delete
+
+  def _ShrunkTags(self, name, accumulator):
+    """Finds the reservoirs that the memory budget shrank since last applied.
+
+    Args:
+      name: The name of a run.
+      accumulator: The accumulator of the run.
+
+    Returns:
+      A dict mapping each tag whose reservoir was shrunk to its new size and,
+      for tags other than scalars, the sorted indices in the latest layout of
+      the items that are left.
+    """
+    # pylint: disable=protected-access
+    key = event_accumulator._TENSOR_RESERVOIR_KEY
+    # pylint: enable=protected-access
+    shrunk = {}
+    applied = self._applied.get(name, {})
+    for (tag, (size, index_by_id)) in six.iteritems(applied):
+      tag_reservoir = accumulator.tensors_by_tag.get(tag)
+      if tag_reservoir is None or tag_reservoir.size == size:
+        continue
+      kept = None
+      if index_by_id is not None:
+        # This is no read by a plugin, which the eviction policy goes by.
+        items = tag_reservoir.Items(key, mark_read=False)
+        kept = sorted(index_by_id[id(item)] for item in items
+                      if id(item) in index_by_id)
+      shrunk[tag] = (tag_reservoir.size, kept)
+      applied[tag] = (tag_reservoir.size, index_by_id)
+    return shrunk
+
+  def _RestartWorker(self, index, error):
+    """Replaces a worker that died; its runs are reloaded from scratch."""
+    (process, conn) = self._workers[index]
+    logger.error('Reload worker %d failed, restarting it: %s', index, error)
+    conn.close()
+    if process.is_alive():
+      process.terminate()
+    self._StartWorker(index)
+
+  def Close(self):
+    """Shuts down the worker processes."""
+    for (process, conn) in self._workers:
+      try:
+        conn.send(None)
+      except (IOError, OSError):
+        pass
+      conn.close()
+    for (process, conn) in self._workers:
+      process.join()
+
+  def _ApplyDelta(self, name, accumulator, delta):
+    """Applies a delta produced by `_ExportingEventAccumulator.ExportDelta`."""
+    # pylint: disable=protected-access
+    if delta['initial']:
+      # The worker started over, so all of its layouts refer to new items.
+      self._applied[name] = {}
+    applied = self._applied.setdefault(name, {})
+
+    if delta['first_event_timestamp'] is not None:
+      accumulator._first_event_timestamp = delta['first_event_timestamp']
+    accumulator.file_version = delta['file_version']
+    accumulator.most_recent_step = delta['most_recent_step']
+    accumulator.most_recent_wall_time = delta['most_recent_wall_time']
+    (accumulator.records_read, accumulator.bytes_read, accumulator.parse_errors,
+     accumulator.reload_secs) = delta['stats']
+    if 'graph' in delta:
+      (accumulator._graph, accumulator._graph_from_metagraph) = delta['graph']
+    if 'meta_graph' in delta:
+      accumulator._meta_graph = delta['meta_graph']
+    accumulator._tagged_metadata.update(delta['tagged_metadata'])
+
+    for (tag, serialized) in six.iteritems(delta['summary_metadata']):
+      if tag in accumulator.summary_metadata:
+        continue
+      accumulator._AddSummaryMetadata(
+          tag, summary_pb2.SummaryMetadata.FromString(serialized))
+
+    key = event_accumulator._TENSOR_RESERVOIR_KEY
+    for (tag, layout) in six.iteritems(delta['tensors']):
+      (size, index_by_id) = applied.get(tag, (0, {}))
+      previous = {}
+      replaced = accumulator.tensors_by_tag.get(tag)
+      if replaced is not None and index_by_id:
+        for item in replaced.Items(key, mark_read=False):
+          index = index_by_id.get(id(item))
+          if index is not None:
+            previous[index] = item
+      items = []
+      index_by_id = {}
+      for (index, entry) in enumerate(layout):
+        if isinstance(entry, int):
+          item = previous.get(entry)
+          if item is None:
+            # The memory budget dropped it after the worker was last told.
+            continue
+        else:
+          item = event_accumulator.TensorEvent(
+              wall_time=entry[0],
+              step=entry[1],
+              tensor_proto=tensor_pb2.TensorProto.FromString(entry[2]))
+        items.append(item)
+        index_by_id[id(item)] = index
+      applied[tag] = (size, index_by_id)
+      _SetTensorReservoir(accumulator, tag, items=items)
+    for (tag, series) in six.iteritems(delta['scalars']):
+      applied[tag] = (applied.get(tag, (0, None))[0], None)
+      _SetTensorReservoir(accumulator, tag, series=series)
+    for (tag, stats) in six.iteritems(delta['sample_stats']):
+      if stats is None:
+        accumulator._sample_stats.pop(tag, None)
+      else:
+        accumulator._sample_stats[tag] = stats
+    # pylint: enable=protected-access
+
+
+def _SetTensorReservoir(accumulator, tag, items=None, series=None):
+  """Replaces the reservoir of a tag with one of the given items.
+
+  Sampling already happened in the worker, so everything is kept, unless the
+  memory budget has shrunk the reservoir that the new one replaces since the
+  worker was last told. Swapping in a whole new reservoir keeps concurrent
+  readers consistent.
+
+  Args:
+    accumulator: The `event_accumulator.EventAccumulator` to update.
+    tag: The tag whose reservoir to replace.
+    items: A list of `TensorEvent`s, for a tag of tensors.
+    series: A `reservoir.ScalarSeries`, for a tag of scalars.
+  """
+  # pylint: disable=protected-access
+  replaced = accumulator.tensors_by_tag.get(tag)
+  size = replaced.size if replaced is not None else 0
+  tag_reservoir = accumulator._NewTensorReservoir(tag, size)
+  key = event_accumulator._TENSOR_RESERVOIR_KEY
+  if series is not None:
+    tag_reservoir.SetSeries(key, series)
+  else:
+    tag_reservoir.SetItems(key, items)
+  if size and tag_reservoir.NumItems() > size:
+    tag_reservoir.Shrink(size)
+  with accumulator._tensors_by_tag_lock:
+    accumulator.tensors_by_tag[tag] = tag_reservoir
+  accumulator._BumpGeneration(tag)
+  if accumulator._memory_budget is not None:
+    accumulator._memory_budget.Charge(tag_reservoir.NumBytes())
+  # pylint: enable=protected-access
+
+
+class _ExportingEventAccumulator(event_accumulator.EventAccumulator):
+  """An `EventAccumulator` that hands off loaded data in deltas.
+
+  Tensors are held in mutable `_ExportableTensorEvent`s, whose protos are
+  dropped once exported, so that only their step and wall time remain for
+  reservoir sampling and purging. Scalars are kept in the columns of a
+  `reservoir.ScalarReservoir`, as in the parent.
+  """
+
+  def __init__(self, *args, **kwargs):
+    super(_ExportingEventAccumulator, self).__init__(*args, **kwargs)
+    self._exported = None
+
+  def _NewTensorReservoir(self, tag, size):
+    tag_reservoir = super(_ExportingEventAccumulator, self)._NewTensorReservoir(
+        tag, size)
+    if not isinstance(tag_reservoir, reservoir.ScalarReservoir):
+      # Exported items no longer have protos whose bytes could be counted.
+      tag_reservoir = reservoir.Reservoir(size)
+    return tag_reservoir
+
+  def _SampleHeader(self, tensor_event):
+    if tensor_event.tensor_proto is None:
+      return tensor_event.header
+    return super(_ExportingEventAccumulator, self)._SampleHeader(tensor_event)
+
+  def _AddTensorItem(self, tag, item, f=None):
+    to_tensor_event = f or (lambda x: x)
+    def transform(x):
+      tensor_event = to_tensor_event(x)
+      if tensor_event is None:
+        return None
+      return _ExportableTensorEvent(*tensor_event)
+    super(_ExportingEventAccumulator, self)._AddTensorItem(
+        tag, item, transform)
+
+  def Shrink(self, shrunk):
+    """Shrinks reservoirs to match those that the parent's budget shrank.
+
+    Args:
+      shrunk: A dict as returned by `ReloadProcessPool._ShrunkTags`.
+    """
+    for (tag, (size, kept)) in six.iteritems(shrunk):
+      tag_reservoir = self.tensors_by_tag.get(tag)
+      if tag_reservoir is None:
+        continue
+      if kept is None:
+        tag_reservoir.Shrink(size)
+        continue
+      if self._exported is None or tag not in self._exported['tensors']:
+        # The indices refer to items that this accumulator never exported.
+        continue
+      exported_items = self._exported['tensors'][tag][0]
+      kept_ids = set(id(exported_items[index]) for index in kept)
+      tag_reservoir.Shrink(size, lambda item: id(item) in kept_ids)
+
+  def ExportDelta(self):
+    """Returns a picklable dict of the data loaded since the last call."""
+    initial = self._exported is None
+    if initial:
+      self._exported = {
+          'graph': None,
+          'meta_graph': None,
+          'tagged_metadata': {},
+          'summary_metadata': set(),
+          # The generation of each tag as of its latest export.
+          'generations': {},
+          'sample_stats': {},
+          # Maps each tag of tensors to the exported items and their indices
+          # by `id`. The list keeps the items alive so that their ids are not
+          # reused.
+          'tensors': {},
+      }
+    exported = self._exported
+    delta = {
+        'initial': initial,
+        'first_event_timestamp': self._first_event_timestamp,
+        'file_version': self.file_version,
+        'most_recent_step': self.most_recent_step,
+        'most_recent_wall_time': self.most_recent_wall_time,
+        'tagged_metadata': {},
+        'summary_metadata': {},
+        'tensors': {},
+        'scalars': {},
+        'sample_stats': {},
+    }
+    if self._graph is not exported['graph']:
+      delta['graph'] = (self._graph, self._graph_from_metagraph)
+      exported['graph'] = self._graph
+    if self._meta_graph is not exported['meta_graph']:
+      delta['meta_graph'] = self._meta_graph
+      exported['meta_graph'] = self._meta_graph
+    for (tag, run_metadata) in six.iteritems(self._tagged_metadata):
+      if exported['tagged_metadata'].get(tag) is not run_metadata:
+        delta['tagged_metadata'][tag] = run_metadata
+        exported['tagged_metadata'][tag] = run_metadata
+    for (tag, metadata) in six.iteritems(self.summary_metadata):
+      if tag not in exported['summary_metadata']:
+        delta['summary_metadata'][tag] = metadata.SerializeToString()
+        exported['summary_metadata'].add(tag)
+
+    key = event_accumulator._TENSOR_RESERVOIR_KEY
+    for (tag, tag_reservoir) in six.iteritems(self.tensors_by_tag):
+      generation = self.Generation(tag)
+      if exported['generations'].get(tag) == generation:
+        continue
+      exported['generations'][tag] = generation
+      if isinstance(tag_reservoir, reservoir.ScalarReservoir):
+        delta['scalars'][tag] = tag_reservoir.Series(key)
+        continue
+      items = tag_reservoir.Items(key)
+      (previous, index_by_id) = exported['tensors'].get(tag, ([], {}))
+      if len(items) == len(previous) and all(
+          a is b for (a, b) in zip(items, previous)):
+        continue
+      keep_header = self._SampleShapeFn(tag) is not None
+      layout = []
+      for item in items:
+        index = index_by_id.get(id(item))
+        if index is not None:
+          layout.append(index)
+        else:
+          layout.append((item.wall_time, item.step,
+                         item.tensor_proto.SerializeToString()))
+          if keep_header:
+            # Sample stats are recomputed from retained items after a purge.
+            item.header = event_accumulator._TensorHeader(item)
+          item.tensor_proto = None
+      delta['tensors'][tag] = layout
+      exported['tensors'][tag] = (
+          items, {id(item): i for (i, item) in enumerate(items)})
+    # The stats are of all events loaded, not only of those sent, so they are
+    # sent as they are rather than recomputed by the parent.
+    for tag in set(self._sample_stats) | set(exported['sample_stats']):
+      stats = self._sample_stats.get(tag)
+      if exported['sample_stats'].get(tag) != stats:
+        delta['sample_stats'][tag] = stats
+        exported['sample_stats'][tag] = stats
+    # Read last, since reading the reservoirs may find malformed values.
+    delta['stats'] = (self.records_read, self.bytes_read, self.parse_errors,
+                      self.reload_secs)
+    return delta
+
+
+class _ExportableTensorEvent(object):
+  """Like `event_accumulator.TensorEvent`, but the proto can be dropped."""
+
+  __slots__ = ('wall_time', 'step', 'tensor_proto', 'header')
+
+  def __init__(self, wall_time, step, tensor_proto):
+    self.wall_time = wall_time
+    self.step = step
+    self.tensor_proto = tensor_proto
+    # The `event_scanner.TensorHeader` of a dropped proto of images or audio.
+    self.header = None
+
+
+def _WorkerMain(conn, accumulator_kwargs):
+  """Serves reload requests from a `ReloadProcessPool` until told to stop.
+
+  Each request is a pair of a list of `(name, path, shrunk)` triples, where
+  `shrunk` is as returned by `ReloadProcessPool._ShrunkTags`, and a flag
+  that says whether that list is complete. The response lists a
+  `(name, status, payload)` triple for each requested run.
+  """
+  accumulators = {}
+  while True:
+    try:
+      request = conn.recv()
+    except EOFError:
+      return
+    if request is None:
+      return
+    (runs, complete) = request
+    if complete:
+      names = set(name for (name, _, _) in runs)
+      for name in list(accumulators):
+        if name not in names:
+          del accumulators[name]
+    results = []
+    for (name, path, shrunk) in runs:
+      accumulator = accumulators.get(name)
+      if accumulator is None or accumulator.path != path:
+        accumulator = _ExportingEventAccumulator(path, **accumulator_kwargs)
+        accumulators[name] = accumulator
+      try:
+        accumulator.Shrink(shrunk)
+        accumulator.Reload()
+      except (OSError, IOError) as e:
+        results.append((name, _ERROR, str(e)))
+        continue
+      except directory_watcher.DirectoryDeletedError:
+        del accumulators[name]
+        results.append((name, _DELETED, None))
+        continue
+      except Exception:  # pylint: disable=broad-except
+        # A run that fails to reload must not take down the other runs of
+        # this worker, which would all have to be reloaded from scratch.
+        results.append((name, _ERROR, traceback.format_exc()))
+        continue
+      results.append((name, _OK, accumulator.ExportDelta()))
+    conn.send(results)
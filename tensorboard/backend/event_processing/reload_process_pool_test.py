@@ -0,0 +1,399 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import weakref
+
+import tensorflow as tf
+
+from tensorboard.backend.event_processing import memory_budget
+from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import reload_process_pool
+from tensorboard.backend.event_processing import reservoir
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import graph_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.plugins.image import metadata as image_metadata
+from tensorboard.plugins.scalar import metadata as scalar_metadata
+from tensorboard.summary.writer import event_file_writer
+from tensorboard.util import tensor_util
+
+
+_SIZE_GUIDANCE = {
+    event_accumulator.TENSORS: 10,
+    event_accumulator.GRAPH: 1,
+    event_accumulator.META_GRAPH: 1,
+    event_accumulator.RUN_METADATA: 1,
+}
+
+
+def _WriteScalars(logdir, tag, steps, graph=False):
+  writer = event_file_writer.EventFileWriter(logdir)
+  if graph:
+    graph_def = graph_pb2.GraphDef()
+    graph_def.node.add(name='a', op='Const')
+    writer.add_event(event_pb2.Event(
+        wall_time=0, graph_def=graph_def.SerializeToString()))
+  metadata = scalar_metadata.create_summary_metadata(
+      display_name=tag, description='')
+  for step in steps:
+    value = summary_pb2.Summary.Value(
+        tag=tag,
+        metadata=metadata,
+        tensor=tensor_util.make_tensor_proto(float(step) / 2))
+    writer.add_event(event_pb2.Event(
+        wall_time=step * 10.0,
+        step=step,
+        summary=summary_pb2.Summary(value=[value])))
+  writer.close()
+
+
+def _WriteImages(logdir, tag, samples_by_step):
+  writer = event_file_writer.EventFileWriter(logdir)
+  metadata = image_metadata.create_summary_metadata(
+      display_name=tag, description='')
+  for (step, samples) in enumerate(samples_by_step):
+    value = summary_pb2.Summary.Value(
+        tag=tag,
+        metadata=metadata,
+        tensor=tensor_util.make_tensor_proto(
+            [b'4', b'3'] + [b'image'] * samples))
+    writer.add_event(event_pb2.Event(
+        wall_time=step * 10.0,
+        step=step,
+        summary=summary_pb2.Summary(value=[value])))
+  writer.close()
+
+
+class _FakeConnection(object):
+  """Feeds requests to `_WorkerMain` and collects its responses."""
+
+  def __init__(self, requests):
+    self._requests = list(requests) + [None]
+    self.sent = []
+
+  def recv(self):
+    return self._requests.pop(0)
+
+  def send(self, obj):
+    self.sent.append(obj)
+
+
+class ReloadProcessPoolTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(ReloadProcessPoolTest, self).setUp()
+    self.logdir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    self.pool = reload_process_pool.ReloadProcessPool(
+        2, size_guidance=_SIZE_GUIDANCE)
+    self.addCleanup(self.pool.Close)
+
+  def _RunDir(self, name):
+    return os.path.join(self.logdir, name)
+
+  def _NewAccumulator(self, name):
+    return event_accumulator.EventAccumulator(
+        self._RunDir(name), size_guidance=_SIZE_GUIDANCE)
+
+  def assertAccumulatorsEqual(self, expected, actual):
+    self.assertEqual(expected.Tags(), actual.Tags())
+    self.assertEqual(expected.FirstEventTimestamp(),
+                     actual.FirstEventTimestamp())
+    self.assertEqual(expected.PluginTagToContent(scalar_metadata.PLUGIN_NAME),
+                     actual.PluginTagToContent(scalar_metadata.PLUGIN_NAME))
+    if expected.Tags()[event_accumulator.GRAPH]:
+      self.assertProtoEquals(expected.Graph(), actual.Graph())
+    for tag in expected.Tags()[event_accumulator.TENSORS]:
+      self.assertEqual(expected.SummaryMetadata(tag),
+                       actual.SummaryMetadata(tag))
+      self.assertEqual(
+          [(e.wall_time, e.step, tensor_util.make_ndarray(e.tensor_proto))
+           for e in expected.Tensors(tag)],
+          [(e.wall_time, e.step, tensor_util.make_ndarray(e.tensor_proto))
+           for e in actual.Tensors(tag)])
+
+  def testMatchesInProcessReload(self):
+    _WriteScalars(self._RunDir('run1'), 'loss', range(5), graph=True)
+    _WriteScalars(self._RunDir('run2'), 'accuracy', range(100))
+    _WriteScalars(self._RunDir('run3'), 'loss', range(3))
+    items = [(name, self._NewAccumulator(name))
+             for name in ('run1', 'run2', 'run3')]
+    self.assertEqual(set(), self.pool.Reload(items))
+    for (name, accumulator) in items:
+      expected = self._NewAccumulator(name)
+      expected.Reload()
+      self.assertAccumulatorsEqual(expected, accumulator)
+
+  def testIncrementalReloadKeepsSampling(self):
+    expected = self._NewAccumulator('run1')
+    actual = self._NewAccumulator('run1')
+    for start in (0, 7, 30, 31):
+      _WriteScalars(self._RunDir('run1'), 'loss', range(start, start + 23))
+      expected.Reload()
+      self.pool.Reload([('run1', actual)])
+      self.assertAccumulatorsEqual(expected, actual)
+
+  def testParentDoesNotSampleAgain(self):
+    _WriteScalars(self._RunDir('run1'), 'loss', range(60))
+    _WriteImages(self._RunDir('run2'), 'images', [1] * 50)
+    items = [(name, self._NewAccumulator(name)) for name in ('run1', 'run2')]
+    # The workers run in other processes, so this only counts the items that
+    # the parent adds one by one.
+    with tf.compat.v1.test.mock.patch.object(
+        reservoir.Reservoir, 'AddItem') as add_item:
+      self.pool.Reload(items)
+    self.assertEqual(0, add_item.call_count)
+    ((_, scalars), (_, images)) = items
+    self.assertEqual(10, len(scalars.Tensors('loss')))
+    self.assertEqual(59, scalars.Tensors('loss')[-1].step)
+    self.assertEqual(10, len(images.Tensors('images')))
+
+  def testIncrementalReloadOfFullReservoirs(self):
+    writer = event_file_writer.EventFileWriter(self._RunDir('run1'))
+    metadata = image_metadata.create_summary_metadata(
+        display_name='images', description='')
+    actual = self._NewAccumulator('run1')
+    for step in range(30):
+      value = summary_pb2.Summary.Value(
+          tag='images',
+          metadata=metadata,
+          tensor=tensor_util.make_tensor_proto([b'4', b'3', b'image']))
+      writer.add_event(event_pb2.Event(
+          step=step, summary=summary_pb2.Summary(value=[value])))
+      if step % 10 == 9:
+        # Later items replace ones that the worker has already exported.
+        writer.flush()
+        self.pool.Reload([('run1', actual)])
+    writer.close()
+    expected = self._NewAccumulator('run1')
+    expected.Reload()
+    self.assertEqual([e.step for e in expected.Tensors('images')],
+                     [e.step for e in actual.Tensors('images')])
+    self.assertEqual(29, actual.Tensors('images')[-1].step)
+
+  def testPurgesOrphanedData(self):
+    expected = self._NewAccumulator('run1')
+    actual = self._NewAccumulator('run1')
+    _WriteScalars(self._RunDir('run1'), 'loss', range(20))
+    self.pool.Reload([('run1', actual)])
+    # A restart from step 5 discards the later steps.
+    _WriteScalars(self._RunDir('run1'), 'loss', range(5, 8))
+    expected.Reload()
+    self.pool.Reload([('run1', actual)])
+    self.assertAccumulatorsEqual(expected, actual)
+    self.assertEqual(7, actual.Tensors('loss')[-1].step)
+
+  def testKeepsSampleStats(self):
+    _WriteImages(self._RunDir('run1'), 'images', [1, 3, 2])
+    actual = self._NewAccumulator('run1')
+    self.pool.Reload([('run1', actual)])
+    self.assertEqual(
+        event_accumulator.SampleStats(
+            num_events=3, max_samples=3, last_step=2, width=4, height=3),
+        actual.SampleStats('images'))
+
+  def testKeepsSampleStatsOfEvictedEvents(self):
+    _WriteImages(self._RunDir('run1'), 'images', [5] + [1] * 29)
+    actual = self._NewAccumulator('run1')
+    self.pool.Reload([('run1', actual)])
+    self.pool.Reload([('run1', actual)])
+    expected = self._NewAccumulator('run1')
+    expected.Reload()
+    self.assertEqual(5, expected.SampleStats('images').max_samples)
+    self.assertEqual(expected.SampleStats('images'),
+                     actual.SampleStats('images'))
+
+  def testRecomputesSampleStatsAfterPurge(self):
+    writer = event_file_writer.EventFileWriter(self._RunDir('run1'))
+    metadata = image_metadata.create_summary_metadata(
+        display_name='images', description='')
+    def AddImages(step, samples):
+      value = summary_pb2.Summary.Value(
+          tag='images',
+          metadata=metadata,
+          tensor=tensor_util.make_tensor_proto(
+              [b'4', b'3'] + [b'image'] * samples))
+      writer.add_event(event_pb2.Event(
+          wall_time=step * 10.0,
+          step=step,
+          summary=summary_pb2.Summary(value=[value])))
+    for step in range(10):
+      AddImages(step, 5 if step == 8 else 2)
+    writer.flush()
+    actual = self._NewAccumulator('run1')
+    self.pool.Reload([('run1', actual)])
+    self.assertEqual(5, actual.SampleStats('images').max_samples)
+    # A restart discards the later steps, whose protos the worker no longer
+    # holds.
+    writer.add_event(event_pb2.Event(
+        wall_time=50.0,
+        step=5,
+        session_log=event_pb2.SessionLog(status=event_pb2.SessionLog.START)))
+    AddImages(5, 3)
+    writer.close()
+    self.pool.Reload([('run1', actual)])
+    self.assertEqual(
+        event_accumulator.SampleStats(
+            num_events=6, max_samples=3, last_step=5, width=4, height=3),
+        actual.SampleStats('images'))
+
+  def testReportsDeletedRuns(self):
+    _WriteScalars(self._RunDir('run1'), 'loss', range(3))
+    _WriteScalars(self._RunDir('run2'), 'loss', range(3))
+    items = [(name, self._NewAccumulator(name)) for name in ('run1', 'run2')]
+    self.pool.Reload(items)
+    shutil.rmtree(self._RunDir('run2'))
+    self.assertEqual(set(['run2']), self.pool.Reload(items))
+
+  def testRestartsDeadWorkers(self):
+    _WriteScalars(self._RunDir('run1'), 'loss', range(20))
+    accumulator = self._NewAccumulator('run1')
+    self.pool.Reload([('run1', accumulator)])
+    for (process, _) in self.pool._workers:
+      process.terminate()
+      process.join()
+    # The first reload notices the dead workers, the next one starts over.
+    self.pool.Reload([('run1', accumulator)])
+    _WriteScalars(self._RunDir('run1'), 'loss', range(20, 25))
+    self.pool.Reload([('run1', accumulator)])
+    expected = self._NewAccumulator('run1')
+    expected.Reload()
+    self.assertAccumulatorsEqual(expected, accumulator)
+
+  def testWorkerSurvivesRunErrors(self):
+    _WriteScalars(self._RunDir('run1'), 'loss', range(3))
+    _WriteScalars(self._RunDir('run2'), 'loss', range(4))
+    runs = [(name, self._RunDir(name), {}) for name in ('run1', 'run2')]
+    conn = _FakeConnection([(runs, True), (runs, True)])
+    original_reload = reload_process_pool._ExportingEventAccumulator.Reload
+    def Reload(accumulator):
+      if accumulator.path == self._RunDir('run1'):
+        raise RuntimeError('corrupt run')
+      return original_reload(accumulator)
+    with tf.compat.v1.test.mock.patch.object(
+        reload_process_pool._ExportingEventAccumulator, 'Reload', Reload):
+      reload_process_pool._WorkerMain(conn, {'size_guidance': _SIZE_GUIDANCE})
+    self.assertEqual(2, len(conn.sent))
+    for results in conn.sent:
+      ((name1, status1, payload1), (name2, status2, _)) = results
+      self.assertEqual(('run1', reload_process_pool._ERROR), (name1, status1))
+      self.assertIn('RuntimeError: corrupt run', payload1)
+      self.assertEqual(('run2', reload_process_pool._OK), (name2, status2))
+    # The worker kept the accumulator of run2, so it only sent it once.
+    self.assertTrue(conn.sent[0][1][2]['initial'])
+    self.assertFalse(conn.sent[1][1][2]['initial'])
+
+  def testWorkerShrinksLikeParent(self):
+    _WriteImages(self._RunDir('run1'), 'images', [1] * 20)
+    _WriteScalars(self._RunDir('run2'), 'loss', range(20))
+    runs = [(name, self._RunDir(name), {}) for name in ('run1', 'run2')]
+    shrunk_runs = [
+        ('run1', self._RunDir('run1'), {'images': (3, [0, 4, 9])}),
+        ('run2', self._RunDir('run2'), {'loss': (3, None)}),
+    ]
+    conn = _FakeConnection([(runs, True), (shrunk_runs, True)])
+    reload_process_pool._WorkerMain(conn, {'size_guidance': _SIZE_GUIDANCE})
+    ((_, _, images), (_, _, scalars)) = conn.sent[1]
+    # Only the items that the parent kept are left, by their indices.
+    self.assertEqual({'images': [0, 4, 9]}, images['tensors'])
+    series = scalars['scalars']['loss']
+    self.assertEqual(3, len(series.steps))
+    self.assertEqual(19, series.steps[-1])
+
+  def testRejectsNonPositiveProcessCount(self):
+    with self.assertRaises(ValueError):
+      reload_process_pool.ReloadProcessPool(0)
+
+
+class ReloadProcessPoolMemoryBudgetTest(tf.test.TestCase):
+
+  def testShrunkItemsAreFreed(self):
+    logdir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    writer = event_file_writer.EventFileWriter(logdir)
+    metadata = image_metadata.create_summary_metadata(
+        display_name='images', description='')
+    for step in range(50):
+      value = summary_pb2.Summary.Value(
+          tag='images',
+          metadata=metadata,
+          tensor=tensor_util.make_tensor_proto(
+              [b'4', b'3', b'x' * 100000]))
+      writer.add_event(event_pb2.Event(
+          step=step, summary=summary_pb2.Summary(value=[value])))
+    writer.close()
+    pool = reload_process_pool.ReloadProcessPool(
+        2, size_guidance={event_accumulator.TENSORS: 100})
+    self.addCleanup(pool.Close)
+    budget = memory_budget.MemoryBudget(10**6)
+    accumulator = event_accumulator.EventAccumulator(
+        logdir, size_guidance={event_accumulator.TENSORS: 100},
+        memory_budget=budget)
+    pool.Reload([('run', accumulator)])
+    # Charging the budget while applying the delta already shrank it.
+    tag_reservoir = accumulator.tensors_by_tag['images']
+    self.assertLess(tag_reservoir.NumItems(), 50)
+    self.assertLessEqual(budget.NumBytes(), 10**6)
+
+    # Track every item as it stands, then shrink them further.
+    tensor_protos = [weakref.ref(e.tensor_proto)
+                     for e in accumulator.Tensors('images')]
+    tag_reservoir.Shrink(2)
+    self.assertEqual(2, len([r for r in tensor_protos if r() is not None]))
+
+    # The worker now keeps the same items, and no more than those.
+    pool.Reload([('run', accumulator)])
+    self.assertEqual(
+        [r().SerializeToString() for r in tensor_protos if r() is not None],
+        [e.tensor_proto.SerializeToString()
+         for e in accumulator.Tensors('images')])
+    self.assertEqual(2, len([r for r in tensor_protos if r() is not None]))
+    self.assertEqual(49, accumulator.Tensors('images')[-1].step)
+
+
+class EventMultiplexerWithProcessesTest(tf.test.TestCase):
+
+  def testReloadsInProcesses(self):
+    logdir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    _WriteScalars(os.path.join(logdir, 'run1'), 'loss', range(3))
+    _WriteScalars(os.path.join(logdir, 'run2'), 'loss', range(4))
+    x = event_multiplexer.EventMultiplexer(max_reload_processes=2)
+    x.AddRunsFromDirectory(logdir)
+    x.Reload()
+    self.addCleanup(x._reload_process_pool.Close)
+    self.assertEqual(3, len(x.Tensors('run1', 'loss')))
+    self.assertEqual(4, len(x.Tensors('run2', 'loss')))
+    self.assertEqual(
+        {'run1': {'loss': b''}, 'run2': {'loss': b''}},
+        {run: {tag: b'' for tag in tags} for (run, tags)
+         in x.PluginRunToTagToContent(scalar_metadata.PLUGIN_NAME).items()})
+
+    # Runs added after the first reload are loaded right away.
+    _WriteScalars(os.path.join(logdir, 'run3'), 'loss', range(5))
+    x.AddRun(os.path.join(logdir, 'run3'), 'run3')
+    self.assertEqual(5, len(x.Tensors('run3', 'loss')))
+
+    shutil.rmtree(os.path.join(logdir, 'run2'))
+    x.Reload()
+    self.assertNotIn('run2', x.Runs())
+
+
+if __name__ == '__main__':
+  tf.test.main()
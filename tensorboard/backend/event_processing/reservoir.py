@@ -20,9 +20,28 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import itertools
 import random
 import threading
 
+import numpy as np
+
+
+# An item of a `ScalarReservoir`.
+ScalarEvent = collections.namedtuple(
+    'ScalarEvent', ['wall_time', 'step', 'value'])
+
+# All items of a `ScalarReservoir` bucket, as parallel numpy arrays.
+ScalarSeries = collections.namedtuple(
+    'ScalarSeries', ['wall_times', 'steps', 'values'])
+
+# Capacity of the arrays of an unbounded `ScalarReservoir` bucket when it is
+# created. They grow by doubling.
+_INITIAL_SCALAR_CAPACITY = 16
+
+# Orders reads of reservoirs, for `Reservoir.last_read`.
+_read_clock = itertools.count(1)
+
 
 class Reservoir(object):
   """A map-to-arrays container, with deterministic Reservoir Sampling.
@@ -57,9 +76,11 @@ class Reservoir(object):
     always_keep_last: Whether the latest seen sample is always at the
       end of the reservoir. Defaults to True.
     size: An integer of the maximum number of samples.
+    last_read: A number that increases every time any reservoir is read,
+      as of when this one last was, or 0 if it never was.
   """
 
-  def __init__(self, size, seed=0, always_keep_last=True):
+  def __init__(self, size, seed=0, always_keep_last=True, item_bytes=None):
     """Creates a new reservoir.
 
     Args:
@@ -70,19 +91,48 @@ class Reservoir(object):
         input items.
       always_keep_last: Whether to always keep the latest seen item in the
         end of the reservoir. Defaults to True.
+      item_bytes: An optional function that returns the approximate number
+        of bytes that an item retains, for `NumBytes`. It is applied to items
+        both before and after they are transformed by `AddItem`. Without it,
+        items are not accounted for.
 
     Raises:
       ValueError: If size is negative or not an integer.
     """
     if size < 0 or size != round(size):
       raise ValueError('size must be nonnegative integer, was %s' % size)
-    self._buckets = collections.defaultdict(
-        lambda: _ReservoirBucket(size, random.Random(seed), always_keep_last))
+    self.size = size
+    self.always_keep_last = always_keep_last
+    self.last_read = 0
+    self._seed = seed
+    self._item_bytes = item_bytes
+    self._buckets = collections.defaultdict(self._NewBucket)
     # _mutex guards the keys - creating new keys, retrieving by key, etc
     # the internal items are guarded by the ReservoirBuckets' internal mutexes
     self._mutex = threading.Lock()
-    self.size = size
-    self.always_keep_last = always_keep_last
+
+  def _NewBucket(self):
+    return _ReservoirBucket(
+        self.size, random.Random(self._seed), self.always_keep_last,
+        self._item_bytes)
+
+  def __getstate__(self):
+    with self._mutex:
+      state = self.__dict__.copy()
+      state['_buckets'] = dict(self._buckets)
+    del state['_mutex']
+    return state
+
+  def __setstate__(self, state):
+    state = dict(state)
+    buckets = state.pop('_buckets')
+    self._item_bytes = None
+    self.__dict__.update(state)
+    # Reads in another process are not comparable with reads in this one.
+    self.last_read = 0
+    self._buckets = collections.defaultdict(self._NewBucket)
+    self._buckets.update(buckets)
+    self._mutex = threading.Lock()
 
   def Keys(self):
     """Return all the keys in the reservoir.
@@ -93,11 +143,12 @@ class Reservoir(object):
     with self._mutex:
       return list(self._buckets.keys())
 
-  def Items(self, key):
+  def Items(self, key, mark_read=True):
     """Return items associated with given key.
 
     Args:
       key: The key for which we are finding associated items.
+      mark_read: Whether this counts as a read for `last_read`.
 
     Raises:
       KeyError: If the key is not found in the reservoir.
@@ -109,6 +160,8 @@ class Reservoir(object):
       if key not in self._buckets:
         raise KeyError('Key %s was not found in Reservoir' % key)
       bucket = self._buckets[key]
+    if mark_read:
+      self.last_read = next(_read_clock)
     return bucket.Items()
 
   def AddItem(self, key, item, f=lambda x: x):
@@ -126,7 +179,9 @@ class Reservoir(object):
     old item with low probability.
 
     If f is provided, it will be applied to transform item (lazily, iff item is
-      going to be included in the reservoir).
+      going to be included in the reservoir). The last item is only
+      transformed once it is read or another item is admitted after it, so
+      that items which are soon replaced by the next one never are.
 
     Args:
       key: The key to store the item under.
@@ -137,6 +192,21 @@ class Reservoir(object):
       bucket = self._buckets[key]
     bucket.AddItem(item, f)
 
+  def SetItems(self, key, items):
+    """Replaces the items associated with a key, without sampling them.
+
+    This is for items that were already sampled elsewhere. They are all
+    kept, even if there are more than `size` of them, and later items are
+    sampled as if these were all the items seen for the key.
+
+    Args:
+      key: The key to store the items under.
+      items: The items to keep, oldest first.
+    """
+    with self._mutex:
+      bucket = self._buckets[key]
+    bucket.SetItems(items)
+
   def FilterItems(self, filterFn, key=None):
     """Filter items within a Reservoir, using a filtering function.
 
@@ -158,6 +228,48 @@ class Reservoir(object):
         return sum(bucket.FilterItems(filterFn)
                    for bucket in self._buckets.values())
 
+  def NumItems(self):
+    """Returns the number of items kept for all keys."""
+    with self._mutex:
+      buckets = list(self._buckets.values())
+    return sum(bucket.NumItems() for bucket in buckets)
+
+  def NumBytes(self):
+    """Returns the approximate number of bytes retained by the items."""
+    with self._mutex:
+      buckets = list(self._buckets.values())
+    return sum(bucket.NumBytes() for bucket in buckets)
+
+  def Shrink(self, size=None, filterFn=None):
+    """Lowers the number of items kept for each key, to free memory.
+
+    The items to drop are picked at random, so that the remaining ones are
+    still a uniform sample of the items seen, and later items are sampled as
+    if the reservoir had always had the smaller size. The latest item is
+    kept if `always_keep_last` is set.
+
+    Args:
+      size: The new maximum number of items per key; positive. Defaults to
+        half of the most items kept for any key.
+      filterFn: An optional function that returns True for the items to
+        keep, such as those that another reservoir kept when it was shrunk.
+        Random items are only dropped from those that it keeps if there are
+        still more than `size` of them.
+
+    Returns:
+      The approximate number of bytes freed, or 0 if `size` is not given and
+      no key has more than one item.
+    """
+    with self._mutex:
+      buckets = list(self._buckets.values())
+      if size is None:
+        largest = max([bucket.NumItems() for bucket in buckets] or [0])
+        if largest <= 1:
+          return 0
+        size = largest // 2
+      self.size = size
+    return sum(bucket.Shrink(size, filterFn) for bucket in buckets)
+
 
 class _ReservoirBucket(object):
   """A container for items from a stream, that implements reservoir sampling.
@@ -165,7 +277,8 @@ class _ReservoirBucket(object):
   It always stores the most recent item as its final item.
   """
 
-  def __init__(self, _max_size, _random=None, always_keep_last=True):
+  def __init__(self, _max_size, _random=None, always_keep_last=True,
+               _item_bytes=None):
     """Create the _ReservoirBucket.
 
     Args:
@@ -175,6 +288,7 @@ class _ReservoirBucket(object):
         random.Random(0).
       always_keep_last: Whether the latest seen item should always be included
         in the end of the bucket.
+      _item_bytes: As for `Reservoir`.
 
     Raises:
       ValueError: if the size is not a nonnegative integer.
@@ -182,6 +296,12 @@ class _ReservoirBucket(object):
     if _max_size < 0 or _max_size != round(_max_size):
       raise ValueError('_max_size must be nonnegative int, was %s' % _max_size)
     self.items = []
+    self._item_bytes = _item_bytes
+    # The sum of `_item_bytes` over the items, including the pending one.
+    self._num_bytes = 0
+    # The last item and its transformation, if it has not been applied yet.
+    # It then follows `items`.
+    self._pending = None
     # This mutex protects the internal items, ensuring that calls to Items and
     # AddItem are thread-safe
     self._mutex = threading.Lock()
@@ -193,6 +313,21 @@ class _ReservoirBucket(object):
       self._random = random.Random(0)
     self.always_keep_last = always_keep_last
 
+  def __getstate__(self):
+    with self._mutex:
+      self._ApplyPending()
+      state = self.__dict__.copy()
+      state['items'] = list(self.items)
+    del state['_mutex']
+    return state
+
+  def __setstate__(self, state):
+    self._pending = None
+    self._item_bytes = None
+    self._num_bytes = 0
+    self.__dict__.update(state)
+    self._mutex = threading.Lock()
+
   def AddItem(self, item, f=lambda x: x):
     """Add an item to the ReservoirBucket, replacing an old item if necessary.
 
@@ -209,20 +344,58 @@ class _ReservoirBucket(object):
     Args:
       item: The item to add to the bucket.
       f: A function to transform item before addition, if it will be kept in
-        the reservoir.
+        the reservoir. It is applied lazily, when the item is read or stops
+        being the last one, so it is never applied to an item that is
+        replaced as the last item first. If it returns None, the item is
+        dropped.
     """
     with self._mutex:
-      if len(self.items) < self._max_size or self._max_size == 0:
-        self.items.append(f(item))
+      size = len(self.items) + (self._pending is not None)
+      if size < self._max_size or self._max_size == 0:
+        self._ApplyPending()
+        self._SetPending(item, f)
       else:
         r = self._random.randint(0, self._num_items_seen)
         if r < self._max_size:
-          self.items.pop(r)
-          self.items.append(f(item))
+          if self._pending is None or r < len(self.items):
+            self._ApplyPending()
+            self._num_bytes -= self._Bytes(self.items.pop(r))
+          self._SetPending(item, f)
         elif self.always_keep_last:
-          self.items[-1] = f(item)
+          if self._pending is None:
+            self._num_bytes -= self._Bytes(self.items.pop())
+          self._SetPending(item, f)
       self._num_items_seen += 1
 
+  def _Bytes(self, item):
+    return self._item_bytes(item) if self._item_bytes else 0
+
+  def SetItems(self, items):
+    """Replaces the items of the bucket, as for `Reservoir.SetItems`."""
+    with self._mutex:
+      self._pending = None
+      self.items = list(items)
+      self._num_bytes = sum(self._Bytes(item) for item in self.items)
+      self._num_items_seen = len(self.items)
+
+  def _SetPending(self, item, f):
+    """Makes an item the pending last item. Requires the lock."""
+    if self._pending is not None:
+      self._num_bytes -= self._Bytes(self._pending[0])
+    self._pending = (item, f)
+    self._num_bytes += self._Bytes(item)
+
+  def _ApplyPending(self):
+    """Transforms the last item if needed. Requires the lock."""
+    if self._pending is not None:
+      (item, f) = self._pending
+      self._pending = None
+      self._num_bytes -= self._Bytes(item)
+      item = f(item)
+      if item is not None:
+        self.items.append(item)
+        self._num_bytes += self._Bytes(item)
+
   def FilterItems(self, filterFn):
     """Filter items in a ReservoirBucket, using a filtering function.
 
@@ -243,9 +416,11 @@ class _ReservoirBucket(object):
       The number of items removed from the bucket.
     """
     with self._mutex:
+      self._ApplyPending()
       size_before = len(self.items)
       self.items = list(filter(filterFn, self.items))
       size_diff = size_before - len(self.items)
+      self._num_bytes = sum(self._Bytes(item) for item in self.items)
 
       # Estimate a correction the number of items seen
       prop_remaining = len(self.items) / float(
@@ -256,4 +431,344 @@ class _ReservoirBucket(object):
   def Items(self):
     """Get all the items in the bucket."""
     with self._mutex:
+      self._ApplyPending()
       return list(self.items)
+
+  def NumItems(self):
+    """Returns the number of items in the bucket."""
+    with self._mutex:
+      return len(self.items) + (self._pending is not None)
+
+  def NumBytes(self):
+    """Returns the approximate number of bytes retained by the items."""
+    with self._mutex:
+      return self._num_bytes
+
+  def Shrink(self, max_size, filterFn=None):
+    """Lowers the maximum size of the bucket, dropping random items.
+
+    Args:
+      max_size: The new maximum size; positive.
+      filterFn: As for `Reservoir.Shrink`.
+
+    Returns:
+      The approximate number of bytes freed.
+    """
+    with self._mutex:
+      self._ApplyPending()
+      self._max_size = max_size
+      if filterFn is not None:
+        self.items = list(filter(filterFn, self.items))
+      excess = len(self.items) - max_size
+      if excess <= 0 and filterFn is None:
+        return 0
+      if excess > 0:
+        candidates = len(self.items) - 1 if self.always_keep_last else len(
+            self.items)
+        dropped = set(self._random.sample(range(candidates), excess))
+        self.items = [item for (i, item) in enumerate(self.items)
+                      if i not in dropped]
+      num_bytes = sum(self._Bytes(item) for item in self.items)
+      freed = self._num_bytes - num_bytes
+      self._num_bytes = num_bytes
+      return freed
+
+
+class ScalarReservoir(Reservoir):
+  """A `Reservoir` of numeric scalars, stored in columns.
+
+  Items are `ScalarEvent`s, and are sampled exactly as in a `Reservoir` with
+  the same size and seed. Rather than keeping one Python object per item,
+  each bucket keeps the wall times, steps and values of its items in
+  parallel numpy arrays, which takes a fraction of the memory and lets
+  readers fetch a whole series at once with `Series`.
+
+  Steps are stored as 64-bit integers and wall times as doubles. Values
+  keep their numpy dtype, promoted as needed if a key mixes dtypes.
+  """
+
+  def _NewBucket(self):
+    return _ScalarReservoirBucket(
+        self.size, random.Random(self._seed), self.always_keep_last)
+
+  def Series(self, key):
+    """Return the items associated with given key as a `ScalarSeries`.
+
+    Args:
+      key: The key for which we are finding associated items.
+
+    Raises:
+      KeyError: If the key is not found in the reservoir.
+
+    Returns:
+      A `ScalarSeries` of newly allocated arrays.
+    """
+    with self._mutex:
+      if key not in self._buckets:
+        raise KeyError('Key %s was not found in Reservoir' % key)
+      bucket = self._buckets[key]
+    self.last_read = next(_read_clock)
+    return bucket.Series()
+
+  def SetSeries(self, key, series):
+    """Replaces the items associated with a key with those of a series.
+
+    This is `SetItems` for items that are already in columns, such as those
+    returned by `Series`.
+
+    Args:
+      key: The key to store the items under.
+      series: A `ScalarSeries`.
+    """
+    with self._mutex:
+      bucket = self._buckets[key]
+    bucket.SetSeries(series)
+
+
+class _ScalarReservoirBucket(object):
+  """A `_ReservoirBucket` of `ScalarEvent`s that stores them in columns."""
+
+  def __init__(self, _max_size, _random=None, always_keep_last=True):
+    """Create the _ScalarReservoirBucket.
+
+    Args:
+      _max_size: The maximum size the reservoir bucket may grow to. If size is
+        zero, the bucket has unbounded size.
+      _random: The random number generator to use. If not specified, defaults to
+        random.Random(0).
+      always_keep_last: Whether the latest seen item should always be included
+        in the end of the bucket.
+
+    Raises:
+      ValueError: if the size is not a nonnegative integer.
+    """
+    if _max_size < 0 or _max_size != round(_max_size):
+      raise ValueError('_max_size must be nonnegative int, was %s' % _max_size)
+    # Columns grow as items arrive, so that the many series with few points
+    # do not take as much memory as the longest ones.
+    capacity = _INITIAL_SCALAR_CAPACITY
+    if _max_size:
+      capacity = min(capacity, _max_size)
+    self._wall_times = np.zeros(capacity, dtype=np.float64)
+    self._steps = np.zeros(capacity, dtype=np.int64)
+    # Allocated along with the first item, whose value decides the dtype.
+    self._values = None
+    self._size = 0
+    # As in `_ReservoirBucket`, the last item if it has not been transformed
+    # yet. It then follows the `_size` items in the columns.
+    self._pending = None
+    # This mutex protects the columns, ensuring that calls to Items, Series
+    # and AddItem are thread-safe
+    self._mutex = threading.Lock()
+    self._max_size = _max_size
+    self._num_items_seen = 0
+    if _random is not None:
+      self._random = _random
+    else:
+      self._random = random.Random(0)
+    self.always_keep_last = always_keep_last
+
+  def __getstate__(self):
+    with self._mutex:
+      self._ApplyPending()
+      state = self.__dict__.copy()
+      state['_wall_times'] = self._wall_times[:self._size].copy()
+      state['_steps'] = self._steps[:self._size].copy()
+      if self._values is not None:
+        state['_values'] = self._values[:self._size].copy()
+    del state['_mutex']
+    return state
+
+  def __setstate__(self, state):
+    self._pending = None
+    self.__dict__.update(state)
+    self._mutex = threading.Lock()
+
+  def AddItem(self, item, f=lambda x: x):
+    """Add an item to the bucket, replacing an old item if necessary.
+
+    This samples and defers `f` exactly like `_ReservoirBucket.AddItem`.
+
+    Args:
+      item: The item to add to the bucket.
+      f: A function to transform item into a `ScalarEvent`, if it will be
+        kept in the reservoir, or into None to drop it.
+    """
+    with self._mutex:
+      size = self._size + (self._pending is not None)
+      if size < self._max_size or self._max_size == 0:
+        self._ApplyPending()
+        self._pending = (item, f)
+      else:
+        r = self._random.randint(0, self._num_items_seen)
+        if r < self._max_size:
+          if self._pending is None or r < self._size:
+            self._ApplyPending()
+            self._Remove(r)
+          self._pending = (item, f)
+        elif self.always_keep_last:
+          if self._pending is None:
+            self._size -= 1
+          self._pending = (item, f)
+      self._num_items_seen += 1
+
+  def _ApplyPending(self):
+    """Transforms the last item if needed. Requires the lock."""
+    if self._pending is not None:
+      (item, f) = self._pending
+      self._pending = None
+      event = f(item)
+      if event is not None:
+        self._Append(event)
+
+  def _Append(self, event):
+    if self._size == len(self._steps):
+      capacity = max(2 * self._size, _INITIAL_SCALAR_CAPACITY)
+      if self._max_size:
+        capacity = max(min(capacity, self._max_size), self._size + 1)
+      self._Resize(capacity)
+    self._Set(self._size, event)
+    self._size += 1
+
+  def _Set(self, index, event):
+    value = np.asarray(event.value)
+    if self._values is None:
+      self._values = np.zeros(len(self._steps), dtype=value.dtype)
+    elif value.dtype != self._values.dtype:
+      dtype = np.promote_types(self._values.dtype, value.dtype)
+      if dtype != self._values.dtype:
+        self._values = self._values.astype(dtype)
+    self._wall_times[index] = event.wall_time
+    self._steps[index] = event.step
+    self._values[index] = value
+
+  def SetItems(self, items):
+    """Replaces the items of the bucket, as for `Reservoir.SetItems`."""
+    self.SetSeries(ScalarSeries(
+        wall_times=[event.wall_time for event in items],
+        steps=[event.step for event in items],
+        values=[event.value for event in items]))
+
+  def SetSeries(self, series):
+    """Replaces the items of the bucket with those of a `ScalarSeries`."""
+    with self._mutex:
+      self._pending = None
+      self._size = len(series.steps)
+      self._wall_times = np.array(series.wall_times, dtype=np.float64)
+      self._steps = np.array(series.steps, dtype=np.int64)
+      self._values = np.array(series.values) if self._size else None
+      self._num_items_seen = self._size
+
+  def _Remove(self, index):
+    size = self._size
+    for column in self._Columns():
+      column[index:size - 1] = column[index + 1:size]
+    self._size -= 1
+
+  def _Resize(self, capacity):
+    def resized(column):
+      result = np.zeros(capacity, dtype=column.dtype)
+      result[:self._size] = column[:self._size]
+      return result
+    self._wall_times = resized(self._wall_times)
+    self._steps = resized(self._steps)
+    if self._values is not None:
+      self._values = resized(self._values)
+
+  def _Columns(self):
+    columns = [self._wall_times, self._steps]
+    if self._values is not None:
+      columns.append(self._values)
+    return columns
+
+  def FilterItems(self, filterFn):
+    """Filter items in the bucket, using a filtering function.
+
+    Updates the number of items seen like `_ReservoirBucket.FilterItems`.
+
+    Args:
+      filterFn: A function that returns True for `ScalarEvent`s to be kept.
+
+    Returns:
+      The number of items removed from the bucket.
+    """
+    with self._mutex:
+      self._ApplyPending()
+      size_before = self._size
+      keep = np.array([bool(filterFn(event)) for event in self._Events()],
+                      dtype=bool)
+      self._size = int(np.count_nonzero(keep))
+      for column in self._Columns():
+        column[:self._size] = column[:size_before][keep]
+      size_diff = size_before - self._size
+
+      # Estimate a correction the number of items seen
+      prop_remaining = self._size / float(
+          size_before) if size_before > 0 else 0
+      self._num_items_seen = int(round(self._num_items_seen * prop_remaining))
+      return size_diff
+
+  def _Events(self):
+    if self._values is None:
+      return []
+    return [
+        ScalarEvent(wall_time=wall_time, step=step, value=value)
+        for (wall_time, step, value) in zip(
+            self._wall_times[:self._size].tolist(),
+            self._steps[:self._size].tolist(),
+            self._values[:self._size])
+    ]
+
+  def Items(self):
+    """Get all the items in the bucket, as `ScalarEvent`s."""
+    with self._mutex:
+      self._ApplyPending()
+      return self._Events()
+
+  def NumItems(self):
+    """Returns the number of items in the bucket."""
+    with self._mutex:
+      return self._size + (self._pending is not None)
+
+  def NumBytes(self):
+    """Returns the number of bytes allocated for the columns."""
+    with self._mutex:
+      return sum(column.nbytes for column in self._Columns())
+
+  def Shrink(self, max_size, filterFn=None):
+    """Lowers the maximum size of the bucket, like `_ReservoirBucket`."""
+    with self._mutex:
+      self._ApplyPending()
+      bytes_before = sum(column.nbytes for column in self._Columns())
+      self._max_size = max_size
+      if filterFn is not None:
+        keep = np.array([bool(filterFn(event)) for event in self._Events()],
+                        dtype=bool)
+        size = int(np.count_nonzero(keep))
+        for column in self._Columns():
+          column[:size] = column[:self._size][keep]
+        self._size = size
+      excess = self._size - max_size
+      if excess > 0:
+        candidates = self._size - 1 if self.always_keep_last else self._size
+        keep = np.ones(self._size, dtype=bool)
+        keep[self._random.sample(range(candidates), excess)] = False
+        for column in self._Columns():
+          column[:max_size] = column[:self._size][keep]
+        self._size = max_size
+      if len(self._steps) > max_size:
+        self._Resize(max_size)
+      return bytes_before - sum(column.nbytes for column in self._Columns())
+
+  def Series(self):
+    """Get all the items in the bucket, as a `ScalarSeries`."""
+    with self._mutex:
+      self._ApplyPending()
+      if self._values is None:
+        values = np.zeros(0, dtype=np.float64)
+      else:
+        values = self._values[:self._size].copy()
+      return ScalarSeries(
+          wall_times=self._wall_times[:self._size].copy(),
+          steps=self._steps[:self._size].copy(),
+          values=values)
@@ -17,6 +17,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import pickle
+
+import numpy as np
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import tensorflow as tf
 
@@ -109,6 +112,116 @@ class ReservoirTest(tf.test.TestCase):
     self.assertEqual(len(r.Items('key1')), 4)
     self.assertEqual(len(r.Items('key2')), 8)
 
+  def testPickleRoundTripContinuesSampling(self):
+    original = reservoir.Reservoir(10, seed=3)
+    for i in xrange(50):
+      original.AddItem('key1', i)
+    restored = pickle.loads(pickle.dumps(original, protocol=2))
+    self.assertEqual(original.Items('key1'), restored.Items('key1'))
+    for i in xrange(50, 200):
+      original.AddItem('key1', i)
+      original.AddItem('key2', i)
+      restored.AddItem('key1', i)
+      restored.AddItem('key2', i)
+    self.assertEqual(original.Items('key1'), restored.Items('key1'))
+    self.assertEqual(original.Items('key2'), restored.Items('key2'))
+
+  def testNumBytes(self):
+    r = reservoir.Reservoir(10, item_bytes=len)
+    self.assertEqual(0, r.NumBytes())
+    for i in xrange(100):
+      r.AddItem('key1', 'x' * i, lambda s: s + 'y')
+    items = r.Items('key1')
+    self.assertEqual(sum(len(s) for s in items), r.NumBytes())
+    r.FilterItems(lambda s: len(s) < 50, 'key1')
+    self.assertEqual(sum(len(s) for s in r.Items('key1')), r.NumBytes())
+    self.assertEqual(0, reservoir.Reservoir(10).NumBytes())
+
+  def testShrink(self):
+    r = reservoir.Reservoir(100, item_bytes=lambda i: 1)
+    for i in xrange(1000):
+      r.AddItem('key1', i)
+      r.AddItem('key2', i)
+    r.AddItem('key3', 0)
+    self.assertEqual(100, r.Shrink())
+    self.assertEqual(50, r.size)
+    for key in ('key1', 'key2'):
+      items = r.Items(key)
+      self.assertEqual(50, len(items))
+      self.assertEqual(sorted(items), items)
+      self.assertEqual(999, items[-1])
+    self.assertEqual([0], r.Items('key3'))
+    for i in xrange(1000, 2000):
+      r.AddItem('key1', i)
+    self.assertEqual(50, len(r.Items('key1')))
+    self.assertEqual(1999, r.Items('key1')[-1])
+
+  def testSetItems(self):
+    r = reservoir.Reservoir(10, item_bytes=len)
+    r.AddItem('key', 'x')
+    r.SetItems('key', ['y' * i for i in xrange(1, 21)])
+    self.assertEqual(['y' * i for i in xrange(1, 21)], r.Items('key'))
+    self.assertEqual(210, r.NumBytes())
+
+  def testSetItemsContinuesSampling(self):
+    r = reservoir.Reservoir(10)
+    r.AddItem('key', -1)
+    r.SetItems('key', list(xrange(5)))
+    # Later items are sampled as if the given ones were all that was seen.
+    sampled = reservoir.Reservoir(10)
+    for i in xrange(100):
+      if i >= 5:
+        r.AddItem('key', i)
+      sampled.AddItem('key', i)
+    self.assertEqual(sampled.Items('key'), r.Items('key'))
+
+  def testShrinkToSize(self):
+    r = reservoir.Reservoir(100, item_bytes=lambda i: 1)
+    for i in xrange(1000):
+      r.AddItem('key', i)
+    self.assertEqual(90, r.Shrink(10))
+    self.assertEqual(10, r.size)
+    self.assertEqual(10, len(r.Items('key')))
+    self.assertEqual(0, r.Shrink(20))
+    self.assertEqual(20, r.size)
+
+  def testShrinkKeepsFilteredItems(self):
+    r = reservoir.Reservoir(100, item_bytes=lambda i: 1)
+    s = reservoir.Reservoir(100, item_bytes=lambda i: 1)
+    for i in xrange(1000):
+      r.AddItem('key', i)
+      s.AddItem('key', i)
+    r.Shrink(10)
+    kept = set(r.Items('key'))
+    self.assertEqual(90, s.Shrink(10, lambda i: i in kept))
+    # Both keep the same items, and sample later ones alike.
+    self.assertEqual(r.Items('key'), s.Items('key'))
+    for i in xrange(1000, 2000):
+      r.AddItem('key', i)
+      s.AddItem('key', i)
+    self.assertEqual(10, len(s.Items('key')))
+    self.assertEqual(1999, s.Items('key')[-1])
+
+  def testShrinkSingleItems(self):
+    r = reservoir.Reservoir(10, item_bytes=lambda i: 1)
+    self.assertEqual(0, r.Shrink())
+    r.AddItem('key', 1)
+    self.assertEqual(0, r.Shrink())
+    self.assertEqual(10, r.size)
+
+  def testReadsUpdateLastRead(self):
+    r = reservoir.Reservoir(10)
+    r.AddItem('key', 1)
+    self.assertEqual(0, r.last_read)
+    r.Items('key')
+    first_read = r.last_read
+    reservoir.Reservoir(10).AddItem('key', 1)
+    r.Items('key')
+    self.assertGreater(r.last_read, first_read)
+    second_read = r.last_read
+    self.assertEqual([1], r.Items('key', mark_read=False))
+    self.assertEqual(second_read, r.last_read)
+
 
 class ReservoirBucketTest(tf.test.TestCase):
 
@@ -116,6 +229,13 @@ class ReservoirBucketTest(tf.test.TestCase):
     b = reservoir._ReservoirBucket(1)
     self.assertFalse(b.Items())
 
+  def testTransformMayDropItems(self):
+    b = reservoir._ReservoirBucket(0, _item_bytes=lambda x: x)
+    for i in xrange(1, 6):
+      b.AddItem(i, lambda x: None if x % 2 else x)
+    self.assertEqual([2, 4], b.Items())
+    self.assertEqual(6, b.NumBytes())
+
   def testFillToSize(self):
     b = reservoir._ReservoirBucket(100)
     for i in xrange(100):
@@ -209,24 +329,225 @@ class ReservoirBucketTest(tf.test.TestCase):
     # We've mocked the randomness generator, so that once it is full, the last
     # item will never get durable reservoir inclusion. Since always_keep_last is
     # false, the function should only get invoked 100 times while filling up
-    # the reservoir. This laziness property is an essential performance
-    # optimization.
+    # the reservoir (the last time when the last item is read). This laziness
+    # property is an essential performance optimization.
     b = reservoir._ReservoirBucket(100, FakeRandom(), always_keep_last=False)
     incrementer = Incrementer()
     for i in xrange(1000):
       b.AddItem(i, incrementer.increment_and_double)
-    self.assertEqual(incrementer.n, 100)
     self.assertEqual(b.Items(), [x * 2 for x in xrange(100)])
+    self.assertEqual(incrementer.n, 100)
 
-    # This time, we will always keep the last item, meaning that the function
-    # should get invoked once for every item we add.
+    # This time, we will always keep the last item. Each item replaces the
+    # previous last one before it is read, so the function should only get
+    # invoked for the items that become durable, and for the last item once it
+    # is read.
     b = reservoir._ReservoirBucket(100, FakeRandom(), always_keep_last=True)
     incrementer = Incrementer()
 
     for i in xrange(1000):
       b.AddItem(i, incrementer.increment_and_double)
-    self.assertEqual(incrementer.n, 1000)
+    self.assertEqual(incrementer.n, 99)
+    self.assertEqual(b.Items(), [x * 2 for x in xrange(99)] + [999 * 2])
+    self.assertEqual(incrementer.n, 100)
     self.assertEqual(b.Items(), [x * 2 for x in xrange(99)] + [999 * 2])
+    self.assertEqual(incrementer.n, 100)
+    # Reading does not change what is kept.
+    b.AddItem(1000, incrementer.increment_and_double)
+    self.assertEqual(b.Items(), [x * 2 for x in xrange(99)] + [1000 * 2])
+
+
+def _ScalarEvent(i):
+  return reservoir.ScalarEvent(wall_time=i * 0.5, step=i, value=np.float32(i))
+
+
+class ScalarReservoirTest(tf.test.TestCase):
+
+  def assertSameSample(self, items, scalar_reservoir, key):
+    expected = [_ScalarEvent(i) for i in items]
+    self.assertEqual(expected, scalar_reservoir.Items(key))
+    series = scalar_reservoir.Series(key)
+    self.assertAllEqual([e.wall_time for e in expected], series.wall_times)
+    self.assertAllEqual([e.step for e in expected], series.steps)
+    self.assertAllEqual([e.value for e in expected], series.values)
+    self.assertEqual(np.float32, series.values.dtype)
+
+  def testSamplesLikeReservoir(self):
+    for (size, always_keep_last) in ((0, True), (1, True), (10, True),
+                                     (10, False), (100, True)):
+      r = reservoir.Reservoir(size, seed=7, always_keep_last=always_keep_last)
+      s = reservoir.ScalarReservoir(
+          size, seed=7, always_keep_last=always_keep_last)
+      for i in xrange(1000):
+        r.AddItem('key', i)
+        s.AddItem('key', i, _ScalarEvent)
+      self.assertSameSample(r.Items('key'), s, 'key')
+
+  def testFilterItemsLikeReservoir(self):
+    r = reservoir.Reservoir(20)
+    s = reservoir.ScalarReservoir(20)
+    for i in xrange(100):
+      r.AddItem('key', i)
+      s.AddItem('key', i, _ScalarEvent)
+    self.assertEqual(r.FilterItems(lambda x: x < 50, 'key'),
+                     s.FilterItems(lambda x: x.step < 50, 'key'))
+    for i in xrange(50, 300):
+      r.AddItem('key', i)
+      s.AddItem('key', i, _ScalarEvent)
+    self.assertSameSample(r.Items('key'), s, 'key')
+
+  def testTransformMayDropItems(self):
+    s = reservoir.ScalarReservoir(0)
+    for i in xrange(1, 6):
+      s.AddItem('key', i, lambda x: None if x % 2 else _ScalarEvent(x))
+    self.assertAllEqual([2, 4], s.Series('key').steps)
+
+  def testTransformIsLazy(self):
+    calls = []
+    def transform(i):
+      calls.append(i)
+      return _ScalarEvent(i)
+    s = reservoir.ScalarReservoir(1, always_keep_last=False)
+    for i in xrange(100):
+      s.AddItem('key', i, transform)
+    self.assertEqual(len(calls), len(set(calls)))
+    self.assertLess(len(calls), 100)
+
+  def testTransformIsDeferredForLastItem(self):
+    calls = []
+    def transform(i):
+      calls.append(i)
+      return _ScalarEvent(i)
+    s = reservoir.ScalarReservoir(10, always_keep_last=True)
+    for i in xrange(1000):
+      s.AddItem('key', i, transform)
+    self.assertLess(len(calls), 100)
+    self.assertNotIn(999, calls)
+    self.assertEqual(999, s.Series('key').steps[-1])
+    self.assertIn(999, calls)
+
+  def testReadsDoNotChangeSampling(self):
+    for size in (0, 1, 10):
+      r = reservoir.Reservoir(size, seed=5)
+      s = reservoir.ScalarReservoir(size, seed=5)
+      read_r = reservoir.Reservoir(size, seed=5)
+      read_s = reservoir.ScalarReservoir(size, seed=5)
+      for i in xrange(500):
+        r.AddItem('key', i)
+        s.AddItem('key', i, _ScalarEvent)
+        read_r.AddItem('key', i)
+        read_s.AddItem('key', i, _ScalarEvent)
+        if i % 7 == 0:
+          read_r.Items('key')
+          read_s.Series('key')
+        if i % 50 == 0:
+          r.FilterItems(lambda x: x % 3, 'key')
+          s.FilterItems(lambda x: x.step % 3, 'key')
+          read_r.FilterItems(lambda x: x % 3, 'key')
+          read_s.FilterItems(lambda x: x.step % 3, 'key')
+      self.assertEqual(r.Items('key'), read_r.Items('key'))
+      self.assertSameSample(r.Items('key'), s, 'key')
+      self.assertSameSample(r.Items('key'), read_s, 'key')
+
+  def testPromotesMixedDtypes(self):
+    s = reservoir.ScalarReservoir(0)
+    s.AddItem('key', reservoir.ScalarEvent(0.0, 0, np.int32(3)))
+    s.AddItem('key', reservoir.ScalarEvent(1.0, 1, np.float64(0.25)))
+    series = s.Series('key')
+    self.assertEqual(np.float64, series.values.dtype)
+    self.assertAllEqual([3.0, 0.25], series.values)
+
+  def testSeriesIsACopy(self):
+    s = reservoir.ScalarReservoir(0)
+    s.AddItem('key', _ScalarEvent(1))
+    s.Series('key').values[0] = 5
+    self.assertEqual(1, s.Series('key').values[0])
+
+  def testMissingKey(self):
+    with self.assertRaises(KeyError):
+      reservoir.ScalarReservoir(10).Series('key')
+
+  def testGrowsColumnsAsNeeded(self):
+    # Each item takes 20 bytes: a float64 wall time, an int64 step and a
+    # float32 value.
+    s = reservoir.ScalarReservoir(1000)
+    s.AddItem('key', _ScalarEvent(0))
+    s.Series('key')
+    one_item_bytes = s.NumBytes()
+    self.assertLessEqual(one_item_bytes, 20 * 16)
+    for i in xrange(1, 100):
+      s.AddItem('key', _ScalarEvent(i))
+    s.Series('key')
+    self.assertGreater(s.NumBytes(), one_item_bytes)
+    self.assertLessEqual(s.NumBytes(), 20 * 2 * 100)
+    for i in xrange(100, 5000):
+      s.AddItem('key', _ScalarEvent(i))
+    self.assertEqual(1000, len(s.Series('key').steps))
+    self.assertEqual(20 * 1000, s.NumBytes())
+
+  def testShrinkLikeReservoir(self):
+    r = reservoir.Reservoir(100, item_bytes=lambda i: 1)
+    s = reservoir.ScalarReservoir(100)
+    for i in xrange(1000):
+      r.AddItem('key', i)
+      s.AddItem('key', i, _ScalarEvent)
+    bytes_before = s.NumBytes()
+    r.Shrink()
+    self.assertGreater(s.Shrink(), 0)
+    self.assertLess(s.NumBytes(), bytes_before)
+    for i in xrange(1000, 2000):
+      r.AddItem('key', i)
+      s.AddItem('key', i, _ScalarEvent)
+    self.assertSameSample(r.Items('key'), s, 'key')
+
+  def testSetSeriesLikeSetItems(self):
+    r = reservoir.Reservoir(10)
+    s = reservoir.ScalarReservoir(10)
+    t = reservoir.ScalarReservoir(10)
+    r.SetItems('key', list(xrange(20)))
+    s.SetItems('key', [_ScalarEvent(i) for i in xrange(20)])
+    t.SetSeries('key', reservoir.ScalarSeries(
+        wall_times=np.arange(20) * 0.5,
+        steps=np.arange(20),
+        values=np.arange(20, dtype=np.float32)))
+    for i in xrange(20, 100):
+      r.AddItem('key', i)
+      s.AddItem('key', i, _ScalarEvent)
+      t.AddItem('key', i, _ScalarEvent)
+    self.assertSameSample(r.Items('key'), s, 'key')
+    self.assertSameSample(r.Items('key'), t, 'key')
+
+  def testSetSeriesWithoutItems(self):
+    s = reservoir.ScalarReservoir(10)
+    s.SetSeries('key', reservoir.ScalarSeries(
+        wall_times=np.zeros(0), steps=np.zeros(0), values=np.zeros(0)))
+    self.assertEqual([], s.Items('key'))
+    s.AddItem('key', _ScalarEvent(3))
+    self.assertSameSample([3], s, 'key')
+
+  def testShrinkKeepsFilteredItemsLikeReservoir(self):
+    r = reservoir.Reservoir(100)
+    s = reservoir.ScalarReservoir(100)
+    for i in xrange(1000):
+      r.AddItem('key', i)
+      s.AddItem('key', i, _ScalarEvent)
+    r.Shrink(20, lambda i: i % 3 == 0)
+    s.Shrink(20, lambda e: e.step % 3 == 0)
+    for i in xrange(1000, 2000):
+      r.AddItem('key', i)
+      s.AddItem('key', i, _ScalarEvent)
+    self.assertSameSample(r.Items('key'), s, 'key')
+
+  def testPickleRoundTripContinuesSampling(self):
+    for size in (0, 10):
+      original = reservoir.ScalarReservoir(size, seed=3)
+      for i in xrange(50):
+        original.AddItem('key', _ScalarEvent(i))
+      restored = pickle.loads(pickle.dumps(original, protocol=2))
+      for i in xrange(50, 200):
+        original.AddItem('key', _ScalarEvent(i))
+        restored.AddItem('key', _ScalarEvent(i))
+      self.assertEqual(original.Items('key'), restored.Items('key'))
 
 
 class ReservoirBucketStatisticalDistributionTest(tf.test.TestCase):
@@ -0,0 +1,155 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""An index of the tags of all runs, with cheap immutable snapshots.
+
+Plugins ask which runs have which of their tags on nearly every request.
+Rather than walking every accumulator each time, the multiplexer keeps a
+`RunTagIndex` up to date as tags are first seen during loading, and hands out
+`IndexSnapshot`s. A snapshot is only rebuilt when a run or tag was added or
+removed since the last one, and then only the changed runs are re-indexed.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+import six
+
+
+class RunTagIndex(object):
+  """Maps runs to their tags and summary metadata; thread-safe."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    # Maps each run to a dict mapping its tags to their `SummaryMetadata`.
+    self._run_to_tag_to_metadata = {}
+    # Maps each run to the object that identifies its latest `AddRun` call.
+    self._run_tokens = {}
+    # Runs changed since `_snapshot` was taken.
+    self._changed_runs = set()
+    self._snapshot = IndexSnapshot(0, {})
+
+  def AddRun(self, run):
+    """Adds a run without tags, replacing any run of the same name.
+
+    Args:
+      run: The name of the run.
+
+    Returns:
+      A function that adds a tag to the run, taking the tag and its
+      `SummaryMetadata`, which must not be modified afterwards. It does
+      nothing once the run has been removed or added again, so that a
+      replaced accumulator that is still loading cannot add stale tags.
+    """
+    token = object()
+    with self._lock:
+      self._run_to_tag_to_metadata[run] = {}
+      self._run_tokens[run] = token
+      self._changed_runs.add(run)
+
+    def add_tag(tag, summary_metadata):
+      with self._lock:
+        if self._run_tokens.get(run) is token:
+          self._run_to_tag_to_metadata[run][tag] = summary_metadata
+          self._changed_runs.add(run)
+    return add_tag
+
+  def RemoveRun(self, run):
+    """Removes a run and its tags, if it is in the index."""
+    with self._lock:
+      self._run_tokens.pop(run, None)
+      if self._run_to_tag_to_metadata.pop(run, None) is not None:
+        self._changed_runs.add(run)
+
+  def Snapshot(self):
+    """Returns an `IndexSnapshot` of the current runs and tags."""
+    with self._lock:
+      if not self._changed_runs:
+        return self._snapshot
+      runs = dict(self._snapshot._runs)  # pylint: disable=protected-access
+      for run in self._changed_runs:
+        tag_to_metadata = self._run_to_tag_to_metadata.get(run)
+        if tag_to_metadata is None:
+          runs.pop(run, None)
+        else:
+          runs[run] = _RunEntry(tag_to_metadata)
+      self._changed_runs = set()
+      self._snapshot = IndexSnapshot(self._snapshot.version + 1, runs)
+      return self._snapshot
+
+
+class IndexSnapshot(object):
+  """The runs and tags of a `RunTagIndex` at some point in time.
+
+  Snapshots never change, and neither do the dicts that they return, which
+  are shared and so must not be modified by callers.
+
+  Fields:
+    version: An integer that is greater for later snapshots of the same index,
+      so that anything derived from a snapshot can be reused as long as the
+      version stays the same.
+  """
+
+  def __init__(self, version, runs):
+    self.version = version
+    self._runs = runs
+    # Lazily computed results of `PluginRunToTagToContent`. Computing one
+    # twice concurrently is harmless, so no lock is needed.
+    self._plugin_run_to_tag_to_content = {}
+
+  def Runs(self):
+    """Returns a list of the names of all runs, including those without tags."""
+    return list(self._runs)
+
+  def PluginRunToTagToContent(self, plugin_name):
+    """Returns a dict `{run: {tag: content}}` of the tags of a plugin.
+
+    Like `EventMultiplexer.PluginRunToTagToContent`; runs without tags for
+    the plugin are omitted.
+    """
+    result = self._plugin_run_to_tag_to_content.get(plugin_name)
+    if result is None:
+      result = {}
+      for (run, entry) in six.iteritems(self._runs):
+        tag_to_content = entry.plugin_to_tag_to_content.get(plugin_name)
+        if tag_to_content:
+          result[run] = tag_to_content
+      self._plugin_run_to_tag_to_content[plugin_name] = result
+    return result
+
+  def SummaryMetadata(self, run, tag):
+    """Returns the `SummaryMetadata` of a tag of a run.
+
+    Raises:
+      KeyError: If the run or tag is not in the snapshot.
+    """
+    return self._runs[run].tag_to_metadata[tag]
+
+
+class _RunEntry(object):
+  """The tags of a run in an `IndexSnapshot`, indexed by plugin."""
+
+  __slots__ = ('tag_to_metadata', 'plugin_to_tag_to_content')
+
+  def __init__(self, tag_to_metadata):
+    self.tag_to_metadata = dict(tag_to_metadata)
+    self.plugin_to_tag_to_content = {}
+    for (tag, summary_metadata) in six.iteritems(self.tag_to_metadata):
+      plugin_name = summary_metadata.plugin_data.plugin_name
+      if plugin_name:
+        self.plugin_to_tag_to_content.setdefault(plugin_name, {})[tag] = (
+            summary_metadata.plugin_data.content)
@@ -0,0 +1,91 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from tensorboard import test as tb_test
+from tensorboard.backend.event_processing import run_tag_index
+from tensorboard.compat.proto import summary_pb2
+
+
+def _Metadata(plugin_name, content=b''):
+  return summary_pb2.SummaryMetadata(
+      plugin_data=summary_pb2.SummaryMetadata.PluginData(
+          plugin_name=plugin_name, content=content))
+
+
+class RunTagIndexTest(tb_test.TestCase):
+
+  def testEmpty(self):
+    snapshot = run_tag_index.RunTagIndex().Snapshot()
+    self.assertEqual(0, snapshot.version)
+    self.assertEqual([], snapshot.Runs())
+    self.assertEqual({}, snapshot.PluginRunToTagToContent('scalars'))
+
+  def testIndexesTagsByPlugin(self):
+    index = run_tag_index.RunTagIndex()
+    add_tag = index.AddRun('train')
+    add_tag('loss', _Metadata('scalars', b'a'))
+    add_tag('weights', _Metadata('histograms', b'b'))
+    add_tag('other', _Metadata(''))
+    index.AddRun('eval')('loss', _Metadata('scalars', b'c'))
+    index.AddRun('empty')
+    snapshot = index.Snapshot()
+    self.assertItemsEqual(['train', 'eval', 'empty'], snapshot.Runs())
+    self.assertEqual({'train': {'loss': b'a'}, 'eval': {'loss': b'c'}},
+                     snapshot.PluginRunToTagToContent('scalars'))
+    self.assertEqual({'train': {'weights': b'b'}},
+                     snapshot.PluginRunToTagToContent('histograms'))
+    self.assertEqual({}, snapshot.PluginRunToTagToContent('images'))
+    self.assertEqual(_Metadata(''), snapshot.SummaryMetadata('train', 'other'))
+    with self.assertRaises(KeyError):
+      snapshot.SummaryMetadata('train', 'missing')
+    with self.assertRaises(KeyError):
+      snapshot.SummaryMetadata('missing', 'loss')
+
+  def testSnapshotsAreImmutableAndReused(self):
+    index = run_tag_index.RunTagIndex()
+    add_tag = index.AddRun('train')
+    add_tag('loss', _Metadata('scalars'))
+    snapshot = index.Snapshot()
+    mapping = snapshot.PluginRunToTagToContent('scalars')
+    self.assertIs(snapshot, index.Snapshot())
+    self.assertIs(mapping, snapshot.PluginRunToTagToContent('scalars'))
+    add_tag('accuracy', _Metadata('scalars'))
+    new_snapshot = index.Snapshot()
+    self.assertGreater(new_snapshot.version, snapshot.version)
+    self.assertEqual({'train': {'loss': b''}},
+                     snapshot.PluginRunToTagToContent('scalars'))
+    self.assertEqual({'train': {'loss': b'', 'accuracy': b''}},
+                     new_snapshot.PluginRunToTagToContent('scalars'))
+
+  def testRemovedOrReplacedRunsIgnoreStaleTags(self):
+    index = run_tag_index.RunTagIndex()
+    old_add_tag = index.AddRun('train')
+    old_add_tag('loss', _Metadata('scalars'))
+    new_add_tag = index.AddRun('train')
+    old_add_tag('stale', _Metadata('scalars'))
+    new_add_tag('accuracy', _Metadata('scalars'))
+    self.assertEqual({'train': {'accuracy': b''}},
+                     index.Snapshot().PluginRunToTagToContent('scalars'))
+    index.RemoveRun('train')
+    new_add_tag('stale', _Metadata('scalars'))
+    self.assertEqual([], index.Snapshot().Runs())
+    index.RemoveRun('missing')
+
+
+if __name__ == '__main__':
+  tb_test.main()
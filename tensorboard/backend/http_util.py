@@ -20,27 +20,63 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import gzip
+import hashlib
 import json
 import re
 import struct
 import time
 import wsgiref.handlers
+import zlib
 
 import six
+from six.moves import xrange  # pylint: disable=redefined-builtin
 
 import werkzeug
 
+from tensorboard.backend import columnar
 from tensorboard.backend import json_util
 from tensorboard.compat import tf
 
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
 
 _EXTRACT_MIMETYPE_PATTERN = re.compile(r'^[^;\s]*')
 _EXTRACT_CHARSET_PATTERN = re.compile(r'charset=([-_0-9A-Za-z]+)')
 
-# Allows *, gzip or x-gzip, but forbid gzip;q=0
+# The qvalue of a coding in an Accept-Encoding header.
 # https://tools.ietf.org/html/rfc7231#section-5.3.4
-_ALLOWS_GZIP_PATTERN = re.compile(
-    r'(?:^|,|\s)(?:(?:x-)?gzip|\*)(?!;q=0)(?:\s|,|$)')
+_QVALUE_PATTERN = re.compile(r'(?:^|;)\s*q\s*=\s*([0-9.]+)')
+
+GZIP = 'gzip'
+BROTLI = 'br'
+ZSTD = 'zstd'
+
+# The content codings that responses may be compressed with, most preferred
+# first, and the range of their compression levels. Brotli and zstd are only
+# used if their libraries are installed.
+_CODINGS = (BROTLI, ZSTD, GZIP)
+_LEVEL_RANGES = {GZIP: (1, 9), BROTLI: (0, 11), ZSTD: (1, 22)}
+
+DEFAULT_COMPRESSION_LEVELS = {GZIP: 3, BROTLI: 4, ZSTD: 3}
+DEFAULT_COMPRESSION_MIN_BYTES = 512
+
+# Bodies at least this large are compressed in chunks while they are sent,
+# rather than into a second buffer before.
+_STREAMING_MIN_BYTES = 1 << 20
+_STREAMING_CHUNK_BYTES = 1 << 18
+
+# Set by `ConfigureCompression`. The levels map codings, and `(coding,
+# mimetype)` pairs that override them, to compression levels.
+_compression_min_bytes = DEFAULT_COMPRESSION_MIN_BYTES
+_compression_levels = dict(DEFAULT_COMPRESSION_LEVELS)
 
 _TEXTUAL_MIMETYPES = set([
     'application/javascript',
@@ -60,6 +96,15 @@ _JSON_MIMETYPES = set([
     'application/json+protobuf',
 ])
 
+# Binary media types that compress well, unlike images and audio, which are
+# compressed already.
+_COMPRESSIBLE_BINARY_MIMETYPES = set([
+    columnar.MIME_TYPE,
+])
+
+# Request methods whose responses have ETags and may be 304 Not Modified.
+_CONDITIONAL_METHODS = ('GET', 'HEAD')
+
 
 def Respond(request,
             content,
@@ -67,19 +112,32 @@ def Respond(request,
             code=200,
             expires=0,
             content_encoding=None,
-            encoding='utf-8'):
+            encoding='utf-8',
+            etag=None):
   """Construct a werkzeug Response.
 
   Responses are transmitted to the browser with compression if: a) the browser
-  supports it; b) it's sane to compress the content_type in question; and c)
-  the content isn't already compressed, as indicated by the content_encoding
-  parameter.
+  supports it; b) it's sane to compress the content_type in question, which is
+  textual or a compressible binary type like `columnar.MIME_TYPE`; c) the
+  content isn't already compressed, as indicated by the content_encoding
+  parameter; and d) the content is large enough to be worth it. Brotli or
+  zstd are preferred over gzip if the browser supports them and their
+  libraries are installed. See `ConfigureCompression` for the thresholds and
+  levels. Large bodies are compressed while they are sent, so their responses
+  have no Content-Length.
 
   Browser and proxy caching is completely disabled by default. If the expires
   parameter is greater than zero then the response will be able to be cached by
   the browser for that many seconds; however, proxies are still forbidden from
   caching so that developers can bypass the cache with Ctrl+Shift+R.
 
+  Successful responses to GET and HEAD requests carry a strong ETag, so that
+  browsers revalidate their cached copy rather than download it again: if the
+  request's If-None-Match header has the ETag of the response, then the
+  response is a bodiless 304 Not Modified. The ETag is derived from the etag
+  parameter if given, else from a hash of the content, and from the content
+  encoding of the response, since gzipped and plain bodies differ.
+
   For textual content that isn't JSON, the encoding parameter is used as the
   transmission charset which is automatically appended to the Content-Type
   header. That is unless of course the content_type parameter contains a
@@ -103,39 +161,48 @@ def Respond(request,
     expires: Second duration for browser caching.
     content_encoding: Encoding if content is already encoded, e.g. 'gzip'.
     encoding: Input charset if content parameter has byte strings.
+    etag: An ASCII string that changes whenever the content does, such as one
+      from `ETag`, to use instead of hashing the content.
 
   Returns:
     A werkzeug Response object (a WSGI application).
   """
 
-  mimetype = _EXTRACT_MIMETYPE_PATTERN.search(content_type).group(0)
-  charset_match = _EXTRACT_CHARSET_PATTERN.search(content_type)
-  charset = charset_match.group(1) if charset_match else encoding
-  textual = charset_match or mimetype in _TEXTUAL_MIMETYPES
-  if (mimetype in _JSON_MIMETYPES and
-      isinstance(content, (dict, list, set, tuple))):
-    content = json.dumps(json_util.Cleanse(content, encoding),
-                         ensure_ascii=not charset_match)
-  if charset != encoding:
-    content = tf.compat.as_text(content, encoding)
-  content = tf.compat.as_bytes(content, charset)
-  if textual and not charset_match and mimetype not in _JSON_MIMETYPES:
-    content_type += '; charset=' + charset
-  gzip_accepted = _ALLOWS_GZIP_PATTERN.search(
-      request.headers.get('Accept-Encoding', ''))
-  # Automatically gzip uncompressed text data if accepted.
-  if textual and not content_encoding and gzip_accepted:
-    out = six.BytesIO()
-    # Set mtime to zero to make payload for a given input deterministic.
-    with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=3, mtime=0) as f:
-      f.write(content)
-    content = out.getvalue()
-    content_encoding = 'gzip'
+  (content, content_type, compressible) = _Serialize(
+      content, content_type, encoding)
+  accepted = _AcceptedCodings(request)
+  gzip_accepted = _Accepts(accepted, GZIP)
+  negotiated = compressible or content_encoding == GZIP
+  # Automatically compress uncompressed text data if accepted.
+  compression = None
+  if (compressible and not content_encoding and
+      len(content) >= _compression_min_bytes):
+    compression = _Negotiate(accepted)
+  # Automatically streamwise-gunzip precompressed data if not accepted.
+  gunzip = content_encoding == GZIP and not gzip_accepted
+
+  entity_tag = None
+  if code == 200 and request.method in _CONDITIONAL_METHODS:
+    if etag is None:
+      etag = hashlib.sha1(content).hexdigest()
+    entity_tag = _EntityTag(
+        etag, compression or (None if gunzip else content_encoding))
+    if request.if_none_match.contains_weak(entity_tag):
+      return _NotModified(entity_tag, expires)
 
   content_length = len(content)
   direct_passthrough = False
-  # Automatically streamwise-gunzip precompressed data if not accepted.
-  if content_encoding == 'gzip' and not gzip_accepted:
+  if compression:
+    level = _CompressionLevel(
+        compression, _EXTRACT_MIMETYPE_PATTERN.search(content_type).group(0))
+    if content_length >= _STREAMING_MIN_BYTES and request.method != 'HEAD':
+      content = _CompressChunks(content, compression, level)
+      content_length = None
+    else:
+      content = _Compress(content, compression, level)
+      content_length = len(content)
+    content_encoding = compression
+  elif gunzip:
     gzip_file = gzip.GzipFile(fileobj=six.BytesIO(content), mode='rb')
     # Last 4 bytes of gzip formatted data (little-endian) store the original
     # content length mod 2^32; we just assume it's the content length. That
@@ -146,16 +213,15 @@ def Respond(request,
     direct_passthrough = True
 
   headers = []
-  headers.append(('Content-Length', str(content_length)))
+  if content_length is not None:
+    headers.append(('Content-Length', str(content_length)))
   if content_encoding:
     headers.append(('Content-Encoding', content_encoding))
-  if expires > 0:
-    e = wsgiref.handlers.format_date_time(time.time() + float(expires))
-    headers.append(('Expires', e))
-    headers.append(('Cache-Control', 'private, max-age=%d' % expires))
-  else:
-    headers.append(('Expires', '0'))
-    headers.append(('Cache-Control', 'no-cache, must-revalidate'))
+  if negotiated:
+    headers.append(('Vary', 'Accept-Encoding'))
+  if entity_tag is not None:
+    headers.append(('ETag', '"%s"' % entity_tag))
+  headers.extend(_CacheHeaders(expires))
 
   if request.method == 'HEAD':
     content = None
@@ -163,3 +229,278 @@ def Respond(request,
   return werkzeug.wrappers.Response(
       response=content, status=code, headers=headers, content_type=content_type,
       direct_passthrough=direct_passthrough)
+
+
+def NotModified(request, etag, expires=0):
+  """Construct a 304 response if the client has the current content.
+
+  This lets routes that can tell cheaply whether their content changed skip
+  computing it. The response is the one that `Respond` would give for any
+  content passed along with the same etag, provided that the content type
+  of that content is always the same.
+
+  Args:
+    request: A werkzeug Request object.
+    etag: As for `Respond`.
+    expires: As for `Respond`.
+
+  Returns:
+    A werkzeug Response object with status 304 if the If-None-Match header
+    of the request has an ETag that `Respond` would give with `etag`, or
+    None otherwise.
+  """
+  if request.method not in _CONDITIONAL_METHODS:
+    return None
+  accepted = _AcceptedCodings(request)
+  codings = [coding for coding in _AvailableCodings()
+             if _Accepts(accepted, coding)]
+  for content_encoding in codings + [None]:
+    entity_tag = _EntityTag(etag, content_encoding)
+    if request.if_none_match.contains_weak(entity_tag):
+      return _NotModified(entity_tag, expires)
+  return None
+
+
+def ETag(*parts):
+  """Returns an etag for `Respond` derived from the reprs of some values."""
+  data = '\0'.join(repr(part) for part in parts)
+  return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def Precompress(content, content_type, encoding='utf-8', coding=GZIP):
+  """Serializes and compresses a response body ahead of time.
+
+  This does the work that `Respond` would do for a client whose best accepted
+  coding is `coding`, so that the result can be kept and passed to `Respond`
+  many times. Gzipped bodies can also be passed for clients that accept no
+  compression, which `Respond` decompresses them for.
+
+  Args:
+    content: As for `Respond`.
+    content_type: As for `Respond`.
+    encoding: As for `Respond`.
+    coding: The content coding to compress with, which must be one of
+      `_AvailableCodings()`.
+
+  Returns:
+    A `(content, content_type, content_encoding)` tuple to pass to `Respond`.
+  """
+  (content, content_type, compressible) = _Serialize(
+      content, content_type, encoding)
+  if compressible and len(content) >= _compression_min_bytes:
+    mimetype = _EXTRACT_MIMETYPE_PATTERN.search(content_type).group(0)
+    content = _Compress(content, coding, _CompressionLevel(coding, mimetype))
+    return (content, content_type, coding)
+  return (content, content_type, None)
+
+
+def NegotiateCoding(request):
+  """Returns the content coding that `Respond` would compress with.
+
+  Args:
+    request: A werkzeug Request object.
+
+  Returns:
+    The available content coding that the request's Accept-Encoding header
+    prefers, or None if it accepts none.
+  """
+  return _Negotiate(_AcceptedCodings(request))
+
+
+def ConfigureCompression(min_bytes=DEFAULT_COMPRESSION_MIN_BYTES,
+                         levels=None):
+  """Sets how `Respond` and `Precompress` compress response bodies.
+
+  Args:
+    min_bytes: Bodies smaller than this are not compressed, since their
+      compression costs more than it saves.
+    levels: A dict mapping content codings, or `(coding, mimetype)` pairs
+      for the bodies of a media type, to compression levels, which take
+      precedence over `DEFAULT_COMPRESSION_LEVELS`. For example, as parsed by
+      `ParseCompressionLevels`.
+  """
+  global _compression_min_bytes, _compression_levels
+  compression_levels = dict(DEFAULT_COMPRESSION_LEVELS)
+  compression_levels.update(levels or {})
+  _compression_min_bytes = min_bytes
+  _compression_levels = compression_levels
+
+
+def ParseCompressionLevels(spec):
+  """Parses compression levels for `ConfigureCompression`.
+
+  Args:
+    spec: Comma-separated `CODING=LEVEL` or `CODING:MIMETYPE=LEVEL` items,
+      such as "gzip=6,br:application/json=5", where each coding is one of
+      "gzip", "br", and "zstd".
+
+  Returns:
+    A dict of levels for `ConfigureCompression`.
+
+  Raises:
+    ValueError: If `spec` is malformed or has an unknown coding or a level
+      out of range.
+  """
+  levels = {}
+  for item in spec.split(','):
+    item = item.strip()
+    if not item:
+      continue
+    (key, sep, level) = item.partition('=')
+    (coding, _, mimetype) = key.strip().partition(':')
+    coding = coding.strip()
+    mimetype = mimetype.strip()
+    if not sep or coding not in _LEVEL_RANGES:
+      raise ValueError('Expected CODING[:MIMETYPE]=LEVEL with a coding of %s, '
+                       'got %r' % (', '.join(sorted(_LEVEL_RANGES)), item))
+    try:
+      level = int(level)
+    except ValueError:
+      raise ValueError('Compression level is not an integer: %r' % item)
+    (low, high) = _LEVEL_RANGES[coding]
+    if not low <= level <= high:
+      raise ValueError('Compression level of %s must be in [%d, %d]: %r'
+                       % (coding, low, high, item))
+    levels[(coding, mimetype) if mimetype else coding] = level
+  return levels
+
+
+def _Serialize(content, content_type, encoding):
+  """Encodes content as in `Respond`.
+
+  Returns:
+    A tuple of the content as bytes, the content type with its charset if
+    it is textual, and whether it is worth compressing.
+  """
+  mimetype = _EXTRACT_MIMETYPE_PATTERN.search(content_type).group(0)
+  charset_match = _EXTRACT_CHARSET_PATTERN.search(content_type)
+  charset = charset_match.group(1) if charset_match else encoding
+  textual = charset_match or mimetype in _TEXTUAL_MIMETYPES
+  if (mimetype in _JSON_MIMETYPES and
+      isinstance(content, (dict, list, set, tuple))):
+    content = json.dumps(json_util.Cleanse(content, encoding),
+                         ensure_ascii=not charset_match)
+  if charset != encoding:
+    content = tf.compat.as_text(content, encoding)
+  content = tf.compat.as_bytes(content, charset)
+  if textual and not charset_match and mimetype not in _JSON_MIMETYPES:
+    content_type += '; charset=' + charset
+  compressible = textual or mimetype in _COMPRESSIBLE_BINARY_MIMETYPES
+  return (content, content_type, bool(compressible))
+
+
+def _EntityTag(etag, content_encoding):
+  """Returns the ETag, without quotes, of an encoding of some content."""
+  if content_encoding:
+    return '%s-%s' % (etag, content_encoding)
+  return etag
+
+
+def _NotModified(entity_tag, expires):
+  headers = [('ETag', '"%s"' % entity_tag)]
+  headers.extend(_CacheHeaders(expires))
+  return werkzeug.wrappers.Response(status=304, headers=headers)
+
+
+def _CacheHeaders(expires):
+  """Returns the caching headers of a response as in `Respond`."""
+  if expires > 0:
+    e = wsgiref.handlers.format_date_time(time.time() + float(expires))
+    return [('Expires', e),
+            ('Cache-Control', 'private, max-age=%d' % expires)]
+  return [('Expires', '0'), ('Cache-Control', 'no-cache, must-revalidate')]
+
+
+def _AcceptedCodings(request):
+  """Returns a dict from the codings a request accepts to their qvalues."""
+  accepted = {}
+  for item in request.headers.get('Accept-Encoding', '').split(','):
+    (coding, _, params) = item.partition(';')
+    coding = coding.strip().lower()
+    if not coding:
+      continue
+    qvalue = 1.0
+    match = _QVALUE_PATTERN.search(params.strip())
+    if match:
+      try:
+        qvalue = float(match.group(1))
+      except ValueError:
+        qvalue = 0.0
+    if coding == 'x-gzip':
+      coding = GZIP
+    accepted[coding] = max(qvalue, accepted.get(coding, 0.0))
+  return accepted
+
+
+def _QValue(accepted, coding):
+  # Only gzip, which every HTTP client is expected to support, is taken to be
+  # accepted by a wildcard.
+  return accepted.get(coding, accepted.get('*', 0.0) if coding == GZIP else 0.0)
+
+
+def _Accepts(accepted, coding):
+  return _QValue(accepted, coding) > 0
+
+
+def _AvailableCodings():
+  """Returns the codings whose libraries are installed, most preferred first."""
+  return [coding for coding in _CODINGS
+          if (coding != BROTLI or brotli is not None) and
+          (coding != ZSTD or zstandard is not None)]
+
+
+def _Negotiate(accepted):
+  """Returns the best available coding of those accepted, or None."""
+  best = None
+  best_qvalue = 0.0
+  for coding in _AvailableCodings():
+    qvalue = _QValue(accepted, coding)
+    if qvalue > best_qvalue:
+      (best, best_qvalue) = (coding, qvalue)
+  return best
+
+
+def _CompressionLevel(coding, mimetype):
+  levels = _compression_levels
+  return levels.get((coding, mimetype), levels[coding])
+
+
+class _BrotliCompressor(object):
+  """Adapts `brotli.Compressor` to the interface of `zlib.compressobj`."""
+
+  def __init__(self, level):
+    self._compressor = brotli.Compressor(quality=level)
+
+  def compress(self, data):
+    return self._compressor.process(data)
+
+  def flush(self):
+    return self._compressor.finish()
+
+
+def _Compressor(coding, level):
+  """Returns an object with the `compress` and `flush` of `compressobj`."""
+  if coding == GZIP:
+    # The gzip container of zlib has a zero mtime, which makes the payload
+    # for a given input deterministic.
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+  if coding == BROTLI:
+    return _BrotliCompressor(level)
+  if coding == ZSTD:
+    return zstandard.ZstdCompressor(level=level).compressobj()
+  raise ValueError('Unknown content coding: %r' % (coding,))
+
+
+def _Compress(content, coding, level):
+  compressor = _Compressor(coding, level)
+  return compressor.compress(content) + compressor.flush()
+
+
+def _CompressChunks(content, coding, level):
+  """Yields the compressed content, compressing one chunk at a time."""
+  compressor = _Compressor(coding, level)
+  for start in xrange(0, len(content), _STREAMING_CHUNK_BYTES):
+    chunk = compressor.compress(content[start:start + _STREAMING_CHUNK_BYTES])
+    if chunk:
+      yield chunk
+  yield compressor.flush()
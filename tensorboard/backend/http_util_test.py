@@ -21,13 +21,16 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import gzip
+import json
 import struct
+import unittest
 
 import six
 from werkzeug import test as wtest
 from werkzeug import wrappers
 
 from tensorboard import test as tb_test
+from tensorboard.backend import columnar
 from tensorboard.backend import http_util
 
 
@@ -180,6 +183,192 @@ class RespondTest(tb_test.TestCase):
     r = http_util.Respond(q, '<b>hello world</b>', 'text/html', expires=60)
     self.assertEqual(r.headers.get('Cache-Control'), 'private, max-age=60')
 
+  def testETag_isDerivedFromContent(self):
+    q = wrappers.Request(wtest.EnvironBuilder().get_environ())
+    etag = http_util.Respond(q, 'hello', 'text/plain').headers.get('ETag')
+    self.assertRegexpMatches(etag, r'^"[0-9a-f]+"$')
+    self.assertEqual(
+        etag, http_util.Respond(q, 'hello', 'text/plain').headers.get('ETag'))
+    self.assertNotEqual(
+        etag, http_util.Respond(q, 'world', 'text/plain').headers.get('ETag'))
+
+  def testETag_dependsOnContentEncoding(self):
+    plain = wrappers.Request(wtest.EnvironBuilder().get_environ())
+    e = wtest.EnvironBuilder(headers={'Accept-Encoding': 'gzip'}).get_environ()
+    gzipped = wrappers.Request(e)
+    hello = 'hello' * 200
+    r = http_util.Respond(plain, hello, 'text/plain', etag='abc')
+    self.assertEqual(r.headers.get('ETag'), '"abc"')
+    self.assertEqual(r.headers.get('Vary'), 'Accept-Encoding')
+    r = http_util.Respond(gzipped, hello, 'text/plain', etag='abc')
+    self.assertEqual(r.headers.get('ETag'), '"abc-gzip"')
+    r = http_util.Respond(gzipped, hello, 'image/png', etag='abc')
+    self.assertEqual(r.headers.get('ETag'), '"abc"')
+
+  def testIfNoneMatch_respondsNotModified(self):
+    e = wtest.EnvironBuilder(headers={
+        'Accept-Encoding': 'gzip',
+        'If-None-Match': '"xyz", "abc-gzip"',
+    }).get_environ()
+    q = wrappers.Request(e)
+    r = http_util.Respond(q, 'hello' * 200, 'text/plain', etag='abc')
+    self.assertEqual(r.status_code, 304)
+    self.assertEqual(r.headers.get('ETag'), '"abc-gzip"')
+    self.assertEqual(r.headers.get('Cache-Control'), 'no-cache, must-revalidate')
+    self.assertEqual(b''.join(r.response), b'')
+    r = http_util.Respond(q, 'hello', 'text/plain', etag='def')
+    self.assertEqual(r.status_code, 200)
+
+  def testIfNoneMatch_onlyForSuccessfulGets(self):
+    e = wtest.EnvironBuilder(
+        method='POST', headers={'If-None-Match': '"abc"'}).get_environ()
+    r = http_util.Respond(wrappers.Request(e), 'hello', 'text/plain',
+                          etag='abc')
+    self.assertEqual(r.status_code, 200)
+    self.assertIsNone(r.headers.get('ETag'))
+    e = wtest.EnvironBuilder(headers={'If-None-Match': '"abc"'}).get_environ()
+    r = http_util.Respond(wrappers.Request(e), 'oops', 'text/plain', code=404,
+                          etag='abc')
+    self.assertEqual(r.status_code, 404)
+    self.assertIsNone(r.headers.get('ETag'))
+
+
+class CompressionTest(tb_test.TestCase):
+
+  def tearDown(self):
+    http_util.ConfigureCompression()
+    super(CompressionTest, self).tearDown()
+
+  def _Request(self, accept_encoding, method='GET'):
+    return wrappers.Request(wtest.EnvironBuilder(
+        method=method,
+        headers={'Accept-Encoding': accept_encoding}).get_environ())
+
+  def testSmallBodies_areNotCompressed(self):
+    q = self._Request('gzip')
+    r = http_util.Respond(q, 'x' * 511, 'text/plain')
+    self.assertIsNone(r.headers.get('Content-Encoding'))
+    self.assertEqual(r.response, [b'x' * 511])
+    r = http_util.Respond(q, 'x' * 512, 'text/plain')
+    self.assertEqual(r.headers.get('Content-Encoding'), 'gzip')
+    http_util.ConfigureCompression(min_bytes=1024)
+    r = http_util.Respond(q, 'x' * 512, 'text/plain')
+    self.assertIsNone(r.headers.get('Content-Encoding'))
+
+  def testCompressibleBinaryBodies_areCompressed(self):
+    q = self._Request('gzip')
+    body = b'\0' * 1000
+    r = http_util.Respond(q, body, columnar.MIME_TYPE)
+    self.assertEqual(r.headers.get('Content-Encoding'), 'gzip')
+    self.assertEqual(r.headers.get('Content-Type'), columnar.MIME_TYPE)
+    self.assertEqual(_gunzip(r.response[0]), body)
+    r = http_util.Respond(q, body, 'image/png')
+    self.assertIsNone(r.headers.get('Content-Encoding'))
+
+  def testNegotiation_honorsQvalues(self):
+    body = 'x' * 1000
+    def coding(accept_encoding):
+      r = http_util.Respond(self._Request(accept_encoding), body, 'text/plain')
+      return r.headers.get('Content-Encoding')
+    self.assertEqual('gzip', coding('gzip'))
+    self.assertEqual('gzip', coding('x-gzip, deflate'))
+    self.assertEqual('gzip', coding('gzip;q=1, br;q=0.5, zstd;q=0.1'))
+    self.assertEqual('gzip', coding('gzip, br;q=0, zstd;q=0'))
+    self.assertIsNone(coding('gzip;q=0'))
+    self.assertIsNone(coding('*;q=0'))
+    self.assertIsNone(coding('identity'))
+    self.assertEqual('gzip', coding('*'))
+
+  @unittest.skipIf(http_util.brotli is None, 'brotli is not installed')
+  def testBrotli(self):
+    import brotli  # pylint: disable=g-import-not-at-top
+    body = '{"a": 1}' * 100
+    q = self._Request('gzip, deflate, br')
+    self.assertEqual('br', http_util.NegotiateCoding(q))
+    r = http_util.Respond(q, body, 'application/json')
+    self.assertEqual(r.headers.get('Content-Encoding'), 'br')
+    self.assertEqual(brotli.decompress(b''.join(r.response)),
+                     body.encode('utf-8'))
+
+  @unittest.skipIf(http_util.zstandard is None, 'zstandard is not installed')
+  def testZstd(self):
+    import zstandard  # pylint: disable=g-import-not-at-top
+    body = '{"a": 1}' * 100
+    q = self._Request('gzip, zstd')
+    r = http_util.Respond(q, body, 'application/json')
+    self.assertEqual(r.headers.get('Content-Encoding'), 'zstd')
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    self.assertEqual(decompressor.decompress(b''.join(r.response)),
+                     body.encode('utf-8'))
+
+  def testLevels_arePerMimetype(self):
+    http_util.ConfigureCompression(
+        levels={'gzip': 1, ('gzip', 'application/json'): 9})
+    q = self._Request('gzip')
+    def extra_flags(content_type):
+      r = http_util.Respond(q, '[1, 2, 3]' * 100, content_type)
+      # The XFL byte of the gzip header tells fastest and best compression.
+      return six.indexbytes(r.response[0], 8)  # pylint: disable=unsubscriptable-object
+    self.assertEqual(4, extra_flags('text/plain'))
+    self.assertEqual(2, extra_flags('application/json'))
+
+  def testLargeBodies_areCompressedWhileSent(self):
+    body = json.dumps(list(range(300000)))
+    self.assertGreater(len(body), 2**20)
+    r = http_util.Respond(self._Request('gzip'), body, 'application/json')
+    self.assertEqual(r.headers.get('Content-Encoding'), 'gzip')
+    self.assertIsNone(r.headers.get('Content-Length'))
+    chunks = list(r.response)
+    self.assertGreater(len(chunks), 1)
+    self.assertEqual(_gunzip(b''.join(chunks)), body.encode('utf-8'))
+    r = http_util.Respond(
+        self._Request('gzip', method='HEAD'), body, 'application/json')
+    self.assertEqual(r.headers.get('Content-Length'),
+                     str(len(b''.join(chunks))))
+
+  def testPrecompress(self):
+    (content, content_type, content_encoding) = http_util.Precompress(
+        [1] * 1000, 'application/json')
+    self.assertEqual('application/json', content_type)
+    self.assertEqual('gzip', content_encoding)
+    self.assertEqual([1] * 1000, json.loads(_gunzip(content).decode('utf-8')))
+    self.assertEqual((b'[1]', 'application/json', None),
+                     http_util.Precompress([1], 'application/json'))
+    self.assertEqual((b'\x89PNG', 'image/png', None),
+                     http_util.Precompress(b'\x89PNG', 'image/png'))
+
+  def testParseCompressionLevels(self):
+    self.assertEqual({}, http_util.ParseCompressionLevels(''))
+    self.assertEqual(
+        {'gzip': 6, ('br', 'application/json'): 11, 'zstd': 1},
+        http_util.ParseCompressionLevels(
+            'gzip=6, br:application/json=11,zstd=1'))
+    for spec in ('gzip', 'deflate=1', 'gzip=fast', 'gzip=0', 'br=12'):
+      with self.assertRaises(ValueError):
+        http_util.ParseCompressionLevels(spec)
+
+
+class NotModifiedTest(tb_test.TestCase):
+
+  def testMatchesAnyEncodingThatCouldBeSent(self):
+    def not_modified(if_none_match, accept_encoding=''):
+      e = wtest.EnvironBuilder(headers={
+          'If-None-Match': if_none_match,
+          'Accept-Encoding': accept_encoding,
+      }).get_environ()
+      return http_util.NotModified(wrappers.Request(e), 'abc')
+    self.assertEqual(304, not_modified('"abc"').status_code)
+    self.assertEqual('"abc"', not_modified('"abc"', 'gzip').headers.get('ETag'))
+    self.assertEqual(
+        '"abc-gzip"', not_modified('"abc-gzip"', 'gzip').headers.get('ETag'))
+    self.assertIsNone(not_modified('"abc-gzip"'))
+    self.assertIsNone(not_modified('"def"', 'gzip'))
+
+  def testETag(self):
+    self.assertEqual(http_util.ETag('a', 1), http_util.ETag('a', 1))
+    self.assertNotEqual(http_util.ETag('a', 1), http_util.ETag('a', 2))
+    self.assertNotEqual(http_util.ETag('a', 1), http_util.ETag('a1'))
+
 
 def _gzip(bs):
   out = six.BytesIO()
@@ -192,6 +381,7 @@ def _gunzip(bs):
   with gzip.GzipFile(fileobj=six.BytesIO(bs), mode='rb') as f:
     return f.read()
 
+
 def _bitflip(bs):
   # Return bytestring with all its bits flipped.
   return b''.join(struct.pack('B', 0xFF ^ struct.unpack_from('B', bs, i)[0])
@@ -0,0 +1,89 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""A thread-safe LRU cache bounded in the total size of its entries."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import threading
+
+
+class LruCache(object):
+  """A thread-safe LRU cache, bounded in the total size of its entries.
+
+  Entries larger than a quarter of the maximum are not cached, so that a
+  single large entry cannot evict everything else.
+  """
+
+  def __init__(self, max_size, size_fn=len):
+    """Creates an empty cache.
+
+    Args:
+      max_size: The maximum total size of the cached entries.
+      size_fn: A function that returns the size of an entry, in the same
+        unit as `max_size`. It is called once per `Put`.
+    """
+    self._max_size = max_size
+    self._size_fn = size_fn
+    # Maps keys to `(entry, size)` pairs, least recently used first.
+    self._entries = collections.OrderedDict()
+    self._size = 0
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def Get(self, key):
+    """Returns the entry for a key and marks it as recently used, or None."""
+    with self._lock:
+      pair = self._entries.pop(key, None)
+      if pair is None:
+        self.misses += 1
+        return None
+      self._entries[key] = pair
+      self.hits += 1
+      return pair[0]
+
+  def Put(self, key, entry):
+    """Adds or replaces the entry for a key, evicting old entries to fit."""
+    size = self._size_fn(entry)
+    with self._lock:
+      previous = self._entries.pop(key, None)
+      if previous is not None:
+        self._size -= previous[1]
+      if size > self._max_size // 4:
+        return
+      self._entries[key] = (entry, size)
+      self._size += size
+      while self._size > self._max_size:
+        (_, (_, evicted_size)) = self._entries.popitem(last=False)
+        self._size -= evicted_size
+
+  def Pop(self, key):
+    """Removes the entry for a key, if any."""
+    with self._lock:
+      previous = self._entries.pop(key, None)
+      if previous is not None:
+        self._size -= previous[1]
+
+  def Size(self):
+    """Returns the total size of the cached entries."""
+    with self._lock:
+      return self._size
+
+  def __len__(self):
+    with self._lock:
+      return len(self._entries)
@@ -0,0 +1,67 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for tensorboard.backend.lru_cache."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from tensorboard import test as tb_test
+from tensorboard.backend import lru_cache
+
+
+class LruCacheTest(tb_test.TestCase):
+
+  def testEvictsLeastRecentlyUsed(self):
+    cache = lru_cache.LruCache(12)
+    for key in 'abcd':
+      cache.Put(key, 'xxx')
+    self.assertEqual('xxx', cache.Get('a'))
+    cache.Put('e', 'xxx')
+    self.assertIsNone(cache.Get('b'))
+    self.assertEqual('xxx', cache.Get('a'))
+    self.assertEqual(4, len(cache))
+    self.assertEqual(12, cache.Size())
+    self.assertEqual((2, 1), (cache.hits, cache.misses))
+
+  def testSizeFunction(self):
+    cache = lru_cache.LruCache(8, size_fn=lambda entry: 1)
+    for i in range(10):
+      cache.Put(i, [0] * 100)
+    self.assertEqual(8, len(cache))
+    self.assertEqual(8, cache.Size())
+    self.assertIsNone(cache.Get(1))
+    self.assertIsNotNone(cache.Get(9))
+
+  def testSkipsLargeEntries(self):
+    cache = lru_cache.LruCache(12)
+    cache.Put('a', 'xxx')
+    # An entry too large to cache still replaces the stale one.
+    cache.Put('a', 'xxxx')
+    self.assertIsNone(cache.Get('a'))
+    self.assertEqual(0, cache.Size())
+
+  def testPop(self):
+    cache = lru_cache.LruCache(12)
+    cache.Put('a', 'xx')
+    cache.Put('b', 'xxx')
+    cache.Pop('a')
+    cache.Pop('missing')
+    self.assertIsNone(cache.Get('a'))
+    self.assertEqual(3, cache.Size())
+
+
+if __name__ == '__main__':
+  tb_test.main()
@@ -0,0 +1,258 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""A minimal registry of operational metrics in the Prometheus text format.
+
+Modules define their metrics at import time on the shared `REGISTRY`, and
+TensorBoard serves `REGISTRY.Render()` at `/metrics`, so that a Prometheus
+server can scrape it. Only the small subset of the Prometheus client that
+TensorBoard needs is implemented, to avoid a dependency.
+
+Example:
+
+  _LOADS = metrics.REGISTRY.Counter(
+      'tensorboard_loads_total', 'Number of loads.', labels=('kind',))
+  _LOADS.Inc(labels=('full',))
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import bisect
+import collections
+import math
+import threading
+
+import six
+
+
+# Suitable for durations in seconds, as in the Prometheus clients.
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5, 5.0,
+                   7.5, 10.0, float('inf'))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Registry(object):
+  """A set of metrics, rendered together; thread-safe."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._metrics = collections.OrderedDict()
+
+  def Counter(self, name, documentation, labels=()):
+    """Defines a `Counter`, or returns the existing one of that name."""
+    return self._Define(Counter, name, documentation, labels)
+
+  def Gauge(self, name, documentation, labels=()):
+    """Defines a `Gauge`, or returns the existing one of that name."""
+    return self._Define(Gauge, name, documentation, labels)
+
+  def Histogram(self, name, documentation, labels=(),
+                buckets=DEFAULT_BUCKETS):
+    """Defines a `Histogram`, or returns the existing one of that name."""
+    return self._Define(Histogram, name, documentation, labels, buckets)
+
+  def GaugeFunction(self, name, documentation, labels, fn):
+    """Defines a gauge whose values are computed whenever it is rendered.
+
+    Defining it again replaces the function, such as when a new object
+    provides the values.
+
+    Args:
+      name: The name of the metric.
+      documentation: A description of the metric.
+      labels: A tuple of label names.
+      fn: A function taking no arguments that returns a dict mapping tuples
+        of label values to numbers.
+    """
+    with self._lock:
+      self._metrics[name] = _GaugeFunction(name, documentation, labels, fn)
+
+  def _Define(self, cls, name, documentation, labels, *args):
+    with self._lock:
+      metric = self._metrics.get(name)
+      if metric is None:
+        metric = cls(name, documentation, tuple(labels), *args)
+        self._metrics[name] = metric
+      elif type(metric) is not cls or metric.labels != tuple(labels):  # pylint: disable=unidiomatic-typecheck
+        raise ValueError('Metric %r is already defined differently' % name)
+      return metric
+
+  def Render(self):
+    """Returns all metrics in the Prometheus text format, as a string."""
+    with self._lock:
+      metrics = list(self._metrics.values())
+    lines = []
+    for metric in metrics:
+      lines.append('# HELP %s %s' % (metric.name, _EscapeHelp(
+          metric.documentation)))
+      lines.append('# TYPE %s %s' % (metric.name, metric.type))
+      for (name, labels, value) in metric.Samples():
+        lines.append('%s%s %s' % (name, _FormatLabels(labels),
+                                  _FormatValue(value)))
+    return '\n'.join(lines) + '\n'
+
+
+class _Metric(object):
+  """A metric with a value per combination of label values."""
+
+  type = None
+
+  def __init__(self, name, documentation, labels):
+    self.name = name
+    self.documentation = documentation
+    self.labels = labels
+    self._lock = threading.Lock()
+    self._values = {}
+
+  def _CheckLabels(self, labels):
+    labels = tuple(six.text_type(value) for value in labels)
+    if len(labels) != len(self.labels):
+      raise ValueError('Metric %r takes labels %r, got %r'
+                       % (self.name, self.labels, labels))
+    return labels
+
+  def Remove(self, labels=()):
+    """Forgets the value for some label values, if any."""
+    labels = self._CheckLabels(labels)
+    with self._lock:
+      self._values.pop(labels, None)
+
+  def Value(self, labels=()):
+    """Returns the current value for some label values."""
+    labels = self._CheckLabels(labels)
+    with self._lock:
+      return self._values.get(labels, 0)
+
+  def Samples(self):
+    with self._lock:
+      items = sorted(self._values.items())
+    return [(self.name, list(zip(self.labels, labels)), value)
+            for (labels, value) in items]
+
+
+class Counter(_Metric):
+  """A number that only goes up, such as a count of events."""
+
+  type = 'counter'
+
+  def Inc(self, amount=1, labels=()):
+    if amount < 0:
+      raise ValueError('Counters can only be increased, not by %r' % amount)
+    labels = self._CheckLabels(labels)
+    with self._lock:
+      self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+  """A number that goes up and down, such as a duration of the latest load."""
+
+  type = 'gauge'
+
+  def Set(self, value, labels=()):
+    labels = self._CheckLabels(labels)
+    with self._lock:
+      self._values[labels] = value
+
+
+class Histogram(_Metric):
+  """Counts observations, such as latencies, in cumulative buckets."""
+
+  type = 'histogram'
+
+  def __init__(self, name, documentation, labels, buckets):
+    super(Histogram, self).__init__(name, documentation, labels)
+    buckets = tuple(sorted(buckets))
+    if buckets[-1] != float('inf'):
+      buckets += (float('inf'),)
+    self._buckets = buckets
+
+  def Observe(self, value, labels=()):
+    labels = self._CheckLabels(labels)
+    with self._lock:
+      state = self._values.get(labels)
+      if state is None:
+        # The count of each bucket on its own, and the sum.
+        state = self._values[labels] = [[0] * len(self._buckets), 0.0]
+      state[0][bisect.bisect_left(self._buckets, value)] += 1
+      state[1] += value
+
+  def Value(self, labels=()):
+    """Returns the number of observations for some label values."""
+    labels = self._CheckLabels(labels)
+    with self._lock:
+      state = self._values.get(labels)
+      return sum(state[0]) if state else 0
+
+  def Samples(self):
+    with self._lock:
+      items = sorted((labels, (list(counts), total))
+                     for (labels, (counts, total)) in self._values.items())
+    samples = []
+    for (labels, (counts, total)) in items:
+      label_pairs = list(zip(self.labels, labels))
+      cumulative = 0
+      for (bound, count) in zip(self._buckets, counts):
+        cumulative += count
+        samples.append((self.name + '_bucket',
+                        label_pairs + [('le', _FormatValue(bound))],
+                        cumulative))
+      samples.append((self.name + '_sum', label_pairs, total))
+      samples.append((self.name + '_count', label_pairs, cumulative))
+    return samples
+
+
+class _GaugeFunction(object):
+
+  type = 'gauge'
+
+  def __init__(self, name, documentation, labels, fn):
+    self.name = name
+    self.documentation = documentation
+    self.labels = tuple(labels)
+    self._fn = fn
+
+  def Samples(self):
+    values = self._fn()
+    return [(self.name, list(zip(self.labels, labels)), value)
+            for (labels, value) in sorted(six.iteritems(values))]
+
+
+def _EscapeHelp(text):
+  return text.replace('\\', r'\\').replace('\n', r'\n')
+
+
+def _FormatLabels(label_pairs):
+  if not label_pairs:
+    return ''
+  return '{%s}' % ','.join(
+      '%s="%s"' % (name, six.text_type(value).replace('\\', r'\\')
+                   .replace('"', r'\"').replace('\n', r'\n'))
+      for (name, value) in label_pairs)
+
+
+def _FormatValue(value):
+  if value == float('inf'):
+    return '+Inf'
+  if value == float('-inf'):
+    return '-Inf'
+  if isinstance(value, float) and math.isnan(value):
+    return 'NaN'
+  return repr(value) if isinstance(value, float) else str(value)
+
+
+# The registry of the metrics that TensorBoard serves.
+REGISTRY = Registry()
@@ -0,0 +1,102 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for tensorboard.backend.metrics."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from tensorboard import test as tb_test
+from tensorboard.backend import metrics
+
+
+class RegistryTest(tb_test.TestCase):
+
+  def setUp(self):
+    super(RegistryTest, self).setUp()
+    self.registry = metrics.Registry()
+
+  def testCounter(self):
+    counter = self.registry.Counter('loads_total', 'Loads.', labels=('kind',))
+    counter.Inc(labels=('full',))
+    counter.Inc(2, labels=('full',))
+    counter.Inc(labels=('partial',))
+    self.assertEqual(3, counter.Value(labels=('full',)))
+    self.assertEqual(0, counter.Value(labels=('other',)))
+    self.assertEqual(
+        '# HELP loads_total Loads.\n'
+        '# TYPE loads_total counter\n'
+        'loads_total{kind="full"} 3\n'
+        'loads_total{kind="partial"} 1\n',
+        self.registry.Render())
+    with self.assertRaises(ValueError):
+      counter.Inc(-1, labels=('full',))
+    with self.assertRaises(ValueError):
+      counter.Inc()
+
+  def testGauge(self):
+    gauge = self.registry.Gauge('seconds', 'Seconds.')
+    gauge.Set(1.5)
+    gauge.Set(0.25)
+    self.assertIn('\nseconds 0.25\n', self.registry.Render())
+    gauge.Remove()
+    self.assertNotIn('\nseconds ', self.registry.Render())
+
+  def testHistogram(self):
+    histogram = self.registry.Histogram(
+        'latency', 'Latency.', buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+      histogram.Observe(value)
+    self.assertEqual(4, histogram.Value())
+    self.assertEqual(
+        '# HELP latency Latency.\n'
+        '# TYPE latency histogram\n'
+        'latency_bucket{le="0.1"} 2\n'
+        'latency_bucket{le="1.0"} 3\n'
+        'latency_bucket{le="+Inf"} 4\n'
+        'latency_sum 2.65\n'
+        'latency_count 4\n',
+        self.registry.Render())
+
+  def testDefinesEachNameOnce(self):
+    counter = self.registry.Counter('c', 'C.')
+    self.assertIs(counter, self.registry.Counter('c', 'C.'))
+    with self.assertRaises(ValueError):
+      self.registry.Gauge('c', 'C.')
+    with self.assertRaises(ValueError):
+      self.registry.Counter('c', 'C.', labels=('kind',))
+
+  def testEscapes(self):
+    gauge = self.registry.Gauge('g', 'Back\\slash\nnewline.', labels=('run',))
+    gauge.Set(1, labels=('a "b"\\c\n',))
+    self.assertEqual(
+        '# HELP g Back\\\\slash\\nnewline.\n'
+        '# TYPE g gauge\n'
+        'g{run="a \\"b\\"\\\\c\\n"} 1\n',
+        self.registry.Render())
+
+  def testGaugeFunction(self):
+    values = {('a',): 1}
+    self.registry.GaugeFunction(
+        'items', 'Items.', ('plugin',), lambda: dict(values))
+    self.assertIn('items{plugin="a"} 1\n', self.registry.Render())
+    values[('b',)] = 2
+    self.assertIn('items{plugin="b"} 2\n', self.registry.Render())
+    self.registry.GaugeFunction('items', 'Items.', ('plugin',), dict)
+    self.assertNotIn('items{', self.registry.Render())
+
+
+if __name__ == '__main__':
+  tb_test.main()
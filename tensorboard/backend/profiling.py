@@ -0,0 +1,306 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Profiles of slow requests and reloads, kept for later download.
+
+A `Profiler` profiles every request and reload while it runs, and keeps the
+profile only if it turned out to take longer than a threshold. The latest
+profiles are kept in a ring buffer, which TensorBoard serves at
+`/debug/profiles`, so that hot spots of a live server can be found without
+attaching a debugger.
+
+Two kinds of profiles are supported:
+
+  * `SAMPLE` profiles are taken by a background thread that looks at the
+    stacks of the profiled threads every few milliseconds. They cost little,
+    and are rendered in the "collapsed stacks" format of flame graph tools,
+    with one line of `;`-separated frames and a number of samples per stack.
+  * `CPROFILE` profiles are taken by `cProfile`, which traces every function
+    call of the profiled thread and so makes it notably slower. They are
+    rendered like `pstats.Stats.dump_stats`, and can be loaded with
+    `pstats.Stats(filename)`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import contextlib
+import cProfile
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+
+import six
+from six.moves import _thread
+
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+SAMPLE = 'sample'
+CPROFILE = 'cprofile'
+MODES = (SAMPLE, CPROFILE)
+
+# Kinds of profiled activities.
+REQUEST = 'request'
+RELOAD = 'reload'
+
+# How often the stacks of profiled threads are sampled.
+_SAMPLE_INTERVAL_SECS = 0.005
+
+# The IDs of the sampler threads of all profilers, which are never sampled.
+_sampler_threads = set()
+
+
+class Profile(collections.namedtuple(
+    'Profile', ('id', 'kind', 'name', 'mode', 'start_time', 'duration_secs',
+                'data'))):
+  """A profile of a slow activity.
+
+  Fields:
+    id: An integer that identifies the profile among those of its profiler.
+    kind: `REQUEST` or `RELOAD`.
+    name: What was profiled, such as the route of a request.
+    mode: `SAMPLE` or `CPROFILE`.
+    start_time: When the activity started, in seconds since the epoch.
+    duration_secs: How long the activity took.
+    data: The profile as bytes, in the format of its mode.
+  """
+
+  __slots__ = ()
+
+  def Summary(self):
+    """Returns a JSON-able dict describing the profile, without its data."""
+    return {
+        'id': self.id,
+        'kind': self.kind,
+        'name': self.name,
+        'mode': self.mode,
+        'start_time': self.start_time,
+        'duration_secs': self.duration_secs,
+        'size': len(self.data),
+    }
+
+
+class Profiler(object):
+  """Keeps profiles of activities that take longer than a threshold.
+
+  Thread-safe. Activities of different threads may be profiled at the same
+  time, but not nested activities of the same thread in `CPROFILE` mode.
+  """
+
+  def __init__(self, request_threshold_secs=0, reload_threshold_secs=0,
+               mode=SAMPLE, max_profiles=20,
+               sample_interval_secs=_SAMPLE_INTERVAL_SECS):
+    """Creates a profiler.
+
+    Args:
+      request_threshold_secs: Requests that take longer than this are kept.
+        Zero or less to not profile requests.
+      reload_threshold_secs: Reloads that take longer than this are kept.
+        Zero or less to not profile reloads.
+      mode: One of `MODES`.
+      max_profiles: How many of the latest profiles to keep.
+      sample_interval_secs: How often stacks are sampled in `SAMPLE` mode.
+
+    Raises:
+      ValueError: If `mode` is unknown or `max_profiles` is not positive.
+    """
+    if mode not in MODES:
+      raise ValueError('Unknown profiler mode: %r' % (mode,))
+    if max_profiles <= 0:
+      raise ValueError('max_profiles must be positive, was %r'
+                       % (max_profiles,))
+    self._thresholds = {
+        REQUEST: request_threshold_secs,
+        RELOAD: reload_threshold_secs,
+    }
+    self._mode = mode
+    self._sample_interval_secs = sample_interval_secs
+    self._lock = threading.Lock()
+    self._profiles = collections.deque(maxlen=max_profiles)
+    self._next_id = 1
+    # For `SAMPLE` mode; guarded by `_lock`.
+    self._sampling = set()
+    self._sampling_changed = threading.Condition(self._lock)
+    self._sampler = None
+
+  @property
+  def enabled(self):
+    """Whether some kind of activity is profiled."""
+    return any(threshold > 0 for threshold in self._thresholds.values())
+
+  def Enabled(self, kind):
+    """Returns whether activities of a kind are profiled."""
+    return self._thresholds[kind] > 0
+
+  @contextlib.contextmanager
+  def Profile(self, kind, name):
+    """Profiles the activity of the calling thread inside the context.
+
+    The profile is kept if the activity takes longer than the threshold of its
+    kind, including when it raises.
+
+    Args:
+      kind: `REQUEST` or `RELOAD`.
+      name: What is profiled, such as the route of a request.
+    """
+    if not self.Enabled(kind):
+      yield
+      return
+    if self._mode == CPROFILE:
+      activity = _CProfileActivity()
+    else:
+      self._StartSampler()
+      activity = _SampledActivity(all_threads=kind == RELOAD)
+    start = time.time()
+    self._StartActivity(activity)
+    try:
+      yield
+    finally:
+      self._StopActivity(activity)
+      duration = time.time() - start
+      if duration > self._thresholds[kind]:
+        self._Keep(kind, name, start, duration, activity.Render())
+
+  def Profiles(self):
+    """Returns the kept `Profile`s, latest first."""
+    with self._lock:
+      return list(reversed(self._profiles))
+
+  def Get(self, profile_id):
+    """Returns the kept `Profile` with some ID, or None."""
+    with self._lock:
+      for profile in self._profiles:
+        if profile.id == profile_id:
+          return profile
+    return None
+
+  def _Keep(self, kind, name, start_time, duration, data):
+    with self._lock:
+      profile = Profile(
+          id=self._next_id, kind=kind, name=name, mode=self._mode,
+          start_time=start_time, duration_secs=duration, data=data)
+      self._next_id += 1
+      self._profiles.append(profile)
+    logger.info('Kept profile %d of %s %s, which took %0.3f secs',
+                profile.id, kind, name, duration)
+
+  def _StartActivity(self, activity):
+    if isinstance(activity, _CProfileActivity):
+      activity.profile.enable()
+      return
+    with self._lock:
+      self._sampling.add(activity)
+      self._sampling_changed.notify()
+
+  def _StopActivity(self, activity):
+    if isinstance(activity, _CProfileActivity):
+      activity.profile.disable()
+      return
+    with self._lock:
+      self._sampling.discard(activity)
+
+  def _StartSampler(self):
+    """Starts the sampler thread if needed."""
+    with self._lock:
+      if self._sampler is None:
+        self._sampler = threading.Thread(
+            target=self._SampleForever, name='ProfileSampler')
+        self._sampler.daemon = True
+        self._sampler.start()
+        _sampler_threads.add(self._sampler.ident)
+
+  def _SampleForever(self):
+    while True:
+      with self._lock:
+        while not self._sampling:
+          self._sampling_changed.wait()
+        activities = list(self._sampling)
+      frames = sys._current_frames()  # pylint: disable=protected-access
+      thread_names = dict((t.ident, t.name) for t in threading.enumerate())
+      stacks = {}
+      for activity in activities:
+        thread_ids = (activity.thread_ids(frames) if activity.all_threads
+                      else [activity.thread_id])
+        for thread_id in thread_ids:
+          if thread_id not in stacks and thread_id in frames:
+            stacks[thread_id] = _Stack(
+                thread_names.get(thread_id, str(thread_id)), frames[thread_id])
+      del frames
+      with self._lock:
+        for activity in activities:
+          if activity in self._sampling:
+            activity.Add(stacks)
+      time.sleep(self._sample_interval_secs)
+
+
+class _SampledActivity(object):
+  """Stacks sampled from the threads of an activity."""
+
+  def __init__(self, all_threads):
+    """Creates an activity of the calling thread.
+
+    Args:
+      all_threads: Whether to sample all threads rather than just the calling
+        one, such as for reloads that fan out to worker threads.
+    """
+    self.all_threads = all_threads
+    self.thread_id = _thread.get_ident()
+    self._stack_counts = collections.Counter()
+
+  def thread_ids(self, frames):
+    return [thread_id for thread_id in frames
+            if thread_id not in _sampler_threads]
+
+  def Add(self, stacks):
+    """Counts the stacks of one sample; called with the profiler lock held."""
+    if self.all_threads:
+      self._stack_counts.update(six.itervalues(stacks))
+    elif self.thread_id in stacks:
+      self._stack_counts[stacks[self.thread_id]] += 1
+
+  def Render(self):
+    lines = ['%s %d\n' % (';'.join(stack), count)
+             for (stack, count) in sorted(six.iteritems(self._stack_counts))]
+    return ''.join(lines).encode('utf-8')
+
+
+class _CProfileActivity(object):
+  """A `cProfile` profile of the calling thread."""
+
+  def __init__(self):
+    self.profile = cProfile.Profile()
+
+  def Render(self):
+    return marshal.dumps(pstats.Stats(self.profile).stats)
+
+
+def _Stack(thread_name, frame):
+  """Returns a tuple of frame names from the outermost frame to `frame`."""
+  names = []
+  while frame is not None:
+    code = frame.f_code
+    names.append('%s (%s)' % (code.co_name, os.path.basename(
+        code.co_filename)))
+    frame = frame.f_back
+  names.append(thread_name)
+  names.reverse()
+  return tuple(name.replace(';', ':') for name in names)
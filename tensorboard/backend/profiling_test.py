@@ -0,0 +1,123 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for tensorboard.backend.profiling."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import marshal
+import threading
+import time
+
+from tensorboard import test as tb_test
+from tensorboard.backend import profiling
+
+
+def _SlowFunction(secs):
+  end = time.time() + secs
+  while time.time() < end:
+    pass
+
+
+class ProfilerTest(tb_test.TestCase):
+
+  def testValidatesArguments(self):
+    with self.assertRaises(ValueError):
+      profiling.Profiler(mode='perf')
+    with self.assertRaises(ValueError):
+      profiling.Profiler(max_profiles=0)
+
+  def testDisabledByDefault(self):
+    profiler = profiling.Profiler()
+    self.assertFalse(profiler.enabled)
+    with profiler.Profile(profiling.REQUEST, '/data/runs'):
+      _SlowFunction(0.01)
+    self.assertEqual([], profiler.Profiles())
+
+  def testKeepsOnlySlowActivities(self):
+    profiler = profiling.Profiler(request_threshold_secs=0.05)
+    self.assertTrue(profiler.enabled)
+    self.assertFalse(profiler.Enabled(profiling.RELOAD))
+    with profiler.Profile(profiling.REQUEST, '/fast'):
+      pass
+    with profiler.Profile(profiling.REQUEST, '/slow'):
+      _SlowFunction(0.1)
+    with profiler.Profile(profiling.RELOAD, 'reload'):
+      _SlowFunction(0.1)
+    (profile,) = profiler.Profiles()
+    self.assertEqual(profiling.REQUEST, profile.kind)
+    self.assertEqual('/slow', profile.name)
+    self.assertEqual(profiling.SAMPLE, profile.mode)
+    self.assertGreater(profile.duration_secs, 0.05)
+    self.assertIs(profile, profiler.Get(profile.id))
+    self.assertIsNone(profiler.Get(profile.id + 1))
+    self.assertEqual(profile.id, profile.Summary()['id'])
+
+  def testSampledStacks(self):
+    profiler = profiling.Profiler(request_threshold_secs=0.01,
+                                  sample_interval_secs=0.001)
+    with profiler.Profile(profiling.REQUEST, '/slow'):
+      _SlowFunction(0.2)
+    (profile,) = profiler.Profiles()
+    lines = profile.data.decode('utf-8').splitlines()
+    self.assertTrue(lines)
+    for line in lines:
+      (stack, count) = line.rsplit(' ', 1)
+      self.assertGreater(int(count), 0)
+      self.assertEqual(threading.current_thread().name, stack.split(';')[0])
+    self.assertTrue(any('_SlowFunction (profiling_test.py)' in line
+                        for line in lines))
+
+  def testReloadsSampleAllThreads(self):
+    profiler = profiling.Profiler(reload_threshold_secs=0.01,
+                                  sample_interval_secs=0.001)
+    worker = threading.Thread(
+        target=_SlowFunction, args=(0.2,), name='ReloadWorker')
+    with profiler.Profile(profiling.RELOAD, 'reload'):
+      worker.start()
+      worker.join()
+    (profile,) = profiler.Profiles()
+    self.assertIn(b'ReloadWorker;', profile.data)
+    self.assertNotIn(b'ProfileSampler', profile.data)
+
+  def testCProfile(self):
+    profiler = profiling.Profiler(request_threshold_secs=0.01,
+                                  mode=profiling.CPROFILE)
+    with profiler.Profile(profiling.REQUEST, '/slow'):
+      _SlowFunction(0.05)
+    (profile,) = profiler.Profiles()
+    stats = marshal.loads(profile.data)
+    self.assertIn('_SlowFunction', [name for (_, _, name) in stats])
+
+  def testKeepsProfilesOfFailures(self):
+    profiler = profiling.Profiler(request_threshold_secs=0.01)
+    with self.assertRaises(ZeroDivisionError):
+      with profiler.Profile(profiling.REQUEST, '/broken'):
+        _SlowFunction(0.05)
+        1 / 0  # pylint: disable=pointless-statement
+    self.assertEqual(['/broken'], [p.name for p in profiler.Profiles()])
+
+  def testRingBuffer(self):
+    profiler = profiling.Profiler(request_threshold_secs=0.001, max_profiles=2)
+    for name in ('a', 'b', 'c'):
+      with profiler.Profile(profiling.REQUEST, name):
+        _SlowFunction(0.01)
+    self.assertEqual(['c', 'b'], [p.name for p in profiler.Profiles()])
+    self.assertEqual([3, 2], [p.id for p in profiler.Profiles()])
+
+
+if __name__ == '__main__':
+  tb_test.main()
@@ -0,0 +1,174 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""A cache of serialized responses to data routes.
+
+Dashboards poll the same routes over and over, and most of the time the
+underlying data has not changed. A `ResponseCache` keeps the serialized and
+compressed bodies of recent responses, keyed by the request, by the
+generations of the data they were computed from (see
+`EventAccumulator.Generation`), and by their content coding, so that a
+repeated request for unchanged data costs a dictionary lookup.
+
+Keys also make the ETags of such responses, so that a browser that revalidates
+unchanged data gets a 304 Not Modified without the response being computed or
+looked up at all.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+from tensorboard.backend import http_util
+from tensorboard.backend import lru_cache
+
+
+# Part of every ETag, since generations restart with the process and the
+# generations of different data in an earlier process may be the same.
+_ETAG_SALT = os.urandom(8)
+
+
+class ResponseCache(lru_cache.LruCache):
+  """A thread-safe LRU cache of response bodies, bounded in bytes.
+
+  Entries are `(content, content_type, content_encoding)` triples.
+  """
+
+  def __init__(self, max_bytes):
+    """Creates an empty cache.
+
+    Args:
+      max_bytes: The maximum total size of the cached bodies. Bodies larger
+        than a quarter of it are not cached.
+    """
+    super(ResponseCache, self).__init__(
+        max_bytes, size_fn=lambda entry: len(entry[0]))
+
+
+def RequestKey(request, generations):
+  """Returns a cache key for a request to a data route.
+
+  Args:
+    request: A werkzeug Request.
+    generations: A hashable value that changes whenever the data that the
+      response is computed from does, or None if it cannot be told.
+
+  Returns:
+    A hashable key, or None if the response should not be cached.
+  """
+  if generations is None:
+    return None
+  # Include form data, which some routes accept for long lists of arguments,
+  # and the Accept header, which some routes choose their output format by.
+  args = tuple(sorted(request.values.items(multi=True)))
+  return (request.path, args, request.headers.get('Accept'), generations)
+
+
+def MultiplexerGenerations(multiplexer, run_tag_pairs):
+  """Returns the generations of some series of a multiplexer.
+
+  Args:
+    multiplexer: A multiplexer, which may not support generations.
+    run_tag_pairs: An iterable of `(run, tag)` pairs.
+
+  Returns:
+    A tuple of the generation of each series, or None if some run does not
+    exist or the multiplexer does not keep track of generations.
+  """
+  generation = getattr(multiplexer, 'Generation', None)
+  if generation is None:
+    return None
+  try:
+    return tuple(generation(run, tag) for (run, tag) in run_tag_pairs)
+  except KeyError:
+    return None
+
+
+def SeriesKey(request, multiplexer, run_tag_pairs):
+  """Returns a cache key for a request for some series of a multiplexer.
+
+  Args:
+    request: A werkzeug Request.
+    multiplexer: The multiplexer that the response is computed from, or None
+      if it is computed from elsewhere, in which case it is not cached.
+    run_tag_pairs: An iterable of the `(run, tag)` pairs of the series.
+
+  Returns:
+    A hashable key, or None if the response should not be cached.
+  """
+  return RequestKey(
+      request, MultiplexerGenerations(multiplexer, run_tag_pairs))
+
+
+def IndexKey(request, multiplexer):
+  """Returns a cache key for a request computed from a multiplexer's index.
+
+  Such responses, like those of `tags` routes, only change when runs or tags
+  are added or removed.
+
+  Args:
+    request: A werkzeug Request.
+    multiplexer: The multiplexer that the response is computed from, or None
+      if it is computed from elsewhere, in which case it is not cached.
+
+  Returns:
+    A hashable key, or None if the response should not be cached.
+  """
+  index_snapshot = getattr(multiplexer, 'IndexSnapshot', None)
+  if index_snapshot is None:
+    return None
+  return RequestKey(request, ('index', index_snapshot().version))
+
+
+def Respond(cache, request, key, compute_fn):
+  """Responds from the cache, computing and caching the response if needed.
+
+  Responses with a key have an ETag derived from it, and are 304 Not Modified
+  if the request has that ETag, even if `cache` is None.
+
+  Args:
+    cache: A `ResponseCache`, or None to never cache.
+    request: A werkzeug Request.
+    key: A key from `RequestKey`, or None to not cache this response.
+    compute_fn: A function taking no arguments that returns a `(content,
+      content_type)` pair as for `http_util.Respond`. Exceptions propagate
+      and nothing is cached.
+
+  Returns:
+    A werkzeug Response.
+  """
+  if key is None:
+    (content, content_type) = compute_fn()
+    return http_util.Respond(request, content, content_type)
+  etag = http_util.ETag(_ETAG_SALT, key)
+  not_modified = http_util.NotModified(request, etag)
+  if not_modified is not None:
+    return not_modified
+  if cache is None:
+    (content, content_type) = compute_fn()
+    return http_util.Respond(request, content, content_type, etag=etag)
+  # Bodies are kept compressed with each coding that clients prefer. Gzipped
+  # bodies also serve clients that accept no compression.
+  coding = http_util.NegotiateCoding(request) or http_util.GZIP
+  entry = cache.Get((key, coding))
+  if entry is None:
+    (content, content_type) = compute_fn()
+    entry = http_util.Precompress(content, content_type, coding=coding)
+    cache.Put((key, coding), entry)
+  (content, content_type, content_encoding) = entry
+  return http_util.Respond(
+      request, content, content_type, content_encoding=content_encoding,
+      etag=etag)
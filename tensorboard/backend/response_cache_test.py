@@ -0,0 +1,208 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for the response cache."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import gzip
+import json
+import unittest
+
+import six
+from werkzeug import test as wtest
+from werkzeug import wrappers
+
+from tensorboard import test as tb_test
+from tensorboard.backend import http_util
+from tensorboard.backend import response_cache
+
+
+class _FakeMultiplexer(object):
+
+  def __init__(self, generations):
+    self.generations = generations
+    self.index_version = 1
+
+  def Generation(self, run, tag):
+    return self.generations[run].get(tag, 0)
+
+  def IndexSnapshot(self):
+    return collections.namedtuple('Snapshot', ['version'])(self.index_version)
+
+
+def _Request(query_string='', headers=None):
+  return wrappers.Request(wtest.EnvironBuilder(
+      path='/data/plugin/foo/bar', query_string=query_string,
+      headers=headers).get_environ())
+
+
+class ResponseCacheTest(tb_test.TestCase):
+
+  def testEvictsLeastRecentlyUsed(self):
+    cache = response_cache.ResponseCache(30)
+    cache.Put('a', (b'x' * 7, 'text/plain', None))
+    cache.Put('b', (b'x' * 7, 'text/plain', None))
+    cache.Put('c', (b'x' * 7, 'text/plain', None))
+    cache.Put('d', (b'x' * 7, 'text/plain', None))
+    self.assertIsNotNone(cache.Get('a'))
+    cache.Put('e', (b'x' * 7, 'text/plain', None))
+    self.assertIsNone(cache.Get('b'))
+    self.assertIsNotNone(cache.Get('a'))
+    self.assertIsNotNone(cache.Get('e'))
+    self.assertEqual(28, cache.Size())
+
+  def testSkipsLargeBodies(self):
+    cache = response_cache.ResponseCache(30)
+    cache.Put('a', (b'x' * 8, 'text/plain', None))
+    self.assertIsNone(cache.Get('a'))
+    self.assertEqual(0, cache.Size())
+
+  def testReplacesEntries(self):
+    cache = response_cache.ResponseCache(30)
+    cache.Put('a', (b'x' * 7, 'text/plain', None))
+    cache.Put('a', (b'x' * 3, 'text/plain', None))
+    self.assertEqual(3, cache.Size())
+    self.assertEqual(b'xxx', cache.Get('a')[0])
+
+
+class RequestKeyTest(tb_test.TestCase):
+
+  def testNoneGenerations(self):
+    self.assertIsNone(response_cache.RequestKey(_Request('run=a'), None))
+
+  def testDependsOnArgumentsAndGenerations(self):
+    key = response_cache.RequestKey(_Request('run=a&tag=b'), (1,))
+    self.assertEqual(
+        key, response_cache.RequestKey(_Request('tag=b&run=a'), (1,)))
+    self.assertNotEqual(
+        key, response_cache.RequestKey(_Request('run=a&tag=c'), (1,)))
+    self.assertNotEqual(
+        key, response_cache.RequestKey(_Request('run=a&tag=b'), (2,)))
+
+  def testDependsOnAcceptHeader(self):
+    key = response_cache.RequestKey(_Request('run=a'), (1,))
+    self.assertNotEqual(key, response_cache.RequestKey(
+        _Request('run=a', headers={'Accept': 'text/csv'}), (1,)))
+
+  def testSeriesKey(self):
+    multiplexer = _FakeMultiplexer({'a': {'b': 1}})
+    request = _Request('run=a&tag=b')
+    key = response_cache.SeriesKey(request, multiplexer, [('a', 'b')])
+    self.assertIsNotNone(key)
+    multiplexer.generations['a']['b'] = 2
+    self.assertNotEqual(
+        key, response_cache.SeriesKey(request, multiplexer, [('a', 'b')]))
+    self.assertIsNone(
+        response_cache.SeriesKey(request, multiplexer, [('missing', 'b')]))
+    self.assertIsNone(response_cache.SeriesKey(request, None, [('a', 'b')]))
+    self.assertIsNone(
+        response_cache.SeriesKey(request, object(), [('a', 'b')]))
+
+  def testIndexKey(self):
+    multiplexer = _FakeMultiplexer({})
+    request = _Request()
+    key = response_cache.IndexKey(request, multiplexer)
+    self.assertEqual(key, response_cache.IndexKey(request, multiplexer))
+    multiplexer.index_version += 1
+    self.assertNotEqual(key, response_cache.IndexKey(request, multiplexer))
+    self.assertIsNone(response_cache.IndexKey(request, None))
+
+
+class RespondTest(tb_test.TestCase):
+
+  def setUp(self):
+    super(RespondTest, self).setUp()
+    self.cache = response_cache.ResponseCache(2**20)
+    self.calls = 0
+
+  def _Compute(self):
+    self.calls += 1
+    return ({'values': list(range(1000))}, 'application/json')
+
+  def testCachesResponses(self):
+    key = response_cache.RequestKey(_Request(), (1,))
+    for _ in range(3):
+      response = response_cache.Respond(
+          self.cache, _Request(), key, self._Compute)
+      self.assertEqual(list(range(1000)),
+                       json.loads(b''.join(response.response))['values'])
+    self.assertEqual(1, self.calls)
+    self.assertEqual(2, self.cache.hits)
+
+  def testServesCompressedBodiesToGzipClients(self):
+    key = response_cache.RequestKey(_Request(), (1,))
+    response_cache.Respond(self.cache, _Request(), key, self._Compute)
+    response = response_cache.Respond(
+        self.cache, _Request(headers={'Accept-Encoding': 'gzip'}), key,
+        self._Compute)
+    self.assertEqual('gzip', response.headers.get('Content-Encoding'))
+    body = gzip.GzipFile(
+        fileobj=six.BytesIO(b''.join(response.response))).read()
+    self.assertEqual(list(range(1000)), json.loads(body)['values'])
+    self.assertEqual(1, self.calls)
+
+  @unittest.skipIf(http_util.brotli is None, 'brotli is not installed')
+  def testKeepsBodiesPerCoding(self):
+    key = response_cache.RequestKey(_Request(), (1,))
+    for accept_encoding in ('gzip', 'br', 'gzip', 'br'):
+      response = response_cache.Respond(
+          self.cache, _Request(headers={'Accept-Encoding': accept_encoding}),
+          key, self._Compute)
+      self.assertEqual(accept_encoding,
+                       response.headers.get('Content-Encoding'))
+    self.assertEqual(2, self.calls)
+    self.assertEqual(2, self.cache.hits)
+
+  def testWithoutKey(self):
+    for _ in range(2):
+      response_cache.Respond(self.cache, _Request(), None, self._Compute)
+    self.assertEqual(2, self.calls)
+    self.assertEqual(0, self.cache.Size())
+
+  def testRevalidationSkipsComputing(self):
+    key = response_cache.RequestKey(_Request(), (1,))
+    for cache in (self.cache, None):
+      response = response_cache.Respond(cache, _Request(), key, self._Compute)
+      etag = response.headers.get('ETag')
+      self.assertTrue(etag)
+      self.calls = 0
+      response = response_cache.Respond(
+          cache, _Request(headers={'If-None-Match': etag}), key, self._Compute)
+      self.assertEqual(304, response.status_code)
+      self.assertEqual(etag, response.headers.get('ETag'))
+      self.assertEqual(0, self.calls)
+
+  def testETagsDependOnKeys(self):
+    def etag(generations):
+      key = response_cache.RequestKey(_Request(), generations)
+      return response_cache.Respond(
+          self.cache, _Request(), key, self._Compute).headers.get('ETag')
+    self.assertEqual(etag((1,)), etag((1,)))
+    self.assertNotEqual(etag((1,)), etag((2,)))
+
+  def testErrorsAreNotCached(self):
+    key = response_cache.RequestKey(_Request(), (1,))
+    def fail():
+      raise ValueError('nope')
+    with self.assertRaises(ValueError):
+      response_cache.Respond(self.cache, _Request(), key, fail)
+    self.assertEqual(0, self.cache.Size())
+
+
+if __name__ == '__main__':
+  tb_test.main()
@@ -0,0 +1,243 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Downscaled copies of images, for views that show many images small.
+
+Routes that serve images accept a `max_dim` query parameter, the largest
+width and height in pixels that the client will show the image at. Larger
+images are then served as PNG thumbnails that fit in that square, which for a
+grid of large images is a small fraction of the original bytes.
+
+A `ThumbnailCache` makes thumbnails on a fixed pool of worker threads, so
+that a grid that asks for hundreds of them at once does not decode hundreds
+of images at once, and keeps them in an LRU cache bounded in bytes. Images
+that already fit, that TensorFlow cannot decode (like SVGs), or that are
+served without TensorFlow are served as they are.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+from multiprocessing import pool as multiprocessing_pool
+
+from tensorboard.backend import lru_cache
+from tensorboard.util import op_evaluator
+
+
+MAX_DIM_ARG = 'max_dim'
+MIME_TYPE = 'image/png'
+
+# The bytes charged for each entry besides its thumbnail, so that entries for
+# images that are served as they are still count.
+_ENTRY_BYTES = 128
+
+
+def MaxDim(request):
+  """Returns the `max_dim` argument of a request, or None if it has none.
+
+  Args:
+    request: A werkzeug Request.
+
+  Raises:
+    ValueError: If the argument is not a positive integer.
+  """
+  value = request.args.get(MAX_DIM_ARG)
+  if value is None:
+    return None
+  max_dim = int(value)
+  if max_dim <= 0:
+    raise ValueError('%s must be positive, was %d' % (MAX_DIM_ARG, max_dim))
+  return max_dim
+
+
+class _TensorFlowThumbnailer(op_evaluator.PersistentOpEvaluator):
+  """Downscales an encoded image to fit in a square, as a PNG.
+
+  Arguments:
+    data: The encoded image, in any format that `tf.image.decode_image`
+      reads.
+    max_dim: The largest width and height of the thumbnail, in pixels.
+
+  Returns:
+    The PNG-encoded thumbnail, or None if the image already fits or cannot
+    be decoded.
+  """
+
+  def __init__(self):
+    super(_TensorFlowThumbnailer, self).__init__()
+    self._data_placeholder = None
+    self._max_dim_placeholder = None
+    self._fits_op = None
+    self._thumbnail_op = None
+
+  def initialize_graph(self):
+    import tensorflow.compat.v1 as tf
+    self._data_placeholder = tf.placeholder(
+        dtype=tf.string, name='image_to_shrink')
+    self._max_dim_placeholder = tf.placeholder(dtype=tf.int32, name='max_dim')
+    image = tf.image.decode_image(
+        self._data_placeholder, expand_animations=False)
+    size = tf.cast(tf.shape(image)[:2], tf.float64)
+    scale = (tf.cast(self._max_dim_placeholder, tf.float64) /
+             tf.reduce_max(size))
+    self._fits_op = scale >= 1
+
+    def shrink():
+      new_size = tf.maximum(tf.cast(tf.round(size * scale), tf.int32), 1)
+      # Area interpolation averages every pixel of the original into the
+      # thumbnail, which keeps fine detail from aliasing.
+      resized = tf.image.resize_area(image[tf.newaxis], new_size)[0]
+      return tf.image.encode_png(
+          tf.cast(tf.clip_by_value(tf.round(resized), 0, 255), tf.uint8))
+
+    self._thumbnail_op = tf.cond(
+        self._fits_op, lambda: tf.constant(b''), shrink)
+
+  def run(self, data, max_dim):  # pylint: disable=arguments-differ
+    import tensorflow.compat.v1 as tf
+    try:
+      (fits, thumbnail) = tf.get_default_session().run(
+          [self._fits_op, self._thumbnail_op],
+          feed_dict={self._data_placeholder: data,
+                     self._max_dim_placeholder: max_dim})
+    except tf.errors.InvalidArgumentError:
+      return None
+    return None if fits else thumbnail
+
+
+_make_thumbnail = _TensorFlowThumbnailer()
+
+
+def MakeThumbnail(data, max_dim):
+  """Downscales an encoded image to fit in a square, as a PNG.
+
+  Args:
+    data: The encoded image, as bytes.
+    max_dim: The largest width and height of the thumbnail, in pixels.
+
+  Returns:
+    The PNG-encoded thumbnail, or None if the original should be served:
+    if it already fits, if it cannot be decoded, or if TensorFlow is not
+    installed.
+  """
+  try:
+    return _make_thumbnail(data, max_dim)
+  except ImportError:
+    return None
+
+
+class ThumbnailCache(object):
+  """A thread-safe LRU cache of thumbnails, bounded in bytes.
+
+  Concurrent requests for the same thumbnail wait for a single worker to make
+  it.
+  """
+
+  def __init__(self, max_bytes, num_threads, make_thumbnail=MakeThumbnail):
+    """Creates an empty cache.
+
+    Args:
+      max_bytes: The maximum total size of the cached thumbnails. Thumbnails
+        larger than a quarter of it are not cached.
+      num_threads: The number of threads that make thumbnails.
+      make_thumbnail: A function like `MakeThumbnail`.
+    """
+    self._num_threads = num_threads
+    self._make_thumbnail = make_thumbnail
+    # Entries are 1-tuples, since a thumbnail of None is cached too.
+    self._entries = lru_cache.LruCache(
+        max_bytes, size_fn=lambda entry: _ENTRY_BYTES + len(entry[0] or b''))
+    # Maps the keys of thumbnails that are being made to their `AsyncResult`.
+    self._pending = {}
+    self._pool = None
+    self._lock = threading.Lock()
+
+  @property
+  def hits(self):
+    return self._entries.hits
+
+  @property
+  def misses(self):
+    return self._entries.misses
+
+  def Get(self, key, data_fn, max_dim):
+    """Returns a thumbnail, making it on a worker thread if needed.
+
+    Args:
+      key: A hashable key that identifies the image and `max_dim`, like
+        `(run, tag, step, sample, max_dim)`, or None to not cache the
+        thumbnail.
+      data_fn: A function taking no arguments that returns the encoded
+        image. It is only called if the thumbnail is not cached.
+      max_dim: The largest width and height of the thumbnail, in pixels.
+
+    Returns:
+      The PNG-encoded thumbnail, or None if the original should be served;
+      see `MakeThumbnail`. Exceptions of `data_fn` propagate and nothing is
+      cached.
+    """
+    with self._lock:
+      if key is not None:
+        entry = self._entries.Get(key)
+        if entry is not None:
+          return entry[0]
+      result = self._pending.get(key) if key is not None else None
+      if result is None:
+        if self._pool is None:
+          self._pool = multiprocessing_pool.ThreadPool(self._num_threads)
+        result = self._pool.apply_async(self._Make, (key, data_fn, max_dim))
+        if key is not None:
+          self._pending[key] = result
+    return result.get()
+
+  def _Make(self, key, data_fn, max_dim):
+    """Makes a thumbnail on a worker thread and caches it."""
+    try:
+      thumbnail = self._make_thumbnail(data_fn(), max_dim)
+    except Exception:
+      if key is not None:
+        with self._lock:
+          del self._pending[key]
+      raise
+    if key is None:
+      return thumbnail
+    with self._lock:
+      del self._pending[key]
+      self._entries.Put(key, (thumbnail,))
+    return thumbnail
+
+  def Size(self):
+    """Returns the total size of the cached thumbnails, in bytes."""
+    return self._entries.Size()
+
+
+def Thumbnail(cache, key, data_fn, max_dim):
+  """Returns a thumbnail from a cache, or makes one if there is no cache.
+
+  Args:
+    cache: A `ThumbnailCache`, or None to make the thumbnail on this thread.
+    key: As for `ThumbnailCache.Get`.
+    data_fn: As for `ThumbnailCache.Get`.
+    max_dim: As for `ThumbnailCache.Get`.
+
+  Returns:
+    The PNG-encoded thumbnail, or None if the original should be served; see
+    `MakeThumbnail`.
+  """
+  if cache is None:
+    return MakeThumbnail(data_fn(), max_dim)
+  return cache.Get(key, data_fn, max_dim)
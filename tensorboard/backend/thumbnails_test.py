@@ -0,0 +1,156 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for tensorboard.backend.thumbnails."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import struct
+import threading
+
+import numpy as np
+import six
+import tensorflow as tf
+from werkzeug import test as werkzeug_test
+from werkzeug import wrappers
+
+from tensorboard.backend import thumbnails
+from tensorboard.util import encoder
+
+
+def _Request(query_string=''):
+  return wrappers.Request(
+      werkzeug_test.EnvironBuilder(query_string=query_string).get_environ())
+
+
+def _Png(height, width, channels=3):
+  image = np.arange(height * width * channels) % 256
+  return encoder.encode_png(
+      image.reshape((height, width, channels)).astype(np.uint8))
+
+
+def _Shape(png):
+  """Reads the height, width and channels of a PNG from its IHDR chunk."""
+  (width, height) = struct.unpack('>II', png[16:24])
+  color_type = six.indexbytes(png, 25)
+  channels = {0: 1, 2: 3, 4: 2, 6: 4}[color_type]
+  return (height, width, channels)
+
+
+class MaxDimTest(tf.test.TestCase):
+
+  def testParsesArgument(self):
+    self.assertIsNone(thumbnails.MaxDim(_Request()))
+    self.assertEqual(200, thumbnails.MaxDim(_Request('max_dim=200')))
+
+  def testRejectsInvalidArgument(self):
+    for query_string in ('max_dim=0', 'max_dim=-3', 'max_dim=big'):
+      with self.assertRaises(ValueError):
+        thumbnails.MaxDim(_Request(query_string))
+
+
+class MakeThumbnailTest(tf.test.TestCase):
+
+  def testShrinksToFit(self):
+    self.assertEqual((10, 20, 3), _Shape(thumbnails.MakeThumbnail(
+        _Png(50, 100), 20)))
+    self.assertEqual((20, 7, 4), _Shape(thumbnails.MakeThumbnail(
+        _Png(300, 100, channels=4), 20)))
+    self.assertEqual((1, 16, 1), _Shape(thumbnails.MakeThumbnail(
+        _Png(2, 64, channels=1), 16)))
+
+  def testKeepsImagesThatFit(self):
+    self.assertIsNone(thumbnails.MakeThumbnail(_Png(50, 100), 100))
+    self.assertIsNone(thumbnails.MakeThumbnail(_Png(50, 100), 1000))
+
+  def testKeepsImagesThatCannotBeDecoded(self):
+    self.assertIsNone(thumbnails.MakeThumbnail(b'<svg ></svg>', 10))
+    self.assertIsNone(thumbnails.MakeThumbnail(_Png(50, 100)[:40], 10))
+
+
+class ThumbnailCacheTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(ThumbnailCacheTest, self).setUp()
+    self.made = []
+
+  def _MakeThumbnail(self, data, max_dim):
+    self.made.append(data)
+    return data[:max_dim]
+
+  def testCachesThumbnails(self):
+    cache = thumbnails.ThumbnailCache(10000, 2, self._MakeThumbnail)
+    self.assertEqual(b'abc', cache.Get('a', lambda: b'abcdef', 3))
+    self.assertEqual(b'abc', cache.Get('a', lambda: b'other', 3))
+    self.assertEqual(b'ab', cache.Get('b', lambda: b'abcdef', 2))
+    self.assertEqual([b'abcdef', b'abcdef'], self.made)
+    self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+  def testEvictsLeastRecentlyUsed(self):
+    cache = thumbnails.ThumbnailCache(1000, 1, self._MakeThumbnail)
+    for key in 'abcde':
+      cache.Get(key, lambda: b'x' * 100, 100)
+    self.assertLessEqual(cache.Size(), 1000)
+    cache.Get('e', lambda: b'y', 1)
+    cache.Get('a', lambda: b'y', 1)
+    self.assertEqual(6, len(self.made))
+    self.assertEqual(b'y', self.made[-1])
+
+  def testDoesNotCacheWithoutKey(self):
+    cache = thumbnails.ThumbnailCache(10000, 1, self._MakeThumbnail)
+    cache.Get(None, lambda: b'abc', 1)
+    cache.Get(None, lambda: b'abc', 1)
+    self.assertEqual(2, len(self.made))
+    self.assertEqual(0, cache.Size())
+
+  def testMakesConcurrentRequestsOnce(self):
+    started = threading.Event()
+    release = threading.Event()
+    def data_fn():
+      started.set()
+      release.wait()
+      return b'abc'
+    cache = thumbnails.ThumbnailCache(10000, 2, self._MakeThumbnail)
+    results = []
+    threads = [threading.Thread(
+        target=lambda: results.append(cache.Get('a', data_fn, 2)))
+               for _ in range(3)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+      thread.start()
+    release.set()
+    for thread in threads:
+      thread.join()
+    self.assertEqual([b'ab'] * 3, results)
+    self.assertEqual([b'abc'], self.made)
+
+  def testPropagatesErrors(self):
+    def data_fn():
+      raise KeyError('gone')
+    cache = thumbnails.ThumbnailCache(10000, 1, self._MakeThumbnail)
+    with six.assertRaisesRegex(self, KeyError, 'gone'):
+      cache.Get('a', data_fn, 2)
+    self.assertEqual(b'ab', cache.Get('a', lambda: b'abc', 2))
+
+  def testThumbnailWithoutCache(self):
+    self.assertIsNone(thumbnails.Thumbnail(None, 'a', lambda: _Png(5, 5), 10))
+    self.assertIsNotNone(
+        thumbnails.Thumbnail(None, 'a', lambda: _Png(50, 50), 10))
+
+
+if __name__ == '__main__':
+  tf.test.main()
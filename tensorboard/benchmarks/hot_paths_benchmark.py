@@ -0,0 +1,334 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for the hot paths of loading and serving data.
+
+Writes a synthetic logdir with `synthetic_logdir`, then measures:
+
+  * `event_file_loader`: reading all event files with `EventFileLoader`;
+  * `run_discovery`: finding the runs of the logdir;
+  * `directory_watcher`: reading all runs with `DirectoryWatcher`;
+  * `reservoir_add_item`: adding items to a `Reservoir`;
+  * `reload_cold`: adding and loading all runs with a new `EventMultiplexer`;
+  * `reload_warm`: reloading an `EventMultiplexer` without new data;
+  * `route:<path>`: serving each data route of the plugins with data in the
+    logdir through a WSGI test client, with the response cache disabled.
+
+Each benchmark is repeated, and the results are written as JSON, so that
+results can be kept per commit and compared:
+
+    bazel run //tensorboard/benchmarks:hot_paths_benchmark -- \\
+        --output=/tmp/results.json --label="$(git rev-parse HEAD)"
+
+The JSON object has the fields `label`, `config` (the shape of the logdir
+and the number of repetitions), `environment`, and `results`, which maps
+each benchmark name to an object with the `seconds` of each repetition,
+their `min_secs` and `median_secs`, and the number of `items` processed per
+repetition with the resulting `items_per_sec` of the fastest repetition.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+from six.moves import urllib
+from six.moves import xrange
+
+from absl import app
+from absl import flags
+from werkzeug import test as werkzeug_test
+from werkzeug import wrappers
+
+from tensorboard import version
+from tensorboard.backend import application
+from tensorboard.backend.event_processing import directory_watcher
+from tensorboard.backend.event_processing import event_file_loader
+from tensorboard.backend.event_processing import io_wrapper
+from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.backend.event_processing import reservoir
+from tensorboard.benchmarks import synthetic_logdir
+from tensorboard.plugins import base_plugin
+from tensorboard.plugins.core import core_plugin
+from tensorboard.plugins.distribution import distributions_plugin
+from tensorboard.plugins.histogram import histograms_plugin
+from tensorboard.plugins.image import images_plugin
+from tensorboard.plugins.pr_curve import pr_curves_plugin
+from tensorboard.plugins.scalar import scalars_plugin
+from tensorboard.plugins.text import text_plugin
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string('output', None, 'File to write the JSON results to.')
+flags.DEFINE_string('label', '', 'Label of the results, such as a commit.')
+flags.DEFINE_string('logdir', None, 'Directory to write the synthetic logdir '
+                    'to, which must not contain runs yet. Defaults to a '
+                    'temporary directory, which is removed afterwards.')
+flags.DEFINE_integer('runs', 4, 'Number of runs of the synthetic logdir.')
+flags.DEFINE_integer('tags', 10, 'Number of tags of each run.')
+flags.DEFINE_integer('steps', 500, 'Number of steps of each tag.')
+flags.DEFINE_integer('files_per_run', 2, 'Number of event files of each run.')
+flags.DEFINE_integer('seed', 0, 'Seed of the synthetic data.')
+flags.DEFINE_integer('repetitions', 5, 'How often to repeat each benchmark.')
+flags.DEFINE_integer('reservoir_items', 200000,
+                     'Number of items to add to a reservoir.')
+
+# The plugins whose routes are benchmarked, which cover every kind of data in
+# synthetic logdirs.
+_PLUGINS = [
+    core_plugin.CorePluginLoader(),
+    scalars_plugin.ScalarsPlugin,
+    distributions_plugin.DistributionsPlugin,
+    histograms_plugin.HistogramsPlugin,
+    images_plugin.ImagesPlugin,
+    pr_curves_plugin.PrCurvesPlugin,
+    text_plugin.TextPlugin,
+]
+
+# Routes of the plugins, as (path, kind of data or None, extra query
+# parameters) tuples. Routes with a kind are asked for the first run and
+# first tag of that kind.
+_ROUTES = (
+    ('/data/runs', None, {}),
+    ('/data/logdir', None, {}),
+    ('/data/plugins_listing', None, {}),
+    ('/data/plugin/scalars/tags', None, {}),
+    ('/data/plugin/scalars/scalars', synthetic_logdir.SCALAR, {}),
+    ('/data/plugin/histograms/tags', None, {}),
+    ('/data/plugin/histograms/histograms', synthetic_logdir.HISTOGRAM, {}),
+    ('/data/plugin/distributions/tags', None, {}),
+    ('/data/plugin/distributions/distributions', synthetic_logdir.HISTOGRAM,
+     {}),
+    ('/data/plugin/images/tags', None, {}),
+    ('/data/plugin/images/images', synthetic_logdir.IMAGE, {}),
+    ('/data/plugin/images/individualImage', synthetic_logdir.IMAGE,
+     {'index': '0'}),
+    ('/data/plugin/text/tags', None, {}),
+    ('/data/plugin/text/text', synthetic_logdir.TEXT, {}),
+    ('/data/plugin/pr_curves/tags', None, {}),
+    ('/data/plugin/pr_curves/pr_curves', synthetic_logdir.PR_CURVE, {}),
+)
+
+
+def measure(fn, repetitions, setup=None):
+  """Times `fn` over several repetitions.
+
+  Args:
+    fn: A function that takes the result of `setup`, or no arguments if
+      there is no `setup`, and returns the number of items it processed.
+    repetitions: How often to call `fn`.
+    setup: An optional function that is called without timing before each
+      call of `fn`.
+
+  Returns:
+    A JSON-able dict of results, as described in the module docstring.
+  """
+  seconds = []
+  items = None
+  for _ in xrange(repetitions):
+    args = (setup(),) if setup is not None else ()
+    start = time.time()
+    items = fn(*args)
+    seconds.append(time.time() - start)
+  min_secs = min(seconds)
+  return {
+      'seconds': seconds,
+      'min_secs': min_secs,
+      'median_secs': sorted(seconds)[len(seconds) // 2],
+      'items': items,
+      'items_per_sec': items / min_secs if min_secs else None,
+  }
+
+
+def bench_event_file_loader(logdir):
+  def load():
+    count = 0
+    for path in logdir.files:
+      for _ in event_file_loader.EventFileLoader(path).Load():
+        count += 1
+    return count
+  return load
+
+
+def bench_run_discovery(logdir):
+  def discover():
+    return len(list(io_wrapper.GetLogdirSubdirectories(logdir.path)))
+  return discover
+
+
+def bench_directory_watcher(logdir):
+  def watch():
+    count = 0
+    for run in logdir.runs:
+      watcher = directory_watcher.DirectoryWatcher(
+          os.path.join(logdir.path, run),
+          event_file_loader.RawEventFileLoader,
+          io_wrapper.IsTensorFlowEventsFile)
+      for _ in watcher.Load():
+        count += 1
+    return count
+  return watch
+
+
+def bench_reservoir_add_item(num_items):
+  def add_items(r):
+    for i in xrange(num_items):
+      r.AddItem('key_%d' % (i % 10), i)
+    return num_items
+  return add_items, lambda: reservoir.Reservoir(size=1000, seed=0)
+
+
+def _NewMultiplexer(logdir):
+  multiplexer = event_multiplexer.EventMultiplexer(
+      size_guidance=application.DEFAULT_SIZE_GUIDANCE,
+      tensor_size_guidance=application.DEFAULT_TENSOR_SIZE_GUIDANCE)
+  multiplexer.AddRunsFromDirectory(logdir.path)
+  return multiplexer
+
+
+def bench_reload(logdir, warm):
+  def reload(multiplexer):
+    multiplexer.Reload()
+    return logdir.num_events
+  if warm:
+    def setup():
+      multiplexer = _NewMultiplexer(logdir)
+      multiplexer.Reload()
+      return multiplexer
+    return reload, setup
+  return lambda logdir_: reload(_NewMultiplexer(logdir_)), lambda: logdir
+
+
+def route_urls(logdir):
+  """Returns a list of the URLs of `_ROUTES` for a synthetic logdir."""
+  urls = []
+  for (path, kind, params) in _ROUTES:
+    params = dict(params)
+    if kind is not None:
+      params['run'] = logdir.runs[0]
+      params['tag'] = logdir.Tags(kind)[0]
+    url = path
+    if params:
+      url += '?' + urllib.parse.urlencode(sorted(params.items()))
+    urls.append(url)
+  return urls
+
+
+def make_app(logdir):
+  """Returns a WSGI app of `_PLUGINS` that has loaded a synthetic logdir."""
+  loaders = [plugin if isinstance(plugin, base_plugin.TBLoader)
+             else base_plugin.BasicLoader(plugin) for plugin in _PLUGINS]
+  parser = argparse.ArgumentParser()
+  for loader in loaders:
+    loader.define_flags(parser)
+  tensorboard_flags = parser.parse_args([
+      '--logdir', logdir.path, '--reload_interval', '0',
+      '--reload_task', 'blocking', '--response_cache_mb', '0'])
+  for loader in loaders:
+    loader.fix_flags(tensorboard_flags)
+  return application.standard_tensorboard_wsgi(
+      tensorboard_flags, loaders, assets_zip_provider=None)
+
+
+def bench_route(client, url):
+  def get():
+    response = client.get(url)
+    if response.status_code != 200:
+      raise RuntimeError('GET %s returned %s' % (url, response.status))
+    return 1
+  return get
+
+
+def run_benchmarks(logdir, repetitions, reservoir_items):
+  """Runs all benchmarks against a synthetic logdir.
+
+  Args:
+    logdir: A `synthetic_logdir.Logdir`.
+    repetitions: How often to repeat each benchmark.
+    reservoir_items: Number of items to add to a reservoir.
+
+  Returns:
+    A dict mapping benchmark names to results of `measure`.
+  """
+  results = {}
+  def run(name, fn, setup=None):
+    logger.info('Running %s', name)
+    results[name] = measure(fn, repetitions, setup)
+    logger.info('%s: %0.4f secs (%s items)', name, results[name]['min_secs'],
+                results[name]['items'])
+  run('event_file_loader', bench_event_file_loader(logdir))
+  run('run_discovery', bench_run_discovery(logdir))
+  run('directory_watcher', bench_directory_watcher(logdir))
+  run('reservoir_add_item', *bench_reservoir_add_item(reservoir_items))
+  run('reload_cold', *bench_reload(logdir, warm=False))
+  run('reload_warm', *bench_reload(logdir, warm=True))
+  client = werkzeug_test.Client(make_app(logdir), wrappers.BaseResponse)
+  for url in route_urls(logdir):
+    run('route:' + url, bench_route(client, url))
+  return results
+
+
+def main(unused_argv):
+  path = FLAGS.logdir
+  temporary = path is None
+  if temporary:
+    path = tempfile.mkdtemp(prefix='tensorboard_benchmark_')
+  try:
+    logger.info('Writing synthetic logdir to %s', path)
+    logdir = synthetic_logdir.Generate(
+        path, num_runs=FLAGS.runs, num_tags=FLAGS.tags, num_steps=FLAGS.steps,
+        seed=FLAGS.seed, files_per_run=FLAGS.files_per_run)
+    results = run_benchmarks(logdir, FLAGS.repetitions, FLAGS.reservoir_items)
+  finally:
+    if temporary:
+      shutil.rmtree(path)
+  report = {
+      'label': FLAGS.label,
+      'config': {
+          'runs': FLAGS.runs,
+          'tags': FLAGS.tags,
+          'steps': FLAGS.steps,
+          'files_per_run': FLAGS.files_per_run,
+          'seed': FLAGS.seed,
+          'repetitions': FLAGS.repetitions,
+          'reservoir_items': FLAGS.reservoir_items,
+      },
+      'environment': {
+          'tensorboard_version': version.VERSION,
+          'python_version': platform.python_version(),
+          'platform': platform.platform(),
+      },
+      'results': results,
+  }
+  serialized = json.dumps(report, indent=2, sort_keys=True)
+  if FLAGS.output:
+    with open(FLAGS.output, 'w') as f:
+      f.write(serialized + '\n')
+    logger.info('Wrote results to %s', FLAGS.output)
+  else:
+    print(serialized)
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,229 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Writes synthetic logdirs of a given shape, for benchmarks.
+
+A synthetic logdir has `num_runs` runs, each with `num_tags` tags of
+`num_steps` steps. Tags cycle through the kinds of data in `KINDS`, so that
+every kind is represented once there are at least as many tags as kinds.
+
+The summary data depend only on the shape and the seed, so that benchmark
+results of different commits are comparable. Event files get names derived
+from the step they start at; only the wall time of the file version event
+that `EventFileWriter` starts every file with is the real time.
+
+Writing does not need TensorFlow.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import os
+import struct
+import zlib
+
+import numpy as np
+from six.moves import xrange
+
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.plugins.histogram import summary_v2 as histogram_summary
+from tensorboard.plugins.image import metadata as image_metadata
+from tensorboard.plugins.pr_curve import metadata as pr_curve_metadata
+from tensorboard.plugins.scalar import summary_v2 as scalar_summary
+from tensorboard.plugins.text import summary_v2 as text_summary
+from tensorboard.summary.writer import event_file_writer
+from tensorboard.util import tensor_util
+
+
+SCALAR = 'scalar'
+HISTOGRAM = 'histogram'
+IMAGE = 'image'
+TEXT = 'text'
+PR_CURVE = 'pr_curve'
+KINDS = (SCALAR, HISTOGRAM, IMAGE, TEXT, PR_CURVE)
+
+# The wall time of step 0, in seconds since the epoch.
+_BASE_WALL_TIME = 1500000000.0
+
+_HISTOGRAM_SAMPLES = 1000
+_HISTOGRAM_BUCKETS = 30
+_IMAGE_SIZE = 16
+_PR_CURVE_SAMPLES = 200
+_PR_CURVE_THRESHOLDS = 51
+_WORDS = ('loss', 'accuracy', 'gradient', '**bold**', '`code`', 'step', 'batch',
+          'learning', 'rate', 'epoch', '*emphasis*', 'token')
+
+
+class Logdir(collections.namedtuple(
+    'Logdir', ('path', 'runs', 'tag_to_kind', 'num_steps', 'files'))):
+  """Describes a synthetic logdir.
+
+  Fields:
+    path: The directory.
+    runs: A list of the names of the runs, which are subdirectories.
+    tag_to_kind: A dict mapping each tag, which every run has, to its kind.
+    num_steps: The number of steps of each tag.
+    files: A list of the paths of all event files.
+  """
+
+  __slots__ = ()
+
+  @property
+  def num_events(self):
+    """The number of summary events, not counting file version events."""
+    return len(self.runs) * len(self.tag_to_kind) * self.num_steps
+
+  def Tags(self, kind):
+    """Returns the sorted tags of a kind."""
+    return sorted(tag for (tag, tag_kind) in self.tag_to_kind.items()
+                  if tag_kind == kind)
+
+
+def Tag(kind, index):
+  """Returns the name of the `index`th tag of a kind."""
+  return '%s/%d' % (kind, index)
+
+
+def Generate(path, num_runs=2, num_tags=5, num_steps=100, seed=0,
+             files_per_run=1, kinds=KINDS):
+  """Writes a synthetic logdir.
+
+  Args:
+    path: The directory to write to, which is created if needed and should
+      not contain runs yet.
+    num_runs: The number of runs.
+    num_tags: The number of tags of each run.
+    num_steps: The number of steps of each tag.
+    seed: The seed of the summary data.
+    files_per_run: How many event files the steps of each run are split into.
+    kinds: The kinds of data that tags cycle through.
+
+  Returns:
+    A `Logdir`.
+  """
+  tag_to_kind = {}
+  for i in xrange(num_tags):
+    kind = kinds[i % len(kinds)]
+    tag_to_kind[Tag(kind, i // len(kinds))] = kind
+  runs = ['run_%d' % i for i in xrange(num_runs)]
+  files = []
+  for (run_index, run) in enumerate(runs):
+    # Each run has its own data, which does not depend on the other runs.
+    random = np.random.RandomState([seed, run_index])
+    run_dir = os.path.join(path, run)
+    first_steps = [num_steps * i // files_per_run
+                   for i in xrange(files_per_run)] + [num_steps]
+    for (start, end) in zip(first_steps, first_steps[1:]):
+      events = []
+      for step in xrange(start, end):
+        for (tag, kind) in sorted(tag_to_kind.items()):
+          events.append(event_pb2.Event(
+              wall_time=_BASE_WALL_TIME + step, step=step,
+              summary=_Summary(kind, tag, step, num_steps, random)))
+      files.append(_WriteEventFile(run_dir, start, events))
+  return Logdir(path=path, runs=runs, tag_to_kind=tag_to_kind,
+                num_steps=num_steps, files=files)
+
+
+def _WriteEventFile(run_dir, first_step, events):
+  """Writes events to a new event file named after its first step."""
+  if not os.path.isdir(run_dir):
+    os.makedirs(run_dir)
+  existing = set(os.listdir(run_dir))
+  writer = event_file_writer.EventFileWriter(run_dir)
+  for event in events:
+    writer.add_event(event)
+  writer.close()
+  (written,) = set(os.listdir(run_dir)) - existing
+  path = os.path.join(run_dir, 'events.out.tfevents.%010d.synthetic'
+                      % (_BASE_WALL_TIME + first_step))
+  os.rename(os.path.join(run_dir, written), path)
+  return path
+
+
+def _Summary(kind, tag, step, num_steps, random):
+  progress = step / max(num_steps - 1, 1)
+  if kind == SCALAR:
+    value = np.exp(-3 * progress) + random.normal(scale=0.05)
+    return scalar_summary.scalar_pb(tag, value)
+  if kind == HISTOGRAM:
+    data = random.normal(loc=progress, scale=1 - progress / 2,
+                         size=_HISTOGRAM_SAMPLES)
+    return histogram_summary.histogram_pb(
+        tag, data, buckets=_HISTOGRAM_BUCKETS)
+  if kind == IMAGE:
+    return _ImageSummary(tag, random)
+  if kind == TEXT:
+    words = random.choice(_WORDS, size=random.randint(5, 30))
+    return text_summary.text_pb(
+        tag, u'Step %d: %s' % (step, u' '.join(words)))
+  if kind == PR_CURVE:
+    return _PrCurveSummary(tag, progress, random)
+  raise ValueError('Unknown kind of data: %r' % (kind,))
+
+
+def _ImageSummary(tag, random):
+  image = random.randint(0, 256, size=(_IMAGE_SIZE, _IMAGE_SIZE, 3))
+  tensor = tensor_util.make_tensor_proto(
+      [str(_IMAGE_SIZE), str(_IMAGE_SIZE), _EncodePng(image.astype(np.uint8))],
+      dtype=np.object)
+  summary = summary_pb2.Summary()
+  summary.value.add(
+      tag=tag,
+      metadata=image_metadata.create_summary_metadata(
+          display_name=None, description=None),
+      tensor=tensor)
+  return summary
+
+
+def _PrCurveSummary(tag, progress, random):
+  """Returns a PR curve of predictions that get better with `progress`."""
+  labels = random.rand(_PR_CURVE_SAMPLES) < 0.5
+  predictions = np.clip(
+      labels * progress * 0.5 + random.rand(_PR_CURVE_SAMPLES) *
+      (1 - progress * 0.5), 0, 1)
+  thresholds = np.linspace(0, 1, _PR_CURVE_THRESHOLDS)
+  above = predictions[np.newaxis, :] >= thresholds[:, np.newaxis]
+  tp = np.sum(above & labels, axis=1).astype(np.float32)
+  fp = np.sum(above & ~labels, axis=1).astype(np.float32)
+  tn = np.sum(~above & ~labels, axis=1).astype(np.float32)
+  fn = np.sum(~above & labels, axis=1).astype(np.float32)
+  precision = tp / np.maximum(tp + fp, 1)
+  recall = tp / np.maximum(tp + fn, 1)
+  data = np.stack((tp, fp, tn, fn, precision, recall)).astype(np.float32)
+  summary = summary_pb2.Summary()
+  summary.value.add(
+      tag=tag,
+      metadata=pr_curve_metadata.create_summary_metadata(
+          display_name=tag, description='',
+          num_thresholds=_PR_CURVE_THRESHOLDS),
+      tensor=tensor_util.make_tensor_proto(data))
+  return summary
+
+
+def _EncodePng(image):
+  """Encodes an RGB `uint8` array of shape `[h, w, 3]` as a PNG."""
+  (height, width, _) = image.shape
+  def chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data +
+            struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+  # Each row starts with filter type 0 (none).
+  rows = b''.join(b'\x00' + image[y].tobytes() for y in xrange(height))
+  return (b'\x89PNG\r\n\x1a\n' +
+          chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) +
+          chunk(b'IDAT', zlib.compress(rows)) +
+          chunk(b'IEND', b''))
@@ -0,0 +1,98 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for tensorboard.benchmarks.synthetic_logdir."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+from tensorboard import test as tb_test
+from tensorboard.backend.event_processing import event_file_loader
+from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.benchmarks import synthetic_logdir
+from tensorboard.plugins.histogram import metadata as histogram_metadata
+from tensorboard.plugins.image import metadata as image_metadata
+from tensorboard.plugins.pr_curve import metadata as pr_curve_metadata
+from tensorboard.plugins.scalar import metadata as scalar_metadata
+from tensorboard.plugins.text import metadata as text_metadata
+
+
+def _SummaryEvents(logdir):
+  """Returns the serialized summary events of all files of a logdir."""
+  events = []
+  for path in logdir.files:
+    for event in event_file_loader.EventFileLoader(path).Load():
+      if event.HasField('summary'):
+        events.append(event.SerializeToString())
+  return events
+
+
+class SyntheticLogdirTest(tb_test.TestCase):
+
+  def testShape(self):
+    path = os.path.join(self.get_temp_dir(), 'logdir')
+    logdir = synthetic_logdir.Generate(
+        path, num_runs=3, num_tags=7, num_steps=10, files_per_run=2)
+    self.assertEqual(['run_0', 'run_1', 'run_2'], logdir.runs)
+    self.assertEqual(['scalar/0', 'scalar/1'],
+                     logdir.Tags(synthetic_logdir.SCALAR))
+    self.assertEqual(['pr_curve/0'], logdir.Tags(synthetic_logdir.PR_CURVE))
+    self.assertEqual(210, logdir.num_events)
+    self.assertEqual(6, len(logdir.files))
+    self.assertEqual(210, len(_SummaryEvents(logdir)))
+    self.assertEqual(
+        sorted(logdir.files),
+        sorted(os.path.join(path, run, name) for run in logdir.runs
+               for name in os.listdir(os.path.join(path, run))))
+
+  def testPluginsSeeEveryKind(self):
+    logdir = synthetic_logdir.Generate(
+        os.path.join(self.get_temp_dir(), 'plugins'), num_runs=1, num_tags=5,
+        num_steps=3)
+    multiplexer = event_multiplexer.EventMultiplexer()
+    multiplexer.AddRunsFromDirectory(logdir.path)
+    multiplexer.Reload()
+    for (plugin_name, kind) in (
+        (scalar_metadata.PLUGIN_NAME, synthetic_logdir.SCALAR),
+        (histogram_metadata.PLUGIN_NAME, synthetic_logdir.HISTOGRAM),
+        (image_metadata.PLUGIN_NAME, synthetic_logdir.IMAGE),
+        (text_metadata.PLUGIN_NAME, synthetic_logdir.TEXT),
+        (pr_curve_metadata.PLUGIN_NAME, synthetic_logdir.PR_CURVE)):
+      self.assertEqual(
+          {'run_0': logdir.Tags(kind)},
+          {run: sorted(tags) for (run, tags) in
+           multiplexer.PluginRunToTagToContent(plugin_name).items()})
+      self.assertEqual(
+          [0, 1, 2],
+          [e.step for e in multiplexer.Tensors('run_0', logdir.Tags(kind)[0])])
+
+  def testDeterministic(self):
+    def generate(name, seed):
+      return synthetic_logdir.Generate(
+          os.path.join(self.get_temp_dir(), name), num_runs=2, num_tags=5,
+          num_steps=5, seed=seed)
+    first = generate('first', seed=0)
+    second = generate('second', seed=0)
+    self.assertEqual(_SummaryEvents(first), _SummaryEvents(second))
+    self.assertEqual([os.path.relpath(f, first.path) for f in first.files],
+                     [os.path.relpath(f, second.path) for f in second.files])
+    self.assertNotEqual(_SummaryEvents(first),
+                        _SummaryEvents(generate('third', seed=1)))
+
+
+if __name__ == '__main__':
+  tb_test.main()
@@ -72,7 +72,9 @@ def get_filesystem(filename):
 
 
 # Data returned from the Stat call.
-StatData = namedtuple("StatData", ["length"])
+StatData = namedtuple("StatData", ["length", "mtime_nsec"])
+# Not every filesystem reports modification times.
+StatData.__new__.__defaults__ = (None,)
 
 
 class LocalFileSystem(object):
@@ -145,10 +147,10 @@ class LocalFileSystem(object):
         # NOTE: Size of the file is given by .st_size as returned from
         # os.stat(), but we convert to .length
         try:
-            len = os.stat(compat.as_bytes(filename)).st_size
+            st = os.stat(compat.as_bytes(filename))
         except OSError:
             raise errors.NotFoundError(None, None, "Could not find file")
-        return StatData(len)
+        return StatData(st.st_size, int(st.st_mtime * 1e9))
 
 
 class S3FileSystem(object):
@@ -328,6 +330,17 @@ class GFile(object):
     def __iter__(self):
         return self
 
+    def seek(self, offset):
+        """Moves the read position to the given absolute byte offset."""
+        if offset != self.offset:
+            self.buff = None
+            self.buff_offset = 0
+            self.offset = offset
+
+    def tell(self):
+        """Returns the current read position as an absolute byte offset."""
+        return self.offset
+
     def _read_buffer_to_offset(self, new_buff_offset):
         old_buff_offset = self.buff_offset
         read_size = min(len(self.buff), new_buff_offset) - old_buff_offset
@@ -18,12 +18,17 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import array
 import struct
 
 from . import errors
 from .io import gfile
 
+try:
+    # Optional C implementation of CRC-32C; see `crc_update`.
+    import crc32c as _crc32c_accelerated
+except ImportError:
+    _crc32c_accelerated = None
+
 
 TFE_DEVICE_PLACEMENT_WARN = 0
 TFE_DEVICE_PLACEMENT_SILENT_FOR_INT32 = 0
@@ -121,25 +126,63 @@ CRC_INIT = 0
 _MASK = 0xFFFFFFFF
 
 
+def _make_slicing_tables(table):
+    """Derives the lookup tables for slicing-by-8 CRC computation.
+
+    Entry `i` of table `k` is the CRC contribution of byte value `i` followed
+    by `k` zero bytes, so eight input bytes can be folded in at once.
+    """
+    tables = [tuple(table)]
+    for _ in range(7):
+        prev = tables[-1]
+        tables.append(tuple((prev[i] >> 8) ^ table[prev[i] & 0xff]
+                            for i in range(256)))
+    return tuple(tables)
+
+
+_CRC_TABLES = _make_slicing_tables(CRC_TABLE)
+
+
+def _crc_update_slicing_by_8(crc, data):
+    """Pure-Python CRC-32C update over a bytes-like object.
+
+    Processes eight bytes per iteration using the slicing-by-8 tables, and
+    the remaining tail one byte at a time.
+    """
+    t0, t1, t2, t3, t4, t5, t6, t7 = _CRC_TABLES
+    crc ^= _MASK
+    length = len(data)
+    aligned = length - length % 8
+    if aligned:
+        words = iter(struct.unpack_from('<%dI' % (aligned // 4), data))
+        for lo, hi in zip(words, words):
+            crc ^= lo
+            crc = (t7[crc & 0xff] ^ t6[(crc >> 8) & 0xff] ^
+                   t5[(crc >> 16) & 0xff] ^ t4[crc >> 24] ^
+                   t3[hi & 0xff] ^ t2[(hi >> 8) & 0xff] ^
+                   t1[(hi >> 16) & 0xff] ^ t0[hi >> 24])
+    for b in bytearray(data[aligned:]):
+        crc = t0[(crc ^ b) & 0xff] ^ (crc >> 8)
+    return crc ^ _MASK
+
+
 def crc_update(crc, data):
     """Update CRC-32C checksum with data.
+
+    Uses the C implementation from the `crc32c` package when it is installed,
+    and a pure-Python slicing-by-8 implementation otherwise.
+
     Args:
       crc: 32-bit checksum to update as long.
       data: byte array, string or iterable over bytes.
     Returns:
       32-bit updated CRC-32C as long.
     """
-
-    if type(data) != array.array or data.itemsize != 1:
-        buf = array.array("B", data)
-    else:
-        buf = data
-
-    crc ^= _MASK
-    for b in buf:
-        table_index = (crc ^ b) & 0xff
-        crc = (CRC_TABLE[table_index] ^ (crc >> 8)) & _MASK
-    return crc ^ _MASK
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytearray(data)
+    if _crc32c_accelerated is not None:
+        return _crc32c_accelerated.crc32c(data, crc)
+    return _crc_update_slicing_by_8(crc, data)
 
 
 def crc_finalize(crc):
@@ -164,6 +207,16 @@ def crc32c(data):
 
 
 class PyRecordReader_New:
+    """Reads TFRecords one at a time from a possibly still growing file.
+
+    The reader keeps a persistent file handle along with the byte offset just
+    past the last complete record it returned. A record that is only partially
+    present on disk is treated as not yet available: `GetNext()` raises
+    `OutOfRangeError` without advancing, and the next call retries from the
+    start of that record. This lets callers tail a file that is still being
+    written with memory bounded by the size of a single record.
+    """
+
     def __init__(
       self,
       filename=None,
@@ -171,75 +224,86 @@ class PyRecordReader_New:
       compression_type=None,
       status=None
     ):
-        self.event_strs = []
-        self.filename = filename
-        self.start_offset = start_offset
-        self.compression_type = compression_type
-        self.status = status
-        self.done_reading = False
-        self.index = -1
-
-    def read(self):
-        if self.filename is None:
+        if filename is None:
             raise errors.NotFoundError(
                 None, None, 'No filename provided, cannot read Events')
-        if not gfile.exists(self.filename):
+        if not gfile.exists(filename):
             raise errors.NotFoundError(
                 None, None,
-                '{} does not point to valid Events file'.format(self.filename))
-
-        # TODO: Handle gzip and zlib compressed files
-        with gfile.GFile(self.filename, 'rb') as f:
-            f.read(self.start_offset)
-
-            while True:
-                # Read the header
-                header_str = f.read(8)
-                if len(header_str) != 8:
-                    break  # Hit EOF so exit
-                header = struct.unpack('Q', header_str)
-
-                # Read the crc32, which is 4 bytes, and check it against
-                # the crc32 of the header
-                crc_header_str = f.read(4)
-                crc_header = struct.unpack('I', crc_header_str)
-                header_crc_calc = masked_crc32c(header_str)
-                if header_crc_calc != crc_header[0]:
-                    raise errors.DataLossError(
-                        None, None,
-                        '{} failed header crc32 check'.format(self.filename)
-                    )
-
-                # The length of the header tells us how many bytes the Event
-                # string takes
-                header_len = int(header[0])
-                event_str = f.read(header_len)
-
-                event_crc_calc = masked_crc32c(event_str)
-
-                # The next 4 bytes contain the crc32 of the Event string,
-                # which we check for integrity. Sometimes, the last Event
-                # has no crc32, in which case we skip.
-                crc_event_str = f.read(4)
-                if crc_event_str:
-                    crc_event = struct.unpack('I', crc_event_str)
-                    if event_crc_calc != crc_event[0]:
-                        raise errors.DataLossError(
-                            None, None,
-                            '{} failed event crc32 check'.format(self.filename)
-                        )
-                self.event_strs += [event_str]
-
-        self.done_reading = True
+                '{} does not point to valid Events file'.format(filename))
+        if compression_type:
+            # TODO: Handle gzip and zlib compressed files
+            raise errors.UnimplementedError(
+                None, None, 'compression not supported.')
+        self.filename = filename
+        self.start_offset = start_offset
+        self.compression_type = compression_type
+        self.status = status
+        self.curr_event = None
+        self.file_handle = gfile.GFile(self.filename, 'rb')
+        # Byte offset just past the last complete record read from the file.
+        self.offset = start_offset
 
     def GetNext(self):
-        if not self.done_reading:
-            self.read()
+        # Each read starts at the end of the last complete record, so that a
+        # record which was only partially written last time is read in full.
+        self.file_handle.seek(self.offset)
+
+        # Read the header, which holds the length of the Event string.
+        header_str = self._read(8)
+        if len(header_str) != 8:
+            # Hit EOF, possibly in the middle of a header still being written.
+            raise errors.OutOfRangeError(None, None, 'No more events to read')
 
-        if self.index >= len(self.event_strs) - 1:
+        # Read the crc32, which is 4 bytes, and check it against the crc32 of
+        # the header.
+        crc_header_str = self._read(4)
+        if len(crc_header_str) != 4:
+            raise errors.OutOfRangeError(None, None, 'No more events to read')
+        crc_header = struct.unpack('I', crc_header_str)
+        header_crc_calc = masked_crc32c(header_str)
+        if header_crc_calc != crc_header[0]:
+            raise errors.DataLossError(
+                None, None,
+                '{} failed header crc32 check'.format(self.filename)
+            )
+
+        # The length of the header tells us how many bytes the Event string
+        # takes.
+        header = struct.unpack('Q', header_str)
+        header_len = int(header[0])
+        event_str = self._read(header_len)
+        if len(event_str) != header_len:
             raise errors.OutOfRangeError(None, None, 'No more events to read')
-        else:
-            self.index += 1
+
+        # The next 4 bytes contain the crc32 of the Event string, which we
+        # check for integrity. If they are missing, the record is not yet
+        # completely written.
+        crc_event_str = self._read(4)
+        if len(crc_event_str) != 4:
+            raise errors.OutOfRangeError(None, None, 'No more events to read')
+        crc_event = struct.unpack('I', crc_event_str)
+        event_crc_calc = masked_crc32c(event_str)
+        if event_crc_calc != crc_event[0]:
+            raise errors.DataLossError(
+                None, None,
+                '{} failed event crc32 check'.format(self.filename)
+            )
+
+        # The record is complete, so later reads resume after it.
+        self.offset += 8 + 4 + header_len + 4
+        self.curr_event = event_str
 
     def record(self):
-        return self.event_strs[self.index]
+        return self.curr_event
+
+    def _read(self, n):
+        try:
+            return self.file_handle.read(n)
+        except (IOError, OSError):
+            if gfile.exists(self.filename):
+                raise
+            # Surface a deleted file as a TensorFlow error, like the real
+            # reader does, so that callers can tell it apart from I/O trouble.
+            raise errors.NotFoundError(
+                None, None, '{} no longer exists'.format(self.filename))
@@ -0,0 +1,179 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from tensorboard.compat.tensorflow_stub import errors
+from tensorboard.compat.tensorflow_stub import pywrap_tensorflow
+
+
+def _MakeRecord(data):
+    header = struct.pack('Q', len(data))
+    return b''.join([
+        header,
+        struct.pack('I', pywrap_tensorflow.masked_crc32c(header)),
+        data,
+        struct.pack('I', pywrap_tensorflow.masked_crc32c(data)),
+    ])
+
+
+def _ReferenceCrc32c(data):
+    """Byte-at-a-time CRC-32C, straight from the table."""
+    crc = 0xffffffff
+    for b in bytearray(data):
+        crc = pywrap_tensorflow.CRC_TABLE[(crc ^ b) & 0xff] ^ (crc >> 8)
+    return crc ^ 0xffffffff
+
+
+class Crc32cTest(unittest.TestCase):
+    # Check values from RFC 3720, section B.4, plus the usual "123456789".
+    KNOWN_VALUES = [
+        (b'', 0x00000000),
+        (b'123456789', 0xe3069283),
+        (b'\x00' * 32, 0x8a9136aa),
+        (b'\xff' * 32, 0x62a8ab43),
+        (bytes(bytearray(range(32))), 0x46dd794e),
+        (bytes(bytearray(range(31, -1, -1))), 0x113fdb5c),
+    ]
+
+    def testKnownValues(self):
+        for (data, expected) in self.KNOWN_VALUES:
+            self.assertEqual(expected, pywrap_tensorflow.crc32c(data))
+
+    def testSlicingByEightKnownValues(self):
+        for (data, expected) in self.KNOWN_VALUES:
+            self.assertEqual(
+                expected, pywrap_tensorflow._crc_update_slicing_by_8(0, data))
+
+    def testSlicingByEightMatchesReference(self):
+        data = bytes(bytearray((i * 7919) & 0xff for i in range(1000)))
+        for length in list(range(0, 40)) + [255, 256, 257, 1000]:
+            self.assertEqual(
+                _ReferenceCrc32c(data[:length]),
+                pywrap_tensorflow._crc_update_slicing_by_8(0, data[:length]))
+
+    def testIncrementalUpdate(self):
+        data = b'The quick brown fox jumps over the lazy dog'
+        crc = pywrap_tensorflow.CRC_INIT
+        for i in range(0, len(data), 5):
+            crc = pywrap_tensorflow.crc_update(crc, data[i:i + 5])
+        self.assertEqual(pywrap_tensorflow.crc32c(data),
+                         pywrap_tensorflow.crc_finalize(crc))
+
+    def testAcceptsBufferTypes(self):
+        expected = pywrap_tensorflow.crc32c(b'123456789')
+        self.assertEqual(expected, pywrap_tensorflow.crc32c(
+            bytearray(b'123456789')))
+        self.assertEqual(expected, pywrap_tensorflow.crc32c(
+            memoryview(b'123456789')))
+        self.assertEqual(expected, pywrap_tensorflow.crc32c(
+            [ord(c) for c in '123456789']))
+
+
+class PyRecordReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'events.out.tfevents.1')
+        self._Append(b'')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _Append(self, data):
+        with open(self.filename, 'ab') as f:
+            f.write(data)
+
+    def _ReadAll(self, reader):
+        records = []
+        while True:
+            try:
+                reader.GetNext()
+            except errors.OutOfRangeError:
+                return records
+            records.append(reader.record())
+
+    def testNoFilename(self):
+        with self.assertRaises(errors.NotFoundError):
+            pywrap_tensorflow.PyRecordReader_New(None)
+
+    def testMissingFile(self):
+        with self.assertRaises(errors.NotFoundError):
+            pywrap_tensorflow.PyRecordReader_New(
+                os.path.join(self.temp_dir, 'nonexistent'))
+
+    def testEmptyFile(self):
+        reader = pywrap_tensorflow.PyRecordReader_New(self.filename)
+        self.assertEqual([], self._ReadAll(reader))
+
+    def testReadsRecordsInOrder(self):
+        self._Append(_MakeRecord(b'foo') + _MakeRecord(b'') +
+                     _MakeRecord(b'bar'))
+        reader = pywrap_tensorflow.PyRecordReader_New(self.filename)
+        self.assertEqual([b'foo', b'', b'bar'], self._ReadAll(reader))
+        self.assertEqual([], self._ReadAll(reader))
+
+    def testPicksUpAppendedRecords(self):
+        self._Append(_MakeRecord(b'foo'))
+        reader = pywrap_tensorflow.PyRecordReader_New(self.filename)
+        self.assertEqual([b'foo'], self._ReadAll(reader))
+        self._Append(_MakeRecord(b'bar'))
+        self.assertEqual([b'bar'], self._ReadAll(reader))
+
+    def testResumesAfterTruncatedRecord(self):
+        record = _MakeRecord(b'some event data')
+        self._Append(_MakeRecord(b'foo'))
+        reader = pywrap_tensorflow.PyRecordReader_New(self.filename)
+        self.assertEqual([b'foo'], self._ReadAll(reader))
+        # Write the next record a few bytes at a time, cutting it off in the
+        # header, the header crc, the data and the data crc.
+        for (start, end) in [(0, 5), (5, 10), (10, 20), (20, len(record) - 2)]:
+            self._Append(record[start:end])
+            self.assertEqual([], self._ReadAll(reader))
+        self._Append(record[len(record) - 2:])
+        self.assertEqual([b'some event data'], self._ReadAll(reader))
+
+    def testStartOffset(self):
+        first = _MakeRecord(b'foo')
+        self._Append(first + _MakeRecord(b'bar'))
+        reader = pywrap_tensorflow.PyRecordReader_New(
+            self.filename, start_offset=len(first))
+        self.assertEqual([b'bar'], self._ReadAll(reader))
+
+    def testCorruptHeader(self):
+        record = bytearray(_MakeRecord(b'foo'))
+        record[0] ^= 0xff
+        self._Append(bytes(record))
+        reader = pywrap_tensorflow.PyRecordReader_New(self.filename)
+        with self.assertRaises(errors.DataLossError):
+            reader.GetNext()
+
+    def testCorruptData(self):
+        record = bytearray(_MakeRecord(b'foo'))
+        record[12] ^= 0xff
+        self._Append(bytes(record))
+        reader = pywrap_tensorflow.PyRecordReader_New(self.filename)
+        with self.assertRaises(errors.DataLossError):
+            reader.GetNext()
+
+
+if __name__ == '__main__':
+    unittest.main()
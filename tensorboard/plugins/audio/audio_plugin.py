@@ -94,9 +94,7 @@ class AudioPlugin(base_plugin.TBPlugin):
     for (run, tag_to_content) in six.iteritems(mapping):
       for tag in tag_to_content:
         summary_metadata = self._multiplexer.SummaryMetadata(run, tag)
-        tensor_events = self._multiplexer.Tensors(run, tag)
-        samples = max([self._number_of_samples(event.tensor_proto)
-                       for event in tensor_events] + [0])
+        samples = self._multiplexer.SampleStats(run, tag).max_samples
         result[run][tag] = {'displayName': summary_metadata.display_name,
                             'description': plugin_util.markdown_to_safe_html(
                                 summary_metadata.summary_description),
@@ -96,6 +96,8 @@ class TBContext(object):
       logdir=None,
       multiplexer=None,
       plugin_name_to_instance=None,
+      response_cache=None,
+      thumbnail_cache=None,
       window_title=None):
     """Instantiates magic container.
 
@@ -133,6 +135,10 @@ class TBContext(object):
           plugin may be absent from this mapping until it is registered. Plugin
           logic should handle cases in which a plugin is absent from this
           mapping, lest a KeyError is raised.
+      response_cache: A `response_cache.ResponseCache` that plugins may use
+          to reuse the responses of data routes, or None.
+      thumbnail_cache: A `thumbnails.ThumbnailCache` that plugins may use to
+          make and keep thumbnails of images, or None.
       window_title: A string specifying the window title.
     """
     self.assets_zip_provider = assets_zip_provider
@@ -143,6 +149,8 @@ class TBContext(object):
     self.logdir = logdir
     self.multiplexer = multiplexer
     self.plugin_name_to_instance = plugin_name_to_instance
+    self.response_cache = response_cache
+    self.thumbnail_cache = thumbnail_cache
     self.window_title = window_title
 
 
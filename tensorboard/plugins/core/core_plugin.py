@@ -308,6 +308,76 @@ port (%s) but search for a nearby free port if the default port is
 unavailable. (default: "default").\
 ''' % DEFAULT_PORT)
 
+    parser.add_argument(
+        '--http_server',
+        metavar='TYPE',
+        type=str,
+        default='threaded',
+        choices=['threaded', 'pooled'],
+        help='''\
+[experimental] The HTTP server to serve TensorBoard with. The default
+"threaded" server starts a thread for every connection, which is fine for a
+few users. The "pooled" server serves connections with a bounded pool of
+--http_workers threads, keeps connections alive between requests, and
+finishes the requests it accepted before exiting on SIGTERM, which suits
+servers shared by many users. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--http_workers',
+        metavar='COUNT',
+        type=int,
+        default=16,
+        help='''\
+[experimental] How many threads serve HTTP connections with
+--http_server=pooled. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--http_backlog',
+        metavar='COUNT',
+        type=int,
+        default=128,
+        help='''\
+[experimental] How many connections may wait to be accepted with
+--http_server=pooled, and how many accepted connections may wait for a
+worker. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--http_timeout_secs',
+        metavar='SECONDS',
+        type=float,
+        default=60.0,
+        help='''\
+[experimental] How long reading a request from or writing a response to a
+connection may block with --http_server=pooled before the connection is
+closed. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--http_keepalive_secs',
+        metavar='SECONDS',
+        type=float,
+        default=5.0,
+        help='''\
+[experimental] How long connections are kept open between requests with
+--http_server=pooled. Idle connections are closed sooner when other
+connections wait for a worker. Set to 0 to close connections after every
+request. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--http_drain_secs',
+        metavar='SECONDS',
+        type=float,
+        default=10.0,
+        help='''\
+[experimental] How long to wait for accepted requests to be served when
+shutting down with --http_server=pooled, such as on SIGTERM.
+(default: %(default)s)\
+''')
+
     parser.add_argument(
         '--purge_orphaned_data',
         metavar='BOOL',
@@ -433,6 +503,138 @@ routing of an elb when the website base_url is not available e.g.
 The max number of threads that TensorBoard can use to reload runs. Not
 relevant for db read-only mode. Each thread reloads one run at a time.
 (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--max_reload_processes',
+        metavar='COUNT',
+        type=int,
+        default=0,
+        help='''\
+If greater than 1, the number of worker processes that TensorBoard uses to
+read and parse event files, sidestepping the Python GIL. Overrides
+--max_reload_threads. Not relevant for db modes. Ignored with
+--reload_task=process. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--ingest_cache_dir',
+        metavar='PATH',
+        type=str,
+        default='',
+        help='''\
+Local directory in which TensorBoard periodically saves the data it has
+loaded for each run, along with its position in the run's event files. After
+a restart, runs are restored from this directory and only new events are
+read. Entries are discarded if the event files or the sampling flags have
+changed. Not supported with --max_reload_processes.\
+''')
+
+    parser.add_argument(
+        '--logdir_full_rescan_interval',
+        metavar='SECONDS',
+        type=float,
+        default=600.0,
+        help='''\
+How often to list every directory under the logdir while looking for new
+runs. In between, only directories whose modification time has changed are
+listed again. Set to 0 to list every directory on each reload. Cloud paths
+are always listed in full. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--watch_for_changes',
+        metavar='BOOL',
+        # Custom str-to-bool converter since regular bool() doesn't work.
+        type=lambda v: {'true': True, 'false': False}.get(v.lower(), v),
+        choices=[True, False],
+        default=False,
+        help='''\
+Experimental. Whether to use inotify (Linux only) to learn which local runs
+have changed, so that only those are reloaded, and as soon as they change
+rather than after --reload_interval. Runs on cloud file systems are still
+polled. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--response_cache_mb',
+        metavar='MB',
+        type=float,
+        default=64.0,
+        help='''\
+Memory to spend on caching the compressed responses of data routes, which
+are reused as long as the underlying data does not change. Set to 0 to
+disable the cache. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--thumbnail_cache_mb',
+        metavar='MB',
+        type=float,
+        default=64.0,
+        help='''\
+Memory to spend on caching the thumbnails that image routes serve when
+asked for images no larger than a `max_dim`. Set to 0 to make thumbnails
+anew for every request. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--thumbnail_threads',
+        metavar='N',
+        type=int,
+        default=4,
+        help='''\
+The number of threads that make thumbnails of images. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--compression_min_bytes',
+        metavar='BYTES',
+        type=int,
+        default=http_util.DEFAULT_COMPRESSION_MIN_BYTES,
+        help='''\
+Textual responses smaller than this are sent uncompressed, since
+compressing them costs more than it saves. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--compression_levels',
+        metavar='LEVELS',
+        type=str,
+        default='',
+        help='''\
+Compression levels of textual responses, as comma-separated
+CODING=LEVEL or CODING:MIMETYPE=LEVEL items, where CODING is "gzip" (1-9),
+"br" (0-11) or "zstd" (1-22). For instance "gzip=6,br:application/json=7"
+compresses gzipped responses at level 6, and JSON responses for browsers
+that prefer brotli at level 7. Brotli and zstd are used if the brotli and
+zstandard Python packages are installed. Defaults to gzip=%d, br=%d and
+zstd=%d.\
+''' % tuple(http_util.DEFAULT_COMPRESSION_LEVELS[coding]
+            for coding in (http_util.GZIP, http_util.BROTLI, http_util.ZSTD)))
+
+    parser.add_argument(
+        '--max_memory_mb',
+        metavar='MB',
+        type=float,
+        default=0.0,
+        help='''\
+Approximate memory that the data loaded from all runs together may take.
+When it is exceeded, tags keep fewer samples than --samples_per_plugin asks
+for, starting with the tags picked by --memory_eviction_policy. Set to 0 for
+no limit. Not relevant for db modes. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--memory_eviction_policy',
+        metavar='POLICY',
+        type=str,
+        default='largest',
+        choices=['largest', 'coldest'],
+        help='''\
+Which tags keep fewer samples first when --max_memory_mb is exceeded:
+"largest" picks the tags that take the most memory, and "coldest" those
+that were least recently viewed. (default: %(default)s)\
 ''')
 
     parser.add_argument(
@@ -447,6 +649,53 @@ The default "auto" option will conditionally use threads for legacy reloading
 and a child process for DB import reloading. The "process" option is only
 useful with DB import mode. The "blocking" option will block startup until
 reload finishes, and requires --load_interval=0. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--profile_requests_slower_than_ms',
+        metavar='MS',
+        type=float,
+        default=0.0,
+        help='''\
+[experimental] Profile requests, and keep the profiles of those that take
+longer than this for download at /debug/profiles. Set to 0 to not profile
+requests. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--profile_reloads_slower_than_secs',
+        metavar='SECS',
+        type=float,
+        default=0.0,
+        help='''\
+[experimental] Profile reloads, and keep the profiles of those that take
+longer than this for download at /debug/profiles. Not supported with
+--reload_task=process. Set to 0 to not profile reloads.
+(default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--profiler',
+        metavar='TYPE',
+        type=str,
+        default='sample',
+        choices=['sample', 'cprofile'],
+        help='''\
+[experimental] How --profile_requests_slower_than_ms and
+--profile_reloads_slower_than_secs profile: "sample" looks at the stacks of
+the profiled threads every few milliseconds, which is cheap, while "cprofile"
+traces every function call of the profiled thread, which is exact but slows
+it down notably. (default: %(default)s)\
+''')
+
+    parser.add_argument(
+        '--max_profiles',
+        metavar='N',
+        type=int,
+        default=20,
+        help='''\
+[experimental] How many of the latest profiles of slow requests and reloads
+to keep. (default: %(default)s)\
 ''')
 
     parser.add_argument(
@@ -483,6 +732,14 @@ flag.\
 
     if flags.path_prefix.endswith('/'):
       flags.path_prefix = flags.path_prefix[:-1]
+    if flags.http_workers <= 0:
+      raise FlagsError('--http_workers must be positive.')
+    if flags.thumbnail_threads <= 0:
+      raise FlagsError('--thumbnail_threads must be positive.')
+    try:
+      http_util.ParseCompressionLevels(flags.compression_levels)
+    except ValueError as e:
+      raise FlagsError('Invalid --compression_levels: %s' % e)
 
   def load(self, context):
     """Creates CorePlugin instance."""
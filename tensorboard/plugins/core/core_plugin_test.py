@@ -51,13 +51,19 @@ class FakeFlags(object):
       logdir='',
       event_file='',
       db='',
-      path_prefix=''):
+      path_prefix='',
+      http_workers=16,
+      thumbnail_threads=4,
+      compression_levels=''):
     self.inspect = inspect
     self.version_tb = version_tb
     self.logdir = logdir
     self.event_file = event_file
     self.db = db
     self.path_prefix = path_prefix
+    self.http_workers = http_workers
+    self.thumbnail_threads = thumbnail_threads
+    self.compression_levels = compression_levels
 
 
 class CorePluginTest(tf.test.TestCase):
@@ -104,6 +110,10 @@ class CorePluginTest(tf.test.TestCase):
       loader.fix_flags(FakeFlags(inspect=False))
     with six.assertRaisesRegex(self, ValueError, logdir_or_db_req):
       loader.fix_flags(FakeFlags(inspect=False, event_file='/tmp/event.out'))
+    with six.assertRaisesRegex(self, ValueError, 'http_workers must be'):
+      loader.fix_flags(FakeFlags(logdir='/tmp', http_workers=0))
+    with six.assertRaisesRegex(self, ValueError, 'Invalid --compression_lev'):
+      loader.fix_flags(FakeFlags(logdir='/tmp', compression_levels='gzip=10'))
 
     flag = FakeFlags(inspect=False, logdir='/tmp', path_prefix='hello/')
     loader.fix_flags(flag)
@@ -38,7 +38,6 @@ from tensorboard.plugins import base_plugin
 from tensorboard.plugins.custom_scalar import layout_pb2
 from tensorboard.plugins.custom_scalar import metadata
 from tensorboard.plugins.scalar import metadata as scalars_metadata
-from tensorboard.plugins.scalar import scalars_plugin
 from tensorboard.util import tensor_util
 
 
@@ -210,31 +209,25 @@ class CustomScalarsPlugin(base_plugin.TBPlugin):
           _TAG_TO_EVENTS_PROPERTY: {},
       }
 
-    # Fetch the tags for the run. Filter for tags that match the regex.
+    # The run may have no scalars, for instance if a configuration specified
+    # a run that TensorBoard has not read from disk yet.
     run_to_data = self._multiplexer.PluginRunToTagToContent(
         scalars_metadata.PLUGIN_NAME)
-
-    tag_to_data = None
-    try:
-      tag_to_data = run_to_data[run]
-    except KeyError:
-      # The run could not be found. Perhaps a configuration specified a run that
-      # TensorBoard has not read from disk yet.
-      payload = {}
-
-    if tag_to_data:
-      scalars_plugin_instance = self._get_scalars_plugin()
-      if not scalars_plugin_instance:
-        raise ValueError(('Failed to respond to request for /scalars. '
-                          'The scalars plugin is oddly not registered.'))
-
-      form = scalars_plugin.OutputFormat.JSON
-      payload = {
-        tag: scalars_plugin_instance.scalars_impl(tag, run, None, form)[0]
-            for tag in tag_to_data.keys()
-            if regex.match(tag)
+    if not run_to_data.get(run):
+      return {
+          _REGEX_VALID_PROPERTY: True,
+          _TAG_TO_EVENTS_PROPERTY: {},
       }
 
+    scalars_plugin_instance = self._get_scalars_plugin()
+    if not scalars_plugin_instance:
+      raise ValueError(('Failed to respond to request for /scalars. '
+                        'The scalars plugin is oddly not registered.'))
+
+    # Fetch the series of the tags of the run that match the regex.
+    payload = scalars_plugin_instance.scalars_batch_impl(
+        runs=[run], tag_regex=regex.pattern).get(run, {})
+
     return {
         _REGEX_VALID_PROPERTY: True,
         _TAG_TO_EVENTS_PROPERTY: payload,
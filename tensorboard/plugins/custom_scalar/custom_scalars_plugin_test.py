@@ -161,6 +161,13 @@ class CustomScalarsPluginTest(tf.test.TestCase):
       self.assertEqual(step, entry[1])
       np.testing.assert_allclose(step + 1, entry[2])
 
+  def testScalarsForRunNotLoadedYet(self):
+    # Runs without scalars get an empty payload even without the scalars
+    # plugin.
+    self.plugin._plugin_name_to_instance.clear()
+    body = self.plugin.scalars_impl('unknown_run', 'increments')
+    self.assertEqual({'regex_valid': True, 'tag_to_events': {}}, body)
+
   def testMergedLayout(self):
     parsed_layout = layout_pb2.Layout()
     json_format.Parse(self.plugin.layout_impl(), parsed_layout)
@@ -138,6 +138,64 @@ def compress_histogram(buckets, bps=NORMAL_HISTOGRAM_BPS):
   return result
 
 
+def compress_histograms(histograms, bps=NORMAL_HISTOGRAM_BPS):
+  """Compresses many histograms at once, as `compress_histogram` does.
+
+  Histograms with the same number of buckets, which are usually all the
+  histograms of a tag, are compressed together with array operations rather
+  than one basis point at a time.
+
+  Args:
+    histograms: A list of histograms, each of which is an array-like of
+      buckets of shape `[k, 3]` as for `compress_histogram`.
+    bps: Compression points represented in basis points, 1/100ths of a percent.
+        Defaults to normal distribution.
+
+  Returns:
+    A float64 array of shape `[len(histograms), len(bps)]` of the values of
+    each histogram at each basis point.
+  """
+  result = np.zeros((len(histograms), len(bps)))
+  indices_by_size = collections.defaultdict(list)
+  for (i, buckets) in enumerate(histograms):
+    indices_by_size[len(buckets)].append(i)
+  for (size, indices) in indices_by_size.items():
+    if size:
+      stacked = np.array([histograms[i] for i in indices], dtype=np.float64)
+      result[indices] = _compress_stacked(stacked.reshape(-1, size, 3), bps)
+  return result
+
+
+def _compress_stacked(buckets, bps):
+  """Compresses an array of shape `[n, k, 3]` of `n` nonempty histograms."""
+  bps = np.array(bps)
+  rows = np.arange(buckets.shape[0])[:, np.newaxis]
+  minmin = buckets[:, 0, 0][:, np.newaxis]
+  maxmax = buckets[:, -1, 1][:, np.newaxis]
+  counts = buckets[:, :, 2]
+  right_edges = buckets[:, :, 1]
+  totals = counts.sum(axis=1)
+  totals[totals == 0] = 1.0
+  weights = (counts * bps[-1] / totals[:, np.newaxis]).cumsum(axis=1)
+  # The index of the first bucket whose cumulative weight exceeds each basis
+  # point, as `np.searchsorted(..., side='right')` finds per histogram. The
+  # weight of the bucket before it is at most the basis point, so the two
+  # weights differ and interpolating between them is well defined.
+  found = (weights[:, :, np.newaxis] <= bps).sum(axis=1)
+  in_range = found < weights.shape[1]
+  i = np.minimum(found, weights.shape[1] - 1)
+  before = np.maximum(i - 1, 0)
+  cumsum = weights[rows, i]
+  cumsum_prev = np.where(i > 0, weights[rows, before], 0.0)
+  lhs = np.where((i == 0) | (cumsum_prev == 0), minmin,
+                 np.maximum(right_edges[rows, before], minmin))
+  rhs = np.minimum(right_edges[rows, i], maxmax)
+  # As `_lerp`, on arrays; points out of range divide by zero.
+  with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+    values = lhs + (bps - cumsum_prev) * (rhs - lhs) / (cumsum - cumsum_prev)
+  return np.where(in_range, values, maxmax)
+
+
 def _lerp(x, x0, x1, y0, y1):
   """Affinely map from [x0, x1] onto [y0, y1]."""
   return y0 + (x - x0) * float(y1 - y0) / (x1 - x0)
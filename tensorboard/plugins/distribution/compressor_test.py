@@ -17,6 +17,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
 import tensorflow as tf
 
 from tensorboard.plugins.distribution import compressor
@@ -92,5 +93,32 @@ class CompressorTest(tf.test.TestCase):
     self.assertAlmostEqual(vals[8].value, 1.7976931348623157e+308)
 
 
+class CompressHistogramsTest(tf.test.TestCase):
+
+  def test_matches_compress_histogram(self):
+    random = np.random.RandomState(0)
+    histograms = [
+        [[0, 1, 0], [1, 2, 3], [2, 3, 0]],
+        [[1, 2, 1], [2, 3, 3], [3, 4, 0]],
+        [[0, 1, 0], [1, 2, 0], [2, 3, 0]],
+        [[-0.5, 0.5, 7]],
+        np.zeros((0, 3)),
+        [[-1.0, 0.0, 0.0], [0.0, 0.5, 896.0], [0.5, 1.0, 0.0],
+         [1.0, 1.7976931348623157e+308, 64.0]],
+    ]
+    for size in (1, 5, 30, 30, 30):
+      edges = np.sort(random.normal(size=size + 1))
+      counts = random.randint(0, 4, size=size)
+      histograms.append(np.stack([edges[:-1], edges[1:], counts], axis=1))
+    for bps in (compressor.NORMAL_HISTOGRAM_BPS, (0, 2500, 5000, 7500, 10000)):
+      expected = [[v.value for v in compressor.compress_histogram(h, bps)]
+                  for h in histograms]
+      np.testing.assert_array_equal(
+          expected, compressor.compress_histograms(histograms, bps))
+
+  def test_no_histograms(self):
+    self.assertEqual((0, 9), compressor.compress_histograms([]).shape)
+
+
 if __name__ == '__main__':
   tf.test.main()
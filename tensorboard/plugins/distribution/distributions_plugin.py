@@ -22,12 +22,29 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
+import six
 from werkzeug import wrappers
 
+from tensorboard.backend import columnar
 from tensorboard.backend import http_util
+from tensorboard.backend import lru_cache
+from tensorboard.backend import response_cache
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.distribution import compressor
 from tensorboard.plugins.histogram import histograms_plugin
+from tensorboard.util import tensor_util
+
+
+# The most bytes that the compressed samples kept between requests may take,
+# counting the tensor protos that they keep alive.
+_COMPRESSED_CACHE_BYTES = 32 * 2**20
+
+
+def _CompressedBytes(compressed):
+  """Returns the bytes retained by an entry of `_compressed`."""
+  return sum(tensor_proto.ByteSize() + row.nbytes
+             for (tensor_proto, row) in six.itervalues(compressed))
 
 
 class DistributionsPlugin(base_plugin.TBPlugin):
@@ -53,6 +70,14 @@ class DistributionsPlugin(base_plugin.TBPlugin):
     """
     self._histograms_plugin = histograms_plugin.HistogramsPlugin(context)
     self._multiplexer = context.multiplexer
+    self._db_connection_provider = context.db_connection_provider
+    self._response_cache = context.response_cache
+    # Maps `(run, tag)` to a dict mapping the `id` of the tensor proto of
+    # each event of the latest sample of the series to a pair of the proto,
+    # which keeps the `id` from being reused, and its compressed values, for
+    # the most recently requested series.
+    self._compressed = lru_cache.LruCache(
+        _COMPRESSED_CACHE_BYTES, size_fn=_CompressedBytes)
 
   def get_plugin_apps(self):
     return {
@@ -68,35 +93,86 @@ class DistributionsPlugin(base_plugin.TBPlugin):
     """
     return self._histograms_plugin.is_active()
 
-  def distributions_impl(self, tag, run):
-    """Result of the form `(body, mime_type)`, or `ValueError`."""
-    (histograms, mime_type) = self._histograms_plugin.histograms_impl(
-        tag, run, downsample_to=self.SAMPLE_SIZE)
-    return ([self._compress(histogram) for histogram in histograms],
-            mime_type)
+  def distributions_impl(self, tag, run, output_format=None):
+    """Result of the form `(body, mime_type)`, or `ValueError`.
 
-  def _compress(self, histogram):
-    (wall_time, step, buckets) = histogram
-    converted_buckets = compressor.compress_histogram(buckets)
-    return [wall_time, step, converted_buckets]
+    If `output_format` is `columnar.FORMAT`, the body is columnar with the
+    columns `wall_time` (float64), `step` (int64), `basis_points` (int32) and
+    `values` (float64), the value of each event at each basis point.
+    """
+    (wall_times, steps, values) = self._distributions(tag, run)
+    bps = compressor.NORMAL_HISTOGRAM_BPS
+    if output_format == columnar.FORMAT:
+      return (columnar.Encode([
+          ('wall_time', np.array(wall_times, dtype=np.float64)),
+          ('step', np.array(steps, dtype=np.int64)),
+          ('basis_points', np.array(bps, dtype=np.int32)),
+          ('values', values),
+      ]), columnar.MIME_TYPE)
+    return ([[wall_time, step, list(zip(bps, row))]
+             for (wall_time, step, row)
+             in zip(wall_times, steps, values.tolist())], 'application/json')
+
+  def _distributions(self, tag, run):
+    """Returns the wall times, steps and compressed values of a series.
+
+    The values are an array of shape `[n, len(NORMAL_HISTOGRAM_BPS)]`. Each
+    event of the multiplexer is compressed only once, when a request first
+    samples it, and all new events of a request are compressed together.
+    """
+    if self._db_connection_provider:
+      histograms = self._histograms_plugin.histogram_events(
+          tag, run, downsample_to=self.SAMPLE_SIZE)
+      return ([h[0] for h in histograms], [h[1] for h in histograms],
+              compressor.compress_histograms([h[2] for h in histograms]))
+    key = (run, tag)
+    try:
+      events = self._histograms_plugin.tensor_events(
+          tag, run, downsample_to=self.SAMPLE_SIZE)
+    except ValueError:
+      self._compressed.Pop(key)
+      raise
+    previous = self._compressed.Get(key) or {}
+    compressed = {}
+    new_events = []
+    for event in events:
+      entry = previous.get(id(event.tensor_proto))
+      if entry is not None and entry[0] is event.tensor_proto:
+        compressed[id(event.tensor_proto)] = entry
+      else:
+        new_events.append(event)
+    if new_events:
+      new_values = compressor.compress_histograms(
+          [tensor_util.make_ndarray(e.tensor_proto) for e in new_events])
+      for (event, row) in zip(new_events, new_values):
+        compressed[id(event.tensor_proto)] = (event.tensor_proto, row)
+    self._compressed.Put(key, compressed)
+    values = np.array([compressed[id(e.tensor_proto)][1] for e in events])
+    return ([e.wall_time for e in events], [e.step for e in events],
+            values.reshape(-1, len(compressor.NORMAL_HISTOGRAM_BPS)))
 
   def index_impl(self):
     return self._histograms_plugin.index_impl()
 
   @wrappers.Request.application
   def tags_route(self, request):
-    index = self.index_impl()
-    return http_util.Respond(request, index, 'application/json')
+    key = None if self._db_connection_provider else response_cache.IndexKey(
+        request, self._multiplexer)
+    return response_cache.Respond(
+        self._response_cache, request, key,
+        lambda: (self.index_impl(), 'application/json'))
 
   @wrappers.Request.application
   def distributions_route(self, request):
     """Given a tag and single run, return an array of compressed histograms."""
     tag = request.args.get('tag')
     run = request.args.get('run')
+    output_format = columnar.FORMAT if columnar.Requested(request) else None
+    key = None if self._db_connection_provider else response_cache.SeriesKey(
+        request, self._multiplexer, [(run, tag)])
     try:
-      (body, mime_type) = self.distributions_impl(tag, run)
-      code = 200
+      return response_cache.Respond(
+          self._response_cache, request, key,
+          lambda: self.distributions_impl(tag, run, output_format))
     except ValueError as e:
-      (body, mime_type) = (str(e), 'text/plain')
-      code = 400
-    return http_util.Respond(request, body, mime_type, code=code)
+      return http_util.Respond(request, str(e), 'text/plain', code=400)
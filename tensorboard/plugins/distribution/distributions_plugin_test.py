@@ -25,7 +25,10 @@ import os.path
 import six
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import tensorflow as tf
+from werkzeug import test as werkzeug_test
+from werkzeug import wrappers
 
+from tensorboard.backend import columnar
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
 from tensorboard.plugins import base_plugin
@@ -152,6 +155,65 @@ class DistributionsPluginTest(tf.test.TestCase):
     self._test_distributions(self._RUN_WITH_DISTRIBUTION,
                              '%s/histogram_summary' % self._DISTRIBUTION_TAG)
 
+  def test_distributions_columnar(self):
+    self.set_up_with_runs([self._RUN_WITH_DISTRIBUTION])
+    tag = '%s/histogram_summary' % self._DISTRIBUTION_TAG
+    (expected, _) = self.plugin.distributions_impl(
+        tag, self._RUN_WITH_DISTRIBUTION)
+    client = werkzeug_test.Client(
+        self.plugin.distributions_route, wrappers.BaseResponse)
+    response = client.get(
+        '/distributions',
+        query_string={'run': self._RUN_WITH_DISTRIBUTION, 'tag': tag},
+        headers={'Accept': columnar.MIME_TYPE})
+    self.assertEqual(200, response.status_code)
+    self.assertEqual(columnar.MIME_TYPE, response.headers['Content-Type'])
+    columns = columnar.Decode(response.get_data())
+    self.assertEqual(list(compressor.NORMAL_HISTOGRAM_BPS),
+                     columns['basis_points'].tolist())
+    self.assertEqual([e[0] for e in expected], columns['wall_time'].tolist())
+    self.assertEqual([e[1] for e in expected], columns['step'].tolist())
+    self.assertEqual([[v for (_, v) in e[2]] for e in expected],
+                     columns['values'].tolist())
+
+  def test_compresses_each_event_once(self):
+    self.set_up_with_runs([self._RUN_WITH_DISTRIBUTION])
+    tag = '%s/histogram_summary' % self._DISTRIBUTION_TAG
+    compressed = []
+    original = compressor.compress_histograms
+    def compress_histograms(histograms):
+      compressed.extend(histograms)
+      return original(histograms)
+    with tf.compat.v1.test.mock.patch.object(
+        compressor, 'compress_histograms', compress_histograms):
+      (first, _) = self.plugin.distributions_impl(
+          tag, self._RUN_WITH_DISTRIBUTION)
+      (second, _) = self.plugin.distributions_impl(
+          tag, self._RUN_WITH_DISTRIBUTION)
+    self.assertEqual(first, second)
+    self.assertEqual(self._STEPS, len(compressed))
+    for (histogram, datum) in zip(compressed, first):
+      self.assertEqual(
+          [tuple(v) for v in compressor.compress_histogram(histogram)],
+          [tuple(v) for v in datum[2]])
+
+  def test_compressed_samples_are_bounded(self):
+    self.set_up_with_runs([self._RUN_WITH_DISTRIBUTION])
+    tag = '%s/histogram_summary' % self._DISTRIBUTION_TAG
+    self.plugin.distributions_impl(tag, self._RUN_WITH_DISTRIBUTION)
+    sample_bytes = self.plugin._compressed.Size()
+    self.assertGreater(sample_bytes, 0)
+    # A sample that takes more than a quarter of the bound is not kept, and
+    # nor are the tensor protos it refers to.
+    context = base_plugin.TBContext(
+        logdir=self.logdir, multiplexer=self.plugin._multiplexer)
+    with tf.compat.v1.test.mock.patch.object(
+        distributions_plugin, '_COMPRESSED_CACHE_BYTES', 4 * sample_bytes - 4):
+      self.plugin = distributions_plugin.DistributionsPlugin(context)
+    self.plugin.distributions_impl(tag, self._RUN_WITH_DISTRIBUTION)
+    self.assertEqual(0, self.plugin._compressed.Size())
+    self.assertEqual(0, len(self.plugin._compressed))
+
   def test_active_with_distribution(self):
     self.set_up_with_runs([self._RUN_WITH_DISTRIBUTION])
     self.assertTrue(self.plugin.is_active())
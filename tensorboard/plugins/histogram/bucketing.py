@@ -0,0 +1,136 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Buckets data into histograms with NumPy, in memory linear in the input.
+
+The data are counted in chunks of a fixed size, so that the temporaries of
+counting take a bounded amount of memory however large the input is, and
+inputs with many chunks may be counted by several threads, since NumPy
+releases the GIL for the arithmetic on each chunk.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import threading
+
+import numpy as np
+from six.moves import xrange  # pylint: disable=redefined-builtin
+
+
+# The number of elements that are counted at once; each takes 8 bytes of
+# temporaries per thread.
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Inputs with at least this many elements are counted by several threads.
+_PARALLEL_MIN_SIZE = 1 << 24
+_MAX_THREADS = 8
+
+
+def histogram_buckets(data, bucket_count, chunk_size=DEFAULT_CHUNK_SIZE,
+                      num_threads=None):
+  """Buckets data as `histogram_pb` and the legacy `pb` do.
+
+  The data are split into `bucket_count` buckets of equal width between
+  their minimum and maximum, with the maximum counted in the last bucket.
+  The result is the same as that of counting each element with a one-hot
+  vector over the buckets, which takes memory proportional to the number of
+  elements times the number of buckets.
+
+  Args:
+    data: A `np.array` or array-like form of any shape. Must have type
+      castable to `float`.
+    bucket_count: A positive `int`.
+    chunk_size: How many elements to count at once.
+    num_threads: How many threads to count with, or None to use several
+      threads only for large inputs.
+
+  Returns:
+    A float64 array of shape `[k, 3]` of `[left_edge, right_edge, count]`
+    buckets. If there is no data, then `k` is 0. If there is data but all
+    points have the same value, then `k` is 1 and the bucket has a width of
+    1 around that value. Else, `k` is `bucket_count`.
+  """
+  data = np.asarray(data).ravel()
+  if data.dtype.kind not in 'iuf':
+    data = data.astype(float)
+  if data.size == 0:
+    return np.array([]).reshape((0, 3))
+  # Extremes of the original type are the same as those of the data cast to
+  # float64, since the cast preserves order.
+  min_ = np.float64(np.min(data))
+  max_ = np.float64(np.max(data))
+  range_ = max_ - min_
+  if range_ == 0:
+    center = min_
+    return np.array([[center - 0.5, center + 0.5, float(data.size)]])
+  bucket_width = range_ / bucket_count
+
+  def count(start, stop):
+    offsets = np.subtract(data[start:stop], min_, dtype=np.float64)
+    np.divide(offsets, bucket_width, out=offsets)
+    np.floor(offsets, out=offsets)
+    # Offsets are NaN for NaN data, and for infinite data if the range is
+    # infinite; such data count in no bucket.
+    nans = np.isnan(offsets)
+    if nans.any():
+      offsets = offsets[~nans]
+    indices = offsets.astype(np.int64)
+    np.minimum(indices, bucket_count - 1, out=indices)
+    return np.bincount(indices, minlength=bucket_count)
+
+  chunks = [(start, min(start + chunk_size, data.size))
+            for start in xrange(0, data.size, chunk_size)]
+  if num_threads is None:
+    num_threads = _default_num_threads(data.size)
+  num_threads = max(1, min(num_threads, len(chunks)))
+  totals = [np.zeros(bucket_count, dtype=np.int64)
+            for _ in xrange(num_threads)]
+  errors = []
+
+  def work(index):
+    try:
+      for (start, stop) in chunks[index::num_threads]:
+        totals[index] += count(start, stop)
+    except Exception as e:  # pylint: disable=broad-except
+      errors.append(e)
+
+  if num_threads == 1:
+    work(0)
+  else:
+    threads = [threading.Thread(target=work, args=(i,),
+                                name='HistogramBucketer %d' % i)
+               for i in xrange(num_threads)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+  if errors:
+    raise errors[0]
+  bucket_counts = sum(totals)
+  edges = np.linspace(min_, max_, bucket_count + 1)
+  left_edges = edges[:-1]
+  right_edges = edges[1:]
+  return np.array([left_edges, right_edges, bucket_counts]).transpose()
+
+
+def _default_num_threads(size):
+  if size < _PARALLEL_MIN_SIZE:
+    return 1
+  try:
+    return min(multiprocessing.cpu_count(), _MAX_THREADS)
+  except NotImplementedError:
+    return 1
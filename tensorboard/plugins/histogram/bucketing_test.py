@@ -0,0 +1,97 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for tensorboard.plugins.histogram.bucketing."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from tensorboard import test as tb_test
+from tensorboard.plugins.histogram import bucketing
+
+
+def _one_hot_buckets(data, bucket_count):
+  """The one-hot bucketing that `histogram_pb` used to do."""
+  data = np.array(data).flatten().astype(float)
+  if data.size == 0:
+    return np.array([]).reshape((0, 3))
+  min_ = np.min(data)
+  max_ = np.max(data)
+  range_ = max_ - min_
+  if range_ == 0:
+    center = min_
+    return np.array([[center - 0.5, center + 0.5, float(data.size)]])
+  bucket_width = range_ / bucket_count
+  offsets = data - min_
+  with np.errstate(invalid='ignore'):
+    bucket_indices = np.floor(offsets / bucket_width).astype(int)
+  clamped_indices = np.minimum(bucket_indices, bucket_count - 1)
+  one_hots = (np.array([clamped_indices]).transpose()
+              == np.arange(0, bucket_count))  # broadcast
+  bucket_counts = np.sum(one_hots, axis=0)
+  edges = np.linspace(min_, max_, bucket_count + 1)
+  return np.array([edges[:-1], edges[1:], bucket_counts]).transpose()
+
+
+class HistogramBucketsTest(tb_test.TestCase):
+
+  def assertSameBuckets(self, data, bucket_count=30, **kwargs):
+    expected = _one_hot_buckets(data, bucket_count)
+    actual = bucketing.histogram_buckets(data, bucket_count, **kwargs)
+    self.assertEqual(np.float64, actual.dtype)
+    np.testing.assert_array_equal(expected, actual)
+
+  def test_matches_one_hot_bucketing(self):
+    random = np.random.RandomState(0)
+    self.assertSameBuckets(random.normal(size=1000))
+    self.assertSameBuckets(random.normal(size=(10, 20, 3)), bucket_count=7)
+    self.assertSameBuckets(random.uniform(-1e6, 1e6, size=999), bucket_count=1)
+    self.assertSameBuckets(random.normal(size=100).astype(np.float32))
+    self.assertSameBuckets(random.randint(-5, 5, size=100))
+    self.assertSameBuckets(np.arange(31))
+    self.assertSameBuckets([[1, 2], [3, 4]])
+    self.assertSameBuckets([True, False, True])
+
+  def test_edge_cases(self):
+    self.assertSameBuckets([])
+    self.assertSameBuckets(np.zeros((0, 4)))
+    self.assertSameBuckets([3.5])
+    self.assertSameBuckets([-1.0] * 10)
+    self.assertEqual((0, 3), bucketing.histogram_buckets([], 30).shape)
+    self.assertEqual((1, 3), bucketing.histogram_buckets([7, 7], 30).shape)
+
+  def test_non_finite_data(self):
+    self.assertSameBuckets([1.0, 2.0, np.inf, 3.0])
+    self.assertSameBuckets([-np.inf, 1.0, 2.0])
+    self.assertSameBuckets([1.0, np.nan, 2.0])
+
+  def test_chunks_and_threads(self):
+    data = np.random.RandomState(1).normal(size=10007)
+    for chunk_size in (1, 100, 4096, 10007, 20000):
+      for num_threads in (1, 3):
+        self.assertSameBuckets(data, chunk_size=chunk_size,
+                               num_threads=num_threads)
+
+  def test_read_only_input(self):
+    data = np.random.RandomState(2).normal(size=1000)
+    data.setflags(write=False)
+    buckets = bucketing.histogram_buckets(data, 30, chunk_size=100)
+    self.assertEqual(1000, buckets[:, 2].sum())
+
+
+if __name__ == '__main__':
+  tb_test.main()
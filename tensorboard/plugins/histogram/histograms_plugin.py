@@ -30,13 +30,67 @@ import six
 from werkzeug import wrappers
 
 from tensorboard import plugin_util
+from tensorboard.backend import columnar
 from tensorboard.backend import http_util
+from tensorboard.backend import lru_cache
+from tensorboard.backend import response_cache
 from tensorboard.compat import tf
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.histogram import metadata
 from tensorboard.util import tensor_util
 
 
+# The most bytes that the sampled series kept between requests may take,
+# counting the tensor protos that they keep alive.
+_SERIES_CACHE_BYTES = 32 * 2**20
+
+
+class _HistogramSeries(collections.namedtuple(
+    '_HistogramSeries', ('generations', 'tensor_protos', 'wall_times',
+                         'steps', 'bucket_counts', 'buckets'))):
+  """The sampled histograms of a series, stacked into arrays.
+
+  Fields:
+    generations: The multiplexer generations of the series when it was
+      sampled, or None if they are unknown.
+    tensor_protos: The tensor protos of the sampled events of the multiplexer,
+      or None if they are from a database.
+    wall_times: A float64 array of the wall times of the events.
+    steps: An int64 array of the steps of the events.
+    bucket_counts: An int32 array of the number of buckets of each event.
+    buckets: A float64 array of shape `[sum(bucket_counts), 3]` of the
+      `[left, right, count]` buckets of all events one after another.
+  """
+
+  __slots__ = ()
+
+  def Histograms(self):
+    """Returns a list of the bucket arrays of each event, as views."""
+    return np.split(self.buckets, np.cumsum(self.bucket_counts)[:-1])
+
+  def NumBytes(self):
+    """Returns the approximate number of bytes retained by the series."""
+    num_bytes = sum(array.nbytes for array in (
+        self.wall_times, self.steps, self.bucket_counts, self.buckets))
+    if self.tensor_protos is not None:
+      num_bytes += sum(p.ByteSize() for p in self.tensor_protos)
+    return num_bytes
+
+
+def _StackHistograms(histogram_events, generations=None, tensor_protos=None):
+  """Returns a `_HistogramSeries` of `(wall_time, step, buckets)` events."""
+  histograms = [np.asarray(buckets, dtype=np.float64).reshape(-1, 3)
+                for (_, _, buckets) in histogram_events]
+  return _HistogramSeries(
+      generations=generations,
+      tensor_protos=tensor_protos,
+      wall_times=np.array([e[0] for e in histogram_events], dtype=np.float64),
+      steps=np.array([e[1] for e in histogram_events], dtype=np.int64),
+      bucket_counts=np.array([len(h) for h in histograms], dtype=np.int32),
+      buckets=(np.concatenate(histograms) if histograms
+               else np.zeros((0, 3))))
+
+
 class HistogramsPlugin(base_plugin.TBPlugin):
   """Histograms Plugin for TensorBoard.
 
@@ -60,6 +114,11 @@ class HistogramsPlugin(base_plugin.TBPlugin):
     """
     self._db_connection_provider = context.db_connection_provider
     self._multiplexer = context.multiplexer
+    self._response_cache = context.response_cache
+    # Maps `(run, tag, downsample_to)` to the latest `_HistogramSeries`, for
+    # the most recently requested series.
+    self._series = lru_cache.LruCache(
+        _SERIES_CACHE_BYTES, size_fn=_HistogramSeries.NumBytes)
 
   def get_plugin_apps(self):
     return {
@@ -110,25 +169,95 @@ class HistogramsPlugin(base_plugin.TBPlugin):
         }
       return result
 
-    runs = self._multiplexer.Runs()
-    result = {run: {} for run in runs}
+    # One snapshot gives a consistent view, without visiting every run.
+    index = self._multiplexer.IndexSnapshot()
+    result = {run: {} for run in index.Runs()}
 
-    mapping = self._multiplexer.PluginRunToTagToContent(metadata.PLUGIN_NAME)
+    mapping = index.PluginRunToTagToContent(metadata.PLUGIN_NAME)
     for (run, tag_to_content) in six.iteritems(mapping):
       for (tag, content) in six.iteritems(tag_to_content):
         content = metadata.parse_plugin_metadata(content)
-        summary_metadata = self._multiplexer.SummaryMetadata(run, tag)
+        summary_metadata = index.SummaryMetadata(run, tag)
         result[run][tag] = {'displayName': summary_metadata.display_name,
                             'description': plugin_util.markdown_to_safe_html(
                                 summary_metadata.summary_description)}
 
     return result
 
-  def histograms_impl(self, tag, run, downsample_to=None):
+  def histograms_impl(self, tag, run, downsample_to=None, output_format=None):
     """Result of the form `(body, mime_type)`, or `ValueError`.
 
     At most `downsample_to` events will be returned. If this value is
-    `None`, then no downsampling will be performed.
+    `None`, then no downsampling will be performed. If `output_format` is
+    `columnar.FORMAT`, the body is columnar with the columns `wall_time`
+    (float64), `step` (int64), `bucket_counts` (int32), the number of buckets
+    of each event, and `buckets` (float64), the `[left, right, count]`
+    buckets of all events one after another.
+    """
+    if self._db_connection_provider:
+      series = _StackHistograms(self.histogram_events(tag, run, downsample_to))
+    else:
+      series = self._sampled_series(tag, run, downsample_to)
+    if output_format == columnar.FORMAT:
+      return (columnar.Encode([
+          ('wall_time', series.wall_times),
+          ('step', series.steps),
+          ('bucket_counts', series.bucket_counts),
+          ('buckets', series.buckets),
+      ]), columnar.MIME_TYPE)
+    # One `tolist` of all buckets is much cheaper than one per event.
+    buckets = series.buckets.tolist()
+    ends = np.cumsum(series.bucket_counts).tolist()
+    starts = [0] + ends[:-1]
+    return ([[wall_time, step, buckets[start:end]]
+             for (wall_time, step, start, end)
+             in zip(series.wall_times.tolist(), series.steps.tolist(),
+                    starts, ends)], 'application/json')
+
+  def _sampled_series(self, tag, run, downsample_to):
+    """Returns the `_HistogramSeries` of a series of the multiplexer.
+
+    The series is kept until the multiplexer generation of the series
+    changes, so that the sample is taken and its tensors are decoded only
+    once per change of the data rather than once per request. Events that
+    stay in the sample are not decoded again either.
+    """
+    key = (run, tag, downsample_to)
+    generations = response_cache.MultiplexerGenerations(
+        self._multiplexer, [(run, tag)])
+    previous = self._series.Get(key)
+    if previous is not None and previous.generations == generations:
+      return previous
+    try:
+      tensor_events = self.tensor_events(tag, run, downsample_to)
+    except ValueError:
+      self._series.Pop(key)
+      raise
+    decoded = {}
+    if previous is not None:
+      for (tensor_proto, histogram) in zip(previous.tensor_protos,
+                                           previous.Histograms()):
+        decoded[id(tensor_proto)] = (tensor_proto, histogram)
+    histogram_events = []
+    for e in tensor_events:
+      entry = decoded.get(id(e.tensor_proto))
+      if entry is not None and entry[0] is e.tensor_proto:
+        histogram = entry[1]
+      else:
+        histogram = tensor_util.make_ndarray(e.tensor_proto)
+      histogram_events.append((e.wall_time, e.step, histogram))
+    series = _StackHistograms(
+        histogram_events, generations=generations,
+        tensor_protos=[e.tensor_proto for e in tensor_events])
+    if generations is not None:
+      self._series.Put(key, series)
+    return series
+
+  def histogram_events(self, tag, run, downsample_to=None):
+    """Returns the `(wall_time, step, buckets)` events of a series.
+
+    The buckets are an array of shape `[k, 3]` of `[left, right, count]`
+    buckets. Raises `ValueError` as `histograms_impl` does.
     """
     if self._db_connection_provider:
       # Serve data from the database.
@@ -190,18 +319,28 @@ class HistogramsPlugin(base_plugin.TBPlugin):
                 for step, computed_time, data, dtype, shape in cursor]
     else:
       # Serve data from events files.
-      try:
-        tensor_events = self._multiplexer.Tensors(run, tag)
-      except KeyError:
-        raise ValueError('No histogram tag %r for run %r' % (tag, run))
-      if downsample_to is not None and len(tensor_events) > downsample_to:
-        rand_indices = random.Random(0).sample(
-            six.moves.xrange(len(tensor_events)), downsample_to)
-        indices = sorted(rand_indices)
-        tensor_events = [tensor_events[i] for i in indices]
-      events = [[e.wall_time, e.step, tensor_util.make_ndarray(e.tensor_proto).tolist()]
-                for e in tensor_events]
-    return (events, 'application/json')
+      events = [(e.wall_time, e.step, tensor_util.make_ndarray(e.tensor_proto))
+                for e in self.tensor_events(tag, run, downsample_to)]
+    return events
+
+  def tensor_events(self, tag, run, downsample_to=None):
+    """Returns the `TensorEvent`s of a series of the multiplexer.
+
+    Like `histogram_events`, but without a database and without decoding
+    the tensors, so that callers can reuse what they derived from them
+    before. The events are the same objects as long as the multiplexer
+    keeps them.
+    """
+    try:
+      tensor_events = self._multiplexer.Tensors(run, tag)
+    except KeyError:
+      raise ValueError('No histogram tag %r for run %r' % (tag, run))
+    if downsample_to is not None and len(tensor_events) > downsample_to:
+      rand_indices = random.Random(0).sample(
+          six.moves.xrange(len(tensor_events)), downsample_to)
+      indices = sorted(rand_indices)
+      tensor_events = [tensor_events[i] for i in indices]
+    return tensor_events
 
   def _get_values(self, data_blob, dtype_enum, shape_string):
     """Obtains values for histogram data given blob and dtype enum.
@@ -210,26 +349,32 @@ class HistogramsPlugin(base_plugin.TBPlugin):
       dtype_enum: The enum representing the dtype.
       shape_string: A comma-separated string of numbers denoting shape.
     Returns:
-      The histogram values as a list served to the frontend.
+      The histogram values as an array.
     """
     buf = np.frombuffer(data_blob, dtype=tf.DType(dtype_enum).as_numpy_dtype)
-    return buf.reshape([int(i) for i in shape_string.split(',')]).tolist()
+    return buf.reshape([int(i) for i in shape_string.split(',')])
 
   @wrappers.Request.application
   def tags_route(self, request):
-    index = self.index_impl()
-    return http_util.Respond(request, index, 'application/json')
+    key = None if self._db_connection_provider else response_cache.IndexKey(
+        request, self._multiplexer)
+    return response_cache.Respond(
+        self._response_cache, request, key,
+        lambda: (self.index_impl(), 'application/json'))
 
   @wrappers.Request.application
   def histograms_route(self, request):
     """Given a tag and single run, return array of histogram values."""
     tag = request.args.get('tag')
     run = request.args.get('run')
+    output_format = columnar.FORMAT if columnar.Requested(request) else None
+    key = None if self._db_connection_provider else response_cache.SeriesKey(
+        request, self._multiplexer, [(run, tag)])
     try:
-      (body, mime_type) = self.histograms_impl(
-          tag, run, downsample_to=self.SAMPLE_SIZE)
-      code = 200
+      return response_cache.Respond(
+          self._response_cache, request, key,
+          lambda: self.histograms_impl(
+              tag, run, downsample_to=self.SAMPLE_SIZE,
+              output_format=output_format))
     except ValueError as e:
-      (body, mime_type) = (str(e), 'text/plain')
-      code = 400
-    return http_util.Respond(request, body, mime_type, code=code)
+      return http_util.Respond(request, str(e), 'text/plain', code=400)
@@ -22,10 +22,12 @@ from __future__ import print_function
 import collections
 import os.path
 
+import numpy as np
 import six
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import tensorflow as tf
 
+from tensorboard.backend import columnar
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
 from tensorboard.plugins import base_plugin
@@ -55,6 +57,7 @@ class HistogramsPluginTest(tf.test.TestCase):
   def __init__(self, *args, **kwargs):
     super(HistogramsPluginTest, self).__init__(*args, **kwargs)
     self.logdir = None
+    self.multiplexer = None
     self.plugin = None
 
   def set_up_with_runs(self, run_names):
@@ -67,6 +70,7 @@ class HistogramsPluginTest(tf.test.TestCase):
     })
     multiplexer.AddRunsFromDirectory(self.logdir)
     multiplexer.Reload()
+    self.multiplexer = multiplexer
     context = base_plugin.TBContext(logdir=self.logdir, multiplexer=multiplexer)
     self.plugin = histograms_plugin.HistogramsPlugin(context)
 
@@ -173,6 +177,72 @@ class HistogramsPluginTest(tf.test.TestCase):
     self._test_histograms(self._RUN_WITH_HISTOGRAM,
                           '%s/histogram_summary' % self._HISTOGRAM_TAG)
 
+  def test_histograms_columnar(self):
+    self.set_up_with_runs([self._RUN_WITH_HISTOGRAM])
+    tag = '%s/histogram_summary' % self._HISTOGRAM_TAG
+    (expected, _) = self.plugin.histograms_impl(
+        tag, self._RUN_WITH_HISTOGRAM, downsample_to=50)
+    (data, mime_type) = self.plugin.histograms_impl(
+        tag, self._RUN_WITH_HISTOGRAM, downsample_to=50,
+        output_format=columnar.FORMAT)
+    self.assertEqual(columnar.MIME_TYPE, mime_type)
+    columns = columnar.Decode(data)
+    self.assertEqual([e[0] for e in expected], columns['wall_time'].tolist())
+    self.assertEqual([e[1] for e in expected], columns['step'].tolist())
+    self.assertEqual([len(e[2]) for e in expected],
+                     columns['bucket_counts'].tolist())
+    ends = np.cumsum(columns['bucket_counts']).tolist()
+    self.assertEqual(
+        [e[2] for e in expected],
+        [columns['buckets'][end - count:end].tolist() for (end, count)
+         in zip(ends, columns['bucket_counts'].tolist())])
+
+  def test_histograms_decoded_once(self):
+    self.set_up_with_runs([self._RUN_WITH_HISTOGRAM])
+    tag = '%s/histogram_summary' % self._HISTOGRAM_TAG
+    make_ndarray = tf.compat.v1.test.mock.Mock(
+        wraps=histograms_plugin.tensor_util.make_ndarray)
+    with tf.compat.v1.test.mock.patch.object(
+        histograms_plugin.tensor_util, 'make_ndarray', make_ndarray):
+      (first, _) = self.plugin.histograms_impl(
+          tag, self._RUN_WITH_HISTOGRAM, downsample_to=50)
+      self.assertEqual(50, make_ndarray.call_count)
+      (second, _) = self.plugin.histograms_impl(
+          tag, self._RUN_WITH_HISTOGRAM, downsample_to=50)
+      self.assertEqual(first, second)
+      self.assertEqual(50, make_ndarray.call_count)
+      # A new generation resamples the series, but events that were decoded
+      # already are not decoded again.
+      with tf.compat.v1.test.mock.patch.object(
+          self.multiplexer, 'Generation', lambda run, tag: -1):
+        (third, _) = self.plugin.histograms_impl(
+            tag, self._RUN_WITH_HISTOGRAM, downsample_to=50)
+      self.assertEqual(first, third)
+      self.assertEqual(50, make_ndarray.call_count)
+      self.plugin.histograms_impl(tag, self._RUN_WITH_HISTOGRAM)
+      self.assertEqual(50 + self._STEPS, make_ndarray.call_count)
+
+  def test_sampled_series_are_bounded(self):
+    self.set_up_with_runs([self._RUN_WITH_HISTOGRAM])
+    tag = '%s/histogram_summary' % self._HISTOGRAM_TAG
+    self.plugin.histograms_impl(tag, self._RUN_WITH_HISTOGRAM, downsample_to=20)
+    max_bytes = 4 * self.plugin._series.Size()
+    context = base_plugin.TBContext(
+        logdir=self.logdir, multiplexer=self.multiplexer)
+    with tf.compat.v1.test.mock.patch.object(
+        histograms_plugin, '_SERIES_CACHE_BYTES', max_bytes):
+      self.plugin = histograms_plugin.HistogramsPlugin(context)
+    for downsample_to in xrange(1, 21):
+      self.plugin.histograms_impl(
+          tag, self._RUN_WITH_HISTOGRAM, downsample_to=downsample_to)
+    self.assertLessEqual(self.plugin._series.Size(), max_bytes)
+    self.assertLess(len(self.plugin._series), 20)
+    # The most recently requested series are kept.
+    self.assertIsNotNone(
+        self.plugin._series.Get((self._RUN_WITH_HISTOGRAM, tag, 20)))
+    self.assertIsNone(
+        self.plugin._series.Get((self._RUN_WITH_HISTOGRAM, tag, 1)))
+
   def test_active_with_legacy_histogram(self):
     self.set_up_with_runs([self._RUN_WITH_LEGACY_HISTOGRAM])
     self.assertTrue(self.plugin.is_active())
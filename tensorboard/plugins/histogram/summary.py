@@ -32,8 +32,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import numpy as np
-
+from tensorboard.plugins.histogram import bucketing
 from tensorboard.plugins.histogram import metadata
 from tensorboard.plugins.histogram import summary_v2
 
@@ -170,30 +169,7 @@ def pb(name, data, bucket_count=None, display_name=None, description=None):
 
   if bucket_count is None:
     bucket_count = summary_v2.DEFAULT_BUCKET_COUNT
-  data = np.array(data).flatten().astype(float)
-  if data.size == 0:
-    buckets = np.array([]).reshape((0, 3))
-  else:
-    min_ = np.min(data)
-    max_ = np.max(data)
-    range_ = max_ - min_
-    if range_ == 0:
-      center = min_
-      buckets = np.array([[center - 0.5, center + 0.5, float(data.size)]])
-    else:
-      bucket_width = range_ / bucket_count
-      offsets = data - min_
-      bucket_indices = np.floor(offsets / bucket_width).astype(int)
-      clamped_indices = np.minimum(bucket_indices, bucket_count - 1)
-      one_hots = (np.array([clamped_indices]).transpose()
-                  == np.arange(0, bucket_count))  # broadcast
-      assert one_hots.shape == (data.size, bucket_count), (
-          one_hots.shape, (data.size, bucket_count))
-      bucket_counts = np.sum(one_hots, axis=0)
-      edges = np.linspace(min_, max_, bucket_count + 1)
-      left_edges = edges[:-1]
-      right_edges = edges[1:]
-      buckets = np.array([left_edges, right_edges, bucket_counts]).transpose()
+  buckets = bucketing.histogram_buckets(data, bucket_count)
   tensor = tf.make_tensor_proto(buckets, dtype=tf.float64)
 
   if display_name is None:
@@ -20,6 +20,7 @@ from __future__ import print_function
 
 import operator
 
+import numpy as np
 import tensorflow as tf
 try:
   # python version >= 3.3
@@ -29,6 +30,7 @@ except ImportError:
 
 from google.protobuf import text_format
 from tensorboard.backend.event_processing import event_accumulator
+from tensorboard.backend.event_processing import plugin_event_accumulator
 from tensorboard.backend.event_processing import plugin_event_multiplexer
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.hparams import api_pb2
@@ -189,6 +191,7 @@ class ListSessionGroupsTest(tf.test.TestCase):
         },
     }
     self._mock_multiplexer.Tensors.side_effect = self._mock_tensors
+    self._mock_multiplexer.ScalarSeries.side_effect = self._mock_scalar_series
 
   # A mock version of EventMultiplexer.Tensors
   def _mock_tensors(self, run, tag):
@@ -279,6 +282,15 @@ class ListSessionGroupsTest(tf.test.TestCase):
     }
     return result_dict[run][tag]
 
+  # A mock version of EventMultiplexer.ScalarSeries, backed by _mock_tensors.
+  def _mock_scalar_series(self, run, tag):
+    tensor_events = self._mock_tensors(run, tag)
+    return plugin_event_accumulator.ScalarSeries(
+        wall_times=np.array([e.wall_time for e in tensor_events]),
+        steps=np.array([e.step for e in tensor_events]),
+        values=np.array([tf.make_ndarray(e.tensor_proto).item()
+                         for e in tensor_events]))
+
   def test_empty_request(self):
     # Since we don't allow any statuses, result should be empty.
     self.assertProtoEquals('total_size: 0',
@@ -21,7 +21,6 @@ from __future__ import print_function
 import os
 
 import six
-import tensorflow as tf
 
 from tensorboard.plugins.hparams import api_pb2
 
@@ -67,13 +66,12 @@ def last_metric_eval(multiplexer, session_name, metric_name):
   """
   try:
     run, tag = run_tag_from_session_and_metric(session_name, metric_name)
-    tensor_events = multiplexer.Tensors(run=run, tag=tag)
+    series = multiplexer.ScalarSeries(run=run, tag=tag)
   except KeyError as e:
     raise KeyError(
         'Can\'t find metric %s for session: %s. Underlying error message: %s'
         % (metric_name, session_name, e))
-  last_event = tensor_events[-1]
   # TODO(erez): Raise HParamsError if the tensor is not a 0-D real scalar.
-  return (last_event.wall_time,
-          last_event.step,
-          tf.make_ndarray(last_event.tensor_proto).item())
+  return (series.wall_times[-1].item(),
+          series.steps[-1].item(),
+          series.values[-1].item())
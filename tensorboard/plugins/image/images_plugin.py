@@ -27,6 +27,8 @@ from werkzeug import wrappers
 
 from tensorboard import plugin_util
 from tensorboard.backend import http_util
+from tensorboard.backend import response_cache
+from tensorboard.backend import thumbnails
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.image import metadata
 from tensorboard.compat import tf
@@ -66,6 +68,8 @@ class ImagesPlugin(base_plugin.TBPlugin):
     """
     self._multiplexer = context.multiplexer
     self._db_connection_provider = context.db_connection_provider
+    self._response_cache = context.response_cache
+    self._thumbnail_cache = context.thumbnail_cache
 
   def get_plugin_apps(self):
     return {
@@ -134,9 +138,7 @@ class ImagesPlugin(base_plugin.TBPlugin):
     for (run, tag_to_content) in six.iteritems(mapping):
       for tag in tag_to_content:
         summary_metadata = self._multiplexer.SummaryMetadata(run, tag)
-        tensor_events = self._multiplexer.Tensors(run, tag)
-        samples = max([len(event.tensor_proto.string_val[2:])  # width, height
-                       for event in tensor_events] + [0])
+        samples = self._multiplexer.SampleStats(run, tag).max_samples
         result[run][tag] = {'displayName': summary_metadata.display_name,
                             'description': plugin_util.markdown_to_safe_html(
                                 summary_metadata.summary_description),
@@ -161,8 +163,12 @@ class ImagesPlugin(base_plugin.TBPlugin):
     tag = request.args.get('tag')
     run = request.args.get('run')
     sample = int(request.args.get('sample', 0))
-    response = self._image_response_for_run(run, tag, sample)
-    return http_util.Respond(request, response, 'application/json')
+    key = None if self._db_connection_provider else response_cache.SeriesKey(
+        request, self._multiplexer, [(run, tag)])
+    return response_cache.Respond(
+        self._response_cache, request, key,
+        lambda: (self._image_response_for_run(run, tag, sample),
+                 'application/json'))
 
   def _image_response_for_run(self, run, tag, sample):
     """Builds a JSON-serializable object with information about images.
@@ -317,13 +323,48 @@ class ImagesPlugin(base_plugin.TBPlugin):
     images = events[index].tensor_proto.string_val[2:]  # skip width, height
     return images[sample]
 
+  def _get_thumbnail(self, run, tag, index, sample, max_dim):
+    """Returns a thumbnail of an image, as for `thumbnails.Thumbnail`.
+
+    Thumbnails are cached by the step and wall time of their image, which
+    unlike its index do not change as the reservoir samples new images, and
+    are not cached when reading from a database.
+    """
+    if self._db_connection_provider:
+      return thumbnails.Thumbnail(
+          self._thumbnail_cache, None,
+          lambda: self._get_individual_image(run, tag, index, sample),
+          max_dim)
+    events = self._filter_by_sample(self._multiplexer.Tensors(run, tag), sample)
+    event = events[index]
+    try:
+      (width, height) = [int(s) for s in event.tensor_proto.string_val[:2]]
+    except ValueError:
+      # The dimensions are unknown, so serve the original.
+      return None
+    if max(width, height) <= max_dim:
+      return None
+    key = (self.plugin_name, run, tag, event.step, event.wall_time, sample,
+           max_dim)
+    return thumbnails.Thumbnail(
+        self._thumbnail_cache, key,
+        lambda: event.tensor_proto.string_val[2 + sample], max_dim)
+
   @wrappers.Request.application
   def _serve_individual_image(self, request):
-    """Serves an individual image."""
+    """Serves an individual image, or a thumbnail of it given a `max_dim`."""
     run = request.args.get('run')
     tag = request.args.get('tag')
     index = int(request.args.get('index'))
     sample = int(request.args.get('sample', 0))
+    try:
+      max_dim = thumbnails.MaxDim(request)
+    except ValueError as e:
+      return http_util.Respond(request, str(e), 'text/plain', 400)
+    if max_dim is not None:
+      thumbnail = self._get_thumbnail(run, tag, index, sample, max_dim)
+      if thumbnail is not None:
+        return http_util.Respond(request, thumbnail, thumbnails.MIME_TYPE)
     data = self._get_individual_image(run, tag, index, sample)
     image_type = imghdr.what(None, data)
     content_type = _IMGHDR_TO_MIMETYPE.get(image_type, _DEFAULT_IMAGE_MIMETYPE)
@@ -22,7 +22,9 @@ import collections
 import json
 import os
 import shutil
+import struct
 import tempfile
+import unittest
 
 import numpy
 from six.moves import urllib
@@ -32,7 +34,9 @@ from werkzeug import test as werkzeug_test
 from werkzeug import wrappers
 
 from tensorboard.backend import application
+from tensorboard.backend import thumbnails
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
+from tensorboard.compat import tf as tf_compat
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.image import summary
 from tensorboard.plugins.image import images_plugin
@@ -40,6 +44,8 @@ from tensorboard.util import test_util
 
 tf.compat.v1.disable_v2_behavior()
 
+USING_REAL_TF = tf_compat.__version__ != 'stub'
+
 
 class ImagesPluginTest(tf.test.TestCase):
 
@@ -86,8 +92,10 @@ class ImagesPluginTest(tf.test.TestCase):
         "foo": foo_directory,
         "bar": bar_directory,
     })
+    self.thumbnail_cache = thumbnails.ThumbnailCache(2**20, 2)
     context = base_plugin.TBContext(
-        logdir=self.log_dir, multiplexer=multiplexer)
+        logdir=self.log_dir, multiplexer=multiplexer,
+        thumbnail_cache=self.thumbnail_cache)
     plugin = images_plugin.ImagesPlugin(context)
     # Setting a reload interval of -1 disables reloading. We disable reloading
     # because we seek to block tests from running til after one reload finishes.
@@ -97,6 +105,7 @@ class ImagesPluginTest(tf.test.TestCase):
         self.log_dir, [plugin], multiplexer, reload_interval=-1, path_prefix='')
     self.server = werkzeug_test.Client(wsgi_app, wrappers.BaseResponse)
     multiplexer.Reload()
+    self.multiplexer = multiplexer
     self.routes = plugin.get_plugin_apps()
 
   def tearDown(self):
@@ -199,6 +208,36 @@ class ImagesPluginTest(tf.test.TestCase):
     self.assertEqual(200, response.status_code)
     self.assertEqual("image/png", response.headers.get("content-type"))
 
+  @unittest.skipUnless(USING_REAL_TF, 'Thumbnails are made with real TF')
+  def testIndividualImageThumbnail(self):
+    """Tests fetching images no larger than a `max_dim`."""
+    url = ("/data/plugin/images/individualImage"
+           "?run=foo&tag=baz/image/0&sample=0&index=0")
+    original = self.server.get(url).get_data()
+    for _ in xrange(2):
+      response = self.server.get(url + "&max_dim=21")
+      self.assertEqual(200, response.status_code)
+      self.assertEqual("image/png", response.headers.get("content-type"))
+      thumbnail = response.get_data()
+      self.assertEqual((21, 8), struct.unpack(">II", thumbnail[16:24]))
+      self.assertLess(len(thumbnail), len(original))
+    self.assertEqual((1, 1),
+                     (self.thumbnail_cache.hits, self.thumbnail_cache.misses))
+    # Images that already fit are served as they are.
+    response = self.server.get(url + "&max_dim=42")
+    self.assertEqual(original, response.get_data())
+    response = self.server.get(url + "&max_dim=0")
+    self.assertEqual(400, response.status_code)
+
+  def testIndividualImageThumbnailWithUnknownDimensions(self):
+    tensor_event = self.multiplexer.Tensors("foo", "baz/image/0")[0]
+    tensor_event.tensor_proto.string_val[0] = b"unknown"
+    url = ("/data/plugin/images/individualImage"
+           "?run=foo&tag=baz/image/0&sample=0&index=0")
+    response = self.server.get(url + "&max_dim=21")
+    self.assertEqual(200, response.status_code)
+    self.assertEqual(self.server.get(url).get_data(), response.get_data())
+
   def testRunsRoute(self):
     """Tests that the /runs route offers the correct run to tag mapping."""
     response = self.server.get("/data/plugin/images/tags")
@@ -220,6 +259,12 @@ class ImagesPluginTest(tf.test.TestCase):
         },
     }, self._DeserializeResponse(response.get_data()))
 
+  def testRunsRouteDoesNotReadImages(self):
+    with tf.compat.v1.test.mock.patch.object(
+        self.multiplexer, "Tensors", side_effect=AssertionError):
+      response = self.server.get("/data/plugin/images/tags")
+    self.assertEqual(200, response.status_code)
+
 
 if __name__ == "__main__":
   tf.test.main()
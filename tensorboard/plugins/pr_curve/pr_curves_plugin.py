@@ -22,6 +22,7 @@ from werkzeug import wrappers
 
 from tensorboard import plugin_util
 from tensorboard.backend import http_util
+from tensorboard.backend import response_cache
 from tensorboard.compat import tf
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.pr_curve import metadata
@@ -42,6 +43,7 @@ class PrCurvesPlugin(base_plugin.TBPlugin):
     """
     self._db_connection_provider = context.db_connection_provider
     self._multiplexer = context.multiplexer
+    self._response_cache = context.response_cache
 
   @wrappers.Request.application
   def pr_curves_route(self, request):
@@ -63,14 +65,15 @@ class PrCurvesPlugin(base_plugin.TBPlugin):
       return http_util.Respond(
           request, 'No tag provided when fetching PR curve data', 400)
 
+    key = None if self._db_connection_provider else response_cache.SeriesKey(
+        request, self._multiplexer, [(run, tag) for run in runs])
     try:
-      response = http_util.Respond(
-          request, self.pr_curves_impl(runs, tag), 'application/json')
+      return response_cache.Respond(
+          self._response_cache, request, key,
+          lambda: (self.pr_curves_impl(runs, tag), 'application/json'))
     except ValueError as e:
       return http_util.Respond(request, str(e), 'text/plain', 400)
 
-    return response
-
   def pr_curves_impl(self, runs, tag):
     """Creates the JSON object for the PR curves response for a run-tag combo.
 
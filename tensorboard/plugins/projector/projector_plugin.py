@@ -30,6 +30,7 @@ from werkzeug import wrappers
 from google.protobuf import json_format
 from google.protobuf import text_format
 
+from tensorboard.backend import thumbnails
 from tensorboard.backend.http_util import Respond
 from tensorboard.compat import tf
 from tensorboard.compat import _pywrap_tensorflow
@@ -233,6 +234,7 @@ class ProjectorPlugin(base_plugin.TBPlugin):
     """
     self.multiplexer = context.multiplexer
     self.logdir = context.logdir
+    self._thumbnail_cache = context.thumbnail_cache
     self._handlers = None
     self.readers = {}
     self.run_paths = None
@@ -628,6 +630,11 @@ class ProjectorPlugin(base_plugin.TBPlugin):
       return Respond(request, 'query parameter "name" is required',
                      'text/plain', 400)
 
+    try:
+      max_dim = thumbnails.MaxDim(request)
+    except ValueError as e:
+      return Respond(request, str(e), 'text/plain', 400)
+
     if run not in self.configs:
       return Respond(request, 'Unknown run: "%s"' % run, 'text/plain', 400)
 
@@ -645,14 +652,26 @@ class ProjectorPlugin(base_plugin.TBPlugin):
     if not tf.io.gfile.exists(fpath) or tf.io.gfile.isdir(fpath):
       return Respond(request, '"%s" does not exist or is directory' % fpath,
                      'text/plain', 400)
-    f = tf.io.gfile.GFile(fpath, 'rb')
-    encoded_image_string = f.read()
-    f.close()
+    if max_dim is not None:
+      # A sprite is shrunk as a whole, so the client scales the dimensions of
+      # its single images by the same factor as the sprite.
+      stat = tf.io.gfile.stat(fpath)
+      key = (self.plugin_name, fpath, stat.length, stat.mtime_nsec, max_dim)
+      thumbnail = thumbnails.Thumbnail(
+          self._thumbnail_cache, key, lambda: _read_file(fpath), max_dim)
+      if thumbnail is not None:
+        return Respond(request, thumbnail, thumbnails.MIME_TYPE)
+    encoded_image_string = _read_file(fpath)
     image_type = imghdr.what(None, encoded_image_string)
     mime_type = _IMGHDR_TO_MIMETYPE.get(image_type, _DEFAULT_IMAGE_MIMETYPE)
     return Respond(request, encoded_image_string, mime_type)
 
 
+def _read_file(fpath):
+  with tf.io.gfile.GFile(fpath, 'rb') as f:
+    return f.read()
+
+
 def _find_latest_checkpoint(dir_path):
   if not _using_tf():
     return None
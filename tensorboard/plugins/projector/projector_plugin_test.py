@@ -23,6 +23,7 @@ import gzip
 import io
 import json
 import os
+import struct
 import numpy as np
 import tensorflow as tf
 import unittest
@@ -40,6 +41,7 @@ from tensorboard.compat import tf as tf_compat
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.projector import projector_config_pb2
 from tensorboard.plugins.projector import projector_plugin
+from tensorboard.util import encoder
 from tensorboard.util import test_util
 
 tf.compat.v1.disable_v2_behavior()
@@ -151,6 +153,32 @@ class ProjectorAppTest(tf.test.TestCase):
     expected_tensor = np.array([[6, 6]], dtype=np.float32)
     self._AssertTensorResponse(tensor_bytes, expected_tensor)
 
+  # TODO(#2007): Cleanly separate out projector tests that require real TF
+  @unittest.skipUnless(USING_REAL_TF, 'Test only passes when using real TF')
+  def testSpriteImage(self):
+    self._GenerateProjectorTestData()
+    sprite = encoder.encode_png(np.zeros([40, 60, 3], dtype=np.uint8))
+    with tf.io.gfile.GFile(os.path.join(self.log_dir, 'sprite.png'), 'wb') as f:
+      f.write(sprite)
+    config_path = os.path.join(self.log_dir, 'projector_config.pbtxt')
+    config = projector_config_pb2.ProjectorConfig()
+    with tf.io.gfile.GFile(config_path) as f:
+      text_format.Merge(f.read(), config)
+    config.embeddings[0].sprite.image_path = 'sprite.png'
+    with tf.io.gfile.GFile(config_path, 'w') as f:
+      f.write(text_format.MessageToString(config))
+    self._SetupWSGIApp()
+
+    url = '/data/plugin/projector/sprite_image?run=.&name=var1'
+    response = self._Get(url)
+    self.assertEqual('image/png', response.headers.get('Content-Type'))
+    self.assertEqual(sprite, response.data)
+    response = self._Get(url + '&max_dim=30')
+    self.assertEqual(200, response.status_code)
+    self.assertEqual((30, 20), struct.unpack('>II', response.data[16:24]))
+    self.assertEqual(sprite, self._Get(url + '&max_dim=60').data)
+    self.assertEqual(400, self._Get(url + '&max_dim=-1').status_code)
+
   def testBookmarksRequestMissingRunAndName(self):
     self._GenerateProjectorTestData()
     self._SetupWSGIApp()
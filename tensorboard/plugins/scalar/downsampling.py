@@ -0,0 +1,175 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Downsampling of scalar series for display.
+
+A chart a few hundred pixels wide cannot show more than a few thousand
+points, so long series can be reduced on the server before they are sent to
+the browser. Each algorithm picks a subset of the points of a series, always
+including the first and the last, and returns their indices in increasing
+order so that they can be applied to every column of the series alike.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+
+# Largest-Triangle-Three-Buckets: keeps the point of each bucket that forms
+# the largest triangle with its neighbors, which preserves the visual shape.
+# See Steinarsson, "Downsampling Time Series for Visual Representation" (2013).
+LTTB = 'lttb'
+# Keeps the smallest and the largest value of each bucket, so that no spike is
+# lost and the envelope of the series is exact.
+MIN_MAX = 'minmax'
+# Keeps evenly spaced points. Cheapest, but may miss spikes.
+STRIDE = 'stride'
+
+METHODS = (LTTB, MIN_MAX, STRIDE)
+
+
+def downsample(method, steps, values, num_samples):
+  """Picks at most `num_samples` points of a series.
+
+  Args:
+    method: One of `METHODS`.
+    steps: A 1-D array of the steps of the series, in increasing order.
+    values: A 1-D array of the values of the series, as long as `steps`.
+    num_samples: The maximum number of points to keep; at least 2.
+
+  Returns:
+    A 1-D integer array of the indices of the points to keep, in increasing
+    order. If the series has at most `num_samples` points, all are kept.
+
+  Raises:
+    ValueError: If `method` is unknown or `num_samples` is less than 2.
+  """
+  if method not in METHODS:
+    raise ValueError('Unknown downsampling method: %r' % (method,))
+  if num_samples < 2:
+    raise ValueError('num_samples must be at least 2, was %r' % (num_samples,))
+  size = len(values)
+  if size <= num_samples:
+    return np.arange(size)
+  if method == LTTB:
+    return lttb_indices(steps, values, num_samples)
+  elif method == MIN_MAX:
+    return min_max_indices(values, num_samples)
+  else:
+    return stride_indices(size, num_samples)
+
+
+def _bucket_bounds(size, num_buckets):
+  """Splits `range(1, size - 1)` into `num_buckets` contiguous buckets.
+
+  Returns:
+    An array of `num_buckets + 1` boundaries.
+  """
+  return np.linspace(1, size - 1, num_buckets + 1).astype(np.int64)
+
+
+def lttb_indices(steps, values, num_samples):
+  """Largest-Triangle-Three-Buckets downsampling.
+
+  The first and last points are kept, and the others are split into
+  `num_samples - 2` buckets. From each bucket, the point that forms the
+  largest triangle with the point kept from the previous bucket and the
+  average of the next bucket is kept.
+
+  Args:
+    steps: A 1-D array of x coordinates, in increasing order.
+    values: A 1-D array of y coordinates.
+    num_samples: The number of points to keep, at least 2 and less than the
+      number of points.
+
+  Returns:
+    A 1-D integer array of `num_samples` indices, in increasing order.
+  """
+  x = np.asarray(steps, dtype=np.float64)
+  y = np.asarray(values, dtype=np.float64)
+  size = len(y)
+  num_buckets = num_samples - 2
+  bounds = _bucket_bounds(size, num_buckets)
+  indices = np.empty(num_samples, dtype=np.int64)
+  indices[0] = 0
+  indices[-1] = size - 1
+  selected = 0
+  for i in range(num_buckets):
+    (start, end) = (bounds[i], bounds[i + 1])
+    if i + 1 < num_buckets:
+      (next_start, next_end) = (bounds[i + 1], bounds[i + 2])
+    else:
+      (next_start, next_end) = (size - 1, size)
+    average_x = x[next_start:next_end].mean()
+    average_y = y[next_start:next_end].mean()
+    (selected_x, selected_y) = (x[selected], y[selected])
+    # Twice the area of each triangle; the factor does not change the argmax.
+    areas = np.abs(
+        (selected_x - average_x) * (y[start:end] - selected_y) -
+        (selected_x - x[start:end]) * (average_y - selected_y))
+    selected = start + int(np.argmax(areas))
+    indices[i + 1] = selected
+  return indices
+
+
+def min_max_indices(values, num_samples):
+  """Min/max envelope downsampling.
+
+  The first and last points are kept, and the others are split into
+  `(num_samples - 2) // 2` buckets, of which the smallest and the largest
+  value are kept.
+
+  Args:
+    values: A 1-D array of y coordinates.
+    num_samples: The maximum number of points to keep, at least 2 and less
+      than the number of points.
+
+  Returns:
+    A 1-D integer array of at most `num_samples` indices, in increasing order.
+  """
+  y = np.asarray(values)
+  size = len(y)
+  num_buckets = (num_samples - 2) // 2
+  if num_buckets == 0:
+    return np.array([0, size - 1], dtype=np.int64)
+  bounds = _bucket_bounds(size, num_buckets)
+  # Buckets all have about the same length, so pad them to the longest one and
+  # reduce them at once. Padding repeats each bucket's first element, which
+  # changes neither its minimum nor its maximum.
+  starts = bounds[:-1]
+  lengths = bounds[1:] - starts
+  offsets = np.arange(lengths.max())
+  positions = starts[:, np.newaxis] + np.minimum(
+      offsets[np.newaxis, :], lengths[:, np.newaxis] - 1)
+  windows = y[positions]
+  minima = positions[np.arange(num_buckets), np.argmin(windows, axis=1)]
+  maxima = positions[np.arange(num_buckets), np.argmax(windows, axis=1)]
+  return np.unique(np.concatenate([[0, size - 1], minima, maxima]))
+
+
+def stride_indices(size, num_samples):
+  """Evenly spaced downsampling.
+
+  Args:
+    size: The number of points.
+    num_samples: The number of points to keep, at least 2 and less than
+      `size`.
+
+  Returns:
+    A 1-D integer array of `num_samples` indices, in increasing order.
+  """
+  return np.unique(np.round(np.linspace(0, size - 1, num_samples))
+                   .astype(np.int64))
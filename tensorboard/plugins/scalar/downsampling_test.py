@@ -0,0 +1,86 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for scalar downsampling."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from tensorboard.plugins.scalar import downsampling
+
+
+class DownsampleTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(DownsampleTest, self).setUp()
+    self.steps = np.arange(10000) * 3
+    self.values = np.sin(self.steps / 500.0) + np.random.RandomState(0).rand(
+        len(self.steps))
+
+  def assertValidIndices(self, indices, num_samples):
+    self.assertLessEqual(len(indices), num_samples)
+    self.assertEqual(0, indices[0])
+    self.assertEqual(len(self.steps) - 1, indices[-1])
+    self.assertTrue(np.all(np.diff(indices) > 0))
+
+  def testAllMethods(self):
+    for method in downsampling.METHODS:
+      for num_samples in (2, 3, 4, 101, 2000, 9999):
+        indices = downsampling.downsample(
+            method, self.steps, self.values, num_samples)
+        self.assertValidIndices(indices, num_samples)
+
+  def testShortSeriesIsKept(self):
+    for method in downsampling.METHODS:
+      self.assertAllEqual(
+          [0, 1, 2],
+          downsampling.downsample(method, [1, 2, 3], [1.0, 2.0, 3.0], 3))
+      self.assertAllEqual([], downsampling.downsample(method, [], [], 3))
+
+  def testLttbKeepsSpikes(self):
+    values = np.zeros(1000)
+    values[517] = 100.0
+    indices = downsampling.lttb_indices(np.arange(1000), values, 20)
+    self.assertEqual(20, len(indices))
+    self.assertIn(517, indices)
+
+  def testLttbIsDeterministic(self):
+    self.assertAllEqual(
+        downsampling.lttb_indices(self.steps, self.values, 500),
+        downsampling.lttb_indices(self.steps, self.values, 500))
+
+  def testMinMaxKeepsEnvelope(self):
+    indices = downsampling.min_max_indices(self.values, 100)
+    self.assertIn(np.argmin(self.values), indices)
+    self.assertIn(np.argmax(self.values), indices)
+    # Every bucket contributes its extremes.
+    self.assertGreater(len(indices), 90)
+
+  def testStride(self):
+    self.assertAllEqual([0, 3, 6, 9],
+                        downsampling.stride_indices(10, 4))
+
+  def testRejectsBadArguments(self):
+    with self.assertRaises(ValueError):
+      downsampling.downsample('bogus', self.steps, self.values, 10)
+    with self.assertRaises(ValueError):
+      downsampling.downsample(downsampling.LTTB, self.steps, self.values, 1)
+
+
+if __name__ == '__main__':
+  tf.test.main()
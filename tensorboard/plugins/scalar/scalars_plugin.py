@@ -24,6 +24,8 @@ from __future__ import print_function
 
 import collections
 import csv
+import itertools
+import re
 
 import six
 from six import StringIO
@@ -31,17 +33,29 @@ from werkzeug import wrappers
 import numpy as np
 
 from tensorboard import plugin_util
+from tensorboard.backend import columnar
 from tensorboard.backend import http_util
+from tensorboard.backend import response_cache
 from tensorboard.compat import tf
 from tensorboard.plugins import base_plugin
+from tensorboard.plugins.scalar import downsampling
 from tensorboard.plugins.scalar import metadata
-from tensorboard.util import tensor_util
+
+
+# Longer lists of runs or tags are filtered in Python rather than in SQL, to
+# stay clear of SQLite's limit on the number of query parameters.
+_MAX_SQL_IN_LIST_SIZE = 500
+
+# The number of points to downsample to if a request names a downsampling
+# method but no number of samples; about the width of a large chart in pixels.
+_DEFAULT_NUM_SAMPLES = 2000
 
 
 class OutputFormat(object):
   """An enum used to list the valid output formats for API calls."""
   JSON = 'json'
   CSV = 'csv'
+  COLUMNAR = columnar.FORMAT
 
 
 class ScalarsPlugin(base_plugin.TBPlugin):
@@ -57,10 +71,12 @@ class ScalarsPlugin(base_plugin.TBPlugin):
     """
     self._multiplexer = context.multiplexer
     self._db_connection_provider = context.db_connection_provider
+    self._response_cache = context.response_cache
 
   def get_plugin_apps(self):
     return {
         '/scalars': self.scalars_route,
+        '/scalars_batch': self.scalars_batch_route,
         '/tags': self.tags_route,
     }
 
@@ -110,22 +126,30 @@ class ScalarsPlugin(base_plugin.TBPlugin):
         }
       return result
 
-    runs = self._multiplexer.Runs()
-    result = {run: {} for run in runs}
+    # One snapshot gives a consistent view, without visiting every run.
+    index = self._multiplexer.IndexSnapshot()
+    result = {run: {} for run in index.Runs()}
 
-    mapping = self._multiplexer.PluginRunToTagToContent(metadata.PLUGIN_NAME)
+    mapping = index.PluginRunToTagToContent(metadata.PLUGIN_NAME)
     for (run, tag_to_content) in six.iteritems(mapping):
       for (tag, content) in six.iteritems(tag_to_content):
         content = metadata.parse_plugin_metadata(content)
-        summary_metadata = self._multiplexer.SummaryMetadata(run, tag)
+        summary_metadata = index.SummaryMetadata(run, tag)
         result[run][tag] = {'displayName': summary_metadata.display_name,
                             'description': plugin_util.markdown_to_safe_html(
                                 summary_metadata.summary_description)}
 
     return result
 
-  def scalars_impl(self, tag, run, experiment, output_format):
-    """Result of the form `(body, mime_type)`."""
+  def scalars_impl(self, tag, run, experiment, output_format,
+                   downsampling_method=None, num_samples=None):
+    """Result of the form `(body, mime_type)`.
+
+    If `downsampling_method` is one of `downsampling.METHODS`, at most
+    `num_samples` of the points are returned. `OutputFormat.COLUMNAR` bodies
+    have the columns `wall_time` (float64), `step` (int64) and `value`
+    (float64).
+    """
     if self._db_connection_provider:
       db = self._db_connection_provider()
       # We select for steps greater than -1 because the writer inserts
@@ -152,15 +176,21 @@ class ScalarsPlugin(base_plugin.TBPlugin):
           AND Tensors.step > -1
         ORDER BY Tensors.step
       ''', dict(exp=experiment, run=run, tag=tag, plugin=metadata.PLUGIN_NAME))
-      values = [(wall_time, step, self._get_value(data, dtype_enum))
-                for (step, wall_time, data, dtype_enum) in cursor]
+      arrays = self._arrays_from_rows(list(cursor))
     else:
-      tensor_events = self._multiplexer.Tensors(run, tag)
-      values = [(tensor_event.wall_time,
-                 tensor_event.step,
-                 tensor_util.make_ndarray(tensor_event.tensor_proto).item())
-                for tensor_event in tensor_events]
+      series = self._multiplexer.ScalarSeries(run, tag)
+      arrays = (series.wall_times, series.steps, series.values)
+    (wall_times, steps, scalars) = self._downsample(
+        *arrays, downsampling_method=downsampling_method,
+        num_samples=num_samples)
 
+    if output_format == OutputFormat.COLUMNAR:
+      return (columnar.Encode([
+          ('wall_time', wall_times.astype(np.float64)),
+          ('step', steps.astype(np.int64)),
+          ('value', scalars.astype(np.float64)),
+      ]), columnar.MIME_TYPE)
+    values = self._values(wall_times, steps, scalars)
     if output_format == OutputFormat.CSV:
       string_io = StringIO()
       writer = csv.writer(string_io)
@@ -170,6 +200,142 @@ class ScalarsPlugin(base_plugin.TBPlugin):
     else:
       return (values, 'application/json')
 
+  def scalars_batch_impl(self, run_tag_pairs=None, runs=None, tag_regex=None,
+                         experiment=None, downsampling_method=None,
+                         num_samples=None):
+    """Fetches many series at once.
+
+    The series are given either by `run_tag_pairs`, or by `tag_regex` and
+    optionally `runs`. Series that do not exist are left out.
+
+    Args:
+      run_tag_pairs: A list of `(run, tag)` pairs.
+      runs: If `tag_regex` is given, a list of runs to restrict the series
+        to, or None for all runs.
+      tag_regex: A regular expression that the tags of the series must
+        match at their beginning, as in `re.match`.
+      experiment: As in `scalars_impl`.
+      downsampling_method: As in `scalars_impl`.
+      num_samples: As in `scalars_impl`.
+
+    Raises:
+      re.error: If `tag_regex` is not a valid regular expression.
+
+    Returns:
+      A dict mapping each run to a dict mapping each tag to the
+      `[wall_time, step, value]` triples of its series.
+    """
+    if run_tag_pairs is not None:
+      run_tag_pairs = set(run_tag_pairs)
+      runs = set(run for (run, _) in run_tag_pairs)
+      tags = set(tag for (_, tag) in run_tag_pairs)
+      wanted = lambda run, tag: (run, tag) in run_tag_pairs
+    else:
+      pattern = re.compile(tag_regex)
+      run_set = None if runs is None else set(runs)
+      tags = None
+      wanted = lambda run, tag: bool(
+          (run_set is None or run in run_set) and pattern.match(tag))
+
+    result = {}
+    if self._db_connection_provider:
+      for ((run, tag), rows) in itertools.groupby(
+          self._query_batch(experiment, runs, tags), lambda row: row[:2]):
+        if wanted(run, tag):
+          result.setdefault(run, {})[tag] = self._values_from_rows(
+              [row[2:] for row in rows], downsampling_method, num_samples)
+      return result
+
+    mapping = self._multiplexer.PluginRunToTagToContent(metadata.PLUGIN_NAME)
+    for run in (mapping if runs is None else runs):
+      for tag in mapping.get(run, {}):
+        if not wanted(run, tag):
+          continue
+        try:
+          series = self._multiplexer.ScalarSeries(run, tag)
+        except KeyError:
+          # The run was removed after the mapping was taken.
+          continue
+        result.setdefault(run, {})[tag] = self._values(*self._downsample(
+            series.wall_times, series.steps, series.values,
+            downsampling_method, num_samples))
+    return result
+
+  def _query_batch(self, experiment, runs, tags):
+    """Queries the scalars of many series, ordered by run, tag and step.
+
+    Args:
+      experiment: As in `scalars_impl`.
+      runs: A collection of runs to restrict the rows to, or None. It may be
+        ignored if it is too long; callers must filter the rows themselves.
+      tags: Like `runs`, but for tags.
+
+    Returns:
+      An iterable of `(run, tag, step, wall_time, data, dtype)` rows.
+    """
+    params = dict(exp=experiment, plugin=metadata.PLUGIN_NAME)
+    filters = []
+    for (column, values) in (('Runs.run_name', runs), ('Tags.tag_name', tags)):
+      if values is None or len(values) > _MAX_SQL_IN_LIST_SIZE:
+        continue
+      names = []
+      for value in values:
+        name = 'p%d' % len(params)
+        params[name] = value
+        names.append(':' + name)
+      filters.append('AND %s IN (%s)' % (column, ', '.join(names) or 'NULL'))
+    db = self._db_connection_provider()
+    # As in `scalars_impl`, the check for step filters out placeholder rows.
+    return db.execute('''
+      SELECT
+        Runs.run_name,
+        Tags.tag_name,
+        Tensors.step,
+        Tensors.computed_time,
+        Tensors.data,
+        Tensors.dtype
+      FROM Tensors
+      JOIN Tags
+        ON Tensors.series = Tags.tag_id
+      JOIN Runs
+        ON Tags.run_id = Runs.run_id
+      WHERE
+        (:exp == '' OR Runs.experiment_id == CAST(:exp AS INT))
+        AND Tags.plugin_name = :plugin
+        AND Tensors.shape = ''
+        AND Tensors.step > -1
+        %s
+      ORDER BY Runs.run_name, Tags.tag_name, Tensors.step
+    ''' % '\n        '.join(filters), params)
+
+  def _values_from_rows(self, rows, downsampling_method, num_samples):
+    """Like `_values`, for `(step, wall_time, data, dtype)` database rows."""
+    return self._values(*self._downsample(
+        *self._arrays_from_rows(rows), downsampling_method=downsampling_method,
+        num_samples=num_samples))
+
+  def _arrays_from_rows(self, rows):
+    """Returns `(wall_times, steps, scalars)` arrays of database rows."""
+    wall_times = np.array([row[1] for row in rows], dtype=np.float64)
+    steps = np.array([row[0] for row in rows], dtype=np.int64)
+    scalars = np.array([self._get_value(data, dtype_enum)
+                        for (_, _, data, dtype_enum) in rows])
+    return (wall_times, steps, scalars)
+
+  def _downsample(self, wall_times, steps, scalars, downsampling_method,
+                  num_samples):
+    """Returns the `(wall_times, steps, scalars)` arrays of a series."""
+    if downsampling_method:
+      indices = downsampling.downsample(
+          downsampling_method, steps, scalars, num_samples)
+      (wall_times, steps, scalars) = (
+          wall_times[indices], steps[indices], scalars[indices])
+    return (wall_times, steps, scalars)
+
+  def _values(self, wall_times, steps, scalars):
+    """Returns a series as a list of `(wall_time, step, value)` triples."""
+    return list(zip(wall_times.tolist(), steps.tolist(), scalars.tolist()))
+
   def _get_value(self, scalar_data_blob, dtype_enum):
     """Obtains value for scalar event given blob and dtype enum.
 
@@ -186,8 +352,11 @@ class ScalarsPlugin(base_plugin.TBPlugin):
 
   @wrappers.Request.application
   def tags_route(self, request):
-    index = self.index_impl()
-    return http_util.Respond(request, index, 'application/json')
+    key = None if self._db_connection_provider else response_cache.IndexKey(
+        request, self._multiplexer)
+    return response_cache.Respond(
+        self._response_cache, request, key,
+        lambda: (self.index_impl(), 'application/json'))
 
   @wrappers.Request.application
   def scalars_route(self, request):
@@ -197,5 +366,91 @@ class ScalarsPlugin(base_plugin.TBPlugin):
     run = request.args.get('run')
     experiment = request.args.get('experiment')
     output_format = request.args.get('format')
-    (body, mime_type) = self.scalars_impl(tag, run, experiment, output_format)
-    return http_util.Respond(request, body, mime_type)
+    if output_format is None and columnar.Requested(request):
+      output_format = OutputFormat.COLUMNAR
+    try:
+      (downsampling_method, num_samples) = _parse_downsampling(request.args)
+    except ValueError as e:
+      return http_util.Respond(request, str(e), 'text/plain', code=400)
+    return response_cache.Respond(
+        self._response_cache, request, self._cache_key(request, [(run, tag)]),
+        lambda: self.scalars_impl(tag, run, experiment, output_format,
+                                  downsampling_method, num_samples))
+
+  @wrappers.Request.application
+  def scalars_batch_route(self, request):
+    """Returns many series in one response; see `http_api.md`."""
+    # Long lists of runs and tags may not fit in a URL, so accept a form too.
+    args = request.values
+    runs = args.getlist('run')
+    tags = args.getlist('tag')
+    tag_regex = args.get('tagRegex')
+    try:
+      (downsampling_method, num_samples) = _parse_downsampling(args)
+      if tag_regex is not None:
+        if tags:
+          raise ValueError('Expected either tag or tagRegex, not both')
+        key = self._regex_cache_key(request, runs, re.compile(tag_regex))
+        compute = lambda: self.scalars_batch_impl(
+            runs=runs or None,
+            tag_regex=tag_regex,
+            experiment=args.get('experiment'),
+            downsampling_method=downsampling_method,
+            num_samples=num_samples)
+      else:
+        if len(runs) != len(tags):
+          raise ValueError('Expected as many runs as tags, got %d and %d'
+                           % (len(runs), len(tags)))
+        pairs = list(zip(runs, tags))
+        key = self._cache_key(request, pairs)
+        compute = lambda: self.scalars_batch_impl(
+            run_tag_pairs=pairs,
+            experiment=args.get('experiment'),
+            downsampling_method=downsampling_method,
+            num_samples=num_samples)
+    except (ValueError, re.error) as e:
+      return http_util.Respond(request, str(e), 'text/plain', code=400)
+    return response_cache.Respond(
+        self._response_cache, request, key,
+        lambda: (compute(), 'application/json'))
+
+  def _cache_key(self, request, run_tag_pairs):
+    """Returns the response cache key of a request for some series."""
+    if self._db_connection_provider:
+      # The database is written to by other processes; don't cache.
+      return None
+    return response_cache.SeriesKey(request, self._multiplexer, run_tag_pairs)
+
+  def _regex_cache_key(self, request, runs, pattern):
+    """Like `_cache_key`, for the series whose tags match a pattern."""
+    if self._db_connection_provider:
+      return None
+    mapping = self._multiplexer.PluginRunToTagToContent(metadata.PLUGIN_NAME)
+    pairs = tuple(sorted(
+        (run, tag)
+        for run in (runs or mapping)
+        for tag in mapping.get(run, {})
+        if pattern.match(tag)))
+    generations = response_cache.MultiplexerGenerations(self._multiplexer, pairs)
+    # New matching tags change the response, so they are part of the key.
+    return response_cache.RequestKey(
+        request, None if generations is None else (pairs, generations))
+
+
+def _parse_downsampling(args):
+  """Reads the downsampling parameters of a request.
+
+  Returns:
+    A `(downsampling_method, num_samples)` pair, both None if the request
+    does not ask for downsampling.
+
+  Raises:
+    ValueError: If the parameters are invalid.
+  """
+  downsampling_method = args.get('downsampling')
+  if not downsampling_method:
+    return (None, None)
+  num_samples = int(args.get('samples', _DEFAULT_NUM_SAMPLES))
+  # Validate the arguments before loading any data.
+  downsampling.downsample(downsampling_method, [], [], num_samples)
+  return (downsampling_method, num_samples)
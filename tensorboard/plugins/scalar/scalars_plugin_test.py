@@ -21,17 +21,23 @@ from __future__ import print_function
 
 import collections
 import csv
+import json
 import os.path
 
 from six import StringIO
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import tensorflow as tf
+from werkzeug import test as werkzeug_test
+from werkzeug import wrappers
 
 from tensorboard.backend import application
+from tensorboard.backend import columnar
+from tensorboard.backend import response_cache
 from tensorboard.backend.event_processing import plugin_event_accumulator as event_accumulator  # pylint: disable=line-too-long
 from tensorboard.backend.event_processing import plugin_event_multiplexer as event_multiplexer  # pylint: disable=line-too-long
 from tensorboard.plugins import base_plugin
 from tensorboard.plugins.core import core_plugin
+from tensorboard.plugins.scalar import downsampling
 from tensorboard.plugins.scalar import scalars_plugin
 from tensorboard.plugins.scalar import summary
 from tensorboard.util import test_util
@@ -69,6 +75,7 @@ class ScalarsPluginTest(tf.test.TestCase):
     })
     multiplexer.AddRunsFromDirectory(self.logdir)
     multiplexer.Reload()
+    self.multiplexer = multiplexer
     context = base_plugin.TBContext(logdir=self.logdir, multiplexer=multiplexer)
     self.plugin = scalars_plugin.ScalarsPlugin(context)
 
@@ -111,6 +118,7 @@ class ScalarsPluginTest(tf.test.TestCase):
     self.set_up_with_runs([self._RUN_WITH_SCALARS])
     routes = self.plugin.get_plugin_apps()
     self.assertIsInstance(routes['/scalars'], collections.Callable)
+    self.assertIsInstance(routes['/scalars_batch'], collections.Callable)
     self.assertIsInstance(routes['/tags'], collections.Callable)
 
   def generate_run(self, run_name):
@@ -158,6 +166,22 @@ class ScalarsPluginTest(tf.test.TestCase):
         self._RUN_WITH_HISTOGRAM: {},
     }, self.plugin.index_impl())
 
+  def test_tags_route_is_cached_until_tags_change(self):
+    self.set_up_with_runs([self._RUN_WITH_SCALARS])
+    plugin = scalars_plugin.ScalarsPlugin(base_plugin.TBContext(
+        logdir=self.logdir, multiplexer=self.multiplexer,
+        response_cache=response_cache.ResponseCache(2**20)))
+    client = werkzeug_test.Client(plugin.tags_route, wrappers.BaseResponse)
+    for _ in range(2):
+      data = json.loads(client.get('/tags').get_data().decode('utf-8'))
+      self.assertEqual([self._RUN_WITH_SCALARS], list(data))
+    self.generate_run(self._RUN_WITH_LEGACY_SCALARS)
+    self.multiplexer.AddRunsFromDirectory(self.logdir)
+    self.multiplexer.Reload()
+    data = json.loads(client.get('/tags').get_data().decode('utf-8'))
+    self.assertEqual([self._LEGACY_SCALAR_TAG],
+                     list(data[self._RUN_WITH_LEGACY_SCALARS]))
+
   def _test_scalars_json(self, run_name, tag_name, should_work=True):
     self.set_up_with_runs([self._RUN_WITH_LEGACY_SCALARS,
                            self._RUN_WITH_SCALARS,
@@ -213,6 +237,144 @@ class ScalarsPluginTest(tf.test.TestCase):
     self._test_scalars_csv(self._RUN_WITH_HISTOGRAM, self._HISTOGRAM_TAG,
                            should_work=False)
 
+  def test_scalars_columnar(self):
+    self.set_up_with_runs([self._RUN_WITH_SCALARS])
+    tag = '%s/scalar_summary' % self._SCALAR_TAG
+    (full, _) = self.plugin.scalars_impl(
+        tag, self._RUN_WITH_SCALARS, None, scalars_plugin.OutputFormat.JSON)
+    (data, mime_type) = self.plugin.scalars_impl(
+        tag, self._RUN_WITH_SCALARS, None,
+        scalars_plugin.OutputFormat.COLUMNAR)
+    self.assertEqual(columnar.MIME_TYPE, mime_type)
+    columns = columnar.Decode(data)
+    self.assertEqual(['wall_time', 'step', 'value'], list(columns))
+    self.assertEqual('<f8', columns['wall_time'].dtype.str)
+    self.assertEqual('<i8', columns['step'].dtype.str)
+    self.assertEqual([list(point) for point in full], [
+        list(point) for point in zip(*[c.tolist() for c in columns.values()])])
+
+  def test_scalars_route_columnar(self):
+    self.set_up_with_runs([self._RUN_WITH_SCALARS])
+    client = werkzeug_test.Client(
+        self.plugin.scalars_route, wrappers.BaseResponse)
+    query_string = {
+        'run': self._RUN_WITH_SCALARS,
+        'tag': '%s/scalar_summary' % self._SCALAR_TAG,
+    }
+    for (extra, headers) in (({'format': 'columnar'}, {}),
+                             ({}, {'Accept': columnar.MIME_TYPE})):
+      response = client.get(
+          '/scalars', query_string=dict(query_string, **extra), headers=headers)
+      self.assertEqual(200, response.status_code)
+      self.assertEqual(columnar.MIME_TYPE, response.headers['Content-Type'])
+      columns = columnar.Decode(response.get_data())
+      self.assertEqual(self._STEPS, len(columns['step']))
+    response = client.get('/scalars', query_string=query_string)
+    self.assertEqual('application/json', response.headers['Content-Type'])
+
+  def test_scalars_json_downsampled(self):
+    self.set_up_with_runs([self._RUN_WITH_SCALARS])
+    tag = '%s/scalar_summary' % self._SCALAR_TAG
+    (full, _) = self.plugin.scalars_impl(
+        tag, self._RUN_WITH_SCALARS, None, scalars_plugin.OutputFormat.JSON)
+    for method in downsampling.METHODS:
+      (data, mime_type) = self.plugin.scalars_impl(
+          tag, self._RUN_WITH_SCALARS, None, scalars_plugin.OutputFormat.JSON,
+          method, 10)
+      self.assertEqual('application/json', mime_type)
+      self.assertLessEqual(len(data), 10)
+      self.assertEqual(full[0], data[0])
+      self.assertEqual(full[-1], data[-1])
+      for point in data:
+        self.assertIn(point, full)
+
+  def test_scalars_route_downsampled(self):
+    self.set_up_with_runs([self._RUN_WITH_SCALARS])
+    client = werkzeug_test.Client(
+        self.plugin.scalars_route, wrappers.BaseResponse)
+    tag = '%s/scalar_summary' % self._SCALAR_TAG
+    response = client.get('/scalars', query_string={
+        'run': self._RUN_WITH_SCALARS,
+        'tag': tag,
+        'downsampling': 'stride',
+        'samples': '5',
+    })
+    self.assertEqual(200, response.status_code)
+    self.assertEqual(5, len(json.loads(response.get_data().decode('utf-8'))))
+    for query_string in ({'downsampling': 'bogus'},
+                         {'downsampling': 'lttb', 'samples': '1'},
+                         {'downsampling': 'lttb', 'samples': 'many'}):
+      query_string.update({'run': self._RUN_WITH_SCALARS, 'tag': tag})
+      response = client.get('/scalars', query_string=query_string)
+      self.assertEqual(400, response.status_code)
+
+  def test_scalars_batch_with_pairs(self):
+    self.set_up_with_runs([self._RUN_WITH_LEGACY_SCALARS,
+                           self._RUN_WITH_SCALARS,
+                           self._RUN_WITH_HISTOGRAM])
+    tag = '%s/scalar_summary' % self._SCALAR_TAG
+    data = self.plugin.scalars_batch_impl(run_tag_pairs=[
+        (self._RUN_WITH_SCALARS, tag),
+        (self._RUN_WITH_LEGACY_SCALARS, self._LEGACY_SCALAR_TAG),
+        (self._RUN_WITH_HISTOGRAM, self._HISTOGRAM_TAG),
+        ('nonexistent', tag),
+    ])
+    json_format = scalars_plugin.OutputFormat.JSON
+    self.assertEqual({
+        self._RUN_WITH_SCALARS: {
+            tag: self.plugin.scalars_impl(
+                tag, self._RUN_WITH_SCALARS, None, json_format)[0],
+        },
+        self._RUN_WITH_LEGACY_SCALARS: {
+            self._LEGACY_SCALAR_TAG: self.plugin.scalars_impl(
+                self._LEGACY_SCALAR_TAG, self._RUN_WITH_LEGACY_SCALARS, None,
+                json_format)[0],
+        },
+    }, data)
+
+  def test_scalars_batch_with_regex(self):
+    self.set_up_with_runs([self._RUN_WITH_LEGACY_SCALARS,
+                           self._RUN_WITH_SCALARS,
+                           self._RUN_WITH_HISTOGRAM])
+    data = self.plugin.scalars_batch_impl(tag_regex='simple')
+    self.assertEqual([self._RUN_WITH_SCALARS], list(data))
+    data = self.plugin.scalars_batch_impl(
+        runs=[self._RUN_WITH_LEGACY_SCALARS], tag_regex='.*values',
+        downsampling_method=downsampling.STRIDE, num_samples=3)
+    self.assertEqual([self._RUN_WITH_LEGACY_SCALARS], list(data))
+    series = data[self._RUN_WITH_LEGACY_SCALARS][self._LEGACY_SCALAR_TAG]
+    self.assertEqual([0, 49, 98], [step for (_, step, _) in series])
+
+  def test_scalars_batch_route(self):
+    self.set_up_with_runs([self._RUN_WITH_LEGACY_SCALARS,
+                           self._RUN_WITH_SCALARS])
+    client = werkzeug_test.Client(
+        self.plugin.scalars_batch_route, wrappers.BaseResponse)
+    tag = '%s/scalar_summary' % self._SCALAR_TAG
+    response = client.post('/scalars_batch', data={
+        'run': [self._RUN_WITH_SCALARS, self._RUN_WITH_LEGACY_SCALARS],
+        'tag': [tag, self._LEGACY_SCALAR_TAG],
+    })
+    self.assertEqual(200, response.status_code)
+    data = json.loads(response.get_data().decode('utf-8'))
+    self.assertEqual(self._STEPS, len(data[self._RUN_WITH_SCALARS][tag]))
+    self.assertEqual(
+        self._STEPS,
+        len(data[self._RUN_WITH_LEGACY_SCALARS][self._LEGACY_SCALAR_TAG]))
+
+    response = client.get('/scalars_batch', query_string={
+        'tagRegex': 'simple', 'downsampling': 'lttb', 'samples': '4'})
+    self.assertEqual(200, response.status_code)
+    data = json.loads(response.get_data().decode('utf-8'))
+    self.assertEqual(4, len(data[self._RUN_WITH_SCALARS][tag]))
+
+    for query_string in ({'run': 'a'},
+                         {'tagRegex': '('},
+                         {'tagRegex': 'x', 'tag': 'y'},
+                         {'tagRegex': 'x', 'downsampling': 'bogus'}):
+      response = client.get('/scalars_batch', query_string=query_string)
+      self.assertEqual(400, response.status_code)
+
   def test_active_with_legacy_scalars(self):
     self.set_up_with_runs([self._RUN_WITH_LEGACY_SCALARS])
     self.assertTrue(self.plugin.is_active())
@@ -256,6 +418,46 @@ class ScalarsPluginTest(tf.test.TestCase):
     self.assertEqual('application/json', mime_type)
     self.assertEqual(len(data), self._STEPS)
 
+  def test_scalars_db_downsampled(self):
+    self.set_up_db()
+    self.generate_run_to_db('exp1', self._RUN_WITH_SCALARS)
+    all_exps = self.core_plugin.list_experiments_impl()
+    exp1 = next((x for x in all_exps if x.get('name') == 'exp1'), {})
+
+    (data, mime_type) = self.plugin.scalars_impl(
+        self._SCALAR_TAG, self._RUN_WITH_SCALARS, exp1.get('id'),
+        scalars_plugin.OutputFormat.JSON, downsampling.MIN_MAX, 10)
+    self.assertEqual('application/json', mime_type)
+    self.assertLessEqual(len(data), 10)
+    self.assertEqual([0, self._STEPS - 1], [data[0][1], data[-1][1]])
+
+  def test_scalars_batch_db(self):
+    self.set_up_db()
+    self.generate_run_to_db('exp1', self._RUN_WITH_SCALARS)
+    self.generate_run_to_db('exp1', self._RUN_WITH_LEGACY_SCALARS)
+    all_exps = self.core_plugin.list_experiments_impl()
+    exp1 = next((x for x in all_exps if x.get('name') == 'exp1'), {})
+
+    data = self.plugin.scalars_batch_impl(
+        run_tag_pairs=[(self._RUN_WITH_SCALARS, self._SCALAR_TAG),
+                       (self._RUN_WITH_SCALARS, 'nonexistent')],
+        experiment=exp1.get('id'))
+    (expected, _) = self.plugin.scalars_impl(
+        self._SCALAR_TAG, self._RUN_WITH_SCALARS, exp1.get('id'),
+        scalars_plugin.OutputFormat.JSON)
+    self.assertEqual(
+        {self._RUN_WITH_SCALARS: {self._SCALAR_TAG: expected}}, data)
+
+    data = self.plugin.scalars_batch_impl(
+        tag_regex='simple', experiment=exp1.get('id'),
+        downsampling_method=downsampling.STRIDE, num_samples=2)
+    self.assertEqual(
+        [self._RUN_WITH_LEGACY_SCALARS, self._RUN_WITH_SCALARS],
+        sorted(data))
+    for tag_to_values in data.values():
+      self.assertEqual([0, self._STEPS - 1],
+                       [step for (_, step, _) in tag_to_values[self._SCALAR_TAG]])
+
   def test_scalars_db_no_match(self):
     self.set_up_db()
     self.generate_run_to_db('exp1', self._RUN_WITH_SCALARS)
@@ -34,8 +34,10 @@ from abc import abstractmethod
 import argparse
 import atexit
 from collections import defaultdict
+from collections import OrderedDict
 import errno
 import os
+import select
 import signal
 import socket
 import sys
@@ -45,6 +47,7 @@ import inspect
 
 import absl.logging
 import six
+from six.moves import queue
 from six.moves import urllib
 from six.moves import xrange  # pylint: disable=redefined-builtin
 from werkzeug import serving
@@ -105,7 +108,8 @@ class TensorBoard(object):
   Fields:
     plugin_loaders: Set from plugins passed to constructor.
     assets_zip_provider: Set by constructor.
-    server_class: Set by constructor.
+    server_class: Set by constructor, or None to use the server selected by
+      the `--http_server` flag.
     flags: An argparse.Namespace set by the configure() method.
     cache_key: As `manager.cache_key`; set by the configure() method.
   """
@@ -123,6 +127,7 @@ class TensorBoard(object):
       server_class: An optional factory for a `TensorBoardServer` to use
         for serving the TensorBoard WSGI app. If provided, its callable
         signature should match that of `TensorBoardServer.__init__`.
+        Otherwise, the server is selected by the `--http_server` flag.
 
     :type plugins: list[Union[base_plugin.TBLoader, Type[base_plugin.TBPlugin]]]
     :type assets_zip_provider: () -> file
@@ -133,8 +138,6 @@ class TensorBoard(object):
       plugins = default.get_plugins()
     if assets_zip_provider is None:
       assets_zip_provider = get_default_assets_zip_provider()
-    if server_class is None:
-      server_class = create_port_scanning_werkzeug_server
     def make_loader(plugin):
       if isinstance(plugin, base_plugin.TBLoader):
         return plugin
@@ -281,7 +284,9 @@ class TensorBoard(object):
     """Set a signal handler to gracefully exit on the given signal.
 
     When this process receives the given signal, it will run `atexit`
-    handlers and then exit with `0`.
+    handlers and then exit with `0`. The exit unwinds `serve_forever` of the
+    server in the main thread, so that servers such as `PooledWerkzeugServer`
+    can finish the requests they accepted first.
 
     Args:
       signal_number: The numeric code for the signal to handle, like
@@ -307,7 +312,10 @@ class TensorBoard(object):
     app = application.standard_tensorboard_wsgi(self.flags,
                                                 self.plugin_loaders,
                                                 self.assets_zip_provider)
-    return self.server_class(app, self.flags)
+    server_class = self.server_class
+    if server_class is None:
+      server_class = SERVER_FACTORIES[self.flags.http_server]
+    return server_class(app, self.flags)
 
 
 class TensorBoardServer(object):
@@ -416,6 +424,10 @@ class WerkzeugServer(serving.ThreadedWSGIServer, TensorBoardServer):
   # ThreadedWSGIServer handles this in werkzeug 0.12+ but we allow 0.11.x.
   daemon_threads = True
 
+  # The `serving.WSGIRequestHandler` subclass to handle requests with, or
+  # None for the default.
+  handler_class = None
+
   def __init__(self, wsgi_app, flags):
     self._flags = flags
     host = flags.host
@@ -429,7 +441,8 @@ class WerkzeugServer(serving.ThreadedWSGIServer, TensorBoardServer):
       host = self._get_wildcard_address(port)
 
     try:
-      super(WerkzeugServer, self).__init__(host, port, wsgi_app)
+      super(WerkzeugServer, self).__init__(
+          host, port, wsgi_app, handler=self.handler_class)
     except socket.error as e:
       if hasattr(errno, 'EACCES') and e.errno == errno.EACCES:
         raise TensorBoardServerException(
@@ -531,3 +544,179 @@ class WerkzeugServer(serving.ThreadedWSGIServer, TensorBoardServer):
 
 
 create_port_scanning_werkzeug_server = with_port_scanning(WerkzeugServer)
+
+
+class _PooledRequestHandler(serving.WSGIRequestHandler):
+  """Handles the requests of a connection to a `PooledWerkzeugServer`."""
+
+  protocol_version = 'HTTP/1.1'
+
+  def setup(self):
+    # Bounds how long reading a request or writing a response may block.
+    self.timeout = self.server.request_timeout_secs
+    self._served_request = False
+    serving.WSGIRequestHandler.setup(self)
+
+  def handle_one_request(self):
+    # Waiting for the next request of a kept-alive connection must not hold
+    # on to the worker thread when other connections need it, so rather than
+    # blocking in `readline`, let the server decide how long to wait.
+    if self._served_request and not self.server.wait_for_request(
+        self.connection):
+      self.close_connection = True
+      return
+    self._served_request = True
+    serving.WSGIRequestHandler.handle_one_request(self)
+    if self.server.draining:
+      self.close_connection = True
+
+
+class PooledWerkzeugServer(WerkzeugServer):
+  """Implementation of TensorBoardServer with a bounded pool of threads.
+
+  Unlike `WerkzeugServer`, which starts a thread for every connection, this
+  server hands accepted connections to `--http_workers` worker threads, with
+  up to `--http_backlog` connections waiting for a worker. Connections are
+  kept alive between requests for up to `--http_keepalive_secs`, but an idle
+  connection is closed as soon as another connection waits for a worker, so
+  that idle browser connections cannot starve the pool.
+
+  When `serve_forever` returns or raises, such as when SIGTERM makes the main
+  thread exit, the server stops accepting connections and waits up to
+  `--http_drain_secs` for the connections it accepted to be served.
+  """
+
+  handler_class = _PooledRequestHandler
+
+  def __init__(self, wsgi_app, flags):
+    # Read by `server_activate` to set the backlog of the listening socket.
+    self.request_queue_size = flags.http_backlog
+    self.request_timeout_secs = flags.http_timeout_secs or None
+    self.draining = False
+    self._lock = threading.Lock()
+    # Accepted connections as `(request, client_address)`, or None to stop a
+    # worker.
+    self._connections = queue.Queue(maxsize=flags.http_backlog)
+    # Guarded by `_lock`: how many connections are queued, how many workers
+    # wait for a connection, and the kept-alive connections that wait for a
+    # request, oldest first.
+    self._queued = 0
+    self._idle_workers = 0
+    self._idle_connections = OrderedDict()
+    super(PooledWerkzeugServer, self).__init__(wsgi_app, flags)
+    self._workers = []
+    for i in xrange(flags.http_workers):
+      worker = threading.Thread(
+          target=self._work, name='TensorBoardHTTPWorker-%d' % i)
+      worker.daemon = True
+      worker.start()
+      self._workers.append(worker)
+
+  def process_request(self, request, client_address):
+    """Overrides `ThreadingMixIn` to queue connections for the workers."""
+    with self._lock:
+      self._queued += 1
+      if self._queued > self._idle_workers and self._idle_connections:
+        (idle, _) = self._idle_connections.popitem(last=False)
+        _shutdown_read(idle)
+    # Blocks accepting more connections while the queue is full, leaving them
+    # in the backlog of the listening socket.
+    self._connections.put((request, client_address))
+
+  def _work(self):
+    while True:
+      with self._lock:
+        self._idle_workers += 1
+      connection = self._connections.get()
+      with self._lock:
+        self._idle_workers -= 1
+        if connection is not None:
+          self._queued -= 1
+      if connection is None:
+        return
+      # Serves the connection, closes it, and reports errors.
+      self.process_request_thread(*connection)
+
+  def wait_for_request(self, connection):
+    """Waits for the next request of a kept-alive connection.
+
+    Args:
+      connection: The socket of the connection.
+
+    Returns:
+      Whether the connection became readable before the keep-alive timeout,
+      and was not closed to free the worker or to drain the server.
+    """
+    with self._lock:
+      if self.draining or self._queued > self._idle_workers:
+        return False
+      self._idle_connections[connection] = True
+    readable = _wait_readable(connection, self._flags.http_keepalive_secs)
+    with self._lock:
+      still_idle = self._idle_connections.pop(connection, False)
+    return readable and still_idle
+
+  def serve_forever(self):
+    try:
+      super(PooledWerkzeugServer, self).serve_forever()
+    finally:
+      self._drain()
+
+  def _drain(self):
+    """Stops accepting connections and waits for accepted ones to be served."""
+    with self._lock:
+      if self.draining:
+        return
+      self.draining = True
+      idle = list(self._idle_connections)
+      self._idle_connections.clear()
+    deadline = time.time() + self._flags.http_drain_secs
+    logger.info('Draining HTTP connections for up to %s secs',
+                self._flags.http_drain_secs)
+    self.server_close()
+    for connection in idle:
+      _shutdown_read(connection)
+    try:
+      for _ in self._workers:
+        # Workers serve all queued connections before they stop.
+        self._connections.put(None, timeout=max(deadline - time.time(), 0))
+    except queue.Full:
+      pass
+    for worker in self._workers:
+      worker.join(max(deadline - time.time(), 0))
+    busy = sum(1 for worker in self._workers if worker.is_alive())
+    if busy:
+      logger.warn('%d HTTP workers were still busy after draining for %s secs',
+                  busy, self._flags.http_drain_secs)
+
+
+def _wait_readable(sock, timeout_secs):
+  """Returns whether a socket becomes readable, or closed, within a timeout."""
+  try:
+    if hasattr(select, 'poll'):
+      # Unlike `select.select`, works for file descriptors above FD_SETSIZE.
+      poller = select.poll()
+      poller.register(sock, select.POLLIN)
+      return bool(poller.poll(timeout_secs * 1000))
+    return bool(select.select([sock], [], [], timeout_secs)[0])
+  except (select.error, socket.error, ValueError):
+    return False
+
+
+def _shutdown_read(sock):
+  """Makes a thread waiting for the socket to be readable see its end."""
+  try:
+    sock.shutdown(socket.SHUT_RD)
+  except socket.error:
+    # Already closed by the client.
+    pass
+
+
+create_port_scanning_pooled_werkzeug_server = with_port_scanning(
+    PooledWerkzeugServer)
+
+# Factories of `TensorBoardServer`s by the value of the `--http_server` flag.
+SERVER_FACTORIES = {
+    'threaded': create_port_scanning_werkzeug_server,
+    'pooled': create_port_scanning_pooled_werkzeug_server,
+}
@@ -19,8 +19,12 @@ from __future__ import division
 from __future__ import print_function
 
 import argparse
+import socket
+import threading
+import time
 
 import six
+from six.moves import http_client
 
 from tensorboard import program
 from tensorboard import test as tb_test
@@ -86,5 +90,105 @@ class WerkzeugServerTest(tb_test.TestCase):
     self.assertTrue(one_passed)  # We expect either IPv4 or IPv6 to be supported
 
 
+class PooledWerkzeugServerTest(tb_test.TestCase):
+  """Tests the pooled Werkzeug implementation of TensorBoardServer."""
+
+  def setUp(self):
+    super(PooledWerkzeugServerTest, self).setUp()
+    # Requests to '/block' wait for this event.
+    self.unblock = threading.Event()
+    self.blocked = threading.Event()
+    self.addCleanup(self.unblock.set)
+
+  def _app(self, environ, start_response):
+    if environ['PATH_INFO'] == '/block':
+      self.blocked.set()
+      self.unblock.wait()
+    body = ('%s %s' % (threading.current_thread().name,
+                       environ['REMOTE_PORT'])).encode('utf-8')
+    start_response('200 OK', [('Content-Type', 'text/plain'),
+                              ('Content-Length', str(len(body)))])
+    return [body]
+
+  def _start(self, **kwargs):
+    flags = argparse.Namespace(
+        host='127.0.0.1', port=0, path_prefix='', http_workers=2,
+        http_backlog=16, http_timeout_secs=10.0, http_keepalive_secs=30.0,
+        http_drain_secs=10.0)
+    for (k, v) in six.iteritems(kwargs):
+      setattr(flags, k, v)
+    server = program.PooledWerkzeugServer(self._app, flags)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    self.addCleanup(thread.join)
+    self.addCleanup(server.shutdown)
+    return (server, thread)
+
+  def _get(self, connection, path='/'):
+    """Returns the worker and client port that served a request."""
+    connection.request('GET', path)
+    response = connection.getresponse()
+    self.assertEqual(200, response.status)
+    (worker, port) = response.read().decode('utf-8').split()
+    return (worker, int(port))
+
+  def _connect(self, server):
+    return http_client.HTTPConnection(
+        '127.0.0.1', server.server_port, timeout=10)
+
+  def testServesWithBoundedWorkers(self):
+    (server, _) = self._start()
+    workers = set()
+    for _ in range(5):
+      connection = self._connect(server)
+      workers.add(self._get(connection)[0])
+      connection.close()
+    self.assertLessEqual(len(workers), 2)
+    for worker in workers:
+      self.assertStartsWith(worker, 'TensorBoardHTTPWorker-')
+
+  def testKeepsConnectionsAlive(self):
+    (server, _) = self._start()
+    connection = self._connect(server)
+    (_, first_port) = self._get(connection)
+    (_, second_port) = self._get(connection)
+    self.assertEqual(first_port, second_port)
+    connection.close()
+
+  def testIdleConnectionsYieldWorkers(self):
+    (server, _) = self._start(http_workers=1)
+    idle = self._connect(server)
+    self._get(idle)
+    # The only worker waits for the next request of `idle`, which has to be
+    # closed to serve another connection.
+    other = self._connect(server)
+    self._get(other)
+    with self.assertRaises((http_client.HTTPException, socket.error)):
+      self._get(idle)
+
+  def testDrainsAcceptedRequests(self):
+    (server, thread) = self._start()
+    connection = self._connect(server)
+    results = []
+    request = threading.Thread(
+        target=lambda: results.append(self._get(connection, '/block')))
+    request.start()
+    self.assertTrue(self.blocked.wait(10))
+    server.shutdown()
+    deadline = time.time() + 10
+    while not server.draining and time.time() < deadline:
+      time.sleep(0.01)
+    # The server no longer accepts connections, but serves the request it
+    # accepted once the application returns.
+    with self.assertRaises(socket.error):
+      socket.create_connection(('127.0.0.1', server.server_port), timeout=10)
+    self.assertTrue(thread.is_alive())
+    self.unblock.set()
+    request.join()
+    thread.join()
+    self.assertEqual(1, len(results))
+
+
 if __name__ == '__main__':
   tb_test.main()
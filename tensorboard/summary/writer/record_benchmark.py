@@ -0,0 +1,120 @@
+# Copyright 2019 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Benchmarks for reading and writing TFRecord files without TensorFlow.
+
+Measures the throughput of `RecordWriter.write` and of the pure-Python
+`PyRecordReader_New` stub over a range of record sizes. Both are dominated
+by CRC-32C checksumming, so the results depend heavily on whether the
+optional `crc32c` package is installed; the backend in use is logged at
+startup.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import time
+
+from six.moves import xrange
+
+from absl import app
+from absl import logging
+
+from tensorboard.compat.tensorflow_stub import errors
+from tensorboard.compat.tensorflow_stub import pywrap_tensorflow
+from tensorboard.summary.writer import record_writer
+from tensorboard.util import tb_logging
+
+
+logger = tb_logging.get_logger()
+
+# Total payload bytes written and read per measurement.
+_TOTAL_BYTES = 32 * 1024 * 1024
+
+
+def bench_write(path, record, count):
+  """Write `count` copies of `record` to `path`; return elapsed seconds."""
+  start = time.time()
+  with open(path, 'wb') as f:
+    writer = record_writer.RecordWriter(f)
+    for _ in xrange(count):
+      writer.write(record)
+  return time.time() - start
+
+
+def bench_read(path):
+  """Read every record in `path`; return (elapsed seconds, record count)."""
+  start = time.time()
+  reader = pywrap_tensorflow.PyRecordReader_New(path)
+  count = 0
+  while True:
+    try:
+      reader.GetNext()
+    except errors.OutOfRangeError:
+      break
+    count += 1
+  return (time.time() - start, count)
+
+
+def _format_line(headers, fields):
+  """Format a line of a table.
+
+  Arguments:
+    headers: A list of strings that are used as the table headers.
+    fields: A list of the same length as `headers` where `fields[i]` is
+      the entry for `headers[i]` in this row. Elements can be of
+      arbitrary types. Pass `headers` to print the header row.
+
+  Returns:
+    A pretty string.
+  """
+  assert len(fields) == len(headers), (fields, headers)
+  fields = ["%2.2f" % field if isinstance(field, float) else str(field)
+            for field in fields]
+  return '  '.join(' ' * max(0, len(header) - len(field)) + field
+                   for (header, field) in zip(headers, fields))
+
+
+def main(unused_argv):
+  logging.set_verbosity(logging.INFO)
+  if pywrap_tensorflow._crc32c_accelerated is not None:
+    logger.info('CRC-32C backend: crc32c package')
+  else:
+    logger.info('CRC-32C backend: pure Python (slicing-by-8)')
+
+  tmpdir = tempfile.mkdtemp(prefix='record_benchmark')
+  path = os.path.join(tmpdir, 'events.out.tfevents.benchmark')
+  try:
+    headers = ('RECORD_BYTES', 'RECORDS', 'WRITE_MB/S', 'READ_MB/S')
+    logger.info(_format_line(headers, headers))
+    for record_size in (64, 1024, 64 * 1024, 1024 * 1024):
+      record = os.urandom(record_size)
+      count = max(1, _TOTAL_BYTES // record_size)
+      megabytes = record_size * count / 1e6
+      write_time = min(bench_write(path, record, count)
+                       for _ in xrange(3))  # best-of-three timing
+      read_time = min(bench_read(path)[0] for _ in xrange(3))
+      fields = (record_size, count, megabytes / write_time,
+                megabytes / read_time)
+      logger.info(_format_line(headers, fields))
+  finally:
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+  app.run(main)